@@ -0,0 +1,45 @@
+"""add roster snapshots
+
+Revision ID: a7c9e1f3b5d7
+Revises: f6a8b0c2d4e6
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "a7c9e1f3b5d7"
+down_revision: str | None = "f6a8b0c2d4e6"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "roster_snapshots",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("class_id", sa.Integer(), nullable=False),
+        sa.Column("source", sa.String(), nullable=False),
+        sa.Column("content_hash", sa.String(), nullable=False),
+        sa.Column("entries", sa.JSON(), nullable=False),
+        sa.Column("last_full_sync_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "created",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column("updated", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["class_id"], ["classes.id"], ondelete="cascade"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "class_id", "source", name="_roster_snapshot_class_source_uc"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("roster_snapshots")
@@ -0,0 +1,65 @@
+"""add user merge audits
+
+Revision ID: b8d0f2a4c6e8
+Revises: a7c9e1f3b5d7
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "b8d0f2a4c6e8"
+down_revision: str | None = "a7c9e1f3b5d7"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_merge_audits",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("batch_id", sa.String(), nullable=False),
+        sa.Column("new_user_id", sa.Integer(), nullable=False),
+        sa.Column("old_user_id", sa.Integer(), nullable=False),
+        sa.Column("rows_moved", sa.JSON(), nullable=False),
+        sa.Column("tuples_moved", sa.Integer(), nullable=False),
+        sa.Column(
+            "created",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_user_merge_audits_batch_id"),
+        "user_merge_audits",
+        ["batch_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_user_merge_audits_new_user_id"),
+        "user_merge_audits",
+        ["new_user_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_user_merge_audits_old_user_id"),
+        "user_merge_audits",
+        ["old_user_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_user_merge_audits_old_user_id"), table_name="user_merge_audits"
+    )
+    op.drop_index(
+        op.f("ix_user_merge_audits_new_user_id"), table_name="user_merge_audits"
+    )
+    op.drop_index(op.f("ix_user_merge_audits_batch_id"), table_name="user_merge_audits")
+    op.drop_table("user_merge_audits")
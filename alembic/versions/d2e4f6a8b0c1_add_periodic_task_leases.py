@@ -0,0 +1,70 @@
+"""add periodic task leases and runs
+
+Revision ID: d2e4f6a8b0c1
+Revises: c9e1f3a5b7d9
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "d2e4f6a8b0c1"
+down_revision: str | None = "c9e1f3a5b7d9"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+periodic_task_run_status = sa.Enum(
+    "RUNNING",
+    "COMPLETED",
+    "FAILED",
+    "SKIPPED",
+    name="periodictaskrunstatus",
+)
+
+
+def upgrade() -> None:
+    op.add_column("periodic_tasks", sa.Column("leader_id", sa.String(), nullable=True))
+    op.add_column(
+        "periodic_tasks",
+        sa.Column("lease_expires_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.add_column(
+        "periodic_tasks",
+        sa.Column("fencing_token", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "periodic_tasks",
+        sa.Column("next_run_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_table(
+        "periodic_task_runs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("task_id", sa.Integer(), nullable=False),
+        sa.Column("scheduled_for", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("status", periodic_task_run_status, nullable=False),
+        sa.Column("fencing_token", sa.Integer(), nullable=False),
+        sa.Column("executor", sa.String(), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["task_id"], ["periodic_tasks.id"], ondelete="cascade"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "task_id", "scheduled_for", name="periodic_task_runs_occurrence_uc"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("periodic_task_runs")
+    op.drop_column("periodic_tasks", "next_run_at")
+    op.drop_column("periodic_tasks", "fencing_token")
+    op.drop_column("periodic_tasks", "lease_expires_at")
+    op.drop_column("periodic_tasks", "leader_id")
+
+    bind = op.get_bind()
+    periodic_task_run_status.drop(bind, checkfirst=True)
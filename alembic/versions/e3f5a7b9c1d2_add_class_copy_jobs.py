@@ -0,0 +1,73 @@
+"""add class copy jobs
+
+Revision ID: e3f5a7b9c1d2
+Revises: d2e4f6a8b0c1
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "e3f5a7b9c1d2"
+down_revision: str | None = "d2e4f6a8b0c1"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+class_copy_job_status = sa.Enum(
+    "RUNNING",
+    "COMPLETED",
+    "FAILED",
+    name="classcopyjobstatus",
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "class_copy_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("source_class_id", sa.Integer(), nullable=False),
+        sa.Column("target_class_id", sa.Integer(), nullable=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("options", sa.JSON(), nullable=False),
+        sa.Column("status", class_copy_job_status, nullable=False),
+        sa.Column("completed_steps", sa.JSON(), nullable=False),
+        sa.Column("copied_assistants", sa.JSON(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column(
+            "created",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column("updated", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["source_class_id"], ["classes.id"], ondelete="cascade"
+        ),
+        sa.ForeignKeyConstraint(
+            ["target_class_id"], ["classes.id"], ondelete="SET NULL"
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="cascade"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_class_copy_jobs_source_class_id"),
+        "class_copy_jobs",
+        ["source_class_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_class_copy_jobs_source_class_id"), table_name="class_copy_jobs"
+    )
+    op.drop_table("class_copy_jobs")
+
+    bind = op.get_bind()
+    class_copy_job_status.drop(bind, checkfirst=True)
@@ -0,0 +1,54 @@
+"""add data migration shards
+
+Revision ID: f4a6b8c0d2e3
+Revises: e3f5a7b9c1d2
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "f4a6b8c0d2e3"
+down_revision: str | None = "e3f5a7b9c1d2"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "data_migration_shards",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("migration", sa.String(), nullable=False),
+        sa.Column("shard", sa.Integer(), nullable=False),
+        sa.Column("end_id", sa.Integer(), nullable=False),
+        sa.Column("cursor", sa.Integer(), nullable=False),
+        sa.Column("processed", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.Column(
+            "created",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column("updated", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("migration", "shard", name="uq_data_migration_shard"),
+    )
+    op.create_index(
+        op.f("ix_data_migration_shards_migration"),
+        "data_migration_shards",
+        ["migration"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_data_migration_shards_migration"),
+        table_name="data_migration_shards",
+    )
+    op.drop_table("data_migration_shards")
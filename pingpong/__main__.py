@@ -3,6 +3,7 @@ import asyncio
 import contextlib
 import logging
 import sys
+import time
 import webbrowser
 from typing import Callable, Dict, Optional, cast
 
@@ -82,37 +83,60 @@ from pingpong.migrations.m14_migrate_lecture_slide_v4_context_to_v5 import (
     migrate_lecture_slide_v4_context_to_v5,
 )
 from pingpong.migrations.m15_v3_migrate_threads_and_messages import (
-    migrate_threads_and_messages_to_v3,
+    threads_and_messages_migration,
 )
 from pingpong.migrations.m16_migrate_message_parts import (
-    migrate_message_parts,
+    message_parts_migration,
 )
 from pingpong.migrations.m17_migrate_message_attachments import (
-    migrate_message_attachments,
+    message_attachments_migration,
 )
 from pingpong.migrations.m19_migrate_all_to_next_gen import migrate_all_to_next_gen
 from pingpong.migrations.m20_migrate_voice_mode_threads_to_v3 import (
     migrate_voice_mode_threads_to_v3,
 )
 from pingpong.migrations.m21_finalize_v2_threads_to_v3 import (
-    finalize_v2_threads_to_v3,
+    finalize_v2_threads_migration,
     revert_finalized_v3_threads_to_v2,
 )
+from pingpong.migrations.sharded import (
+    MIGRATION_BATCH_SIZE,
+    MIGRATION_DB_BATCHES_PER_SECOND,
+    MIGRATION_OPENAI_REQUESTS_PER_SECOND,
+    MIGRATION_WORKERS,
+    run_sharded_migration,
+)
 from pingpong.now import _get_next_run_time, croner, utcnow
-from pingpong.schemas import LMSType, RunStatus
+from pingpong.schemas import LMSType, MisfirePolicy, RunStatus
 from pingpong.lti.course_bridge import course_bridge_sync_all
-from pingpong.summary import send_class_summary_for_class
+from pingpong.summary import (
+    SUMMARY_CLASS_CONCURRENCY,
+    SummaryUsage,
+    send_class_summary_for_class,
+)
 
 from .auth import encode_auth_token
 from .bg import get_server
 from .canvas import canvas_sync_all
+from .paging import close_shared_connector
+from .roster_sync import (
+    ROSTER_SYNC_CLASS_TIMEOUT_SECONDS,
+    ROSTER_SYNC_CONCURRENCY,
+    ROSTER_SYNC_REQUESTS_PER_SECOND,
+    HostRateLimiter,
+)
 from .config import config
+from .copy import resume_class_copy
+from .email_outbox import EmailOutboxDispatcher
+from .scheduler import TaskScheduler
 from .errors import sentry
 from . import lecture_slide_processing
 from .models import (
     APIKey,
     Assistant,
     Base,
+    ClassCopyJob,
+    EmailOutbox,
     ExternalLogin,
     Run,
     S3File,
@@ -170,6 +194,18 @@ def schedule() -> None:
     pass
 
 
+@cli.group("email")
+def email() -> None:
+    """Outbound email queue commands."""
+    pass
+
+
+@cli.group("copy")
+def class_copy() -> None:
+    """Class copy job commands."""
+    pass
+
+
 @auth.command("create_db_schema")
 def create_db_schema() -> None:
     async def _make_db_schema() -> None:
@@ -1203,6 +1239,52 @@ def m14_migrate_lecture_slide_v4_context_to_v5(
     asyncio.run(_m14_migrate_lecture_slide_v4_context_to_v5())
 
 
+def _sharded_migration_options(f):
+    """Options of migrations run with `run_sharded_migration`."""
+    options = [
+        click.option(
+            "--workers",
+            default=MIGRATION_WORKERS,
+            show_default=True,
+            help="Shards migrated at once, each with its own DB connection.",
+        ),
+        click.option(
+            "--shards",
+            type=int,
+            default=None,
+            help="Key ranges to split a new run into. Defaults to 4 per worker.",
+        ),
+        click.option(
+            "--batch-size",
+            default=MIGRATION_BATCH_SIZE,
+            show_default=True,
+            help="Rows fetched, migrated and checkpointed together.",
+        ),
+        click.option(
+            "--openai-requests-per-second",
+            default=MIGRATION_OPENAI_REQUESTS_PER_SECOND,
+            show_default=True,
+            help="Rows sent to OpenAI per second, across all workers.",
+        ),
+        click.option(
+            "--db-batches-per-second",
+            default=MIGRATION_DB_BATCHES_PER_SECOND,
+            show_default=True,
+            help="Batches fetched from the DB per second, across all workers.",
+        ),
+        click.option(
+            "--restart-checkpoints",
+            "restart",
+            is_flag=True,
+            default=False,
+            help="Discard checkpoints of an unfinished run and plan a new one.",
+        ),
+    ]
+    for option in reversed(options):
+        f = option(f)
+    return f
+
+
 @db.command("m15_v3_migrate_threads_and_messages")
 @click.option(
     "--resume/--restart",
@@ -1212,36 +1294,46 @@ def m14_migrate_lecture_slide_v4_context_to_v5(
         "m16/m17-derived data. Restart re-syncs every eligible v2 chat thread."
     ),
 )
-def m15_v3_migrate_threads_and_messages(resume: bool) -> None:
+@_sharded_migration_options
+def m15_v3_migrate_threads_and_messages(resume: bool, **runner_options) -> None:
     async def _m15_v3_migrate_threads_and_messages() -> None:
-        async with config.db.driver.async_session() as session:
-            logger.info("Migrating threads and messages to v3...")
-            await migrate_threads_and_messages_to_v3(session, resume=resume)
-            logger.info("Done!")
+        logger.info("Migrating threads and messages to v3...")
+        progress = await run_sharded_migration(
+            threads_and_messages_migration(resume=resume), **runner_options
+        )
+        if progress.failed:
+            # The migration is rerunnable, so failed threads can be retried once
+            # the underlying OpenAI/API issue is fixed.
+            raise RuntimeError(
+                f"Failed to migrate {progress.failed} thread(s); see the log above."
+            )
+        logger.info("Done!")
 
     asyncio.run(_m15_v3_migrate_threads_and_messages())
 
 
 @db.command("m16_migrate_message_parts")
-def m16_migrate_message_parts() -> None:
+@_sharded_migration_options
+def m16_migrate_message_parts(**runner_options) -> None:
     async def _m16_migrate_message_parts() -> None:
         await config.authz.driver.init()
-        async with config.db.driver.async_session() as session:
-            async with config.authz.driver.get_client() as authz_client:
-                logger.info("Backfilling message parts and annotations...")
-                await migrate_message_parts(session, authz_client)
-                logger.info("Done!")
+        async with config.authz.driver.get_client() as authz_client:
+            logger.info("Backfilling message parts and annotations...")
+            await run_sharded_migration(
+                message_parts_migration(authz_client), **runner_options
+            )
+            logger.info("Done!")
 
     asyncio.run(_m16_migrate_message_parts())
 
 
 @db.command("m17_migrate_message_attachments")
-def m17_migrate_message_attachments() -> None:
+@_sharded_migration_options
+def m17_migrate_message_attachments(**runner_options) -> None:
     async def _m17_migrate_message_attachments() -> None:
-        async with config.db.driver.async_session() as session:
-            logger.info("Backfilling message attachments...")
-            await migrate_message_attachments(session)
-            logger.info("Done!")
+        logger.info("Backfilling message attachments...")
+        await run_sharded_migration(message_attachments_migration(), **runner_options)
+        logger.info("Done!")
 
     asyncio.run(_m17_migrate_message_attachments())
 
@@ -1270,12 +1362,12 @@ def m20_migrate_voice_mode_threads_to_v3() -> None:
 
 
 @db.command("m21_finalize_v2_threads_to_v3")
-def m21_finalize_v2_threads_to_v3() -> None:
+@_sharded_migration_options
+def m21_finalize_v2_threads_to_v3(**runner_options) -> None:
     async def _m21_finalize_v2_threads_to_v3() -> None:
-        async with config.db.driver.async_session() as session:
-            logger.info("Finalizing fully migrated v2 threads to v3...")
-            await finalize_v2_threads_to_v3(session)
-            logger.info("Done!")
+        logger.info("Finalizing fully migrated v2 threads to v3...")
+        await run_sharded_migration(finalize_v2_threads_migration(), **runner_options)
+        logger.info("Done!")
 
     asyncio.run(_m21_finalize_v2_threads_to_v3())
 
@@ -1355,50 +1447,84 @@ def get_inactive_s3_files() -> None:
 
 
 async def _lms_sync_all(
-    sync_without_sso_ids: bool = False, sync_classes_with_error_status: bool = False
+    sync_without_sso_ids: bool = False,
+    sync_classes_with_error_status: bool = False,
+    concurrency: int = ROSTER_SYNC_CONCURRENCY,
+    class_timeout: float = ROSTER_SYNC_CLASS_TIMEOUT_SECONDS,
+    requests_per_second: float = ROSTER_SYNC_REQUESTS_PER_SECOND,
 ) -> None:
     await config.authz.driver.init()
-    async with config.db.driver.async_session() as session:
-        async with config.authz.driver.get_client() as c:
-            for lms in config.lms.lms_instances:
-                match lms.type:
-                    case "canvas":
-                        logger.info(
-                            f"Syncing all classes in {lms.tenant}'s {lms.type} instance..."
-                        )
-                        await canvas_sync_all(
-                            session,
-                            c,
-                            lms,
-                            sync_without_sso_ids=sync_without_sso_ids,
-                            sync_classes_with_error_status=sync_classes_with_error_status,
-                        )
-                    case _:
-                        raise NotImplementedError(f"Unsupported LMS type: {lms.type}")
-            logger.info("Done!")
+    async with config.authz.driver.get_client() as c:
+        for lms in config.lms.lms_instances:
+            match lms.type:
+                case "canvas":
+                    logger.info(
+                        f"Syncing all classes in {lms.tenant}'s {lms.type} instance..."
+                    )
+                    await canvas_sync_all(
+                        config.db.driver.async_session,
+                        c,
+                        lms,
+                        sync_without_sso_ids=sync_without_sso_ids,
+                        sync_classes_with_error_status=sync_classes_with_error_status,
+                        concurrency=concurrency,
+                        class_timeout=class_timeout,
+                        rate_limiter=HostRateLimiter(requests_per_second),
+                    )
+                case _:
+                    raise NotImplementedError(f"Unsupported LMS type: {lms.type}")
+        logger.info("Done!")
+    await close_shared_connector()
 
 
-async def _lti_sync_all(sync_classes_with_error_status: bool = False) -> None:
+async def _lti_sync_all(
+    sync_classes_with_error_status: bool = False,
+    concurrency: int = ROSTER_SYNC_CONCURRENCY,
+    class_timeout: float = ROSTER_SYNC_CLASS_TIMEOUT_SECONDS,
+    requests_per_second: float = ROSTER_SYNC_REQUESTS_PER_SECOND,
+) -> None:
     lti_settings = config.lti
     if lti_settings is None:
         logger.error("LTI service is not enabled in configuration")
         return
 
     await config.authz.driver.init()
-    async with config.db.driver.async_session() as session:
-        async with config.authz.driver.get_client() as c:
-            await course_bridge_sync_all(
-                session=session,
-                authz_client=c,
-                sync_classes_with_error_status=sync_classes_with_error_status,
-            )
-            logger.info("Done!")
+    async with config.authz.driver.get_client() as c:
+        await course_bridge_sync_all(
+            session_factory=config.db.driver.async_session,
+            authz_client=c,
+            sync_classes_with_error_status=sync_classes_with_error_status,
+            concurrency=concurrency,
+            class_timeout=class_timeout,
+            rate_limiter=HostRateLimiter(requests_per_second),
+        )
+        logger.info("Done!")
+    await close_shared_connector()
 
 
 @lms.command("sync-all")
 @click.option("--sync-with-error", default=False, is_flag=True)
 @click.option("--sync-without-sso", default=False, is_flag=True)
-def sync_all(sync_with_error: bool, sync_without_sso: bool) -> None:
+@click.option("--concurrency", default=ROSTER_SYNC_CONCURRENCY, show_default=True)
+@click.option(
+    "--class-timeout",
+    default=ROSTER_SYNC_CLASS_TIMEOUT_SECONDS,
+    show_default=True,
+    help="Seconds before a single class's sync is abandoned.",
+)
+@click.option(
+    "--requests-per-second",
+    default=ROSTER_SYNC_REQUESTS_PER_SECOND,
+    show_default=True,
+    help="Request rate limit per LMS host.",
+)
+def sync_all(
+    sync_with_error: bool,
+    sync_without_sso: bool,
+    concurrency: int,
+    class_timeout: float,
+    requests_per_second: float,
+) -> None:
     """
     Sync all classes with a linked LMS class.
     """
@@ -1406,6 +1532,9 @@ def sync_all(sync_with_error: bool, sync_without_sso: bool) -> None:
         _lms_sync_all(
             sync_classes_with_error_status=sync_with_error,
             sync_without_sso_ids=sync_without_sso,
+            concurrency=concurrency,
+            class_timeout=class_timeout,
+            requests_per_second=requests_per_second,
         )
     )
 
@@ -1435,13 +1564,34 @@ def sync_pingpong_with_lms(crontime: str, host: str, port: int) -> None:
 
 @lti.command("sync-all")
 @click.option("--sync-with-error", default=False, is_flag=True)
-def sync_lti_all(sync_with_error: bool) -> None:
+@click.option("--concurrency", default=ROSTER_SYNC_CONCURRENCY, show_default=True)
+@click.option(
+    "--class-timeout",
+    default=ROSTER_SYNC_CLASS_TIMEOUT_SECONDS,
+    show_default=True,
+    help="Seconds before a single class's sync is abandoned.",
+)
+@click.option(
+    "--requests-per-second",
+    default=ROSTER_SYNC_REQUESTS_PER_SECOND,
+    show_default=True,
+    help="Request rate limit per LMS host.",
+)
+def sync_lti_all(
+    sync_with_error: bool,
+    concurrency: int,
+    class_timeout: float,
+    requests_per_second: float,
+) -> None:
     """
     Sync all classes linked through CourseBridge.
     """
     asyncio.run(
         _lti_sync_all(
             sync_classes_with_error_status=sync_with_error,
+            concurrency=concurrency,
+            class_timeout=class_timeout,
+            requests_per_second=requests_per_second,
         )
     )
 
@@ -1497,6 +1647,7 @@ async def _send_activity_summaries(
     task_name: str,
     expiration_cron: str | None = None,
     days: int = 7,
+    concurrency: int = SUMMARY_CLASS_CONCURRENCY,
 ) -> None:
     """
     Send activity summaries for all classes that have not been summarized in the last `days` days.
@@ -1505,6 +1656,7 @@ async def _send_activity_summaries(
         task_name: The name of the task.
         days: Number of days to look back for classes that have not been summarized.
         expiration_cron: A cron schedule to force send summaries to all users at a specific time, no matter previous failures.
+        concurrency: Number of classes to summarize at once, each in its own session.
     """
     await config.authz.driver.init()
     async with config.db.driver.async_session() as session:
@@ -1540,39 +1692,70 @@ async def _send_activity_summaries(
                 )
                 return
 
-            no_errors = True
+            class_ids = [
+                class_.id
+                async for class_ in Class.get_all_classes_to_summarize(
+                    session, before=job.scheduled_at
+                )
+            ]
+            # Release the connection while the classes are summarized.
+            await session.commit()
 
-            async for class_ in Class.get_all_classes_to_summarize(
-                session, before=job.scheduled_at
-            ):
-                try:
-                    logger.info(f"Sending summary for class {class_.id}...")
-                    openai_client = await get_openai_client_by_class_id(
-                        session, class_.id
-                    )
-                    after = utcnow() - timedelta(days=days)
-                    await send_class_summary_for_class(
-                        openai_client,
-                        session,
-                        c,
-                        class_.id,
-                        after,
-                        summary_type="weekly summary",
-                        summary_email_header="Your weekly summary is in.",
-                        sent_before=job.scheduled_at,
-                    )
-                    await session.commit()
+            started_at = time.monotonic()
+            total_usage = SummaryUsage()
+            semaphore = asyncio.Semaphore(concurrency)
 
-                except GetOpenAIClientException as e:
-                    logger.exception(f"Error getting OpenAI client: {e.detail}")
-                    no_errors = False
-                    continue
-                except Exception as e:
-                    logger.exception(f"Error sending class summary: {e}")
-                    no_errors = False
-                    continue
+            async def _send_class_summary(class_id: int) -> bool:
+                async with semaphore:
+                    class_started_at = time.monotonic()
+                    usage = SummaryUsage()
+                    try:
+                        async with config.db.driver.async_session() as class_session:
+                            logger.info(f"Sending summary for class {class_id}...")
+                            openai_client = await get_openai_client_by_class_id(
+                                class_session, class_id
+                            )
+                            after = utcnow() - timedelta(days=days)
+                            await send_class_summary_for_class(
+                                openai_client,
+                                class_session,
+                                c,
+                                class_id,
+                                after,
+                                summary_type="weekly summary",
+                                summary_email_header="Your weekly summary is in.",
+                                sent_before=job.scheduled_at,
+                                usage=usage,
+                            )
+                            await class_session.commit()
+                        return True
+                    except GetOpenAIClientException as e:
+                        logger.exception(f"Error getting OpenAI client: {e.detail}")
+                        return False
+                    except Exception as e:
+                        logger.exception(f"Error sending class summary: {e}")
+                        return False
+                    finally:
+                        total_usage.merge(usage)
+                        logger.info(
+                            f"Class {class_id} summary took "
+                            f"{time.monotonic() - class_started_at:.1f}s and used "
+                            f"{usage.input_tokens} input and {usage.output_tokens} "
+                            f"output tokens in {usage.requests} requests."
+                        )
+
+            results = await asyncio.gather(
+                *(_send_class_summary(class_id) for class_id in class_ids)
+            )
+            logger.info(
+                f"Summarized {len(class_ids)} classes in "
+                f"{time.monotonic() - started_at:.1f}s using "
+                f"{total_usage.input_tokens} input and {total_usage.output_tokens} "
+                f"output tokens in {total_usage.requests} requests; "
+                f"{results.count(False)} failed."
+            )
 
-            if no_errors:
+            if all(results):
                 logger.info("All summaries sent successfully.")
                 job.completed_at = utcnow()
             await session.commit()
@@ -1779,6 +1962,86 @@ def run_lecture_processing_worker(
             )
 
 
+@email.command("run-dispatcher")
+@click.option("--host", default="localhost")
+@click.option("--port", default=8001)
+@click.option(
+    "--poll-interval",
+    default=None,
+    type=click.FloatRange(min=0, min_open=True),
+    help="Seconds between outbox polls (default: email_outbox.poll_interval_seconds).",
+)
+def run_email_dispatcher(host: str, port: int, poll_interval: float | None) -> None:
+    """Deliver emails queued in the outbox through the configured provider."""
+    settings = config.email_outbox
+    if poll_interval is not None:
+        settings = settings.model_copy(update={"poll_interval_seconds": poll_interval})
+    server = get_server(host=host, port=port)
+
+    async def _run() -> None:
+        try:
+            await EmailOutboxDispatcher(config.email.sender, settings).run()
+        finally:
+            await config.email.sender.close()
+
+    with server.run_in_thread():
+        with contextlib.suppress(KeyboardInterrupt):
+            asyncio.run(_run())
+
+
+@email.command("requeue-dead")
+def requeue_dead_emails() -> None:
+    """Queue dead-lettered emails for delivery again."""
+
+    async def _requeue() -> None:
+        async with config.db.driver.async_session() as session:
+            requeued = await EmailOutbox.requeue_dead(session, utcnow())
+            await session.commit()
+        logger.info(f"Requeued {requeued} dead-lettered emails.")
+
+    asyncio.run(_requeue())
+
+
+@class_copy.command("list-failed")
+def list_failed_class_copies() -> None:
+    """List class copies that failed and can be resumed."""
+
+    async def _list() -> None:
+        async with config.db.driver.async_session() as session:
+            for job in await ClassCopyJob.list_failed(session):
+                click.echo(
+                    f"{job.id}: class {job.source_class_id} -> "
+                    f"{job.target_class_id or '(not created)'}, "
+                    f"done: {', '.join(job.completed_steps) or 'nothing'}, "
+                    f"{len(job.copied_assistants)} assistants copied, "
+                    f"{job.attempts} attempts: {job.error}"
+                )
+
+    asyncio.run(_list())
+
+
+@class_copy.command("resume")
+@click.argument("job_ids", type=int, nargs=-1)
+@click.option("--all-failed", is_flag=True, help="Resume every failed class copy.")
+def resume_class_copies(job_ids: tuple[int, ...], all_failed: bool) -> None:
+    """Continue failed class copies from where they stopped."""
+
+    async def _resume() -> None:
+        ids = list(job_ids)
+        if all_failed:
+            async with config.db.driver.async_session() as session:
+                ids.extend(job.id for job in await ClassCopyJob.list_failed(session))
+        await config.authz.driver.init()
+        for job_id in ids:
+            try:
+                await resume_class_copy(job_id)
+                logger.info(f"Class copy job {job_id} completed.")
+            except Exception:
+                logger.exception(f"Class copy job {job_id} failed again.")
+
+    asyncio.run(_resume())
+
+
 @schedule.command("schedule_tasks")
 @click.option("--host", default="localhost")
 @click.option("--port", default=8001)
@@ -1791,34 +2054,54 @@ def run_lecture_processing_worker(
         "Arguments should be a JSON string. Multiple tasks can be passed."
     ),
 )
-def run_dynamic_tasks_with_args(host: str, port: int, tasks: list[str]) -> None:
+@click.option(
+    "--misfire-policy",
+    "misfire_policies",
+    multiple=True,
+    help=(
+        "How to handle runs missed while no scheduler was up, in the format "
+        "'task_name:policy', where policy is one of "
+        f"{', '.join(MisfirePolicy)}. Defaults to '{MisfirePolicy.SKIP}'."
+    ),
+)
+def run_dynamic_tasks_with_args(
+    host: str, port: int, tasks: list[str], misfire_policies: list[str]
+) -> None:
     """
     Dynamically run tasks with arguments based on provided task names, function names, and their cron schedules.
+
+    Any number of schedulers can run the same tasks: for each task, one of them
+    holds a lease in the database and is the only one to run it.
     """
     server = get_server(host=host, port=port)
 
-    async def _execute_task(
+    policies = dict[str, MisfirePolicy]()
+    for entry in misfire_policies:
+        try:
+            task_name, policy = entry.rsplit(":", 1)
+            policies[task_name] = MisfirePolicy(policy)
+        except ValueError:
+            raise click.BadParameter(
+                f"Invalid misfire policy: '{entry}'. Expected 'task_name:policy'."
+            )
+
+    def _build_scheduler(
         task_name: str, function_name: str, cron_schedule: str, args: dict
-    ):
-        """
-        Execute a given task based on its name, cron schedule, and provided arguments.
-        """
+    ) -> TaskScheduler:
         if function_name not in FUNCTIONS_MAP:
             logger.exception(f"Function '{function_name}' is not recognized.")
             sys.exit(1)
 
         func = FUNCTIONS_MAP[function_name]
-        async for _ in croner(cron_schedule, task_name=task_name):
-            try:
-                await func(task_name, **args)
-                logger.info(
-                    f"Task '{task_name}' (calling {function_name}) completed successfully at {datetime.now()}"
-                )
-            except Exception as e:
-                logger.exception(f"Error in task '{task_name}' ({function_name}): {e}")
+        return TaskScheduler(
+            task_name,
+            cron_schedule,
+            lambda: func(task_name, **args),
+            policies.get(task_name, MisfirePolicy.SKIP),
+        )
 
     async def _parse_tasks():
-        task_coroutines = []
+        schedulers = []
         task_names = set()
         for task in tasks:
             try:
@@ -1834,14 +2117,14 @@ def run_dynamic_tasks_with_args(host: str, port: int, tasks: list[str]) -> None:
                 task_names.add(task_name)
 
                 args = json.loads(args_json)
-                task_coroutines.append(
-                    _execute_task(task_name, function_name, cron_schedule, args)
+                schedulers.append(
+                    _build_scheduler(task_name, function_name, cron_schedule, args)
                 )
             except Exception as e:
                 raise ValueError(f"Failed to parse task '{task}': {e}")
 
         # Run all tasks concurrently
-        await asyncio.gather(*task_coroutines)
+        await asyncio.gather(*(scheduler.run() for scheduler in schedulers))
 
     # Run the Uvicorn server in the background
     with server.run_in_thread():
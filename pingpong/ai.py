@@ -186,6 +186,7 @@ from pingpong.schemas import (
     DownloadExport,
 )
 from pingpong.config import config
+from pingpong.email_outbox import outbound_email_sender
 from typing import Any, Dict, Literal, Union, overload
 from sqlalchemy.ext.asyncio import AsyncSession
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
@@ -5695,7 +5696,7 @@ async def export_threads_multiple_classes(
                 link=download_link,
             )
             await send_export_download(
-                config.email.sender,
+                outbound_email_sender(),
                 export_opts,
                 expires=config.artifact_store.download_link_expiration,
             )
@@ -5706,7 +5707,7 @@ async def export_threads_multiple_classes(
             if requestor and requestor.email:
                 try:
                     await send_export_failed(
-                        config.email.sender,
+                        outbound_email_sender(),
                         DownloadExport(
                             class_name="multiple classes",
                             email=requestor.email,
@@ -5929,7 +5930,7 @@ async def export_class_threads(
                 link=download_link,
             )
             await send_export_download(
-                config.email.sender,
+                outbound_email_sender(),
                 export_opts,
                 expires=config.artifact_store.download_link_expiration,
             )
@@ -5938,7 +5939,7 @@ async def export_class_threads(
             if user and user.email:
                 try:
                     await send_export_failed(
-                        config.email.sender,
+                        outbound_email_sender(),
                         DownloadExport(
                             class_name=class_.name if class_ else "Unknown class",
                             email=user.email,
@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import os
+import re
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+_SILENCE_START_RE = re.compile(r"silence_start: (-?\d+(?:\.\d+)?)")
+_SILENCE_END_RE = re.compile(r"silence_end: (-?\d+(?:\.\d+)?)")
+_PROGRESS_OUT_TIME_RE = re.compile(r"^out_time_us=(\d+)$", re.MULTILINE)
+# Speech pauses in lecture and voice recordings sit well below this level; music
+# beds and room tone usually do not, so cuts fall between sentences.
+_SILENCE_NOISE_DB = -35
+_SILENCE_MIN_DURATION_MS = 400
+_FFMPEG_TIMEOUT_SECONDS = 60 * 10
+
+_ChunkResultT = TypeVar("_ChunkResultT")
+
+
+@dataclass(frozen=True)
+class AudioChunk:
+    """A slice of a recording sent to the transcription API on its own.
+
+    `start_ms`/`end_ms` bound the audio actually sent, which includes overlap
+    with the neighbouring chunks. `keep_start_ms`/`keep_end_ms` bound the part
+    of the timeline this chunk owns when the results are stitched together.
+    """
+
+    start_ms: int
+    end_ms: int
+    keep_start_ms: int
+    keep_end_ms: int
+    is_last: bool = False
+
+    @property
+    def duration_ms(self) -> int:
+        return self.end_ms - self.start_ms
+
+    def owns(self, start_ms: float, end_ms: float) -> bool:
+        """Whether an item at absolute offsets belongs to this chunk's window.
+
+        The final chunk also keeps items that run past the end of the
+        recording, which transcription timestamps occasionally do.
+        """
+        midpoint_ms = (start_ms + end_ms) / 2
+        return self.keep_start_ms <= midpoint_ms and (
+            midpoint_ms < self.keep_end_ms or self.is_last
+        )
+
+
+def scan_audio_silences(
+    input_path: str, *, ffmpeg_path: str
+) -> tuple[int, list[tuple[int, int]]]:
+    """Decode the audio track once and return its duration and silent spans.
+
+    Uses ffmpeg progress output for the duration because recordings written
+    through a pipe (e.g. voice mode webm files) do not carry one in the
+    container header.
+    """
+    result = subprocess.run(
+        [
+            ffmpeg_path,
+            "-hide_banner",
+            "-nostats",
+            "-progress",
+            "pipe:1",
+            "-i",
+            input_path,
+            "-vn",
+            "-af",
+            f"silencedetect=noise={_SILENCE_NOISE_DB}dB:"
+            f"d={_SILENCE_MIN_DURATION_MS / 1000:.3f}",
+            "-f",
+            "null",
+            "-",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=_FFMPEG_TIMEOUT_SECONDS,
+    )
+    out_times = _PROGRESS_OUT_TIME_RE.findall(result.stdout)
+    if not out_times:
+        raise RuntimeError("ffmpeg did not report an audio duration.")
+    duration_ms = int(out_times[-1]) // 1000
+
+    silences: list[tuple[int, int]] = []
+    silence_start_ms: int | None = None
+    for line in result.stderr.splitlines():
+        if start_match := _SILENCE_START_RE.search(line):
+            silence_start_ms = max(0, round(float(start_match.group(1)) * 1000))
+        elif (end_match := _SILENCE_END_RE.search(line)) and (
+            silence_start_ms is not None
+        ):
+            silence_end_ms = min(duration_ms, round(float(end_match.group(1)) * 1000))
+            if silence_end_ms > silence_start_ms:
+                silences.append((silence_start_ms, silence_end_ms))
+            silence_start_ms = None
+    if silence_start_ms is not None and silence_start_ms < duration_ms:
+        silences.append((silence_start_ms, duration_ms))
+    return duration_ms, silences
+
+
+def plan_audio_chunks(
+    duration_ms: int,
+    silences: list[tuple[int, int]],
+    *,
+    target_ms: int,
+    max_ms: int,
+    overlap_ms: int,
+) -> list[AudioChunk]:
+    """Split a recording into owned windows that end in silence where possible.
+
+    Each cut is placed at the middle of the silence closest to `target_ms`
+    after the previous cut, as long as it falls between half the target and
+    `max_ms`; otherwise the window is cut hard at `target_ms`. Recordings no
+    longer than `max_ms` are returned as a single chunk. Sent clips add
+    up to `overlap_ms` on either side so words at a hard cut are heard whole
+    by the chunk that owns them.
+    """
+    if duration_ms <= max_ms:
+        return [
+            AudioChunk(
+                start_ms=0,
+                end_ms=duration_ms,
+                keep_start_ms=0,
+                keep_end_ms=duration_ms,
+                is_last=True,
+            )
+        ]
+
+    silence_midpoints = sorted((start + end) // 2 for start, end in silences)
+    # Stop cutting once the remainder is a reasonable final chunk, so the tail
+    # is neither a sliver nor much longer than the others.
+    max_tail_ms = min(max_ms, target_ms * 3 // 2)
+    cuts: list[int] = []
+    cursor_ms = 0
+    while duration_ms - cursor_ms > max_tail_ms:
+        ideal_ms = cursor_ms + target_ms
+        candidates = [
+            midpoint_ms
+            for midpoint_ms in silence_midpoints
+            if cursor_ms + target_ms // 2 <= midpoint_ms <= cursor_ms + max_ms
+        ]
+        cursor_ms = (
+            min(candidates, key=lambda midpoint_ms: abs(midpoint_ms - ideal_ms))
+            if candidates
+            else ideal_ms
+        )
+        cuts.append(cursor_ms)
+
+    boundaries = [0, *cuts, duration_ms]
+    return [
+        AudioChunk(
+            start_ms=max(0, keep_start_ms - overlap_ms),
+            end_ms=min(duration_ms, keep_end_ms + overlap_ms),
+            keep_start_ms=keep_start_ms,
+            keep_end_ms=keep_end_ms,
+            is_last=keep_end_ms == duration_ms,
+        )
+        for keep_start_ms, keep_end_ms in zip(boundaries, boundaries[1:])
+    ]
+
+
+def write_audio_chunk(
+    input_path: str,
+    chunk: AudioChunk,
+    *,
+    ffmpeg_path: str,
+    output_path: str,
+    encode_args: list[str],
+) -> None:
+    subprocess.run(
+        [
+            ffmpeg_path,
+            "-y",
+            "-ss",
+            f"{chunk.start_ms / 1000:.3f}",
+            "-t",
+            f"{chunk.duration_ms / 1000:.3f}",
+            "-i",
+            input_path,
+            "-vn",
+            *encode_args,
+            output_path,
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=_FFMPEG_TIMEOUT_SECONDS,
+    )
+
+
+async def transcribe_audio_chunks(
+    input_path: str,
+    chunks: list[AudioChunk],
+    transcribe: Callable[[AudioChunk, str], Awaitable[_ChunkResultT]],
+    *,
+    ffmpeg_path: str,
+    temp_dir: str,
+    encode_args: list[str],
+    suffix: str,
+    concurrency: int,
+) -> list[_ChunkResultT]:
+    """Cut and transcribe chunks concurrently, returning results in chunk order.
+
+    At most `concurrency` chunks are cut or in flight at once. If any chunk
+    fails, the others are cancelled and the first error is raised.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_chunk(index: int, chunk: AudioChunk) -> _ChunkResultT:
+        async with semaphore:
+            output_path = str(Path(temp_dir) / f"transcription-chunk-{index}{suffix}")
+            await asyncio.to_thread(
+                write_audio_chunk,
+                input_path,
+                chunk,
+                ffmpeg_path=ffmpeg_path,
+                output_path=output_path,
+                encode_args=encode_args,
+            )
+            logger.info(
+                "Transcribing audio chunk. index=%s start_ms=%s end_ms=%s",
+                index,
+                chunk.start_ms,
+                chunk.end_ms,
+            )
+            try:
+                return await transcribe(chunk, output_path)
+            finally:
+                try:
+                    os.remove(output_path)
+                except OSError:
+                    logger.warning(
+                        "Failed to remove transcription audio chunk %s",
+                        output_path,
+                        exc_info=True,
+                    )
+
+    tasks = [
+        asyncio.create_task(run_chunk(index, chunk))
+        for index, chunk in enumerate(chunks)
+    ]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
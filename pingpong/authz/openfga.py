@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 from typing import List, Tuple
@@ -30,6 +31,16 @@ logger = logging.getLogger(__name__)
 _ROOT = "root:0"
 """Singleton root object."""
 
+_MAX_TUPLES_PER_WRITE = 10
+"""OpenFGA rejects write requests with more tuples than this."""
+
+_CONCURRENT_REQUESTS = 8
+"""Reads and write batches in flight at once for a single bulk operation."""
+
+_READ_ALL_MIN_TUPLES = 10
+"""Check at least this many tuples on one relation of one object with a single
+read of the relation instead of one read per tuple."""
+
 
 def _expand_relations(rx: List[Relation] | None) -> List[ClientTuple]:
     if not rx:
@@ -245,50 +256,78 @@ class OpenFgaAuthzClient(AuthzClient):
             (False, op) for op in _expand_relations(revoke)
         ]
 
-        # Can only process 10 operations at a time.
-        for i in range(0, len(ops), 10):
-            batch = ops[i : i + 10]
-            if not batch:
-                break
+        # Can only process 10 operations at a time. Batches are independent,
+        # so send several at once.
+        semaphore = asyncio.Semaphore(_CONCURRENT_REQUESTS)
+
+        async def _write_batch(batch: list[tuple[bool, ClientTuple]]):
             query = ClientWriteRequest(
                 writes=[op for _, op in batch if _] or None,
                 deletes=[op for _, op in batch if not _] or None,
             )
-            await self._cli.write(query)
+            async with semaphore:
+                await self._cli.write(query)
+
+        await asyncio.gather(
+            *(
+                _write_batch(ops[i : i + _MAX_TUPLES_PER_WRITE])
+                for i in range(0, len(ops), _MAX_TUPLES_PER_WRITE)
+            )
+        )
 
     async def create_root_user(self, user_id: int):
         return await self.write_safe(grant=[(f"user:{user_id}", "admin", self.root)])
 
+    async def _existing_tuples(self, tuples: List[Relation]) -> set[Relation]:
+        """Returns which of the tuples are currently stored.
+
+        Many tuples on the same relation of one object (e.g. every student of
+        a class) are checked by paging through that relation once; the rest
+        get a read each. Reads run concurrently.
+        """
+        by_relation: dict[tuple[str, str], set[Relation]] = {}
+        for t in tuples:
+            by_relation.setdefault((t[1], t[2]), set()).add(t)
+
+        semaphore = asyncio.Semaphore(_CONCURRENT_REQUESTS)
+        existing = set[Relation]()
+
+        async def _read_tuple(t: Relation):
+            ent, rel, obj = t
+            async with semaphore:
+                result = await self._cli.read(
+                    TupleKey(
+                        user=ent,
+                        relation=rel,
+                        object=obj,
+                    )
+                )
+            if result.tuples:
+                existing.add(t)
+
+        async def _read_relation(rel: str, obj: str, wanted: set[Relation]):
+            async with semaphore:
+                stored = await self.read_tuples(rel, obj)
+            existing.update(wanted.intersection(stored))
+
+        reads = []
+        for (rel, obj), wanted in by_relation.items():
+            if len(wanted) >= _READ_ALL_MIN_TUPLES:
+                reads.append(_read_relation(rel, obj, wanted))
+            else:
+                reads.extend(_read_tuple(t) for t in wanted)
+        await asyncio.gather(*reads)
+        return existing
+
     async def write_safe(
         self,
         grant: List[Relation] | None = None,
         revoke: List[Relation] | None = None,
     ):
-        filtered_grants = list[Relation]()
-        filtered_revokes = list[Relation]()
-
         #  Filter grants and revokes based on current state.
-        for ent, rel, obj in grant or []:
-            result = await self._cli.read(
-                TupleKey(
-                    user=ent,
-                    relation=rel,
-                    object=obj,
-                )
-            )
-            if not result.tuples:
-                filtered_grants.append((ent, rel, obj))
-
-        for ent, rel, obj in revoke or []:
-            result = await self._cli.read(
-                TupleKey(
-                    user=ent,
-                    relation=rel,
-                    object=obj,
-                )
-            )
-            if result.tuples:
-                filtered_revokes.append((ent, rel, obj))
+        existing = await self._existing_tuples([*(grant or []), *(revoke or [])])
+        filtered_grants = [t for t in grant or [] if t not in existing]
+        filtered_revokes = [t for t in revoke or [] if t in existing]
 
         return await self.write(
             grant=filtered_grants,
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from contextlib import aclosing
 from datetime import datetime, timedelta
 import json
 import logging
@@ -8,6 +9,7 @@ import aiohttp
 from fastapi import BackgroundTasks
 from pingpong.state_types import StateRequest
 from fastapi.responses import RedirectResponse
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from pingpong.auth import decode_auth_token, encode_auth_token
@@ -17,7 +19,15 @@ from pingpong.time import convert_seconds
 from .config import CanvasSettings, config
 from .models import Class, ExternalLogin, LMSClass as CanvasClass
 from .now import NowFn, utcnow
+from .paging import prefetch_pages, shared_connector
 from .retry import with_retry
+from .roster_sync import (
+    ROSTER_SYNC_CLASS_TIMEOUT_SECONDS,
+    ROSTER_SYNC_CONCURRENCY,
+    HostRateLimiter,
+    RosterSyncSummary,
+    run_roster_syncs,
+)
 from .schemas import (
     CanvasAccessToken,
     CanvasInitialAccessTokenRequest,
@@ -31,6 +41,7 @@ from .schemas import (
     LMSClassRequest,
     LMSType,
 )
+from .roster_diff import roster_source, sync_roster_diff
 from .users import AddNewUsersScript, AddNewUsersManual
 
 
@@ -110,8 +121,10 @@ class CanvasCourseClient(ABC):
         user_id: int,
         nowfn: NowFn = utcnow,
         sync_without_sso_ids: bool = False,
+        rate_limiter: HostRateLimiter | None = None,
     ):
         self.config = canvas_backend_config
+        self.rate_limiter = rate_limiter
         self.db = db
         self.class_id = class_id
         self.user_id = user_id
@@ -126,7 +139,13 @@ class CanvasCourseClient(ABC):
         )
 
     async def __aenter__(self):
-        self.http_session = aiohttp.ClientSession()
+        self.http_session = aiohttp.ClientSession(
+            connector=shared_connector(),
+            connector_owner=False,
+            trace_configs=(
+                [self.rate_limiter.trace_config()] if self.rate_limiter else None
+            ),
+        )
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
@@ -292,11 +311,15 @@ class CanvasCourseClient(ABC):
         params: dict | None = None,
         retry_attempt: int = 0,
         check_authorized_user: bool = True,
+        access_token: str | None = None,
     ) -> CanvasRequestResponse:
-        # Get the access token. Force refresh the token if this is a retry attempt
-        access_token = await self._get_access_token(
-            force_refresh=retry_attempt > 0, check_authorized_user=check_authorized_user
-        )
+        # Get the access token. Force refresh the token if this is a retry attempt.
+        # A token passed in by the caller is used as is, without touching the DB.
+        if access_token is None:
+            access_token = await self._get_access_token(
+                force_refresh=retry_attempt > 0,
+                check_authorized_user=check_authorized_user,
+            )
         headers = {"Authorization": f"Bearer {access_token}"}
 
         async with self.http_session.post(
@@ -315,11 +338,15 @@ class CanvasCourseClient(ABC):
         params: dict | None = None,
         retry_attempt: int = 0,
         check_authorized_user: bool = True,
+        access_token: str | None = None,
     ) -> CanvasRequestResponse:
-        # Get the access token. Force refresh the token if this is a retry attempt
-        access_token = await self._get_access_token(
-            force_refresh=retry_attempt > 0, check_authorized_user=check_authorized_user
-        )
+        # Get the access token. Force refresh the token if this is a retry attempt.
+        # A token passed in by the caller is used as is, without touching the DB.
+        if access_token is None:
+            access_token = await self._get_access_token(
+                force_refresh=retry_attempt > 0,
+                check_authorized_user=check_authorized_user,
+            )
         headers = {"Authorization": f"Bearer {access_token}"}
 
         async with self.http_session.get(
@@ -350,20 +377,29 @@ class CanvasCourseClient(ABC):
             list[any]: The parsed response of all pages.
         """
 
-        next_page = self.config.url(path)
-        while next_page:
+        # Pages are fetched in a background task, which must not share the
+        # caller's DB session, so the token is looked up once before paging.
+        access_token = await self._get_access_token(
+            check_authorized_user=check_authorized_user
+        )
+
+        async def _fetch_page(url: str) -> tuple[object, str]:
             if method == "GET":
                 response = await self._make_authed_request_get(
-                    next_page, params, check_authorized_user=check_authorized_user
+                    url, params, access_token=access_token
                 )
             else:
                 response = await self._make_authed_request_post(
-                    next_page, body, params, check_authorized_user=check_authorized_user
+                    url, body, params, access_token=access_token
                 )
+            return response.response, response.next_page
 
-            yield response.response
-
-            next_page = response.next_page
+        # The next page is requested while the caller processes this one.
+        async with aclosing(
+            prefetch_pages(_fetch_page, self.config.url(path))
+        ) as pages:
+            async for page in pages:
+                yield page
 
     async def _get_initial_access_token(self, code: str) -> CanvasAccessToken:
         params = {
@@ -471,11 +507,14 @@ class CanvasCourseClient(ABC):
         #           term for each course is returned.
         params = {"include[]": ["term"]}
 
-        return [
-            course
-            async for result in self._request_all_pages(request_url, params=params)
-            for course in self._process_courses(result)
-        ]
+        async with aclosing(
+            self._request_all_pages(request_url, params=params)
+        ) as pages:
+            return [
+                course
+                async for result in pages
+                for course in self._process_courses(result)
+            ]
 
     def _enrollment_check(self, course_id: str, data: list[dict]) -> bool:
         """Check if the user has a teacher or TA enrollment in the course."""
@@ -511,9 +550,12 @@ class CanvasCourseClient(ABC):
             ]
         }
 
-        async for result in self._request_all_pages(request_url, params=params):
-            if self._enrollment_check(course_id, result):
-                return True
+        async with aclosing(
+            self._request_all_pages(request_url, params=params)
+        ) as pages:
+            async for result in pages:
+                if self._enrollment_check(course_id, result):
+                    return True
         return False
 
     async def _roster_access_check(self, course_id: int | str) -> bool:
@@ -538,43 +580,46 @@ class CanvasCourseClient(ABC):
         params = {"include[]": ["enrollments"]}
 
         page_num = 0
-        async for result in self._request_all_pages(request_url, params=params):
-            if not result:
-                return page_num > 0
-            page_num += 1
-            for user in result:
-                if (
-                    self.config.sso_target
-                    and not user.get(self.config.sso_target)
-                    and not self.sync_without_sso_ids
-                ):
-                    logger.warning(
-                        f"User {user.get('id', '(unknown ID)')} does not have an SSO ID in the Canvas response. Full response: {user}"
-                    )
-                    raise CanvasException(
-                        code=403,
-                        detail="You do not have permission to access SIS information for at least one user in this class. Please ask another privileged user to set up Canvas Sync. If you're still facing issues, contact your Canvas administrator.",
-                    )
-                if not user.get("email"):
-                    if self.sync_with_incomplete_profiles:
-                        continue
-                    logger.warning(
-                        f"User {user.get('id', '(unknown ID)')} does not have an email in the Canvas response. Full response: {user}"
-                    )
-                    raise CanvasException(
-                        code=403,
-                        detail="You do not have permission to access email information for at least one user in this class. Please ask another privileged user to set up Canvas Sync. If you're still facing issues, contact your Canvas administrator.",
-                    )
-                if not (user.get("enrollments") and len(user["enrollments"]) > 0):
-                    if self.sync_with_incomplete_profiles:
-                        continue
-                    logger.warning(
-                        f"User {user.get('id', '(unknown ID)')} does not have enrollment information in the Canvas response. Full response: {user}"
-                    )
-                    raise CanvasException(
-                        code=403,
-                        detail="You do not have permission to access enrollment information for at least one user in this class. Please ask another privileged user to set up Canvas Sync. If you're still facing issues, contact your Canvas administrator.",
-                    )
+        async with aclosing(
+            self._request_all_pages(request_url, params=params)
+        ) as pages:
+            async for result in pages:
+                if not result:
+                    return page_num > 0
+                page_num += 1
+                for user in result:
+                    if (
+                        self.config.sso_target
+                        and not user.get(self.config.sso_target)
+                        and not self.sync_without_sso_ids
+                    ):
+                        logger.warning(
+                            f"User {user.get('id', '(unknown ID)')} does not have an SSO ID in the Canvas response. Full response: {user}"
+                        )
+                        raise CanvasException(
+                            code=403,
+                            detail="You do not have permission to access SIS information for at least one user in this class. Please ask another privileged user to set up Canvas Sync. If you're still facing issues, contact your Canvas administrator.",
+                        )
+                    if not user.get("email"):
+                        if self.sync_with_incomplete_profiles:
+                            continue
+                        logger.warning(
+                            f"User {user.get('id', '(unknown ID)')} does not have an email in the Canvas response. Full response: {user}"
+                        )
+                        raise CanvasException(
+                            code=403,
+                            detail="You do not have permission to access email information for at least one user in this class. Please ask another privileged user to set up Canvas Sync. If you're still facing issues, contact your Canvas administrator.",
+                        )
+                    if not (user.get("enrollments") and len(user["enrollments"]) > 0):
+                        if self.sync_with_incomplete_profiles:
+                            continue
+                        logger.warning(
+                            f"User {user.get('id', '(unknown ID)')} does not have enrollment information in the Canvas response. Full response: {user}"
+                        )
+                        raise CanvasException(
+                            code=403,
+                            detail="You do not have permission to access enrollment information for at least one user in this class. Please ask another privileged user to set up Canvas Sync. If you're still facing issues, contact your Canvas administrator.",
+                        )
         return True
 
     async def verify_access(self, course_id: str) -> None:
@@ -611,8 +656,11 @@ class CanvasCourseClient(ABC):
         #           term for each course is returned.
         params = {"include[]": ["term"]}
 
-        async for result in self._request_all_pages(request_url, params=params):
-            return self._process_course(result)
+        async with aclosing(
+            self._request_all_pages(request_url, params=params)
+        ) as pages:
+            async for result in pages:
+                return self._process_course(result)
 
         raise CanvasException("Course not found", code=404)
 
@@ -751,13 +799,16 @@ class CanvasCourseClient(ABC):
         #                  ‘final_score’, ‘current_grade’ and ‘final_grade’ values.
         params = {"include[]": ["enrollments"]}
 
-        users = [
-            user_role
-            async for result in self._request_all_pages(
+        async with aclosing(
+            self._request_all_pages(
                 request_url, params=params, check_authorized_user=False
             )
-            for user_role in self._process_users(result)
-        ]
+        ) as pages:
+            users = [
+                user_role
+                async for result in pages
+                for user_role in self._process_users(result)
+            ]
 
         unique_users: dict[str, CreateUserClassRole] = {}
 
@@ -799,6 +850,7 @@ class CanvasCourseClient(ABC):
             lms_type=self.config.type,
             sso_tenant=self.config.sso_tenant,
         )
+        self.roster_source = roster_source(self.new_ucr, class_.lms_class.lms_id)
         if self.missing_sso_ids or self.missing_user_information:
             await Class.mark_lms_sync_error(self.db, self.class_id)
             if not self.sync_without_sso_ids or self.missing_user_information:
@@ -845,9 +897,24 @@ class ManualCanvasClient(CanvasCourseClient):
 
     async def _update_user_roles(self):
         """Update the user roles for the class."""
-        await AddNewUsersManual(
-            str(self.class_id), self.new_ucr, self.request, self.tasks, self.user_id
-        ).add_new_users()
+        # Manual syncs always reconcile the full roster.
+        await sync_roster_diff(
+            self.db,
+            self.class_id,
+            self.user_id,
+            self.new_ucr,
+            self.roster_source,
+            lambda new_ucr, removed_user_ids: AddNewUsersManual(
+                str(self.class_id),
+                new_ucr,
+                self.request,
+                self.tasks,
+                self.user_id,
+                removed_user_ids=removed_user_ids,
+            ),
+            now=self.nowfn(),
+            full_reconcile=True,
+        )
 
     def _raise_sync_error_if_manual(self):
         raise CanvasException(
@@ -899,6 +966,7 @@ class ScriptCanvasClient(CanvasCourseClient):
         user_id: int,
         nowfn: Callable[[], datetime] = utcnow,
         sync_without_sso_ids: bool = False,
+        rate_limiter: HostRateLimiter | None = None,
     ):
         super().__init__(
             canvas_backend_config,
@@ -907,6 +975,7 @@ class ScriptCanvasClient(CanvasCourseClient):
             user_id,
             nowfn=nowfn,
             sync_without_sso_ids=sync_without_sso_ids,
+            rate_limiter=rate_limiter,
         )
         self.client = client
 
@@ -915,56 +984,92 @@ class ScriptCanvasClient(CanvasCourseClient):
 
     async def _update_user_roles(self):
         """Update the user roles for the class."""
-        await AddNewUsersScript(
-            str(self.class_id), self.user_id, self.db, self.client, self.new_ucr
-        ).add_new_users()
+        await sync_roster_diff(
+            self.db,
+            self.class_id,
+            self.user_id,
+            self.new_ucr,
+            self.roster_source,
+            lambda new_ucr, removed_user_ids: AddNewUsersScript(
+                str(self.class_id),
+                self.user_id,
+                self.db,
+                self.client,
+                new_ucr,
+                removed_user_ids=removed_user_ids,
+            ),
+            now=self.nowfn(),
+        )
 
     def _raise_sync_error_if_manual(self):
         pass
 
 
 async def canvas_sync_all(
-    session: AsyncSession,
+    session_factory: Callable[[], AsyncSession],
     authz_: OpenFgaAuthzClient,
     canvas_backend: CanvasSettings,
     sync_without_sso_ids: bool = False,
     sync_classes_with_error_status: bool = False,
-) -> None:
-    logger.info(
-        f"ELDEBUG: (canvas_sync_all) Last ExternalLogin RID before sync: {await ExternalLogin.get_last_row_id(session)}"
-    )
-
-    async for class_ in Class.get_all_to_sync(
-        session,
-        canvas_backend.tenant,
-        LMSType(canvas_backend.type),
-        sync_classes_with_error_status=sync_classes_with_error_status,
-    ):
-        logger.info(f"Syncing class {class_.id}...")
+    concurrency: int = ROSTER_SYNC_CONCURRENCY,
+    class_timeout: float = ROSTER_SYNC_CLASS_TIMEOUT_SECONDS,
+    rate_limiter: HostRateLimiter | None = None,
+) -> RosterSyncSummary:
+    """Sync every linked class in the Canvas instance, each in its own session."""
+    async with session_factory() as session:
         logger.info(
-            f"ELDEBUG: (canvas_sync_all) ExternalLogin RID before class {class_.id} sync: {await ExternalLogin.get_last_row_id(session)}"
+            f"ELDEBUG: (canvas_sync_all) Last ExternalLogin RID before sync: {await ExternalLogin.get_last_row_id(session)}"
         )
-        async with session.begin_nested() as session_:
+        lms_user_ids = {
+            class_.id: class_.lms_user_id
+            async for class_ in Class.get_all_to_sync(
+                session,
+                canvas_backend.tenant,
+                LMSType(canvas_backend.type),
+                sync_classes_with_error_status=sync_classes_with_error_status,
+            )
+        }
+    rate_limiter = rate_limiter or HostRateLimiter()
+
+    async def _sync_class(class_id: int) -> str | None:
+        async with session_factory() as session:
+            logger.info(
+                f"ELDEBUG: (canvas_sync_all) ExternalLogin RID before class {class_id} sync: {await ExternalLogin.get_last_row_id(session)}"
+            )
             try:
                 async with ScriptCanvasClient(
                     canvas_backend,
                     session,
                     authz_,
-                    class_.id,
-                    class_.lms_user_id,
+                    class_id,
+                    lms_user_ids[class_id],
                     sync_without_sso_ids=sync_without_sso_ids,
+                    rate_limiter=rate_limiter,
                 ) as client:
                     await client.sync_roster()
             except CanvasInvalidTokenException:
                 logger.exception(
-                    f"Canvas access token for class {class_.id} is invalid. Marking class as having a sync error."
+                    f"Canvas access token for class {class_id} is invalid. Marking class as having a sync error."
                 )
-                await Class.mark_lms_sync_error(session, class_.id)
-            except Exception as e:
-                logger.exception(f"Error syncing class {class_.id}: {e}")
-                await session_.rollback()
-        logger.info(
-            f"ELDEBUG: (canvas_sync_all) ExternalLogin RID after class {class_.id} sync: {await ExternalLogin.get_last_row_id(session)}"
-        )
-    # Finally, commit all changes
-    await session.commit()
+                await session.rollback()
+                await Class.mark_lms_sync_error(session, class_id)
+                await session.commit()
+                raise
+            logger.info(
+                f"ELDEBUG: (canvas_sync_all) ExternalLogin RID after class {class_id} sync: {await ExternalLogin.get_last_row_id(session)}"
+            )
+            await session.commit()
+        if client.missing_sso_ids or client.missing_user_information:
+            return "Some users in the Canvas class are missing SSO IDs or profile information."
+        return None
+
+    summary = await run_roster_syncs(
+        list(lms_user_ids),
+        _sync_class,
+        concurrency=concurrency,
+        class_timeout=class_timeout,
+        warning_exceptions=(CanvasWarning,),
+        retry_exceptions=(IntegrityError, OperationalError),
+    )
+    summary.log(f"Canvas ({canvas_backend.tenant})")
+    return summary
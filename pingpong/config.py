@@ -85,7 +85,7 @@ class GmailEmailSettings(BaseSettings):
     from_address: str
     password: str
 
-    @property
+    @cached_property
     def sender(self) -> GmailEmailSender:
         return GmailEmailSender(self.from_address, self.password)
 
@@ -101,7 +101,8 @@ class SmtpEmailSettings(BaseSettings):
     start_tls: bool = Field(False)
     use_ssl: bool = Field(False)
 
-    @property
+    # Cached so the sender's pool of SMTP sessions is reused across emails.
+    @cached_property
     def sender(self) -> SmtpEmailSender:
         return SmtpEmailSender(
             self.from_address,
@@ -120,6 +121,25 @@ EmailSettings = Union[
 ]
 
 
+class EmailOutboxSettings(BaseSettings):
+    """Settings for queueing outbound email in the database.
+
+    When enabled, emails are written to the outbox and delivered by the
+    `email run-dispatcher` worker instead of being sent inline.
+    """
+
+    enabled: bool = Field(False)
+    rate_limit_per_second: float = Field(10.0, gt=0)
+    burst: int = Field(20, ge=1)
+    concurrency: int = Field(4, ge=1)
+    batch_size: int = Field(50, ge=1)
+    max_attempts: int = Field(8, ge=1)
+    retry_base_seconds: float = Field(30.0, gt=0)
+    retry_max_seconds: float = Field(3600.0, gt=0)
+    lease_seconds: int = Field(300, gt=0)
+    poll_interval_seconds: float = Field(5.0, gt=0)
+
+
 class SentrySettings(BaseSettings):
     """Sentry settings."""
 
@@ -371,12 +391,24 @@ class LTISecuritySettings(BaseSettings):
     token_endpoint: LTIUrlSecuritySettings = Field(LTIUrlSecuritySettings())
 
 
+class LTIRemoteCacheSettings(BaseSettings):
+    """Caching of platform JWKS and OpenID configuration documents."""
+
+    min_ttl: int = Field(60, ge=0)  # Floor for Cache-Control/Expires
+    max_ttl: int = Field(60 * 60 * 24, ge=0)  # Ceiling for Cache-Control/Expires
+    default_ttl: int = Field(60 * 10, ge=0)  # When the platform sends neither
+    max_stale: int = Field(60 * 60 * 24, ge=0)  # Serve stale while refreshes fail
+    refresh_interval: int = Field(30, ge=0)  # Min time between forced refreshes
+    max_entries: int = Field(1024, gt=0)
+
+
 class LTISettings(BaseSettings):
     """LTI Advantage Service settings."""
 
     key_store: LTIKeyStoreSettings
     sync_wait: int = Field(60 * 10, gt=0)  # 10 mins
     security: LTISecuritySettings = Field(LTISecuritySettings())
+    remote_cache: LTIRemoteCacheSettings = Field(LTIRemoteCacheSettings())
 
     # Key rotation settings
     rotation_schedule: str = Field("0 0 1 * *")  # First day of every month at midnight
@@ -670,6 +702,7 @@ class Config(BaseSettings):
     auth: AuthSettings
     authz: AuthzSettings
     email: EmailSettings
+    email_outbox: EmailOutboxSettings = Field(EmailOutboxSettings())
     lms: LMSSettings = Field(LMSSettings())
     lti: LTISettings | None = Field(None)
     sentry: SentrySettings = Field(SentrySettings())
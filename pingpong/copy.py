@@ -1,5 +1,7 @@
+import asyncio
 import json
 import logging
+from dataclasses import dataclass
 
 import openai
 from openai.types.beta.assistant_create_params import ToolResources
@@ -9,27 +11,45 @@ from pingpong import models
 from pingpong.ai import (
     format_instructions,
     get_azure_model_deployment_name_equivalent,
+    get_openai_client_by_class_id,
 )
 from pingpong.auth import generate_auth_link
 from pingpong.authz.base import Relation
 from pingpong.authz.openfga import OpenFgaAuthzClient
 from pingpong.config import config
+from pingpong.email_outbox import outbound_email_sender
 from pingpong.files import _file_grants
 from pingpong.invite import send_clone_group_failed, send_clone_group_notification
+from pingpong.lecture_slide_service import clone_lecture_slide_deck_snapshot
 from pingpong.lecture_video_service import lecture_video_grants
+from pingpong.now import utcnow
 from pingpong.schemas import (
     ClonedGroupNotification,
+    ClassCopyJobStatus,
     ClassCredentialPurpose,
     CopyClassRequest,
     CreateClass,
     InteractionMode,
+    LectureSlideDeckStatus,
     LectureVideoStatus,
     VectorStoreType,
 )
-from pingpong.vector_stores import create_vector_store
+from pingpong.vector_stores import create_openai_vector_store, create_vector_store
 
 logger = logging.getLogger(__name__)
 
+CLASS_COPY_CONCURRENCY = 8
+"""Vector stores created on OpenAI at once while copying a class."""
+
+CLASS_COPY_ASSISTANT_BATCH_SIZE = 20
+"""Assistants copied per transaction; a failed copy resumes after the last one."""
+
+_STEP_CLASS = "class"
+_STEP_SHARED_FILES = "shared_files"
+_STEP_USERS = "users"
+_STEP_ASSISTANTS = "assistants"
+
+_ERROR_MAX_LENGTH = 1000
 
 LECTURE_VIDEO_COPY_REQUIRED_PURPOSES = (
     ClassCredentialPurpose.LECTURE_VIDEO_MANIFEST_GENERATION,
@@ -150,31 +170,6 @@ async def create_new_class(
     return new_class
 
 
-async def copy_shared_files(
-    session: AsyncSession,
-    client: OpenFgaAuthzClient,
-    source_class_id: int,
-    target_class_id: int,
-):
-    shared_file_ids = await client.list(
-        f"class:{source_class_id}",
-        "parent",
-        "class_file",
-    )
-
-    files = await models.File.get_all_by_ids_if_exist(session, shared_file_ids)
-
-    await models.File.add_files_to_class(
-        session, target_class_id, [f.id for f in files]
-    )
-
-    new_grants = []
-    for file in files:
-        new_grants.extend(_file_grants(file, target_class_id))
-
-    await client.write_safe(grant=new_grants)
-
-
 async def copy_class_credentials(
     session: AsyncSession,
     source_class_id: int,
@@ -251,97 +246,31 @@ def ensure_lecture_video_assistant_copy_ready(
         )
 
 
-async def copy_supervisors(
-    session: AsyncSession,
-    client: OpenFgaAuthzClient,
-    source_class_id: int,
-    target_class_id: int,
-):
-    supervisor_ids = await client.list_entities(
-        f"class:{source_class_id}",
-        "supervisor",
-        "user",
-    )
-    supervisors = await models.User.get_all_by_id_if_in_class(
-        session, supervisor_ids, source_class_id
-    )
-
-    batch = list[Relation]()
-    for supervisor in supervisors:
-        for role in ["teacher", "student"]:
-            batch.append((f"user:{supervisor.id}", role, f"class:{source_class_id}"))
+def ensure_lecture_slide_assistant_copy_ready(
+    assistant: models.Assistant,
+) -> None:
+    if assistant.interaction_mode != InteractionMode.LECTURE_SLIDES:
+        return
 
-    results = await client.check(batch)
-    new_grants = []
-    for i, supervisor in enumerate(supervisors):
-        await models.UserClassRole.create(
-            session,
-            user_id=supervisor.id,
-            class_id=target_class_id,
-            subscribed_to_summaries=not supervisor.dna_as_create,
+    if (
+        assistant.lecture_slide_deck is None
+        or assistant.lecture_slide_deck.status != LectureSlideDeckStatus.READY
+    ):
+        raise ValueError(
+            "Lecture slide assistants can only be copied after narration processing is ready."
         )
-        if results[i * 2]:
-            new_grants.append(
-                (f"user:{supervisor.id}", "teacher", f"class:{target_class_id}")
-            )
-        if results[i * 2 + 1]:
-            new_grants.append(
-                (f"user:{supervisor.id}", "student", f"class:{target_class_id}")
-            )
-    await client.write_safe(grant=new_grants)
 
 
-async def copy_all_users(
-    session: AsyncSession,
+async def _write_grants(
     client: OpenFgaAuthzClient,
-    source_class_id: int,
-    target_class_id: int,
-):
-    total_users = await models.Class.get_member_count(session, source_class_id)
-
-    if total_users == 0:
-        return
-
-    offset = 0
-    limit = 10
-
-    new_grants: list[Relation] = []
-
-    while offset < total_users:
-        users = list[models.UserClassRole]()
-
-        batch = list[Relation]()
-        async for user in models.Class.get_members(
-            session, source_class_id, offset=offset, limit=limit
-        ):
-            users.append(user)
-            for role in ["teacher", "student"]:
-                batch.append((f"user:{user.user_id}", role, f"class:{source_class_id}"))
-
-        if not users:
-            break
-
-        results = await client.check(batch)
-        for i, u in enumerate(users):
-            await models.UserClassRole.create(
-                session,
-                user_id=u.user_id,
-                class_id=target_class_id,
-                subscribed_to_summaries=u.subscribed_to_summaries,
-            )
-
-            if results[i * 2]:
-                new_grants.append(
-                    (f"user:{u.user_id}", "teacher", f"class:{target_class_id}")
-                )
-            if results[i * 2 + 1]:
-                new_grants.append(
-                    (f"user:{u.user_id}", "student", f"class:{target_class_id}")
-                )
-
-        offset += len(users)
-
-    await client.write_safe(grant=new_grants)
+    new_grants: list[Relation],
+    batch: list[Relation] | None,
+) -> None:
+    """Writes `new_grants` now, or adds them to `batch` for the caller to write."""
+    if batch is None:
+        await client.write_safe(grant=new_grants)
+    else:
+        batch.extend(new_grants)
 
 
 async def copy_vector_store(
@@ -374,6 +303,34 @@ async def copy_vector_store(
     return vector_store_obj_id, vector_store_id
 
 
+async def copy_lecture_slide_deck(
+    session: AsyncSession,
+    client: OpenFgaAuthzClient,
+    target_class_id: int,
+    deck: models.LectureSlideDeck,
+    grants: list[Relation] | None = None,
+) -> models.LectureSlideDeck:
+    """Copy a slide deck to the target class without copying its media.
+
+    The copy references the same stored slides, narration audio and captions as
+    the source, and its context files are shared with the target class.
+    """
+    cloned_deck = await clone_lecture_slide_deck_snapshot(
+        session, deck, class_id=target_class_id
+    )
+    context_files = [f.file for f in deck.additional_context_files]
+    if context_files:
+        await models.File.add_files_to_class(
+            session, target_class_id, [f.id for f in context_files]
+        )
+        await _write_grants(
+            client,
+            [g for f in context_files for g in _file_grants(f, target_class_id)],
+            grants,
+        )
+    return cloned_deck
+
+
 async def copy_assistant(
     session: AsyncSession,
     client: OpenFgaAuthzClient,
@@ -385,10 +342,16 @@ async def copy_assistant(
     require_published: bool = True,
     force_private: bool = False,
     creator_id: int | None = None,
+    vector_store: tuple[str, int] | None = None,
+    grants: list[Relation] | None = None,
 ) -> models.Assistant | None:
     """
     Copy an assistant to the target class.
 
+    `vector_store` is an already copied (OpenAI id, DB id) vector store to use
+    instead of copying the assistant's own. With `grants`, authz tuples for the
+    copy are added to the list for the caller to write instead of written here.
+
     Returns the new assistant on success, or None if require_published is True
     and the source assistant is not published.
     """
@@ -396,6 +359,7 @@ async def copy_assistant(
         return None
 
     ensure_lecture_video_assistant_copy_ready(assistant)
+    ensure_lecture_slide_assistant_copy_ready(assistant)
 
     if assistant.interaction_mode == InteractionMode.LECTURE_VIDEO:
         await ensure_lecture_video_copy_credentials(
@@ -405,7 +369,9 @@ async def copy_assistant(
     copied_creator_id = creator_id if creator_id is not None else assistant.creator_id
 
     new_vector_store_id, new_vector_store_obj_id = None, None
-    if assistant.vector_store_id:
+    if vector_store is not None:
+        new_vector_store_obj_id, new_vector_store_id = vector_store
+    elif assistant.vector_store_id:
         new_vector_store_obj_id, new_vector_store_id = await copy_vector_store(
             session, client, cli, target_class_id, assistant.vector_store_id
         )
@@ -415,9 +381,16 @@ async def copy_assistant(
         cloned_lecture_video = await models.LectureVideo.clone_for_class(
             session, assistant.lecture_video, target_class_id
         )
-        await client.write_safe(grant=lecture_video_grants(cloned_lecture_video))
+        await _write_grants(client, lecture_video_grants(cloned_lecture_video), grants)
         new_lecture_video_id = cloned_lecture_video.id
 
+    new_lecture_slide_deck_id = None
+    if assistant.lecture_slide_deck:
+        cloned_lecture_slide_deck = await copy_lecture_slide_deck(
+            session, client, target_class_id, assistant.lecture_slide_deck, grants
+        )
+        new_lecture_slide_deck_id = cloned_lecture_slide_deck.id
+
     if assistant.version <= 2:
         tool_resources: ToolResources = {}
         if new_vector_store_obj_id:
@@ -454,6 +427,7 @@ async def copy_assistant(
         class_id=target_class_id,
         vector_store_id=new_vector_store_id,
         lecture_video_id=new_lecture_video_id,
+        lecture_slide_deck_id=new_lecture_slide_deck_id,
         creator_id=copied_creator_id,
         published=None if force_private else assistant.published,
         should_record_user_information=assistant.should_record_user_information,
@@ -503,7 +477,7 @@ async def copy_assistant(
         ci_grants: list[Relation] = []
         for f in assistant.code_interpreter_files:
             ci_grants.extend(_file_grants(f, target_class_id))
-        await client.write_safe(grant=ci_grants)
+        await _write_grants(client, ci_grants, grants)
 
     if assistant.mcp_server_tools:
         new_mcp_servers = []
@@ -573,13 +547,13 @@ async def copy_assistant(
         await session.flush()
         await session.refresh(new_assistant)
 
-    grants = [
+    assistant_grants = [
         (f"class:{target_class_id}", "parent", f"assistant:{new_assistant.id}"),
         (f"user:{copied_creator_id}", "owner", f"assistant:{new_assistant.id}"),
     ]
 
     if assistant.published and not force_private:
-        grants.append(
+        assistant_grants.append(
             (
                 f"class:{target_class_id}#member",
                 "can_view",
@@ -587,141 +561,399 @@ async def copy_assistant(
             ),
         )
 
-    await client.write_safe(grant=grants)
+    await _write_grants(client, assistant_grants, grants)
     return new_assistant
 
 
-# Group cloning preserves each source assistant's creator as historical attribution;
-# only direct assistant copies override the creator with the user making the copy.
-async def copy_moderator_published_assistants(
+@dataclass
+class CopiedMember:
+    user_id: int
+    subscribed_to_summaries: bool | None
+    teacher: bool
+    student: bool
+
+
+@dataclass
+class ClassCopyPlan:
+    """What a class copy reads from the source class, loaded before any writes."""
+
+    source: models.Class
+    user: models.User
+    options: CopyClassRequest
+    shared_files: list[models.File]
+    members: list[CopiedMember]
+    assistants: list[models.Assistant]
+    # source vector store id -> its files
+    vector_store_files: dict[int, list[models.File]]
+
+
+async def _plan_members(
     session: AsyncSession,
     client: OpenFgaAuthzClient,
-    cli: openai.AsyncClient,
     source_class_id: int,
-    target_class_id: int,
-):
-    supervisor_ids = await client.list_entities(
-        f"class:{source_class_id}",
-        "supervisor",
-        "user",
+    copy_users: str,
+    supervisor_ids: list[int],
+) -> list[CopiedMember]:
+    if copy_users == "moderators":
+        supervisors = await models.User.get_all_by_id_if_in_class(
+            session, supervisor_ids, source_class_id
+        )
+        subscriptions = [(u.id, not u.dna_as_create) for u in supervisors]
+    elif copy_users == "all":
+        total_users = await models.Class.get_member_count(session, source_class_id)
+        subscriptions = [
+            (ucr.user_id, ucr.subscribed_to_summaries)
+            async for ucr in models.Class.get_members(
+                session, source_class_id, limit=total_users
+            )
+        ]
+    else:
+        return []
+
+    if not subscriptions:
+        return []
+    results = await client.check(
+        [
+            (f"user:{user_id}", role, f"class:{source_class_id}")
+            for user_id, _ in subscriptions
+            for role in ["teacher", "student"]
+        ]
     )
+    return [
+        CopiedMember(user_id, subscribed, results[i * 2], results[i * 2 + 1])
+        for i, (user_id, subscribed) in enumerate(subscriptions)
+    ]
 
-    async for assistant in models.Assistant.async_get_published(
-        session, source_class_id, supervisor_ids
-    ):
-        await copy_assistant(
-            session,
-            client,
-            cli,
-            target_class_id,
-            assistant,
+
+async def plan_class_copy(
+    session: AsyncSession,
+    client: OpenFgaAuthzClient,
+    source_class_id: int,
+    user_id: int,
+    options: CopyClassRequest,
+) -> ClassCopyPlan:
+    source = await models.Class.get_by_id(session, source_class_id)
+    if not source:
+        raise ValueError(f"Class with ID {source_class_id} not found")
+
+    user = await models.User.get_by_id(session, user_id)
+    if not user:
+        raise ValueError(f"User with ID {user_id} not found")
+
+    shared_file_ids = await client.list(
+        f"class:{source_class_id}",
+        "parent",
+        "class_file",
+    )
+    shared_files = await models.File.get_all_by_ids_if_exist(session, shared_file_ids)
+
+    supervisor_ids = list[int]()
+    if "moderators" in (options.copy_users, options.copy_assistants):
+        supervisor_ids = await client.list_entities(
+            f"class:{source_class_id}",
+            "supervisor",
+            "user",
         )
+    members = await _plan_members(
+        session, client, source_class_id, options.copy_users, supervisor_ids
+    )
+
+    # Group cloning preserves each source assistant's creator as historical
+    # attribution; only direct assistant copies override the creator with the
+    # user making the copy.
+    assistants = list[models.Assistant]()
+    if options.copy_assistants in ("moderators", "all"):
+        assistants = [
+            assistant
+            async for assistant in models.Assistant.async_get_published(
+                session,
+                source_class_id,
+                supervisor_ids if options.copy_assistants == "moderators" else None,
+            )
+        ]
+    # Fail before anything is copied rather than partway through.
+    for assistant in assistants:
+        ensure_lecture_video_assistant_copy_ready(assistant)
+        ensure_lecture_slide_assistant_copy_ready(assistant)
+
+    vector_store_files = await models.VectorStore.get_files_by_ids(
+        session, [a.vector_store_id for a in assistants if a.vector_store_id]
+    )
+
+    return ClassCopyPlan(
+        source=source,
+        user=user,
+        options=options,
+        shared_files=shared_files,
+        members=members,
+        assistants=assistants,
+        vector_store_files=vector_store_files,
+    )
+
+
+async def _delete_openai_vector_stores(
+    cli: openai.AsyncClient, vector_store_ids: list[str]
+) -> None:
+    results = await asyncio.gather(
+        *(cli.vector_stores.delete(id_) for id_ in vector_store_ids),
+        return_exceptions=True,
+    )
+    for id_, result in zip(vector_store_ids, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Failed to delete vector store {id_}: {result}")
+
+
+async def _create_openai_vector_stores(
+    cli: openai.AsyncClient,
+    target_class_id: int,
+    file_ids_by_assistant_id: dict[int, list[str]],
+    concurrency: int,
+) -> dict[int, str]:
+    """Creates a vector store on OpenAI for each assistant, several at once.
+
+    Returns the OpenAI vector store id by assistant id. If any creation fails,
+    the vector stores already created are deleted.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _create(file_ids: list[str]) -> str:
+        async with semaphore:
+            return await create_openai_vector_store(cli, str(target_class_id), file_ids)
+
+    assistant_ids = list(file_ids_by_assistant_id)
+    results = await asyncio.gather(
+        *(_create(file_ids_by_assistant_id[id_]) for id_ in assistant_ids),
+        return_exceptions=True,
+    )
+    created = {
+        id_: result
+        for id_, result in zip(assistant_ids, results)
+        if not isinstance(result, BaseException)
+    }
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        await _delete_openai_vector_stores(cli, list(created.values()))
+        raise errors[0]
+    return created
+
+
+async def _delete_openai_assistants(
+    cli: openai.AsyncClient, assistant_ids: list[str]
+) -> None:
+    results = await asyncio.gather(
+        *(cli.beta.assistants.delete(id_) for id_ in assistant_ids),
+        return_exceptions=True,
+    )
+    for id_, result in zip(assistant_ids, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Failed to delete assistant {id_}: {result}")
 
 
-async def copy_all_published_assistants(
+async def _copy_assistant_batch(
     session: AsyncSession,
     client: OpenFgaAuthzClient,
     cli: openai.AsyncClient,
-    source_class_id: int,
+    plan: ClassCopyPlan,
+    job: models.ClassCopyJob,
     target_class_id: int,
-):
-    async for assistant in models.Assistant.async_get_published(
-        session, source_class_id
-    ):
-        await copy_assistant(
+    assistants: list[models.Assistant],
+    concurrency: int,
+) -> None:
+    """Copies `assistants` in one transaction and records them in `job`.
+
+    If the batch fails, the vector stores and assistants it created on OpenAI
+    are deleted, so resuming the copy doesn't leave orphans behind.
+    """
+    files_by_assistant_id = {
+        a.id: plan.vector_store_files.get(a.vector_store_id, [])
+        for a in assistants
+        if a.vector_store_id
+    }
+    openai_vector_store_ids = await _create_openai_vector_stores(
+        cli,
+        target_class_id,
+        {
+            id_: [f.file_id for f in files]
+            for id_, files in files_by_assistant_id.items()
+        },
+        concurrency,
+    )
+
+    grants = list[Relation]()
+    openai_assistant_ids = list[str]()
+    try:
+        vector_stores = dict[int, tuple[str, int]]()
+        for assistant_id, files in files_by_assistant_id.items():
+            vector_store_id = openai_vector_store_ids[assistant_id]
+            vector_store_obj_id = await models.VectorStore.create(
+                session,
+                {
+                    "type": VectorStoreType.ASSISTANT,
+                    "class_id": target_class_id,
+                    "version": 2,
+                    "expires_at": None,
+                    "vector_store_id": vector_store_id,
+                },
+                [f.file_id for f in files],
+            )
+            vector_stores[assistant_id] = (vector_store_id, vector_store_obj_id)
+            await models.File.add_files_to_class(
+                session, target_class_id, [f.id for f in files]
+            )
+            for f in files:
+                grants.extend(_file_grants(f, target_class_id))
+
+        copied = dict[str, int]()
+        for assistant in assistants:
+            new_assistant = await copy_assistant(
+                session,
+                client,
+                cli,
+                target_class_id,
+                assistant,
+                vector_store=vector_stores.get(assistant.id),
+                grants=grants,
+            )
+            if new_assistant is not None:
+                copied[str(assistant.id)] = new_assistant.id
+                if new_assistant.assistant_id:
+                    openai_assistant_ids.append(new_assistant.assistant_id)
+
+        # Written before the commit: if the commit fails, the tuples point at
+        # rows that never existed, rather than rows missing their tuples.
+        await client.write_safe(grant=grants)
+        job.copied_assistants = {**job.copied_assistants, **copied}
+        await session.commit()
+    except BaseException:
+        await _delete_openai_assistants(cli, openai_assistant_ids)
+        await _delete_openai_vector_stores(cli, list(openai_vector_store_ids.values()))
+        raise
+
+
+async def _complete_step(
+    session: AsyncSession, job: models.ClassCopyJob, step: str
+) -> None:
+    job.completed_steps = [*job.completed_steps, step]
+    await session.commit()
+
+
+async def run_class_copy(
+    session: AsyncSession,
+    client: OpenFgaAuthzClient,
+    cli: openai.AsyncClient,
+    job: models.ClassCopyJob,
+    concurrency: int = CLASS_COPY_CONCURRENCY,
+) -> models.Class:
+    """Copies the class as described by `job`, skipping steps it already finished.
+
+    Each step commits its changes with the job's progress. Returns the new class.
+    """
+    options = CopyClassRequest.model_validate(job.options)
+    plan = await plan_class_copy(
+        session, client, job.source_class_id, job.user_id, options
+    )
+
+    if _STEP_CLASS not in job.completed_steps:
+        new_class = await create_new_class(
             session,
             client,
-            cli,
-            target_class_id,
-            assistant,
+            options.institution_id or plan.source.institution_id,
+            CreateClass(
+                name=options.name,
+                term=options.term,
+                api_key_id=plan.source.api_key_id,
+                private=options.private,
+                any_can_create_assistant=options.any_can_create_assistant,
+                any_can_share_assistant=options.any_can_share_assistant,
+                any_can_publish_assistant=options.any_can_publish_assistant,
+                any_can_publish_thread=options.any_can_publish_thread,
+                any_can_upload_class_file=options.any_can_upload_class_file,
+            ),
+            plan.user.id,
+            plan.user.dna_as_create,
         )
+        await copy_class_credentials(session, plan.source.id, new_class.id)
+        job.target_class_id = new_class.id
+        await _complete_step(session, job, _STEP_CLASS)
 
+    if job.target_class_id is None:
+        raise ValueError("The class being copied to no longer exists")
+    target_class_id = job.target_class_id
 
-async def copy_group(
-    copy_options: CopyClassRequest, cli: openai.AsyncClient, class_id: str, user_id: int
-):
-    async with config.db.driver.async_session() as session:
-        async with config.authz.driver.get_client() as c:
-            class_ = None
-            user = None
-            try:
-                class_ = await models.Class.get_by_id(session, int(class_id))
-                if not class_:
-                    raise ValueError(f"Class with ID {class_id} not found")
-
-                user = await models.User.get_by_id(session, user_id)
-                if not user:
-                    raise ValueError(f"User with ID {user_id} not found")
+    if _STEP_SHARED_FILES not in job.completed_steps:
+        await models.File.add_files_to_class(
+            session, target_class_id, [f.id for f in plan.shared_files]
+        )
+        await client.write_safe(
+            grant=[
+                grant
+                for f in plan.shared_files
+                for grant in _file_grants(f, target_class_id)
+            ]
+        )
+        await _complete_step(session, job, _STEP_SHARED_FILES)
 
-                target_institution_id = (
-                    copy_options.institution_id or class_.institution_id
+    if _STEP_USERS not in job.completed_steps:
+        await models.UserClassRole.create_many(
+            session,
+            target_class_id,
+            {m.user_id: m.subscribed_to_summaries for m in plan.members},
+        )
+        new_grants = list[Relation]()
+        for m in plan.members:
+            if m.teacher:
+                new_grants.append(
+                    (f"user:{m.user_id}", "teacher", f"class:{target_class_id}")
                 )
-
-                new_class_options = CreateClass(
-                    name=copy_options.name,
-                    term=copy_options.term,
-                    api_key_id=class_.api_key_id,
-                    private=copy_options.private,
-                    any_can_create_assistant=copy_options.any_can_create_assistant,
-                    any_can_share_assistant=copy_options.any_can_share_assistant,
-                    any_can_publish_assistant=copy_options.any_can_publish_assistant,
-                    any_can_publish_thread=copy_options.any_can_publish_thread,
-                    any_can_upload_class_file=copy_options.any_can_upload_class_file,
+            if m.student:
+                new_grants.append(
+                    (f"user:{m.user_id}", "student", f"class:{target_class_id}")
                 )
+        await client.write_safe(grant=new_grants)
+        await _complete_step(session, job, _STEP_USERS)
+
+    if _STEP_ASSISTANTS not in job.completed_steps:
+        remaining = [
+            a for a in plan.assistants if str(a.id) not in job.copied_assistants
+        ]
+        for i in range(0, len(remaining), CLASS_COPY_ASSISTANT_BATCH_SIZE):
+            await _copy_assistant_batch(
+                session,
+                client,
+                cli,
+                plan,
+                job,
+                target_class_id,
+                remaining[i : i + CLASS_COPY_ASSISTANT_BATCH_SIZE],
+                concurrency,
+            )
+        await _complete_step(session, job, _STEP_ASSISTANTS)
 
-                new_class = await create_new_class(
-                    session,
-                    c,
-                    target_institution_id,
-                    new_class_options,
-                    user_id,
-                    user.dna_as_create,
-                )
+    return await models.Class.get_by_id(session, target_class_id)
 
-                await copy_class_credentials(
-                    session,
-                    class_.id,
-                    new_class.id,
-                )
 
-                await copy_shared_files(
-                    session,
-                    c,
-                    class_.id,
-                    new_class.id,
-                )
+async def resume_class_copy(job_id: int, cli: openai.AsyncClient | None = None) -> None:
+    """Runs a class copy job from its last saved step and emails the requester.
 
-                if copy_options.copy_users == "moderators":
-                    await copy_supervisors(
-                        session,
-                        c,
-                        class_.id,
-                        new_class.id,
-                    )
-                elif copy_options.copy_users == "all":
-                    await copy_all_users(
-                        session,
-                        c,
-                        class_.id,
-                        new_class.id,
-                    )
-
-                if copy_options.copy_assistants == "moderators":
-                    await copy_moderator_published_assistants(
-                        session,
-                        c,
-                        cli,
-                        class_.id,
-                        new_class.id,
-                    )
-                elif copy_options.copy_assistants == "all":
-                    await copy_all_published_assistants(
-                        session,
-                        c,
-                        cli,
-                        class_.id,
-                        new_class.id,
-                    )
+    Without `cli`, uses the source class's OpenAI client.
+    """
+    async with config.db.driver.async_session() as session:
+        async with config.authz.driver.get_client() as c:
+            job = await models.ClassCopyJob.get_by_id(session, job_id)
+            if not job:
+                raise ValueError(f"Class copy job {job_id} not found")
+            if job.status == ClassCopyJobStatus.COMPLETED:
+                return
+            if cli is None:
+                cli = await get_openai_client_by_class_id(session, job.source_class_id)
+            job.status = ClassCopyJobStatus.RUNNING
+            job.attempts += 1
+            job.error = None
+            await session.commit()
+
+            try:
+                new_class = await run_class_copy(session, c, cli, job)
+                user = await models.User.get_by_id(session, job.user_id)
 
                 magic_link = generate_auth_link(
                     user.id,
@@ -730,7 +962,7 @@ async def copy_group(
                 )
 
                 await send_clone_group_notification(
-                    config.email.sender,
+                    outbound_email_sender(),
                     ClonedGroupNotification(
                         email=user.email,
                         class_name=new_class.name,
@@ -738,21 +970,57 @@ async def copy_group(
                     ),
                     expires=86_400,
                 )
+                job.status = ClassCopyJobStatus.COMPLETED
+                job.finished_at = utcnow()
                 await session.commit()
             except Exception as e:
+                await session.rollback()
+                job = await models.ClassCopyJob.get_by_id(session, job_id)
+                if job is None:
+                    raise
+                job.status = ClassCopyJobStatus.FAILED
+                job.error = str(e)[:_ERROR_MAX_LENGTH]
+                job.finished_at = utcnow()
+                await session.commit()
+                logger.exception(
+                    f"Class copy job {job_id} failed after steps "
+                    f"{job.completed_steps}; resume it with `copy resume {job_id}`"
+                )
                 try:
+                    user = await models.User.get_by_id(session, job.user_id)
+                    class_ = await models.Class.get_by_id(session, job.source_class_id)
                     if user and user.email:
                         await send_clone_group_failed(
-                            config.email.sender,
+                            outbound_email_sender(),
                             ClonedGroupNotification(
                                 email=user.email,
                                 class_name=class_.name
                                 if class_
                                 else "your existing group",
-                                link=config.url(f"/group/{class_id}"),
+                                link=config.url(f"/group/{job.source_class_id}"),
                             ),
                         )
                 except Exception as e2:
                     logger.exception(f"Failed to send clone group failed email: {e2}")
-                await session.rollback()
                 raise e
+
+
+async def copy_group(
+    copy_options: CopyClassRequest, cli: openai.AsyncClient, class_id: str, user_id: int
+):
+    async with config.db.driver.async_session() as session:
+        class_ = await models.Class.get_by_id(session, int(class_id))
+        if not class_:
+            raise ValueError(f"Class with ID {class_id} not found")
+
+        user = await models.User.get_by_id(session, user_id)
+        if not user:
+            raise ValueError(f"User with ID {user_id} not found")
+
+        job = await models.ClassCopyJob.create(
+            session, class_.id, user.id, copy_options
+        )
+        await session.commit()
+        job_id = job.id
+
+    await resume_class_copy(job_id, cli)
@@ -1,12 +1,14 @@
 from .azure import AzureEmailSender
-from .base import EmailSender
+from .base import EmailSender, EmailSendResult
 from .gmail import GmailEmailSender
 from .mock import MockEmailSender
-from .smtp import SmtpEmailSender
+from .smtp import SmtpConnectionPool, SmtpEmailSender
 
 __all__ = [
     "EmailSender",
+    "EmailSendResult",
     "SmtpEmailSender",
+    "SmtpConnectionPool",
     "AzureEmailSender",
     "GmailEmailSender",
     "MockEmailSender",
@@ -1,8 +1,48 @@
+import asyncio
+import logging
 from abc import abstractmethod
-from typing import Protocol
+from collections.abc import Iterable
+from typing import NamedTuple, Protocol
+
+logger = logging.getLogger(__name__)
+
+EMAIL_SEND_CONCURRENCY = 4
+"""Messages in flight at once in `send_many`."""
+
+
+class EmailSendResult(NamedTuple):
+    to: str
+    error: Exception | None = None
 
 
 class EmailSender(Protocol):
     @abstractmethod
     async def send(self, to: str, subject: str, message: str):
         raise NotImplementedError
+
+    async def send_many(
+        self,
+        messages: Iterable[tuple[str, str, str]],
+        concurrency: int = EMAIL_SEND_CONCURRENCY,
+    ) -> list[EmailSendResult]:
+        """Sends (to, subject, message) emails, `concurrency` at a time.
+
+        A message that fails does not stop the others. Returns one result per
+        message, in order.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _send(to: str, subject: str, message: str) -> EmailSendResult:
+            async with semaphore:
+                try:
+                    await self.send(to, subject, message)
+                except Exception as e:
+                    logger.exception(f"Failed to send email to {to}: {e}")
+                    return EmailSendResult(to, e)
+            return EmailSendResult(to)
+
+        return list(await asyncio.gather(*(_send(*m) for m in messages)))
+
+    async def close(self) -> None:
+        """Releases any connections held by the sender."""
+        return None
@@ -1,10 +1,111 @@
+import asyncio
+import logging
 import ssl
+import time
+import weakref
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
 from email.message import EmailMessage
 
 import aiosmtplib
 
 from .base import EmailSender
 
+logger = logging.getLogger(__name__)
+
+SMTP_POOL_SIZE = 4
+"""Authenticated SMTP sessions kept open per sender."""
+
+SMTP_IDLE_TIMEOUT_SECONDS = 30
+"""Sessions idle for longer are closed instead of reused.
+
+Mail servers commonly drop idle sessions after a minute or so.
+"""
+
+SMTP_MAX_MESSAGES_PER_CONNECTION = 100
+"""Sessions are recycled after this many messages, below common server limits."""
+
+
+class _PooledConnection:
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SmtpConnectionPool:
+    """A pool of connected and authenticated SMTP sessions.
+
+    At most `size` sessions are in use at once. Sessions go back to the pool
+    after each message and are closed when a message fails on them, when they
+    have been idle for `idle_timeout` seconds, or after `max_messages`.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[aiosmtplib.SMTP]],
+        size: int = SMTP_POOL_SIZE,
+        idle_timeout: float = SMTP_IDLE_TIMEOUT_SECONDS,
+        max_messages: int = SMTP_MAX_MESSAGES_PER_CONNECTION,
+    ):
+        self._connect = connect
+        self._slots = asyncio.Semaphore(size)
+        self._idle: list[_PooledConnection] = []
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self.connections_opened = 0
+
+    @asynccontextmanager
+    async def connection(self, fresh: bool = False) -> AsyncIterator[_PooledConnection]:
+        """Checks out a session, opening a new one if none is idle."""
+        async with self._slots:
+            conn = None if fresh else await self._checkout_idle()
+            if conn is None:
+                conn = _PooledConnection(await self._connect())
+                self.connections_opened += 1
+            try:
+                yield conn
+            except BaseException:
+                # The session may be in any state now, so don't reuse it.
+                conn.smtp.close()
+                raise
+            conn.sent += 1
+            conn.last_used = time.monotonic()
+            if conn.sent >= self.max_messages:
+                await self._quit(conn)
+            else:
+                self._idle.append(conn)
+
+    async def _checkout_idle(self) -> _PooledConnection | None:
+        while self._idle:
+            # Most recently used first, so surplus sessions age out.
+            conn = self._idle.pop()
+            idle_for = time.monotonic() - conn.last_used
+            if conn.smtp.is_connected and idle_for < self.idle_timeout:
+                return conn
+            await self._quit(conn)
+        return None
+
+    async def _quit(self, conn: _PooledConnection) -> None:
+        if not conn.smtp.is_connected:
+            return
+        try:
+            await conn.smtp.quit(timeout=5)
+        except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError):
+            conn.smtp.close()
+
+    async def close(self) -> None:
+        """Closes every idle session."""
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(self._quit(conn) for conn in idle))
+
+
+def _is_stale_connection_error(e: Exception) -> bool:
+    if isinstance(e, (aiosmtplib.SMTPServerDisconnected, ConnectionError)):
+        return True
+    # 421: the server is closing the session.
+    return isinstance(e, aiosmtplib.SMTPResponseException) and e.code == 421
+
 
 class SmtpEmailSender(EmailSender):
     def __init__(
@@ -18,6 +119,8 @@ class SmtpEmailSender(EmailSender):
         use_tls: bool = False,
         start_tls: bool = False,
         use_ssl: bool = False,
+        pool_size: int = SMTP_POOL_SIZE,
+        idle_timeout: float = SMTP_IDLE_TIMEOUT_SECONDS,
     ):
         self.from_address = from_address
         self.user = user
@@ -27,8 +130,44 @@ class SmtpEmailSender(EmailSender):
         self.use_tls = use_tls
         self.start_tls = start_tls
         self.use_ssl = use_ssl
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        # Sessions are bound to the loop they were opened on.
+        self._pools: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, SmtpConnectionPool
+        ] = weakref.WeakKeyDictionary()
 
-    async def send(self, to: str, subject: str, message: str):
+    @property
+    def pool(self) -> SmtpConnectionPool:
+        """The session pool of the running loop."""
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None:
+            pool = SmtpConnectionPool(
+                self._connect, size=self.pool_size, idle_timeout=self.idle_timeout
+            )
+            self._pools[loop] = pool
+        return pool
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        tls_context: ssl.SSLContext | None = None
+        if self.use_ssl:
+            tls_context = ssl.create_default_context()
+
+        smtp = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls,
+            username=self.user,
+            password=self.pw,
+            tls_context=tls_context,
+        )
+        # Also runs STARTTLS and logs in, as configured.
+        await smtp.connect()
+        return smtp
+
+    def _build_message(self, to: str, subject: str, message: str) -> EmailMessage:
         msg = EmailMessage()
         msg["Subject"] = subject
         msg["From"] = self.from_address
@@ -41,18 +180,25 @@ class SmtpEmailSender(EmailSender):
             msg = message
         else:
             raise ValueError("Message must be either a string or EmailMessage object.")
+        return msg
 
-        tls_context: ssl.SSLContext | None = None
-        if self.use_ssl:
-            tls_context = ssl.create_default_context()
+    async def send(self, to: str, subject: str, message: str):
+        msg = self._build_message(to, subject, message)
+        pool = self.pool
+        reused = False
+        try:
+            async with pool.connection() as conn:
+                reused = conn.sent > 0
+                await conn.smtp.send_message(msg)
+        except Exception as e:
+            if not (reused and _is_stale_connection_error(e)):
+                raise
+            # The server dropped the session while it sat in the pool.
+            logger.info("Pooled SMTP session was closed, reconnecting: %s", e)
+            async with pool.connection(fresh=True) as conn:
+                await conn.smtp.send_message(msg)
 
-        await aiosmtplib.send(
-            msg,
-            hostname=self.host,
-            port=self.port,
-            use_tls=self.use_tls,
-            start_tls=self.start_tls,
-            username=self.user,
-            password=self.pw,
-            tls_context=tls_context,
-        )
+    async def close(self) -> None:
+        pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.close()
@@ -0,0 +1,326 @@
+"""Durable outbound email.
+
+With `email_outbox.enabled`, request handlers and jobs don't talk to the email
+provider. `outbound_email_sender` gives them a sender that writes each email
+to the `email_outbox` table and returns, and `EmailOutboxDispatcher` (run by
+`email run-dispatcher`) delivers queued emails through the configured
+provider:
+
+- claims due emails in batches under a lease, so several dispatchers can run
+  and a crashed dispatcher's emails go out again once the lease expires;
+- sends under a token-bucket rate limit for the provider;
+- retries failed emails with jittered exponential backoff, and dead-letters
+  them after `max_attempts` (see `email requeue-dead`);
+- skips emails whose idempotency key is already in the outbox.
+
+Delivery is at least once: an email whose send succeeded but whose status
+update was lost is sent again after its lease expires.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import secrets
+import socket
+import uuid
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import pingpong.metrics as metrics
+import pingpong.models as models
+import pingpong.schemas as schemas
+from pingpong.config import EmailOutboxSettings, config
+from pingpong.email import EmailSender, EmailSendResult
+from pingpong.now import NowFn, as_utc, utcnow
+from pingpong.roster_sync import HostRateLimiter
+
+logger = logging.getLogger(__name__)
+
+_LAST_ERROR_MAX_LENGTH = 1000
+
+# Every email goes through the one configured provider.
+_RATE_LIMIT_KEY = "email"
+
+# Statuses reported as outbox depth; sent emails are history, not depth.
+_PENDING_STATUSES = (
+    schemas.EmailOutboxStatus.QUEUED,
+    schemas.EmailOutboxStatus.SENDING,
+    schemas.EmailOutboxStatus.DEAD,
+)
+
+
+def _idempotency_key(key: str | None, to: str) -> str:
+    if key is None:
+        return uuid.uuid4().hex
+    # The same key may be used for several recipients of one batch.
+    return hashlib.sha256(f"{key}\0{to}".encode()).hexdigest()
+
+
+async def enqueue_emails(
+    session: AsyncSession,
+    emails: Iterable[tuple[str, str, str]],
+    idempotency_key: str | None = None,
+    nowfn: NowFn = utcnow,
+) -> int:
+    """Adds (to, subject, body) emails to the outbox in the caller's transaction.
+
+    Emails are only delivered if the transaction commits. With an
+    `idempotency_key`, enqueueing again for the same recipient is a no-op.
+    Returns the number of emails added.
+    """
+    now = nowfn()
+    return await models.EmailOutbox.enqueue_many(
+        session,
+        [
+            {
+                "idempotency_key": _idempotency_key(idempotency_key, to),
+                "to_address": to,
+                "subject": subject,
+                "body": body,
+                "next_attempt_at": now,
+            }
+            for to, subject, body in emails
+        ],
+    )
+
+
+class OutboxEmailSender(EmailSender):
+    """An EmailSender that queues emails in the outbox instead of sending them.
+
+    With a `session`, emails join the caller's transaction. Otherwise each call
+    commits on its own session.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession | None = None,
+        idempotency_key: str | None = None,
+    ):
+        self.session = session
+        self.idempotency_key = idempotency_key
+
+    async def send(self, to: str, subject: str, message: str):
+        await self._enqueue([(to, subject, message)])
+
+    async def send_many(
+        self, messages: Iterable[tuple[str, str, str]], concurrency: int = 1
+    ) -> list[EmailSendResult]:
+        messages = list(messages)
+        await self._enqueue(messages)
+        return [EmailSendResult(to) for to, _, _ in messages]
+
+    async def _enqueue(self, messages: list[tuple[str, str, str]]) -> None:
+        if self.session is not None:
+            await enqueue_emails(self.session, messages, self.idempotency_key)
+            return
+        async with config.db.driver.async_session() as session:
+            await enqueue_emails(session, messages, self.idempotency_key)
+            await session.commit()
+
+
+def outbound_email_sender(
+    session: AsyncSession | None = None, idempotency_key: str | None = None
+) -> EmailSender:
+    """The sender for outbound email: the outbox if enabled, else the provider."""
+    if not config.email_outbox.enabled:
+        return config.email.sender
+    return OutboxEmailSender(session, idempotency_key)
+
+
+def build_dispatcher_id() -> str:
+    return f"email-outbox:{socket.gethostname()}:{os.getpid()}"
+
+
+class EmailOutboxDispatcher:
+    """Delivers queued emails from the outbox through `sender`."""
+
+    def __init__(
+        self,
+        sender: EmailSender,
+        settings: EmailOutboxSettings | None = None,
+        nowfn: NowFn = utcnow,
+        dispatcher_id: str | None = None,
+    ):
+        self.sender = sender
+        self.settings = settings or config.email_outbox
+        self.nowfn = nowfn
+        self.dispatcher_id = dispatcher_id or build_dispatcher_id()
+        self.limiter = HostRateLimiter(
+            self.settings.rate_limit_per_second, self.settings.burst
+        )
+
+    async def run(self, stop: asyncio.Event | None = None) -> None:
+        """Dispatches until `stop` is set, polling while the outbox is idle."""
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                dispatched = await self.dispatch_once()
+            except Exception:
+                logger.exception("Email outbox dispatch failed")
+                dispatched = 0
+            if dispatched < self.settings.batch_size:
+                try:
+                    await asyncio.wait_for(
+                        stop.wait(), self.settings.poll_interval_seconds
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+    async def dispatch_once(self) -> int:
+        """Claims one batch of due emails and tries to deliver it.
+
+        Returns the number of emails claimed.
+        """
+        claimed, lease_token = await self._claim()
+        if claimed:
+            semaphore = asyncio.Semaphore(self.settings.concurrency)
+            outcomes = await asyncio.gather(
+                *(self._deliver(email, semaphore) for email in claimed)
+            )
+            await self._record(claimed, outcomes, lease_token)
+        await self.report_depth()
+        return len(claimed)
+
+    def _claimable(self, now: datetime):
+        return or_(
+            and_(
+                models.EmailOutbox.status == schemas.EmailOutboxStatus.QUEUED,
+                models.EmailOutbox.next_attempt_at <= now,
+            ),
+            # Left behind by a dispatcher that stopped mid-batch.
+            and_(
+                models.EmailOutbox.status == schemas.EmailOutboxStatus.SENDING,
+                models.EmailOutbox.lease_expires_at < now,
+            ),
+        )
+
+    async def _claim(self) -> tuple[list[models.EmailOutbox], str]:
+        lease_token = secrets.token_urlsafe(24)
+        async with config.db.driver.async_session() as session:
+            now = self.nowfn()
+            candidate_ids = (
+                select(models.EmailOutbox.id)
+                .where(self._claimable(now))
+                .order_by(models.EmailOutbox.next_attempt_at, models.EmailOutbox.id)
+                .limit(self.settings.batch_size)
+                .scalar_subquery()
+            )
+            # Re-checking the claimable condition in the UPDATE keeps two
+            # dispatchers from claiming the same email.
+            stmt = (
+                update(models.EmailOutbox)
+                .where(models.EmailOutbox.id.in_(candidate_ids))
+                .where(self._claimable(now))
+                .values(
+                    status=schemas.EmailOutboxStatus.SENDING,
+                    lease_token=lease_token,
+                    leased_by=self.dispatcher_id,
+                    lease_expires_at=now
+                    + timedelta(seconds=self.settings.lease_seconds),
+                )
+                .returning(models.EmailOutbox)
+            )
+            claimed = list((await session.scalars(stmt)).all())
+            await session.commit()
+        return sorted(claimed, key=lambda e: e.id), lease_token
+
+    async def _deliver(
+        self, email: models.EmailOutbox, semaphore: asyncio.Semaphore
+    ) -> Exception | None:
+        async with semaphore:
+            await self.limiter.acquire(_RATE_LIMIT_KEY)
+            try:
+                await self.sender.send(email.to_address, email.subject, email.body)
+            except Exception as e:
+                logger.warning(
+                    "Failed to send outbox email %s (attempt %s): %s",
+                    email.id,
+                    email.attempts + 1,
+                    e,
+                )
+                return e
+        return None
+
+    def _retry_delay(self, attempts: int) -> timedelta:
+        delay = min(
+            self.settings.retry_max_seconds,
+            self.settings.retry_base_seconds * 2 ** (attempts - 1),
+        )
+        # Jitter so emails that failed together don't retry together.
+        return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+    async def _record(
+        self,
+        claimed: list[models.EmailOutbox],
+        outcomes: list[Exception | None],
+        lease_token: str,
+    ) -> None:
+        now = self.nowfn()
+        sent_ids = [email.id for email, error in zip(claimed, outcomes) if not error]
+        async with config.db.driver.async_session() as session:
+            if sent_ids:
+                await session.execute(
+                    update(models.EmailOutbox)
+                    .where(models.EmailOutbox.id.in_(sent_ids))
+                    .where(models.EmailOutbox.lease_token == lease_token)
+                    .values(
+                        status=schemas.EmailOutboxStatus.SENT,
+                        attempts=models.EmailOutbox.attempts + 1,
+                        sent_at=now,
+                        last_error=None,
+                        lease_token=None,
+                        leased_by=None,
+                        lease_expires_at=None,
+                    )
+                )
+            for email, error in zip(claimed, outcomes):
+                outcome = "sent"
+                if error is not None:
+                    attempts = email.attempts + 1
+                    dead = attempts >= self.settings.max_attempts
+                    outcome = "dead" if dead else "retry"
+                    await session.execute(
+                        update(models.EmailOutbox)
+                        .where(models.EmailOutbox.id == email.id)
+                        .where(models.EmailOutbox.lease_token == lease_token)
+                        .values(
+                            status=schemas.EmailOutboxStatus.DEAD
+                            if dead
+                            else schemas.EmailOutboxStatus.QUEUED,
+                            attempts=attempts,
+                            next_attempt_at=now + self._retry_delay(attempts),
+                            last_error=str(error)[:_LAST_ERROR_MAX_LENGTH],
+                            lease_token=None,
+                            leased_by=None,
+                            lease_expires_at=None,
+                        )
+                    )
+                    if dead:
+                        logger.error(
+                            "Outbox email %s dead-lettered after %s attempts: %s",
+                            email.id,
+                            attempts,
+                            error,
+                        )
+                if email.created is not None:
+                    metrics.email_send_latency.observe(
+                        (now - as_utc(email.created)).total_seconds(),
+                        app=config.public_url,
+                        outcome=outcome,
+                    )
+            await session.commit()
+
+    async def report_depth(self) -> None:
+        async with config.db.driver.async_session() as session:
+            counts = await models.EmailOutbox.count_by_status(
+                session, _PENDING_STATUSES
+            )
+        for status in _PENDING_STATUSES:
+            metrics.email_outbox_depth.set(
+                counts.get(status, 0), app=config.public_url, status=status.value
+            )
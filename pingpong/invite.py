@@ -1,4 +1,7 @@
-from .email import EmailSender
+import re
+import uuid
+
+from .email import EmailSender, EmailSendResult
 from .schemas import (
     ClassSummaryExport,
     ClonedGroupNotification,
@@ -84,6 +87,22 @@ async def send_invite(
     expires: int = 86400,
 ):
     """Send an email invitation for a user to join a class."""
+    await sender.send(invite.email, *_invite_email(invite, link, expires))
+
+
+async def send_invites(
+    sender: EmailSender,
+    invites: list[tuple[CreateInvite, str]],
+    expires: int = 86400,
+) -> list[EmailSendResult]:
+    """Send (invite, link) email invitations, reusing the sender's connections."""
+    return await sender.send_many(
+        (invite.email, *_invite_email(invite, link, expires))
+        for invite, link in invites
+    )
+
+
+def _invite_email(invite: CreateInvite, link: str, expires: int) -> tuple[str, str]:
     subject = f"You're invited to join {invite.class_name}!"
 
     message = message_template.substitute(
@@ -110,7 +129,7 @@ async def send_invite(
         }
     )
 
-    await sender.send(invite.email, subject, message)
+    return subject, message
 
 
 async def send_export_download(
@@ -245,24 +264,80 @@ async def send_clone_group_failed(
     await sender.send(invite.email, subject, message)
 
 
+class SummaryEmailRenderer:
+    """Renders one class's summary email for many recipients.
+
+    The template is filled in once with the class-wide fields, so each
+    recipient only costs joining their name and login link into the
+    pre-rendered fragments.
+    """
+
+    _RECIPIENT_FIELDS = ("name", "link")
+
+    def __init__(
+        self,
+        class_name: str,
+        summary_html: str,
+        time_since: str,
+        summary_type: str | None = None,
+        title: str | None = None,
+    ):
+        self.subject = f"Your {summary_type or 'activity summary'} for {class_name}"
+        # Unique markers stand in for the recipient fields, so content in the
+        # summary can't be mistaken for a placeholder.
+        marker = f"\0{uuid.uuid4().hex}\0"
+        rendered = summary_template.substitute(
+            {
+                "courseName": class_name,
+                "summary": summary_html,
+                "title": title or "Your group's activity summary is here.",
+                "time": time_since,
+                "legal_text": f"you are a Moderator in {class_name}. You can change your notification settings on the Manage Group page on PingPong",
+                **{
+                    field: f"{marker}{field}{marker}"
+                    for field in self._RECIPIENT_FIELDS
+                },
+            }
+        )
+        # Alternates between literal text and recipient field names.
+        self._fragments = re.split(
+            f"{re.escape(marker)}({'|'.join(self._RECIPIENT_FIELDS)}){re.escape(marker)}",
+            rendered,
+        )
+
+    def render(self, name: str, link: str) -> str:
+        fields = {"name": name, "link": link}
+        return "".join(
+            fields[fragment] if i % 2 else fragment
+            for i, fragment in enumerate(self._fragments)
+        )
+
+
 async def send_summary(
     sender: EmailSender,
     invite: ClassSummaryExport,
 ):
-    subject = (
-        f"Your {invite.summary_type or 'activity summary'} for {invite.class_name}"
+    renderer = SummaryEmailRenderer(
+        invite.class_name,
+        invite.summary_html,
+        invite.time_since,
+        invite.summary_type,
+        invite.title,
     )
-
-    message = summary_template.substitute(
-        {
-            "name": invite.first_name,
-            "courseName": invite.class_name,
-            "summary": invite.summary_html,
-            "link": invite.link,
-            "title": invite.title or "Your group's activity summary is here.",
-            "time": invite.time_since,
-            "legal_text": f"you are a Moderator in {invite.class_name}. You can change your notification settings on the Manage Group page on PingPong",
-        }
+    await sender.send(
+        invite.email,
+        renderer.subject,
+        renderer.render(invite.first_name, invite.link),
     )
 
-    await sender.send(invite.email, subject, message)
+
+async def send_summaries(
+    sender: EmailSender,
+    renderer: SummaryEmailRenderer,
+    recipients: list[tuple[str, str, str]],
+) -> list[EmailSendResult]:
+    """Send (email, name, link) recipients one class's summary."""
+    return await sender.send_many(
+        (email, renderer.subject, renderer.render(name, link))
+        for email, name, link in recipients
+    )
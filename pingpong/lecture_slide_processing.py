@@ -1,7 +1,9 @@
 import asyncio
 import base64
 import contextlib
+import hashlib
 import io
+import itertools
 import json
 import logging
 import multiprocessing
@@ -12,6 +14,7 @@ import socket
 import subprocess
 import tempfile
 import time
+from collections import OrderedDict
 from collections.abc import Callable, Coroutine, Mapping, Sequence
 from dataclasses import dataclass
 from datetime import datetime, timedelta
@@ -221,7 +224,14 @@ Rules:
 - Preserve bracketed ElevenLabs delivery or audio tags where they appear.
 - Do not summarize, explain, add facts, add labels, or translate into any language other than the target language.
 - Return exactly one translated item for every supplied slide_position."""
+LECTURE_SLIDE_TRANSLATION_GLOSSARY_PROMPT = """Build a terminology glossary for translating the supplied lecture narration into the requested target language.
+
+Rules:
+- List the technical terms, names, acronyms, and course-specific phrases that must be translated the same way everywhere in the lecture.
+- Give exactly one target-language rendering per term, or repeat the term unchanged when it should stay untranslated.
+- Do not list ordinary words or phrases that carry no special meaning in the lecture."""
 LECTURE_SLIDE_TRANSLATION_SOURCE_TOKEN_BUDGET = 20_000
+LECTURE_SLIDE_TRANSLATION_CHUNK_CONCURRENCY = 4
 
 RUN_LEASE_DURATION = timedelta(minutes=10)
 RUN_LEASE_HEARTBEAT_INTERVAL = min(timedelta(minutes=1), RUN_LEASE_DURATION / 2)
@@ -252,6 +262,10 @@ SLIDE_MANIFEST_CHUNK_MIN_SPLIT_MS = 60 * 1000
 SLIDE_MANIFEST_MIN_CHUNK_SOURCE_TOKENS = 25_000
 SLIDE_MANIFEST_TOKENIZER_MODEL = "gpt-5.6-sol"
 SLIDE_MANIFEST_TOKENIZER_FALLBACK_ENCODING = "o200k_base"
+# Sized to hold every word of a multi-hour transcript, so planning retries and
+# later attempts never re-encode the same text.
+SLIDE_TOKEN_COUNT_CACHE_MAX_WORDS = 50_000
+SLIDE_TOKEN_COUNT_CACHE_MAX_TEXTS = 1_024
 
 
 class GeneratedSlideNarration(BaseModel):
@@ -275,6 +289,19 @@ class TranslatedSlideNarrationSet(BaseModel):
     slides: list[TranslatedSlideNarration]
 
 
+class TranslationGlossaryTerm(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    source_term: str = Field(..., min_length=1)
+    translated_term: str = Field(..., min_length=1)
+
+
+class TranslationGlossary(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    terms: list[TranslationGlossaryTerm]
+
+
 class GeneratedSlideNarrationSet(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
@@ -1633,7 +1660,7 @@ async def _process_claimed_translation_run(
             session.add(translation)
             await session.commit()
 
-        if not await _translation_has_page_rows(translation_id):
+        if not await _translation_has_all_page_rows(translation_id):
             if not await _set_translation_run_stage(
                 run_id,
                 lease_token,
@@ -1645,11 +1672,15 @@ async def _process_claimed_translation_run(
             )
             if translated_set is None:
                 return
+            # Chunks persist their own rows; this adds the rows for slides that
+            # never needed translating.
             await _persist_translation_page_rows(
                 run_id, lease_token, translation_id, translated_set
             )
             if not await _ensure_translation_run_can_continue(run_id, lease_token):
                 return
+            if not await _translation_has_all_page_rows(translation_id):
+                raise RuntimeError("Lecture slide translation is missing slides.")
 
         if not await _set_translation_run_stage(
             run_id,
@@ -1680,14 +1711,23 @@ async def _process_claimed_translation_run(
         )
 
 
-async def _translation_has_page_rows(translation_id: int) -> bool:
+async def _translation_has_all_page_rows(translation_id: int) -> bool:
     async with config.db.driver.async_session() as session:
-        page_id = await session.scalar(
-            select(models.LectureSlideTranslationPage.id)
-            .where(models.LectureSlideTranslationPage.translation_id == translation_id)
-            .limit(1)
+        translation = await session.get(models.LectureSlideTranslation, translation_id)
+        if translation is None:
+            return False
+        page_count = await session.scalar(
+            select(func.count(models.LectureSlidePage.id)).where(
+                models.LectureSlidePage.lecture_slide_deck_id
+                == translation.lecture_slide_deck_id
+            )
+        )
+        row_count = await session.scalar(
+            select(func.count(models.LectureSlideTranslationPage.id)).where(
+                models.LectureSlideTranslationPage.translation_id == translation_id
+            )
         )
-        return page_id is not None
+        return row_count == page_count
 
 
 async def _generate_translation_text(
@@ -1695,6 +1735,13 @@ async def _generate_translation_text(
     lease_token: str,
     translation_id: int,
 ) -> TranslatedSlideNarrationSet | None:
+    """Translate every pending narration part, persisting rows as chunks finish.
+
+    Chunks are translated concurrently (bounded by
+    LECTURE_SLIDE_TRANSLATION_CHUNK_CONCURRENCY) against a shared glossary so
+    terminology stays consistent across chunks. Slides that already have a
+    translated page row from an earlier attempt are not translated again.
+    """
     async with config.db.driver.async_session() as session:
         translation = await session.scalar(
             select(models.LectureSlideTranslation)
@@ -1702,12 +1749,14 @@ async def _generate_translation_text(
             .options(
                 selectinload(
                     models.LectureSlideTranslation.lecture_slide_deck
-                ).selectinload(models.LectureSlideDeck.pages)
+                ).selectinload(models.LectureSlideDeck.pages),
+                selectinload(models.LectureSlideTranslation.pages),
             )
         )
         if translation is None:
             return None
         deck = translation.lecture_slide_deck
+        persisted_positions = {page.position for page in translation.pages}
         source_items = [
             {
                 "slide_position": page.position,
@@ -1716,6 +1765,7 @@ async def _generate_translation_text(
             for page in sorted(deck.pages, key=lambda item: item.position)
             if page.content_kind != schemas.LectureSlideContentKind.VIDEO
             and text_needs_audio(page.narration_text or "")
+            and page.position not in persisted_positions
         ]
         class_id = deck.class_id
         target_language = translation.language_name
@@ -1726,36 +1776,56 @@ async def _generate_translation_text(
 
     async with config.db.driver.async_session() as session:
         openai_client = await get_openai_client_by_class_id(session, class_id)
-    translated_slides: list[TranslatedSlideNarration] = []
-    for source_chunk in _translation_source_chunks(source_items):
-        result = await _await_with_translation_lease_heartbeat(
+    source_chunks = _translation_source_chunks(source_items)
+    glossary = TranslationGlossary(terms=[])
+    if len(source_chunks) > 1:
+        glossary_result = await _await_with_translation_lease_heartbeat(
             run_id,
             lease_token,
             _parse_responses_output(
                 openai_client,
                 model=openai_model,
-                instructions=LECTURE_SLIDE_TRANSLATION_PROMPT,
-                response_model=TranslatedSlideNarrationSet,
+                instructions=LECTURE_SLIDE_TRANSLATION_GLOSSARY_PROMPT,
+                response_model=TranslationGlossary,
                 input_messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "input_text",
-                                "text": (
-                                    f"Target language: {target_language} "
-                                    f"({target_language_code}).\n\n"
-                                    "Translate this JSON array of narration parts:\n"
-                                    f"{json.dumps(source_chunk, ensure_ascii=False)}"
-                                ),
-                            }
-                        ],
-                    }
+                    _translation_user_message(
+                        target_language,
+                        target_language_code,
+                        "Build a glossary for this JSON array of narration parts:\n"
+                        + json.dumps(
+                            _translation_glossary_source_items(source_chunks),
+                            ensure_ascii=False,
+                        ),
+                    )
                 ],
             ),
         )
-        if result is None:
+        if glossary_result is None:
             return None
+        glossary = glossary_result
+
+    semaphore = asyncio.Semaphore(LECTURE_SLIDE_TRANSLATION_CHUNK_CONCURRENCY)
+    persist_lock = asyncio.Lock()
+
+    async def _translate_chunk(
+        source_chunk: list[dict[str, int | str]],
+    ) -> list[TranslatedSlideNarration]:
+        async with semaphore:
+            result = await _parse_responses_output(
+                openai_client,
+                model=openai_model,
+                instructions=LECTURE_SLIDE_TRANSLATION_PROMPT,
+                response_model=TranslatedSlideNarrationSet,
+                input_messages=[
+                    _translation_user_message(
+                        target_language,
+                        target_language_code,
+                        "Translate this JSON array of narration parts:\n"
+                        + json.dumps(source_chunk, ensure_ascii=False),
+                        glossary=glossary,
+                    )
+                ],
+            )
         expected_positions = {int(item["slide_position"]) for item in source_chunk}
         actual_positions = [slide.slide_position for slide in result.slides]
         if (
@@ -1765,8 +1835,97 @@ async def _generate_translation_text(
             raise RuntimeError(
                 "OpenAI returned an incomplete lecture narration translation."
             )
-        translated_slides.extend(result.slides)
-    return TranslatedSlideNarrationSet(slides=translated_slides)
+        # Rows are written as soon as each chunk lands so a retry after a crash
+        # only re-translates the chunks that never finished.
+        async with persist_lock:
+            await _persist_translation_page_rows(
+                run_id,
+                lease_token,
+                translation_id,
+                result,
+            )
+        return result.slides
+
+    async def _translate_all_chunks() -> list[list[TranslatedSlideNarration]]:
+        tasks = [
+            asyncio.create_task(_translate_chunk(source_chunk))
+            for source_chunk in source_chunks
+        ]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    chunk_results = await _await_with_translation_lease_heartbeat(
+        run_id,
+        lease_token,
+        _translate_all_chunks(),
+    )
+    if chunk_results is None:
+        return None
+    return TranslatedSlideNarrationSet(
+        slides=[slide for chunk_slides in chunk_results for slide in chunk_slides]
+    )
+
+
+def _translation_user_message(
+    target_language: str,
+    target_language_code: str,
+    text: str,
+    *,
+    glossary: TranslationGlossary | None = None,
+) -> Any:
+    content: list[dict[str, str]] = [
+        {
+            "type": "input_text",
+            "text": (
+                f"Target language: {target_language} ({target_language_code}).\n\n"
+                f"{text}"
+            ),
+        }
+    ]
+    if glossary is not None and glossary.terms:
+        content.append(
+            {
+                "type": "input_text",
+                "text": (
+                    "Use these term translations consistently:\n"
+                    + json.dumps(
+                        [term.model_dump() for term in glossary.terms],
+                        ensure_ascii=False,
+                    )
+                ),
+            }
+        )
+    return {"role": "user", "content": content}
+
+
+def _translation_glossary_source_items(
+    source_chunks: list[list[dict[str, int | str]]],
+) -> list[dict[str, int | str]]:
+    """Sample narration parts from every chunk, within one chunk's token budget.
+
+    Items are taken round-robin across chunks so the glossary sees terminology
+    from the whole deck rather than just its opening slides.
+    """
+    items: list[dict[str, int | str]] = []
+    total_tokens = 0
+    for round_items in itertools.zip_longest(*source_chunks):
+        for item in round_items:
+            if item is None:
+                continue
+            item_tokens = _count_text_tokens(json.dumps(item, ensure_ascii=False))
+            if (
+                total_tokens + item_tokens
+                > LECTURE_SLIDE_TRANSLATION_SOURCE_TOKEN_BUDGET
+            ):
+                return sorted(items, key=lambda entry: int(entry["slide_position"]))
+            items.append(item)
+            total_tokens += item_tokens
+    return sorted(items, key=lambda entry: int(entry["slide_position"]))
 
 
 def _translation_source_chunks(
@@ -1803,6 +1962,11 @@ async def _persist_translation_page_rows(
     translation_id: int,
     translated_set: TranslatedSlideNarrationSet,
 ) -> None:
+    """Add page rows for translated slides and slides that need no translation.
+
+    Safe to call repeatedly as chunks complete: positions that already have a
+    row are left alone, and slides still awaiting translation are skipped.
+    """
     translated_by_position = {
         slide.slide_position: slide.narration_text for slide in translated_set.slides
     }
@@ -1812,12 +1976,13 @@ async def _persist_translation_page_rows(
             select(models.LectureSlideTranslation)
             .where(models.LectureSlideTranslation.id == translation_id)
             .options(
+                selectinload(models.LectureSlideTranslation.pages),
                 selectinload(models.LectureSlideTranslation.lecture_slide_deck).options(
                     undefer(models.LectureSlideDeck.transcript_data),
                     selectinload(models.LectureSlideDeck.pages)
                     .selectinload(models.LectureSlidePage.narration)
                     .selectinload(models.LectureSlideNarration.stored_object),
-                )
+                ),
             )
         )
         if (
@@ -1828,6 +1993,9 @@ async def _persist_translation_page_rows(
         ):
             return
         deck = translation.lecture_slide_deck
+        narration_by_position: dict[int, str | None] = {
+            page.position: page.narration_text for page in translation.pages
+        }
         source_transcript = [
             schemas.LectureVideoManifestWordV3.model_validate(word)
             for word in (
@@ -1835,11 +2003,17 @@ async def _persist_translation_page_rows(
             )
         ]
         for page in sorted(deck.pages, key=lambda item: item.position):
-            narration_text = (
-                page.narration_text
-                if page.content_kind == schemas.LectureSlideContentKind.VIDEO
-                else translated_by_position.get(page.position, page.narration_text)
-            )
+            if page.position in narration_by_position:
+                continue
+            if page.content_kind == schemas.LectureSlideContentKind.VIDEO:
+                narration_text = page.narration_text
+            elif page.position in translated_by_position:
+                narration_text = translated_by_position[page.position]
+            elif text_needs_audio(page.narration_text or ""):
+                # Still waiting on its translation chunk.
+                continue
+            else:
+                narration_text = page.narration_text
             stored_object_id = None
             word_timings: list[dict[str, Any]] | None = None
             if (
@@ -1870,13 +2044,15 @@ async def _persist_translation_page_rows(
                     word_timings=word_timings,
                 )
             )
+            narration_by_position[page.position] = narration_text
         run.total_parts = len(deck.pages)
         run.completed_parts = sum(
             1
             for page in deck.pages
-            if page.content_kind == schemas.LectureSlideContentKind.VIDEO
-            or not text_needs_audio(
-                translated_by_position.get(page.position, page.narration_text) or ""
+            if page.position in narration_by_position
+            and (
+                page.content_kind == schemas.LectureSlideContentKind.VIDEO
+                or not text_needs_audio(narration_by_position[page.position] or "")
             )
         )
         session.add(run)
@@ -3692,8 +3868,36 @@ def _slide_manifest_tokenizer() -> tiktoken.Encoding:
         return tiktoken.get_encoding(SLIDE_MANIFEST_TOKENIZER_FALLBACK_ENCODING)
 
 
+_text_token_counts: OrderedDict[bytes, int] = OrderedDict()
+_word_token_counts: OrderedDict[tuple[str, str, int, int], int] = OrderedDict()
+
+
+def _remember_token_count(
+    counts: OrderedDict[Any, int], key: Any, count: int, max_entries: int
+) -> None:
+    counts[key] = count
+    counts.move_to_end(key)
+    while len(counts) > max_entries:
+        counts.popitem(last=False)
+
+
 def _count_text_tokens(text: str) -> int:
-    return len(_slide_manifest_tokenizer().encode(text))
+    """Count tokens, reusing earlier counts for identical text.
+
+    Hashing is far cheaper than BPE encoding, so a prompt section that is
+    estimated again on a retry or a later attempt is only encoded once per
+    worker process.
+    """
+    key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    count = _text_token_counts.get(key)
+    if count is not None:
+        _text_token_counts.move_to_end(key)
+        return count
+    count = len(_slide_manifest_tokenizer().encode(text))
+    _remember_token_count(
+        _text_token_counts, key, count, SLIDE_TOKEN_COUNT_CACHE_MAX_TEXTS
+    )
+    return count
 
 
 def _slide_manifest_request_token_estimate(
@@ -3723,7 +3927,6 @@ def _slide_manifest_request_token_estimate(
                 context_end_ms=context_end_ms,
             ),
             _slide_timing_source_text(page_ranges),
-            _generation_transcript_source_text(transcript, compact=False),
             _manual_slide_questions_source_text(
                 manual_questions or [], question_requests
             )
@@ -3731,7 +3934,9 @@ def _slide_manifest_request_token_estimate(
             _slide_generation_final_task_text(),
         ]
     )
-    return _count_text_tokens(request_text)
+    return _count_text_tokens(request_text) + _transcript_source_token_estimate(
+        transcript
+    )
 
 
 def _slide_manifest_source_token_estimate(
@@ -3739,15 +3944,34 @@ def _slide_manifest_source_token_estimate(
     transcript: list[schemas.LectureVideoManifestWordV3],
 ) -> int:
     return _count_text_tokens(
-        "\n\n".join(
-            [
-                _slide_timing_source_text(page_ranges),
-                _generation_transcript_source_text(transcript, compact=False),
-            ]
-        )
+        _slide_timing_source_text(page_ranges)
+    ) + _transcript_source_token_estimate(transcript)
+
+
+def _transcript_source_token_estimate(
+    transcript: list[schemas.LectureVideoManifestWordV3],
+) -> int:
+    """Estimate the transcript source text from its header and per-word counts.
+
+    The JSON transcript is its word entries plus a fixed header, so summing
+    cached word counts avoids serializing and encoding the transcript again for
+    every window the planner considers.
+    """
+    return _count_text_tokens(_transcript_source_frame_text()) + sum(
+        _word_token_estimate(word) for word in transcript
     )
 
 
+def _transcript_source_frame_text() -> str:
+    """The transcript source text without its word entries.
+
+    A non-empty `indent=2` array puts its brackets on their own lines, unlike
+    the `[]` rendered for an empty transcript.
+    """
+    header = _generation_transcript_source_text([], compact=False).removesuffix("[]")
+    return header + "[\n\n]"
+
+
 def _slide_manifest_chunk_source_token_budget(
     *,
     generation_prompt: str,
@@ -3766,17 +3990,104 @@ def _slide_manifest_chunk_source_token_budget(
     return max(0, SLIDE_MANIFEST_INPUT_TOKEN_BUDGET - fixed_request_tokens)
 
 
+def _word_token_key(
+    word: schemas.LectureVideoManifestWordV3,
+) -> tuple[str, str, int, int]:
+    return (word.id, word.word, word.start_offset_ms, word.end_offset_ms)
+
+
+def _word_token_source_text(word: schemas.LectureVideoManifestWordV3) -> str:
+    """Render a word the way it appears inside the JSON transcript source text.
+
+    That text is an `indent=2` JSON array, so each entry is indented one level
+    and followed by the comma and newline that separate it from the next.
+    """
+    item = json.dumps(
+        {
+            "id": word.id,
+            "word": word.word,
+            "start": word.start_offset_ms / 1000,
+            "end": word.end_offset_ms / 1000,
+        },
+        indent=2,
+    )
+    return "  " + item.replace("\n", "\n  ") + ",\n"
+
+
 def _word_token_estimate(word: schemas.LectureVideoManifestWordV3) -> int:
-    return _count_text_tokens(
-        json.dumps(
-            {
-                "id": word.id,
-                "word": word.word,
-                "start": word.start_offset_ms / 1000,
-                "end": word.end_offset_ms / 1000,
-            }
-        )
+    key = _word_token_key(word)
+    count = _word_token_counts.get(key)
+    if count is not None:
+        _word_token_counts.move_to_end(key)
+        return count
+    count = len(_slide_manifest_tokenizer().encode(_word_token_source_text(word)))
+    _remember_token_count(
+        _word_token_counts, key, count, SLIDE_TOKEN_COUNT_CACHE_MAX_WORDS
     )
+    return count
+
+
+def _known_word_token_counts(
+    words: list[schemas.LectureVideoManifestWordV3],
+) -> list[int] | None:
+    """Return cached per-word token counts, or None if any word is uncounted."""
+    counts: list[int] = []
+    for word in words:
+        count = _word_token_counts.get(_word_token_key(word))
+        if count is None:
+            return None
+        counts.append(count)
+    return counts
+
+
+async def _load_transcript_word_token_counts(
+    deck_id: int,
+    transcript: list[schemas.LectureVideoManifestWordV3],
+) -> None:
+    """Prime the token count cache from the deck's stored per-word counts.
+
+    Counts are computed and written back alongside the transcript the first
+    time they are needed, so later attempts, retries and other workers reuse
+    them instead of re-encoding the transcript.
+    """
+    if not transcript:
+        return
+    encoding_name = _slide_manifest_tokenizer().name
+    async with config.db.driver.async_session() as session:
+        deck = await session.get(
+            models.LectureSlideDeck,
+            deck_id,
+            options=[undefer(models.LectureSlideDeck.transcript_data)],
+        )
+        if deck is None or deck.transcript_data is None:
+            return
+        stored_counts = deck.transcript_data.get("word_token_counts")
+        if (
+            isinstance(stored_counts, dict)
+            and stored_counts.get("encoding") == encoding_name
+            and isinstance(stored_counts.get("counts"), list)
+            and len(stored_counts["counts"]) == len(transcript)
+        ):
+            for word, count in zip(transcript, stored_counts["counts"]):
+                _remember_token_count(
+                    _word_token_counts,
+                    _word_token_key(word),
+                    int(count),
+                    SLIDE_TOKEN_COUNT_CACHE_MAX_WORDS,
+                )
+            return
+        counts = [_word_token_estimate(word) for word in transcript]
+        if deck.transcript_data.get("word_level_transcription") != [
+            word.model_dump() for word in transcript
+        ]:
+            # The stored transcript moved on; its counts belong to a later run.
+            return
+        deck.transcript_data = {
+            **deck.transcript_data,
+            "word_token_counts": {"encoding": encoding_name, "counts": counts},
+        }
+        session.add(deck)
+        await session.commit()
 
 
 def _slide_manifest_context_window_for_token_overlap(
@@ -4229,6 +4540,7 @@ async def _generate_slide_manifest(
         page_ranges=page_ranges,
         transcript=transcript,
     )
+    await _load_transcript_word_token_counts(deck_id, transcript)
 
     return await _await_with_run_lease_heartbeat(
         run_id,
@@ -5209,7 +5521,12 @@ async def _persist_composite_artifacts(
 async def _combine_audio_objects(
     stored_objects: Sequence[models.LectureSlideNarrationStoredObject],
 ) -> bytes:
-    """Combine stored Ogg/Opus narration objects without decoding them in Python."""
+    """Combine stored Ogg/Opus narration objects without decoding them in Python.
+
+    Clips are streamed from the audio store straight into a single ffmpeg
+    process through FIFOs, so per-slide inputs never touch local disk and only
+    the combined output is written out.
+    """
     if not stored_objects:
         return b""
     if not config.lecture_video_audio_store:
@@ -5219,23 +5536,11 @@ async def _combine_audio_objects(
         raise RuntimeError("ffmpeg is required for lecture slide audio concatenation.")
 
     with tempfile.TemporaryDirectory() as temp_dir_name:
-        temp_dir = Path(temp_dir_name)
-        input_paths: list[Path] = []
-        for index, stored_object in enumerate(stored_objects):
-            input_path = temp_dir / f"input-{index}.audio"
-            with input_path.open("wb") as file:
-                async for chunk in config.lecture_video_audio_store.store.get_file(
-                    stored_object.key
-                ):
-                    file.write(chunk)
-            input_paths.append(input_path)
-
-        output_path = temp_dir / "combined.webm"
+        output_path = Path(temp_dir_name) / "combined.webm"
         try:
-            await asyncio.to_thread(
-                _run_ffmpeg_concat,
+            await _stream_ffmpeg_concat(
                 ffmpeg_path,
-                input_paths,
+                stored_objects,
                 output_path,
                 stream_copy=True,
             )
@@ -5244,10 +5549,9 @@ async def _combine_audio_objects(
                 "ffmpeg stream-copy concat failed; retrying with Opus re-encode.",
                 exc_info=True,
             )
-            await asyncio.to_thread(
-                _run_ffmpeg_concat,
+            await _stream_ffmpeg_concat(
                 ffmpeg_path,
-                input_paths,
+                stored_objects,
                 output_path,
                 stream_copy=False,
             )
@@ -5305,55 +5609,168 @@ def _total_stored_audio_duration_ms(
     return sum(cast(int, stored_object.duration_ms) for stored_object in stored_objects)
 
 
-def _run_ffmpeg_concat(
+async def _stream_ffmpeg_concat(
     ffmpeg_path: str,
-    input_paths: Sequence[Path],
+    stored_objects: Sequence[models.LectureSlideNarrationStoredObject],
     output_path: Path,
     *,
     stream_copy: bool,
 ) -> None:
-    """Run ffmpeg concat, preferring stream-copy unless re-encode is requested."""
-    concat_path = output_path.with_suffix(".txt")
-    concat_path.write_text(
-        "".join(f"file '{_escape_ffmpeg_concat_path(path)}'\n" for path in input_paths)
-    )
+    """Join stored clips with ffmpeg's concat demuxer, streaming each through a FIFO.
+
+    Granule positions and Opus pre-skip restart with every clip, so the clips
+    can't simply be piped in as one chained Ogg stream; the concat demuxer
+    shifts each clip's timestamps to follow the previous one. Clips are piped
+    from the audio store into their FIFOs as ffmpeg opens them, so they never
+    touch local disk, and writes wait on the pipe draining, so at most one
+    store chunk is buffered in memory regardless of how many clips there are.
+    """
+    if not config.lecture_video_audio_store:
+        raise RuntimeError("Lecture video audio store is not configured.")
+    audio_store = config.lecture_video_audio_store.store
     codec_args = (
         ["-c", "copy"]
         if stream_copy
         else ["-c:a", "libopus", "-b:a", "64k", "-application", "voip"]
     )
-    command = [
-        ffmpeg_path,
-        "-y",
-        "-nostdin",
-        "-hide_banner",
-        "-loglevel",
-        "error",
-        "-f",
-        "concat",
-        "-safe",
-        "0",
-        "-i",
-        str(concat_path),
-        *codec_args,
-        str(output_path),
-    ]
-    try:
-        completed = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            timeout=FFMPEG_CONCAT_TIMEOUT_SECONDS,
+    with tempfile.TemporaryDirectory() as fifo_dir_name:
+        fifo_dir = Path(fifo_dir_name)
+        fifo_paths = [
+            fifo_dir / f"input-{index}.ogg" for index in range(len(stored_objects))
+        ]
+        for fifo_path in fifo_paths:
+            os.mkfifo(fifo_path)
+        concat_path = fifo_dir / "inputs.txt"
+        concat_path.write_text(
+            "".join(
+                f"file '{_escape_ffmpeg_concat_path(path)}'\n" for path in fifo_paths
+            )
         )
-    except subprocess.TimeoutExpired as exc:
-        output = _subprocess_timeout_output(exc)
-        raise RuntimeError(
-            f"ffmpeg concat timed out after {FFMPEG_CONCAT_TIMEOUT_SECONDS} seconds"
-            f"{output}"
-        ) from exc
-    if completed.returncode != 0:
-        stderr = completed.stderr.strip()
-        raise RuntimeError(f"ffmpeg concat failed: {stderr or completed.returncode}")
+        process = await asyncio.create_subprocess_exec(
+            ffmpeg_path,
+            "-y",
+            "-nostdin",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-f",
+            "concat",
+            "-safe",
+            "0",
+            "-i",
+            str(concat_path),
+            *codec_args,
+            str(output_path),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        assert process.stderr is not None
+        stderr_task = asyncio.create_task(process.stderr.read())
+
+        async def _feed_and_wait() -> int:
+            loop = asyncio.get_running_loop()
+            for stored_object, fifo_path in zip(stored_objects, fifo_paths):
+                pipe = await _open_fifo_writer(fifo_path, process)
+                if pipe is None:
+                    # ffmpeg exited early; its exit status and stderr explain why.
+                    break
+                transport, protocol = await loop.connect_write_pipe(
+                    _FifoWriteProtocol, pipe
+                )
+                try:
+                    async for chunk in audio_store.get_file(stored_object.key):
+                        transport.write(chunk)
+                        await protocol.drain()
+                except BrokenPipeError:
+                    break
+                finally:
+                    transport.close()
+            return await process.wait()
+
+        try:
+            returncode = await asyncio.wait_for(
+                _feed_and_wait(), timeout=FFMPEG_CONCAT_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError as exc:
+            process.kill()
+            await process.wait()
+            stderr = (await stderr_task).decode("utf-8", errors="ignore").strip()
+            raise RuntimeError(
+                f"ffmpeg concat timed out after {FFMPEG_CONCAT_TIMEOUT_SECONDS} seconds"
+                + (f" (stderr={stderr})" if stderr else "")
+            ) from exc
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            stderr_task.cancel()
+            raise
+    stderr = (await stderr_task).decode("utf-8", errors="ignore").strip()
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg concat failed: {stderr or returncode}")
+
+
+class _FifoWriteProtocol(asyncio.Protocol):
+    """Flow control for a clip written into a FIFO that ffmpeg reads."""
+
+    def __init__(self) -> None:
+        self._can_write = asyncio.Event()
+        self._can_write.set()
+        self._lost = False
+
+    def pause_writing(self) -> None:
+        self._can_write.clear()
+
+    def resume_writing(self) -> None:
+        self._can_write.set()
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self._lost = True
+        self._can_write.set()
+
+    async def drain(self) -> None:
+        """Wait until ffmpeg has read enough of the FIFO to take more."""
+        await self._can_write.wait()
+        if self._lost:
+            raise BrokenPipeError("ffmpeg closed the FIFO")
+
+
+async def _open_fifo_writer(
+    fifo_path: Path, process: asyncio.subprocess.Process
+) -> io.FileIO | None:
+    """Open a FIFO for writing once ffmpeg has opened it for reading.
+
+    Returns None if ffmpeg exits first. Opening a FIFO for writing blocks until
+    it has a reader, so the open runs in a thread.
+    """
+    opening = asyncio.ensure_future(asyncio.to_thread(open, fifo_path, "wb", 0))
+    exited = asyncio.ensure_future(process.wait())
+    try:
+        await asyncio.wait([opening, exited], return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        await _abandon_fifo_open(fifo_path, opening)
+        raise
+    finally:
+        exited.cancel()
+    if opening.done():
+        return opening.result()
+    await _abandon_fifo_open(fifo_path, opening)
+    return None
+
+
+async def _abandon_fifo_open(
+    fifo_path: Path, opening: "asyncio.Future[io.FileIO]"
+) -> None:
+    """Let a blocked open of `fifo_path` for writing return, and close it."""
+    # Opening the read end ourselves gives the blocked open the reader it
+    # waits for, so its thread doesn't outlive ffmpeg.
+    reader = os.open(fifo_path, os.O_RDONLY | os.O_NONBLOCK)
+    try:
+        with contextlib.suppress(OSError):
+            (await opening).close()
+    finally:
+        os.close(reader)
 
 
 def _run_ffmpeg_remux(
@@ -5459,10 +5876,18 @@ async def _parse_responses_output(
 def transcript_data_from_words(
     words: list[schemas.LectureVideoManifestWordV3],
 ) -> dict[str, Any]:
-    return {
+    transcript_data: dict[str, Any] = {
         "version": TRANSCRIPT_DATA_VERSION,
         "word_level_transcription": [word.model_dump() for word in words],
     }
+    # Only carry counts this process already knows; never tokenize on write.
+    word_token_counts = _known_word_token_counts(words) if words else None
+    if word_token_counts is not None:
+        transcript_data["word_token_counts"] = {
+            "encoding": _slide_manifest_tokenizer().name,
+            "counts": word_token_counts,
+        }
+    return transcript_data
 
 
 def text_needs_audio(text: str) -> bool:
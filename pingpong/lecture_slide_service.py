@@ -1952,10 +1952,18 @@ async def _delete_lecture_slide_caption_keys_quietly(keys: Iterable[str]) -> Non
 async def clone_lecture_slide_deck_snapshot(
     session: AsyncSession,
     deck: models.LectureSlideDeck,
+    class_id: int | None = None,
 ) -> models.LectureSlideDeck:
+    """Clone a deck's rows, sharing its stored slides, media, audio and captions.
+
+    The clone belongs to `class_id` when given, and to the deck's class
+    otherwise. Stored objects are only deleted once no deck references them, so
+    the clone and the source can be edited or deleted independently.
+    """
+    target_class_id = deck.class_id if class_id is None else class_id
     cloned_deck = await models.LectureSlideDeck.create(
         session,
-        class_id=deck.class_id,
+        class_id=target_class_id,
         source_stored_object_id=deck.source_stored_object_id,
         uploader_id=deck.uploader_id,
         display_name=deck.display_name,
@@ -2019,7 +2027,7 @@ async def clone_lecture_slide_deck_snapshot(
             models.LectureSlideAdditionalContextFile(
                 lecture_slide_deck_id=cloned_deck.id,
                 file_object_id=context_file.file_object_id,
-                class_id=context_file.class_id,
+                class_id=target_class_id,
                 uploader_id=context_file.uploader_id,
                 position=context_file.position,
                 original_filename=context_file.original_filename,
@@ -9,7 +9,7 @@ import subprocess
 import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Literal, TypeVar
+from typing import Any, Awaitable, Literal, TypeVar
 
 import openai
 from google.genai.client import AsyncClient
@@ -19,6 +19,12 @@ from string import Template
 
 import pingpong.schemas as schemas
 from pingpong import gemini as gemini_helpers
+from pingpong.audio_chunking import (
+    AudioChunk,
+    plan_audio_chunks,
+    scan_audio_silences,
+    transcribe_audio_chunks,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +34,11 @@ _WHISPER_UPLOAD_MAX_BYTES = 25_000_000
 _WHISPER_UPLOAD_TARGET_BYTES = 24_500_000
 _TRANSCRIPTION_AUDIO_SAMPLE_RATE = 16_000
 _TRANSCRIPTION_AUDIO_BITRATES = ("32k", "24k", "16k", "12k")
+# Videos longer than the max are transcribed as silence-aligned chunks in parallel.
+_WHISPER_CHUNK_TARGET_MS = 10 * 60 * 1000
+_WHISPER_CHUNK_MAX_MS = 15 * 60 * 1000
+_WHISPER_CHUNK_OVERLAP_MS = 2_000
+_WHISPER_CHUNK_CONCURRENCY = 8
 
 
 @functools.cache
@@ -224,6 +235,7 @@ _MANIFEST_CHUNK_OVERLAP_MS = 30_000
 _MANIFEST_CHUNK_MIN_SPLIT_MS = 3 * 60 * 1000
 _GEMINI_GENERATION_MAX_ATTEMPTS = 3
 _GEMINI_GENERATION_RETRY_DELAY_SECONDS = 5.0
+_MANIFEST_CHUNK_UPLOAD_CONCURRENCY = 3
 
 
 def _generation_final_task_text(*, has_previous_summary_checkpoint: bool) -> str:
@@ -958,17 +970,11 @@ async def _prepare_lecture_video_audio_for_whisper_async(
     )
 
 
-async def transcribe_video_words(
-    video_path: str,
+async def _transcribe_audio_words(
     openai_client: openai.AsyncClient | openai.AsyncAzureOpenAI,
-    *,
-    temp_dir: str,
-) -> list[schemas.LectureVideoManifestWordV3]:
-    path_to_send = await _prepare_lecture_video_audio_for_whisper_async(
-        video_path=video_path,
-        temp_dir=temp_dir,
-    )
-    with open(path_to_send, "rb") as audio_file:
+    audio_path: str,
+) -> tuple[Any, Any]:
+    with open(audio_path, "rb") as audio_file:
         transcription = await openai_client.audio.transcriptions.create(
             file=audio_file,
             model="whisper-1",
@@ -983,6 +989,118 @@ async def transcribe_video_words(
     segments = getattr(transcription, "segments", None)
     if segments is None and isinstance(transcription, dict):
         segments = transcription.get("segments")
+    return words, segments
+
+
+def _rebase_chunk_transcription_items(
+    items: Any,
+    *,
+    chunk: AudioChunk,
+    text_key: str,
+) -> list[dict[str, Any]]:
+    # Shift clip-relative timestamps onto the video timeline and drop items
+    # heard in the overlap that belong to a neighbouring chunk.
+    offset_seconds = chunk.start_ms / 1000
+    rebased_items: list[dict[str, Any]] = []
+    for item in items or []:
+        start = _audio_transcription_item_value(item, "start")
+        end = _audio_transcription_item_value(item, "end")
+        if start is None or end is None:
+            continue
+        start = float(start) + offset_seconds
+        end = float(end) + offset_seconds
+        if not chunk.owns(start * 1000, end * 1000):
+            continue
+        rebased_items.append(
+            {
+                text_key: _audio_transcription_item_value(item, text_key),
+                "start": start,
+                "end": end,
+            }
+        )
+    return rebased_items
+
+
+async def _transcribe_video_audio_in_chunks(
+    video_path: str,
+    openai_client: openai.AsyncClient | openai.AsyncAzureOpenAI,
+    *,
+    temp_dir: str,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    ffmpeg_path = shutil.which("ffmpeg")
+    if ffmpeg_path is None:
+        raise RuntimeError("ffmpeg is required for lecture video transcription.")
+    duration_ms, silences = await asyncio.to_thread(
+        scan_audio_silences, video_path, ffmpeg_path=ffmpeg_path
+    )
+    chunks = plan_audio_chunks(
+        duration_ms,
+        silences,
+        target_ms=_WHISPER_CHUNK_TARGET_MS,
+        max_ms=_WHISPER_CHUNK_MAX_MS,
+        overlap_ms=_WHISPER_CHUNK_OVERLAP_MS,
+    )
+    logger.info(
+        "Transcribing lecture video audio in chunks. duration_ms=%s chunk_count=%s",
+        duration_ms,
+        len(chunks),
+    )
+
+    async def transcribe_chunk(
+        chunk: AudioChunk, chunk_path: str
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        words, segments = await _transcribe_audio_words(openai_client, chunk_path)
+        return (
+            _rebase_chunk_transcription_items(words, chunk=chunk, text_key="word"),
+            _rebase_chunk_transcription_items(segments, chunk=chunk, text_key="text"),
+        )
+
+    chunk_results = await transcribe_audio_chunks(
+        video_path,
+        chunks,
+        transcribe_chunk,
+        ffmpeg_path=ffmpeg_path,
+        temp_dir=temp_dir,
+        encode_args=[
+            "-ac",
+            "1",
+            "-ar",
+            str(_TRANSCRIPTION_AUDIO_SAMPLE_RATE),
+            "-c:a",
+            "libopus",
+            "-b:a",
+            _TRANSCRIPTION_AUDIO_BITRATES[0],
+            "-application",
+            "voip",
+        ],
+        suffix=".webm",
+        concurrency=_WHISPER_CHUNK_CONCURRENCY,
+    )
+    return (
+        [word for words, _segments in chunk_results for word in words],
+        [segment for _words, segments in chunk_results for segment in segments],
+    )
+
+
+async def transcribe_video_words(
+    video_path: str,
+    openai_client: openai.AsyncClient | openai.AsyncAzureOpenAI,
+    *,
+    temp_dir: str,
+) -> list[schemas.LectureVideoManifestWordV3]:
+    video_duration_ms = await _ffprobe_duration_ms(video_path)
+    if video_duration_ms is not None and video_duration_ms > _WHISPER_CHUNK_MAX_MS:
+        words, segments = await _transcribe_video_audio_in_chunks(
+            video_path,
+            openai_client,
+            temp_dir=temp_dir,
+        )
+    else:
+        path_to_send = await _prepare_lecture_video_audio_for_whisper_async(
+            video_path=video_path,
+            temp_dir=temp_dir,
+        )
+        words, segments = await _transcribe_audio_words(openai_client, path_to_send)
     if not words:
         raise ValueError("OpenAI transcription returned no word-level timestamps.")
 
@@ -2183,6 +2301,68 @@ async def _upload_and_generate_whole_manifest(
             await delete_gemini_file(gemini_file_name, gemini_client)
 
 
+async def _upload_manifest_chunk_to_gemini(
+    *,
+    video_path: str,
+    gemini_client: AsyncClient,
+    chunk: ManifestGenerationChunk,
+    temp_dir: str,
+) -> GeminiFileRef:
+    clip_path = await _write_video_clip(video_path, temp_dir=temp_dir, chunk=chunk)
+    try:
+        for attempt in range(1, _GEMINI_GENERATION_MAX_ATTEMPTS + 1):
+            logger.info(
+                "Uploading lecture video chunk to Gemini for manifest generation. "
+                "generation_start_ms=%s generation_end_ms=%s context_start_ms=%s "
+                "context_end_ms=%s",
+                chunk.generation_start_ms,
+                chunk.generation_end_ms,
+                chunk.context_start_ms,
+                chunk.context_end_ms,
+            )
+            try:
+                return await upload_video_to_gemini(clip_path, gemini_client)
+            except Exception as exc:
+                if (
+                    attempt >= _GEMINI_GENERATION_MAX_ATTEMPTS
+                    or not _is_retryable_gemini_generation_error(exc)
+                ):
+                    raise
+                delay_seconds = _GEMINI_GENERATION_RETRY_DELAY_SECONDS * attempt
+                logger.warning(
+                    "Retrying lecture video chunk upload after transient provider "
+                    "failure. generation_start_ms=%s attempt=%s max_attempts=%s "
+                    "delay_seconds=%.1f error=%s",
+                    chunk.generation_start_ms,
+                    attempt,
+                    _GEMINI_GENERATION_MAX_ATTEMPTS,
+                    delay_seconds,
+                    exc,
+                )
+                await asyncio.sleep(delay_seconds)
+        raise RuntimeError("Gemini chunk upload retry loop exited unexpectedly.")
+    finally:
+        # The clip is only needed until Gemini has it; with uploads running
+        # ahead of generation this keeps at most a few clips on disk.
+        Path(clip_path).unlink(missing_ok=True)
+
+
+async def _discard_manifest_chunk_uploads(
+    uploads: list[asyncio.Task[GeminiFileRef]],
+    gemini_client: AsyncClient,
+) -> None:
+    for upload in uploads:
+        upload.cancel()
+    results = await asyncio.gather(*uploads, return_exceptions=True)
+    for result in results:
+        if isinstance(result, GeminiFileRef):
+            logger.info(
+                "Deleting unused lecture video chunk Gemini upload. gemini_file=%s",
+                result.name,
+            )
+            await delete_gemini_file(result.name, gemini_client)
+
+
 async def _upload_and_generate_manifest_chunk(
     *,
     video_path: str,
@@ -2196,25 +2376,23 @@ async def _upload_and_generate_manifest_chunk(
     video_description_window_ms: int = DEFAULT_VIDEO_DESCRIPTION_DURATION_MS,
     previous_summary_checkpoint: schemas.LectureVideoManifestSummaryCheckpointV4
     | None = None,
+    gemini_file_upload: Awaitable[GeminiFileRef] | None = None,
 ) -> schemas.LectureVideoManifestV4:
     chunk_transcript = _transcript_for_window(
         transcript,
         start_offset_ms=chunk.context_start_ms,
         end_offset_ms=chunk.context_end_ms,
     )
-    clip_path = await _write_video_clip(video_path, temp_dir=temp_dir, chunk=chunk)
+    if gemini_file_upload is None:
+        gemini_file_upload = _upload_manifest_chunk_to_gemini(
+            video_path=video_path,
+            gemini_client=gemini_client,
+            chunk=chunk,
+            temp_dir=temp_dir,
+        )
     gemini_file_name: str | None = None
     try:
-        logger.info(
-            "Uploading lecture video chunk to Gemini for manifest generation. "
-            "generation_start_ms=%s generation_end_ms=%s context_start_ms=%s "
-            "context_end_ms=%s",
-            chunk.generation_start_ms,
-            chunk.generation_end_ms,
-            chunk.context_start_ms,
-            chunk.context_end_ms,
-        )
-        gemini_file = await upload_video_to_gemini(clip_path, gemini_client)
+        gemini_file = await gemini_file_upload
         gemini_file_name = gemini_file.name
         logger.info(
             "Generating lecture video manifest chunk. gemini_file=%s "
@@ -2286,6 +2464,7 @@ async def _upload_and_generate_manifest_chunks(
     overlap_ms: int = _MANIFEST_CHUNK_OVERLAP_MS,
     previous_summary_checkpoint: schemas.LectureVideoManifestSummaryCheckpointV4
     | None = None,
+    gemini_file_upload: Awaitable[GeminiFileRef] | None = None,
 ) -> list[schemas.LectureVideoManifestV4]:
     try:
         return [
@@ -2300,6 +2479,7 @@ async def _upload_and_generate_manifest_chunks(
                 model=model,
                 video_description_window_ms=video_description_window_ms,
                 previous_summary_checkpoint=previous_summary_checkpoint,
+                gemini_file_upload=gemini_file_upload,
             )
         ]
     except Exception as exc:
@@ -2399,28 +2579,50 @@ async def upload_and_generate_manifest(
         video_duration_ms,
         len(chunks),
     )
+    # Each chunk's prompt extends the previous chunk's cumulative summary, so
+    # generation calls stay in timeline order. Clipping, uploading, and Gemini
+    # file processing for the next few chunks run ahead of generation instead.
     chunk_manifests: list[schemas.LectureVideoManifestV4] = []
     current_summary_checkpoint: (
         schemas.LectureVideoManifestSummaryCheckpointV4 | None
     ) = None
-    for chunk in chunks:
-        generated_chunk_manifests = await _upload_and_generate_manifest_chunks(
-            video_path=video_path,
-            gemini_client=gemini_client,
-            generation_prompt_content=generation_prompt_content,
-            transcript=transcript,
-            video_duration_ms=video_duration_ms or chunk.generation_end_ms,
-            chunk=chunk,
-            temp_dir=temp_dir,
-            model=model,
-            video_description_window_ms=video_description_window_ms,
-            overlap_ms=overlap_ms,
-            previous_summary_checkpoint=current_summary_checkpoint,
-        )
-        chunk_manifests.extend(generated_chunk_manifests)
-        current_summary_checkpoint = _latest_summary_checkpoint(
-            generated_chunk_manifests,
-            current_summary_checkpoint,
+    chunk_uploads: dict[int, asyncio.Task[GeminiFileRef]] = {}
+    try:
+        for index, chunk in enumerate(chunks):
+            for upload_index in range(
+                index, min(len(chunks), index + _MANIFEST_CHUNK_UPLOAD_CONCURRENCY)
+            ):
+                if upload_index not in chunk_uploads:
+                    chunk_uploads[upload_index] = asyncio.create_task(
+                        _upload_manifest_chunk_to_gemini(
+                            video_path=video_path,
+                            gemini_client=gemini_client,
+                            chunk=chunks[upload_index],
+                            temp_dir=temp_dir,
+                        )
+                    )
+            generated_chunk_manifests = await _upload_and_generate_manifest_chunks(
+                video_path=video_path,
+                gemini_client=gemini_client,
+                generation_prompt_content=generation_prompt_content,
+                transcript=transcript,
+                video_duration_ms=video_duration_ms or chunk.generation_end_ms,
+                chunk=chunk,
+                temp_dir=temp_dir,
+                model=model,
+                video_description_window_ms=video_description_window_ms,
+                overlap_ms=overlap_ms,
+                previous_summary_checkpoint=current_summary_checkpoint,
+                gemini_file_upload=chunk_uploads.pop(index),
+            )
+            chunk_manifests.extend(generated_chunk_manifests)
+            current_summary_checkpoint = _latest_summary_checkpoint(
+                generated_chunk_manifests,
+                current_summary_checkpoint,
+            )
+    finally:
+        await _discard_manifest_chunk_uploads(
+            list(chunk_uploads.values()), gemini_client
         )
     return await _merge_chunk_manifests(
         gemini_client=gemini_client,
@@ -106,5 +106,7 @@ LTI_ADMIN_ROLES = {
 CLIENT_ASSERTION_EXPIRY_SECONDS = 60 * 5
 NRPS_ACCESS_TOKEN_REFRESH_BUFFER_SECONDS = 60
 NRPS_ACCESS_TOKEN_FALLBACK_TTL_SECONDS = 60
+NRPS_PAGE_MAX_ATTEMPTS = 4
+NRPS_PAGE_MAX_RETRY_DELAY_SECONDS = 30
 COURSE_BRIDGE_SYNC_WAIT_DEFAULT_SECONDS = 60 * 10
 MAX_LTI_REDIRECTS = 5
@@ -1,6 +1,8 @@
+import asyncio
 import json
 import logging
-from collections.abc import AsyncIterator
+from collections.abc import AsyncGenerator, Callable
+from contextlib import aclosing
 from datetime import datetime, timedelta
 from functools import partial
 from typing import cast
@@ -10,6 +12,7 @@ import aiohttp
 from fastapi import BackgroundTasks
 import jwt
 import uuid_utils as uuid
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from pingpong.authz.openfga import OpenFgaAuthzClient
@@ -36,6 +39,8 @@ from pingpong.lti.constants import (
     NRPS_MEMBERSHIP_CONTAINER_CONTENT_TYPE,
     NRPS_MEMBERS_KEY,
     NRPS_NEXT_PAGE_KEY,
+    NRPS_PAGE_MAX_ATTEMPTS,
+    NRPS_PAGE_MAX_RETRY_DELAY_SECONDS,
     NRPS_RESOURCE_LINK_QUERY_KEY,
     TOKEN_ENDPOINT_KEY,
     TOKEN_REQUEST_CONTENT_TYPE,
@@ -57,6 +62,15 @@ from pingpong.models import (
     LTIRegistration,
 )
 from pingpong.now import NowFn, utcnow
+from pingpong.paging import prefetch_pages, shared_connector
+from pingpong.retry import RETRYABLE_STATUSES, retry_delay
+from pingpong.roster_sync import (
+    ROSTER_SYNC_CLASS_TIMEOUT_SECONDS,
+    ROSTER_SYNC_CONCURRENCY,
+    HostRateLimiter,
+    RosterSyncSummary,
+    run_roster_syncs,
+)
 from pingpong.schemas import (
     ClassUserRoles,
     CourseBridgeAccessToken,
@@ -68,6 +82,7 @@ from pingpong.schemas import (
 )
 from pingpong.state_types import StateRequest
 from pingpong.time import convert_seconds
+from pingpong.roster_diff import roster_source, sync_roster_diff
 from pingpong.users import AddNewUsersManual, AddNewUsersScript
 
 logger = logging.getLogger(__name__)
@@ -159,10 +174,12 @@ class CourseBridgeClient:
         lti_class_id: int,
         key_manager: LTIKeyManager | None = None,
         nowfn: NowFn = utcnow,
+        rate_limiter: HostRateLimiter | None = None,
     ):
         self.db = db
         self.lti_class_id = lti_class_id
         self.nowfn = nowfn
+        self.rate_limiter = rate_limiter
         if key_manager is None:
             if config.lti is None:
                 raise CourseBridgeGlobalException(
@@ -176,8 +193,13 @@ class CourseBridgeClient:
         self._cached_nrps_access_token_valid_until: int | None = None
 
     async def __aenter__(self):
+        trace_configs = [create_lti_redirect_trace_config()]
+        if self.rate_limiter is not None:
+            trace_configs.append(self.rate_limiter.trace_config())
         self.http_session = aiohttp.ClientSession(
-            trace_configs=[create_lti_redirect_trace_config()]
+            connector=shared_connector(),
+            connector_owner=False,
+            trace_configs=trace_configs,
         )
         return self
 
@@ -321,6 +343,7 @@ class CourseBridgeClient:
     async def _make_authed_nrps_get(
         self,
         url: str,
+        access_token: str | None = None,
     ) -> tuple[dict[str, object], str | None]:
         http_session = self._require_http_session()
         security_settings = _require_lti_security()
@@ -334,66 +357,96 @@ class CourseBridgeClient:
             raise CourseBridgeException(
                 detail=f"Invalid NRPS URL: {e!s}",
             ) from e
-        access_token = await self.get_short_lived_auth_token()
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": NRPS_MEMBERSHIP_CONTAINER_CONTENT_TYPE,
-        }
-        try:
-            async with request_with_validated_redirects(
-                session=http_session,
-                method="GET",
-                url=generated_url,
-                validate_redirect_url=partial(
-                    generate_names_and_role_api_url, validation_mode="redirect"
-                ),
-                redirects_allowed=redirects_allowed,
-                headers=headers,
-            ) as response:
-                response_payload: object = None
-                try:
-                    response_payload = await response.json(content_type=None)
-                except (
-                    json.JSONDecodeError,
-                    ValueError,
-                    aiohttp.ContentTypeError,
-                ) as e:
-                    logger.warning(
-                        "Failed to parse NRPS response payload as JSON: %s", e
-                    )
-                    response_payload = None
-
-                if response.status >= 400:
-                    detail = _extract_error_detail(response_payload)
-                    if not detail:
-                        detail = (await response.text()).strip()
-                    raise CourseBridgeException(
-                        detail=detail or "Failed to fetch NRPS page",
-                    )
+        # Rate limits and brief outages of the platform are retried with
+        # backoff, honoring Retry-After; other errors fail the page at once.
+        for attempt in range(1, NRPS_PAGE_MAX_ATTEMPTS + 1):
+            token = access_token or await self.get_short_lived_auth_token()
+            headers = {
+                "Authorization": f"Bearer {token}",
+                "Accept": NRPS_MEMBERSHIP_CONTAINER_CONTENT_TYPE,
+            }
+            retry_after: str | None = None
+            try:
+                async with request_with_validated_redirects(
+                    session=http_session,
+                    method="GET",
+                    url=generated_url,
+                    validate_redirect_url=partial(
+                        generate_names_and_role_api_url, validation_mode="redirect"
+                    ),
+                    redirects_allowed=redirects_allowed,
+                    headers=headers,
+                ) as response:
+                    if (
+                        response.status in RETRYABLE_STATUSES
+                        and attempt < NRPS_PAGE_MAX_ATTEMPTS
+                    ):
+                        retry_after = response.headers.get("Retry-After")
+                        logger.warning(
+                            "NRPS page request for lti_class_id=%s returned %s; "
+                            "retrying (attempt %s of %s)",
+                            self.lti_class_id,
+                            response.status,
+                            attempt,
+                            NRPS_PAGE_MAX_ATTEMPTS,
+                        )
+                    else:
+                        return await self._parse_nrps_page(response)
+            except ValueError as e:
+                raise CourseBridgeException(detail=f"Invalid NRPS URL: {e!s}") from e
+            except aiohttp.TooManyRedirects as e:
+                raise CourseBridgeException(
+                    detail="Too many redirects for NRPS endpoint",
+                ) from e
+            await asyncio.sleep(
+                retry_delay(
+                    attempt,
+                    retry_after,
+                    max_delay=NRPS_PAGE_MAX_RETRY_DELAY_SECONDS,
+                )
+            )
+        raise RuntimeError("NRPS retry loop exited without returning")
 
-                response_payload_dict = _as_dict(response_payload)
-                if response_payload_dict is None:
-                    raise CourseBridgeException(
-                        detail="Invalid NRPS response payload",
-                    )
+    async def _parse_nrps_page(
+        self, response: aiohttp.ClientResponse
+    ) -> tuple[dict[str, object], str | None]:
+        response_payload: object = None
+        try:
+            response_payload = await response.json(content_type=None)
+        except (
+            json.JSONDecodeError,
+            ValueError,
+            aiohttp.ContentTypeError,
+        ) as e:
+            logger.warning("Failed to parse NRPS response payload as JSON: %s", e)
+            response_payload = None
+
+        if response.status >= 400:
+            detail = _extract_error_detail(response_payload)
+            if not detail:
+                detail = (await response.text()).strip()
+            raise CourseBridgeException(
+                detail=detail or "Failed to fetch NRPS page",
+            )
 
-                next_page_url = self._extract_next_page_url(
-                    response, response_payload_dict
-                )
-                return response_payload_dict, next_page_url
-        except ValueError as e:
-            raise CourseBridgeException(detail=f"Invalid NRPS URL: {e!s}") from e
-        except aiohttp.TooManyRedirects as e:
+        response_payload_dict = _as_dict(response_payload)
+        if response_payload_dict is None:
             raise CourseBridgeException(
-                detail="Too many redirects for NRPS endpoint",
-            ) from e
+                detail="Invalid NRPS response payload",
+            )
+
+        next_page_url = self._extract_next_page_url(response, response_payload_dict)
+        return response_payload_dict, next_page_url
 
     async def _request_all_nrps_pages(
         self, start_url: str
-    ) -> AsyncIterator[dict[str, object]]:
-        next_page: str | None = start_url
+    ) -> AsyncGenerator[dict[str, object], None]:
         seen_pages: set[str] = set()
-        while next_page:
+        # Pages are fetched in a background task, which must not share the
+        # caller's DB session, so the token is looked up once before paging.
+        access_token = await self.get_short_lived_auth_token()
+
+        async def _fetch_page(next_page: str) -> tuple[dict[str, object], str | None]:
             try:
                 normalized_next_page = generate_names_and_role_api_url(next_page)
             except ValueError as e:
@@ -411,10 +464,12 @@ class CourseBridgeClient:
                     detail="NRPS pagination loop detected while fetching memberships",
                 )
             seen_pages.add(normalized_next_page)
-            response_payload, next_page = await self._make_authed_nrps_get(
-                normalized_next_page
-            )
-            yield response_payload
+            return await self._make_authed_nrps_get(normalized_next_page, access_token)
+
+        # The next page is requested while the caller processes this one.
+        async with aclosing(prefetch_pages(_fetch_page, start_url)) as pages:
+            async for page in pages:
+                yield page
 
     @staticmethod
     def _get_member_roles(roles: object) -> ClassUserRoles | None:
@@ -563,42 +618,46 @@ class CourseBridgeClient:
 
         unique_users: dict[str, CreateUserClassRole] = {}
         sso_provider_ids: set[int] = set()
-        async for response_payload in self._request_all_nrps_pages(memberships_url):
-            members = response_payload.get(NRPS_MEMBERS_KEY, [])
-            if members is None:
-                members = []
-            if not isinstance(members, list):
-                raise CourseBridgeException(detail="NRPS response has invalid members")
-
-            for member in members:
-                member_dict = _as_dict(member)
-                if member_dict is None:
-                    continue
-                member_sso_provider_id, member_sso_value = self._extract_member_sso(
-                    member_dict
-                )
-                user_role = self._member_dict_to_create_user_class_role(
-                    member_dict, member_sso_value
-                )
-                if user_role is None:
-                    continue
-                if member_sso_provider_id is not None:
-                    sso_provider_ids.add(member_sso_provider_id)
-
-                key = user_role.email.lower()
-                existing = unique_users.get(key)
-                if existing is None:
-                    unique_users[key] = user_role
-                    continue
-
-                existing_priority = self._role_priority(existing.roles)
-                current_priority = self._role_priority(user_role.roles)
-                if current_priority > existing_priority:
-                    unique_users[key] = user_role
-                elif (
-                    current_priority == existing_priority and not existing.display_name
-                ):
-                    unique_users[key] = user_role
+        async with aclosing(self._request_all_nrps_pages(memberships_url)) as pages:
+            async for response_payload in pages:
+                members = response_payload.get(NRPS_MEMBERS_KEY, [])
+                if members is None:
+                    members = []
+                if not isinstance(members, list):
+                    raise CourseBridgeException(
+                        detail="NRPS response has invalid members"
+                    )
+
+                for member in members:
+                    member_dict = _as_dict(member)
+                    if member_dict is None:
+                        continue
+                    member_sso_provider_id, member_sso_value = self._extract_member_sso(
+                        member_dict
+                    )
+                    user_role = self._member_dict_to_create_user_class_role(
+                        member_dict, member_sso_value
+                    )
+                    if user_role is None:
+                        continue
+                    if member_sso_provider_id is not None:
+                        sso_provider_ids.add(member_sso_provider_id)
+
+                    key = user_role.email.lower()
+                    existing = unique_users.get(key)
+                    if existing is None:
+                        unique_users[key] = user_role
+                        continue
+
+                    existing_priority = self._role_priority(existing.roles)
+                    current_priority = self._role_priority(user_role.roles)
+                    if current_priority > existing_priority:
+                        unique_users[key] = user_role
+                    elif (
+                        current_priority == existing_priority
+                        and not existing.display_name
+                    ):
+                        unique_users[key] = user_role
 
         sso_tenant = None
         if sso_provider_ids:
@@ -879,13 +938,25 @@ class ManualCourseBridgeClient(CourseBridgeClient):
         setup_user_id: int,
         new_ucr: CreateUserClassRoles,
     ) -> CreateUserResults:
-        return await AddNewUsersManual(
-            str(class_id),
+        # Manual syncs always reconcile the full roster.
+        results, _ = await sync_roster_diff(
+            self.db,
+            class_id,
+            setup_user_id,
             new_ucr,
-            self.request,
-            self.tasks,
-            user_id=setup_user_id,
-        ).add_new_users()
+            roster_source(new_ucr),
+            lambda roles, removed_user_ids: AddNewUsersManual(
+                str(class_id),
+                roles,
+                self.request,
+                self.tasks,
+                user_id=setup_user_id,
+                removed_user_ids=removed_user_ids,
+            ),
+            now=self.nowfn(),
+            full_reconcile=True,
+        )
+        return results
 
     def _raise_sync_error_if_manual(self) -> None:
         raise CourseBridgeException(
@@ -901,12 +972,14 @@ class ScriptCourseBridgeClient(CourseBridgeClient):
         lti_class_id: int,
         key_manager: LTIKeyManager | None = None,
         nowfn: NowFn = utcnow,
+        rate_limiter: HostRateLimiter | None = None,
     ):
         super().__init__(
             db=db,
             lti_class_id=lti_class_id,
             key_manager=key_manager,
             nowfn=nowfn,
+            rate_limiter=rate_limiter,
         )
         self.client = client
 
@@ -920,47 +993,84 @@ class ScriptCourseBridgeClient(CourseBridgeClient):
         setup_user_id: int,
         new_ucr: CreateUserClassRoles,
     ) -> CreateUserResults:
-        return await AddNewUsersScript(
-            class_id=str(class_id),
-            user_id=setup_user_id,
-            session=self.db,
-            client=self.client,
-            new_ucr=new_ucr,
-        ).add_new_users()
+        results, _ = await sync_roster_diff(
+            self.db,
+            class_id,
+            setup_user_id,
+            new_ucr,
+            roster_source(new_ucr),
+            lambda roles, removed_user_ids: AddNewUsersScript(
+                class_id=str(class_id),
+                user_id=setup_user_id,
+                session=self.db,
+                client=self.client,
+                new_ucr=roles,
+                removed_user_ids=removed_user_ids,
+            ),
+            now=self.nowfn(),
+        )
+        return results
 
     def _raise_sync_error_if_manual(self) -> None:
         return None
 
 
 async def course_bridge_sync_all(
-    session: AsyncSession,
+    session_factory: Callable[[], AsyncSession],
     authz_client: OpenFgaAuthzClient,
     sync_classes_with_error_status: bool = False,
-) -> None:
-    async for lti_class in LTIClass.get_all_to_sync(
-        session, sync_classes_with_error_status=sync_classes_with_error_status
-    ):
-        logger.info(f"Syncing LTI class {lti_class.id}...")
-        async with session.begin_nested() as savepoint:
-            try:
-                async with ScriptCourseBridgeClient(
-                    db=session,
-                    client=authz_client,
-                    lti_class_id=lti_class.id,
-                ) as client:
-                    await client.sync_roster()
-            except Exception as e:
-                logger.exception(f"Error syncing LTI class {lti_class.id}: {e}")
-                await savepoint.rollback()
-
-                if isinstance(e, CourseBridgeGlobalException):
-                    continue
-
-                # sync_roster() already marks the class as errored, but that write is part
-                # of the rolled-back savepoint above. Re-apply the error marker outside the
-                # savepoint so the class retains an actionable failure state.
-                lti_class.lti_status = LTIStatus.ERROR
-                lti_class.last_sync_error = exception_detail(e)
-                session.add(lti_class)
-
-    await session.commit()
+    concurrency: int = ROSTER_SYNC_CONCURRENCY,
+    class_timeout: float = ROSTER_SYNC_CLASS_TIMEOUT_SECONDS,
+    rate_limiter: HostRateLimiter | None = None,
+) -> RosterSyncSummary:
+    """Sync every linked LTI class, each in its own session."""
+    async with session_factory() as session:
+        lti_class_ids = [
+            lti_class.id
+            async for lti_class in LTIClass.get_all_to_sync(
+                session, sync_classes_with_error_status=sync_classes_with_error_status
+            )
+        ]
+    rate_limiter = rate_limiter or HostRateLimiter()
+
+    async def _sync_class(lti_class_id: int) -> None:
+        async with session_factory() as session:
+            async with ScriptCourseBridgeClient(
+                db=session,
+                client=authz_client,
+                lti_class_id=lti_class_id,
+                rate_limiter=rate_limiter,
+            ) as client:
+                await client.sync_roster()
+            await session.commit()
+
+    async def _mark_sync_error(lti_class_id: int, e: BaseException) -> None:
+        if isinstance(e, CourseBridgeGlobalException):
+            return
+        # sync_roster() already marks the class as errored, but that write was
+        # rolled back with the rest of the class's transaction. Re-apply the
+        # error marker so the class retains an actionable failure state.
+        async with session_factory() as session:
+            lti_class = await LTIClass.get_by_id(session, lti_class_id)
+            if lti_class is None:
+                return
+            lti_class.lti_status = LTIStatus.ERROR
+            lti_class.last_sync_error = (
+                f"Sync timed out after {class_timeout:g} seconds"
+                if isinstance(e, TimeoutError)
+                else exception_detail(e)
+            )
+            session.add(lti_class)
+            await session.commit()
+
+    summary = await run_roster_syncs(
+        lti_class_ids,
+        _sync_class,
+        concurrency=concurrency,
+        class_timeout=class_timeout,
+        warning_exceptions=(CourseBridgeWarning,),
+        retry_exceptions=(IntegrityError, OperationalError),
+        on_failure=_mark_sync_error,
+    )
+    summary.log("CourseBridge")
+    return summary
@@ -1,12 +1,15 @@
 """LTI key management with AWS Secrets Manager and local file support."""
 
+import asyncio
 import json
 import logging
+import time
 import uuid_utils as uuid
 import os
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Any
+from dataclasses import dataclass, field, replace
+from functools import cached_property
 from abc import ABC, abstractmethod
 
 import aioboto3
@@ -24,6 +27,13 @@ import base64
 
 logger = logging.getLogger(__name__)
 
+# How long a loaded key set is used before the key store is read again. Keys
+# are usually rotated by the CLI in another process, so this bounds how long
+# this process keeps signing with (and publishing) the previous set.
+LTI_KEY_CACHE_TTL_SECONDS = 300
+# A lookup for an unknown kid reloads the key store at most this often.
+LTI_KEY_MISS_REFRESH_INTERVAL_SECONDS = 30
+
 
 class LTIKeyStoreError(Exception):
     """Exception raised for LTI key store errors."""
@@ -90,6 +100,46 @@ class LTIKeyPair:
         )
 
 
+@dataclass(frozen=True)
+class LTIKeySet:
+    """An immutable snapshot of the key store with lookups precomputed."""
+
+    version: int
+    keys: tuple[LTIKeyPair, ...]
+    loaded_at: float
+    by_kid: Dict[str, LTIKeyPair] = field(repr=False)
+
+    @classmethod
+    def build(
+        cls, version: int, keys: List[LTIKeyPair], loaded_at: float
+    ) -> "LTIKeySet":
+        return cls(
+            version=version,
+            keys=tuple(keys),
+            loaded_at=loaded_at,
+            by_kid={key.kid: key for key in keys},
+        )
+
+    @cached_property
+    def jwks(self) -> Dict[str, Any]:
+        """The public JWKS document, built once per key set."""
+        return {"keys": [key.to_jwk() for key in self.keys]}
+
+    def renewed(self, loaded_at: float) -> "LTIKeySet":
+        """The same key set (and JWKS) with a new load time."""
+        key_set = replace(self, loaded_at=loaded_at)
+        if "jwks" in self.__dict__:
+            key_set.__dict__["jwks"] = self.jwks
+        return key_set
+
+    @property
+    def current(self) -> Optional[LTIKeyPair]:
+        return self.keys[0] if self.keys else None
+
+    def same_keys(self, keys: List[LTIKeyPair]) -> bool:
+        return [key.to_dict() for key in self.keys] == [key.to_dict() for key in keys]
+
+
 class BaseLTIKeyStore(ABC):
     """Abstract base class for LTI key storage."""
 
@@ -223,10 +273,85 @@ class LocalLTIKeyStore(BaseLTIKeyStore):
 
 
 class LTIKeyManager:
-    """Manages LTI RSA key pairs with configurable storage backend."""
-
-    def __init__(self, key_store: BaseLTIKeyStore):
+    """Manages LTI RSA key pairs with configurable storage backend.
+
+    Keys are held in memory as a versioned `LTIKeySet` and reread from the key
+    store after `cache_ttl` seconds, or right away when this manager rotates
+    keys. Concurrent reloads share a single key store read.
+    """
+
+    def __init__(
+        self,
+        key_store: BaseLTIKeyStore,
+        cache_ttl: float = LTI_KEY_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
         self.key_store = key_store
+        self.cache_ttl = cache_ttl
+        self._clock = clock
+        self._key_set: Optional[LTIKeySet] = None
+        self._expires_at = 0.0
+        self._reload: Optional[asyncio.Task[LTIKeySet]] = None
+
+    async def get_key_set(self, force_refresh: bool = False) -> LTIKeySet:
+        """Get the cached key set, reloading it from the key store if stale."""
+        if (
+            self._key_set is not None
+            and not force_refresh
+            and self._clock() < self._expires_at
+        ):
+            return self._key_set
+
+        reload = self._reload
+        if reload is None or reload.get_loop() is not asyncio.get_running_loop():
+            reload = asyncio.create_task(self._load_key_set())
+            self._reload = reload
+            reload.add_done_callback(self._finish_reload)
+        return await asyncio.shield(reload)
+
+    def _finish_reload(self, task: asyncio.Task) -> None:
+        if self._reload is task:
+            self._reload = None
+        if not task.cancelled():
+            task.exception()
+
+    async def _load_key_set(self) -> LTIKeySet:
+        try:
+            keys = await self.key_store.load_keys()
+        except LTIKeyStoreError:
+            if self._key_set is None:
+                raise
+            # Keep serving the keys we have rather than failing every launch.
+            logger.warning(
+                "Error reloading LTI keys; keeping key set version %s",
+                self._key_set.version,
+                exc_info=True,
+            )
+            now = self._clock()
+            self._key_set = self._key_set.renewed(now)
+            self._expires_at = now + min(
+                self.cache_ttl, LTI_KEY_MISS_REFRESH_INTERVAL_SECONDS
+            )
+            return self._key_set
+        return self._install_key_set(keys)
+
+    def _install_key_set(self, keys: List[LTIKeyPair]) -> LTIKeySet:
+        now = self._clock()
+        current = self._key_set
+        if current is not None and current.same_keys(keys):
+            key_set = current.renewed(now)
+        else:
+            key_set = LTIKeySet.build(
+                (current.version + 1) if current is not None else 1, keys, now
+            )
+            logger.info(
+                "Loaded LTI key set version %s with %s keys",
+                key_set.version,
+                len(key_set.keys),
+            )
+        self._key_set = key_set
+        self._expires_at = now + self.cache_ttl
+        return key_set
 
     def _generate_key_pair(self, key_size: int = 2048) -> LTIKeyPair:
         """Generate a new RSA key pair."""
@@ -264,7 +389,8 @@ class LTIKeyManager:
         """Generate a new key pair and manage rotation."""
         logger.info("Starting key rotation...")
 
-        # Load existing keys
+        # Load existing keys from the store, not the cache, so keys written by
+        # another process since our last reload are not dropped.
         existing_keys = await self.key_store.load_keys()
 
         # Generate new key
@@ -284,28 +410,32 @@ class LTIKeyManager:
 
         # Save updated keys
         await self.key_store.save_keys(updated_keys)
+        self._install_key_set(updated_keys)
 
         logger.info(f"Key rotation completed. Total keys: {len(updated_keys)}")
         return new_key
 
     async def get_current_key(self) -> Optional[LTIKeyPair]:
         """Get the current (newest) key for signing."""
-        keys = await self.key_store.load_keys()
-        return keys[0] if keys else None
+        return (await self.get_key_set()).current
 
     async def get_key_by_kid(self, kid: str) -> Optional[LTIKeyPair]:
         """Get a specific key by its ID."""
-        keys = await self.key_store.load_keys()
-        for key in keys:
-            if key.kid == kid:
-                return key
-        return None
+        key_set = await self.get_key_set()
+        key = key_set.by_kid.get(kid)
+        if (
+            key is None
+            and self._clock() - key_set.loaded_at
+            >= LTI_KEY_MISS_REFRESH_INTERVAL_SECONDS
+        ):
+            # The key may have been added by a rotation in another process.
+            key = (await self.get_key_set(force_refresh=True)).by_kid.get(kid)
+        return key
 
     async def get_public_keys_jwks(self) -> Dict[str, Any]:
         """Get all public keys in JWKS format."""
-        keys = await self.key_store.load_keys()
-
-        return {"keys": [key.to_jwk() for key in keys]}
+        key_set = await self.get_key_set()
+        return {"keys": list(key_set.jwks["keys"])}
 
     async def sign_jwt(self, payload: Dict[str, Any], kid: Optional[str] = None) -> str:
         """Sign a JWT using the specified key or current key."""
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable, Mapping
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Protocol
+
+logger = logging.getLogger(__name__)
+
+RemoteDocumentFetch = Callable[[], Awaitable[tuple[dict[str, Any], float | None]]]
+
+
+class RemoteCacheSettings(Protocol):
+    min_ttl: int
+    max_ttl: int
+    default_ttl: int
+    max_stale: int
+    refresh_interval: int
+    max_entries: int
+
+
+def cache_ttl_from_headers(
+    headers: Mapping[str, str], now: datetime | None = None
+) -> float | None:
+    """Returns the freshness lifetime in seconds that the response headers allow.
+
+    `Cache-Control: max-age` wins over `Expires`. `no-store`/`no-cache` and
+    unparseable `Expires` values mean the document is already stale. Returns
+    None if the response does not say how long it can be cached.
+    """
+    cache_control = headers.get("Cache-Control") or headers.get("cache-control")
+    if cache_control:
+        max_age: float | None = None
+        for directive in cache_control.split(","):
+            name, _, value = directive.strip().partition("=")
+            name = name.lower()
+            if name in ("no-store", "no-cache"):
+                return 0.0
+            if name == "max-age":
+                try:
+                    max_age = float(value.strip().strip('"'))
+                except ValueError:
+                    return 0.0
+        if max_age is not None:
+            try:
+                age = float(headers.get("Age") or headers.get("age") or 0)
+            except ValueError:
+                age = 0.0
+            return max(0.0, max_age - age)
+
+    expires = headers.get("Expires") or headers.get("expires")
+    if expires:
+        try:
+            expires_at = parsedate_to_datetime(expires)
+        except (TypeError, ValueError):
+            return 0.0
+        date = headers.get("Date") or headers.get("date")
+        response_date: datetime | None = None
+        if date:
+            try:
+                response_date = parsedate_to_datetime(date)
+            except (TypeError, ValueError):
+                response_date = None
+        if response_date is None:
+            response_date = now or datetime.now(timezone.utc)
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if response_date.tzinfo is None:
+            response_date = response_date.replace(tzinfo=timezone.utc)
+        return max(0.0, (expires_at - response_date).total_seconds())
+
+    return None
+
+
+@dataclass
+class _CachedDocument:
+    value: dict[str, Any]
+    fetched_at: float
+    expires_at: float
+    stale_until: float
+
+
+class RemoteDocumentCache:
+    """In-process cache for JSON documents fetched from LTI platforms.
+
+    - Freshness follows the response's Cache-Control/Expires, clamped to the
+      configured floor and ceiling (`default_ttl` when the headers are silent).
+    - Concurrent misses for the same key share one fetch.
+    - `force_refresh` refetches at most once per `refresh_interval`, so a
+      flood of requests (e.g. JWTs with unknown key ids) cannot turn into a
+      flood of upstream fetches.
+    - If a refresh fails, the last good document is served for up to
+      `max_stale` seconds past its expiry, retrying at most once per
+      `min_ttl`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        settings: Callable[[], RemoteCacheSettings],
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self._settings = settings
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, _CachedDocument] = OrderedDict()
+        self._in_flight: dict[Hashable, asyncio.Task[dict[str, Any]]] = {}
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._in_flight.clear()
+
+    async def get(
+        self,
+        key: Hashable,
+        fetch: RemoteDocumentFetch,
+        *,
+        force_refresh: bool = False,
+    ) -> dict[str, Any]:
+        settings = self._settings()
+        now = self._clock()
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            can_refresh = now - entry.fetched_at >= settings.refresh_interval
+            if now < entry.expires_at and not (force_refresh and can_refresh):
+                return entry.value
+            if force_refresh and not can_refresh:
+                return entry.value
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._refresh(key, fetch))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish_refresh(key, done))
+        return await asyncio.shield(task)
+
+    def _finish_refresh(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Waiters may all have been cancelled; don't leave the error unretrieved.
+        if not task.cancelled():
+            task.exception()
+
+    async def _refresh(self, key: Hashable, fetch: RemoteDocumentFetch) -> dict:
+        settings = self._settings()
+        try:
+            value, header_ttl = await fetch()
+        except Exception:
+            now = self._clock()
+            entry = self._entries.get(key)
+            if entry is None or now > entry.stale_until:
+                raise
+            entry.expires_at = min(now + settings.min_ttl, entry.stale_until)
+            logger.warning(
+                "Serving stale %s after refresh failed. key=%s age_seconds=%.0f",
+                self.name,
+                key,
+                now - entry.fetched_at,
+                exc_info=True,
+            )
+            return entry.value
+
+        now = self._clock()
+        ttl = settings.default_ttl if header_ttl is None else header_ttl
+        ttl = min(max(ttl, settings.min_ttl), settings.max_ttl)
+        self._entries[key] = _CachedDocument(
+            value=value,
+            fetched_at=now,
+            expires_at=now + ttl,
+            stale_until=now + ttl + settings.max_stale,
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > settings.max_entries:
+            self._entries.popitem(last=False)
+        return value
@@ -2,6 +2,7 @@
 
 import asyncio
 from functools import partial
+import hashlib
 import json
 import logging
 from datetime import datetime, timedelta
@@ -16,7 +17,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from pingpong.animal_hash import name as user_display_name
 from pingpong.auth import encode_session_token
 from pingpong.authz.openfga import OpenFgaAuthzClient
-from pingpong.config import config
+from pingpong.config import LTIRemoteCacheSettings, config
+from pingpong.email_outbox import outbound_email_sender
 from pingpong.invite import send_lti_registration_submitted
 from pingpong.log_utils import sanitize_for_log
 from pingpong.lti.claims import get_claim_object as _get_claim_object
@@ -75,6 +77,7 @@ from pingpong.lti.http import (
     request_with_validated_redirects,
 )
 from pingpong.lti.platforms import get_handler
+from pingpong.lti.remote_cache import RemoteDocumentCache, cache_ttl_from_headers
 from pingpong.lti.roles import (
     is_admin as is_lti_admin,
     is_instructor as is_lti_instructor,
@@ -231,12 +234,37 @@ def _require_non_empty_string(value: object, detail: str) -> str:
     return value
 
 
-async def _fetch_jwks(jwks_url: str) -> dict[str, Any]:
-    timeout = aiohttp.ClientTimeout(total=10)
+def _remote_cache_settings() -> LTIRemoteCacheSettings:
+    return getattr(config.lti, "remote_cache", None) or LTIRemoteCacheSettings()
+
+
+_jwks_cache = RemoteDocumentCache("JWKS", _remote_cache_settings)
+_openid_configuration_cache = RemoteDocumentCache(
+    "OpenID configuration", _remote_cache_settings
+)
+
+
+async def _fetch_jwks(jwks_url: str, *, force_refresh: bool = False) -> dict[str, Any]:
+    """Returns the platform's JWKS, cached per the response's caching headers.
+
+    `force_refresh` bypasses a fresh cache entry (rate limited), for when a
+    token names a key the cached JWKS does not have yet.
+    """
     try:
         generated_jwks_url = generate_jwks_uri_url(jwks_url)
     except ValueError as e:
         raise HTTPException(status_code=400, detail="Invalid jwks_url") from e
+    return await _jwks_cache.get(
+        generated_jwks_url,
+        partial(_download_jwks, generated_jwks_url),
+        force_refresh=force_refresh,
+    )
+
+
+async def _download_jwks(
+    generated_jwks_url: str,
+) -> tuple[dict[str, Any], float | None]:
+    timeout = aiohttp.ClientTimeout(total=10)
     redirects_allowed = (
         allow_redirects(config.lti.security.jwks_uri) if config.lti else True
     )
@@ -264,7 +292,9 @@ async def _fetch_jwks(jwks_url: str) -> dict[str, Any]:
                     ) from e
                 if not isinstance(payload, dict):
                     raise HTTPException(status_code=500, detail="Invalid JWKS response")
-                return cast(dict[str, Any], payload)
+                return cast(dict[str, Any], payload), cache_ttl_from_headers(
+                    response.headers
+                )
         except ValueError as e:
             raise HTTPException(status_code=400, detail="Invalid jwks_url") from e
         except aiohttp.TooManyRedirects as e:
@@ -291,7 +321,10 @@ async def _fetch_jwks(jwks_url: str) -> dict[str, Any]:
 async def _fetch_openid_configuration(
     openid_configuration_url: str, headers: dict[str, str]
 ) -> dict[str, Any]:
-    timeout = aiohttp.ClientTimeout(total=10)
+    """Returns the platform's OpenID configuration, cached per the response's
+    caching headers. Entries are keyed on the request headers too, since they
+    carry the registration token.
+    """
     try:
         generated_openid_configuration_url = generate_openid_configuration_url(
             openid_configuration_url
@@ -300,7 +333,23 @@ async def _fetch_openid_configuration(
         raise HTTPException(
             status_code=400, detail="Invalid openid_configuration"
         ) from e
+    headers_digest = hashlib.sha256(
+        json.dumps(sorted(headers.items())).encode()
+    ).hexdigest()
+    return await _openid_configuration_cache.get(
+        (generated_openid_configuration_url, headers_digest),
+        partial(
+            _download_openid_configuration,
+            generated_openid_configuration_url,
+            headers,
+        ),
+    )
+
 
+async def _download_openid_configuration(
+    generated_openid_configuration_url: str, headers: dict[str, str]
+) -> tuple[dict[str, Any], float | None]:
+    timeout = aiohttp.ClientTimeout(total=10)
     redirects_allowed = (
         allow_redirects(config.lti.security.openid_configuration)
         if config.lti
@@ -334,7 +383,9 @@ async def _fetch_openid_configuration(
                         status_code=500,
                         detail="Invalid OpenID configuration response payload",
                     )
-                return cast(dict[str, Any], payload)
+                return cast(dict[str, Any], payload), cache_ttl_from_headers(
+                    response.headers
+                )
         except ValueError as e:
             raise HTTPException(
                 status_code=400, detail="Invalid openid_configuration"
@@ -391,6 +442,13 @@ async def _resolve_platform(
     return LMSPlatform(product_family_code), response_data
 
 
+def _jwks_has_kid(jwks: dict[str, Any], kid: str) -> bool:
+    keys = jwks.get("keys")
+    return isinstance(keys, list) and any(
+        isinstance(key, dict) and key.get("kid") == kid for key in keys
+    )
+
+
 def _select_jwk(jwks: dict[str, Any], kid: str | None) -> dict[str, Any]:
     keys = jwks.get("keys")
     if not isinstance(keys, list) or not keys:
@@ -435,6 +493,9 @@ async def _verify_lti_id_token(
         raise HTTPException(status_code=400, detail="Invalid id_token kid")
 
     jwks = await _fetch_jwks(jwks_url)
+    if kid and not _jwks_has_kid(jwks, kid):
+        # The platform may have rotated keys since the JWKS was cached.
+        jwks = await _fetch_jwks(jwks_url, force_refresh=True)
     jwk = _select_jwk(jwks, kid)
     try:
         public_key = jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(jwk))
@@ -773,7 +834,7 @@ async def register_lti_instance(request: StateRequest, data: LTIRegisterRequest)
 
     try:
         await send_lti_registration_submitted(
-            config.email.sender,
+            outbound_email_sender(),
             admin_email=data.admin_email,
             admin_name=data.admin_name,
             integration_name=data.name,
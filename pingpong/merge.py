@@ -1,7 +1,21 @@
 import asyncio
 import json
+import uuid
+from collections import Counter
+from collections.abc import Sequence
+from functools import lru_cache
 from typing import AsyncGenerator
-from sqlalchemy import Select, and_, delete, exists, or_, select, text, update
+from sqlalchemy import (
+    Select,
+    Table,
+    and_,
+    case,
+    delete,
+    exists,
+    or_,
+    select,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 
@@ -23,15 +37,68 @@ from pingpong.models import (
     User,
     UserClassRole,
     UserInstitutionRole,
+    UserMergeAudit,
     _get_upsert_stmt,
     user_thread_association,
     user_merge_association,
     File,
 )
+from pingpong.retry import retry_delay
 from pingpong.schemas import MergedUserTuple
 
 logger = logging.getLogger(__name__)
 
+MERGE_BATCH_SIZE = 500
+"""Merges handled by each set-based statement."""
+
+MERGE_AUTHZ_BATCH_SIZE = 200
+"""Tuples per `write_safe` call when moving permissions."""
+
+MERGE_AUTHZ_CONCURRENCY = 4
+"""Permission listings and `write_safe` calls in flight at once."""
+
+MERGE_AUTHZ_WRITE_ATTEMPTS = 3
+
+# Maps an old user id to the user id it is merged into.
+MergeMapping = dict[int, int]
+
+# (audit name, table, user id column) of rows that are simply reassigned.
+_REASSIGNED_USER_COLUMNS = (
+    ("assistants", Assistant, "creator_id"),
+    ("threads", user_thread_association, "user_id"),
+    ("mcp_server_tools_created", MCPServerTool, "created_by_user_id"),
+    ("mcp_server_tools_updated", MCPServerTool, "updated_by_user_id"),
+    ("files", File, "uploader_id"),
+    ("lecture_videos", LectureVideo, "uploader_id"),
+    ("lecture_video_thread_states", LectureVideoThreadState, "controller_user_id"),
+    ("lecture_video_interactions", LectureVideoInteraction, "actor_user_id"),
+    ("lms_classes", Class, "lms_user_id"),
+    ("lti_classes", LTIClass, "setup_user_id"),
+)
+
+# (audit name, model, copied columns, unique columns) of rows that are copied
+# to the new user unless it already has a matching row, then deleted.
+_COPIED_USER_ROWS = (
+    (
+        "classes",
+        UserClassRole,
+        ("class_id", "role", "title", "lms_tenant", "lms_type"),
+        ("user_id", "class_id"),
+    ),
+    (
+        "institutions",
+        UserInstitutionRole,
+        ("institution_id", "role", "title"),
+        ("user_id", "institution_id"),
+    ),
+    (
+        "agreement_acceptances",
+        AgreementAcceptance,
+        ("agreement_id", "policy_id", "accepted_at"),
+        ("user_id", "agreement_id"),
+    ),
+)
+
 
 async def merge(
     session: AsyncSession,
@@ -39,9 +106,144 @@ async def merge(
     new_user_id: int,
     old_user_id: int,
 ) -> "User":
-    await merge_db_operations(session, new_user_id, old_user_id)
-    await merge_permissions(client, new_user_id, old_user_id)
-    return await merge_users(session, new_user_id, old_user_id)
+    _, users = await _merge_many(session, client, [(new_user_id, old_user_id)])
+    return users[new_user_id]
+
+
+async def merge_many(
+    session: AsyncSession,
+    client: OpenFgaAuthzClient,
+    pairs: Sequence[tuple[int, int]],
+) -> list[UserMergeAudit]:
+    """Merges many (new user id, old user id) pairs at once.
+
+    Has the same effect as calling `merge` for each pair in order, but moves
+    the rows of up to `MERGE_BATCH_SIZE` merges with one statement per table
+    and the permissions of all of them with concurrent batched writes. Chains
+    (a user merged into a user that is itself merged) are followed to the
+    final user. Returns the audit record written for each merge.
+    """
+    audits, _ = await _merge_many(session, client, pairs)
+    return audits
+
+
+def _resolve_merge_pairs(pairs: Sequence[tuple[int, int]]) -> MergeMapping:
+    targets: MergeMapping = {}
+    for new_user_id, old_user_id in pairs:
+        if new_user_id == old_user_id:
+            raise ValueError(
+                f"Cannot merge user {sanitize_for_log(old_user_id)} into itself."
+            )
+        if targets.get(old_user_id, new_user_id) != new_user_id:
+            raise ValueError(
+                f"User {sanitize_for_log(old_user_id)} is merged into more than one user."
+            )
+        targets[old_user_id] = new_user_id
+
+    def _final(user_id: int) -> int:
+        seen = {user_id}
+        while user_id in targets:
+            user_id = targets[user_id]
+            if user_id in seen:
+                raise ValueError("User merges form a cycle.")
+            seen.add(user_id)
+        return user_id
+
+    return {old_user_id: _final(old_user_id) for old_user_id in targets}
+
+
+def _merge_batches(mapping: MergeMapping) -> list[MergeMapping]:
+    """Splits merges into batches where every new user appears at most once.
+
+    Merging two users into the same user in one statement could move rows that
+    conflict with each other, so the k-th merge into each user goes into the
+    k-th round, which keeps the outcome of merging one pair at a time.
+    """
+    rounds: list[MergeMapping] = []
+    merges_into: Counter[int] = Counter()
+    for old_user_id, new_user_id in mapping.items():
+        index = merges_into[new_user_id]
+        merges_into[new_user_id] += 1
+        if index == len(rounds):
+            rounds.append({})
+        rounds[index][old_user_id] = new_user_id
+
+    batches: list[MergeMapping] = []
+    for round_ in rounds:
+        items = list(round_.items())
+        for start in range(0, len(items), MERGE_BATCH_SIZE):
+            batches.append(dict(items[start : start + MERGE_BATCH_SIZE]))
+    return batches
+
+
+def _per_old_user(batch: MergeMapping, moved_to: Counter[int]) -> dict[int, int]:
+    # New users are unique within a batch, so the new id identifies the merge.
+    old_user_ids = {
+        new_user_id: old_user_id for old_user_id, new_user_id in batch.items()
+    }
+    return {old_user_ids[new_user_id]: n for new_user_id, n in moved_to.items()}
+
+
+async def _merge_many(
+    session: AsyncSession,
+    client: OpenFgaAuthzClient,
+    pairs: Sequence[tuple[int, int]],
+) -> tuple[list[UserMergeAudit], dict[int, User]]:
+    mapping = _resolve_merge_pairs(pairs)
+    if not mapping:
+        return [], {}
+    batches = _merge_batches(mapping)
+    await _check_new_users_exist(session, mapping)
+
+    rows_moved: dict[int, Counter[str]] = {old: Counter() for old in mapping}
+    for batch in batches:
+        for name, moved_to in (await _merge_db_rows(session, batch)).items():
+            for old_user_id, n in _per_old_user(batch, moved_to).items():
+                rows_moved[old_user_id][name] += n
+
+    tuples_moved = await _merge_permissions(client, mapping)
+
+    users: dict[int, User] = {}
+    for batch in batches:
+        users.update(await _merge_user_rows(session, batch))
+
+    batch_id = str(uuid.uuid4())
+    audits = [
+        UserMergeAudit(
+            batch_id=batch_id,
+            new_user_id=new_user_id,
+            old_user_id=old_user_id,
+            rows_moved=dict(rows_moved[old_user_id]),
+            tuples_moved=tuples_moved.get(old_user_id, 0),
+        )
+        for old_user_id, new_user_id in mapping.items()
+    ]
+    session.add_all(audits)
+    await session.flush()
+    logger.info(
+        "Merged %s users into %s users (batch %s)",
+        len(mapping),
+        len(set(mapping.values())),
+        batch_id,
+    )
+    return audits, users
+
+
+async def _check_new_users_exist(session: AsyncSession, mapping: MergeMapping):
+    new_user_ids = set(mapping.values())
+    found: set[int] = set()
+    ids = sorted(new_user_ids)
+    for start in range(0, len(ids), MERGE_BATCH_SIZE):
+        found.update(
+            await session.scalars(
+                select(User.id).where(
+                    User.id.in_(ids[start : start + MERGE_BATCH_SIZE])
+                )
+            )
+        )
+    missing = new_user_ids - found
+    if missing:
+        raise ValueError(f"New user {sanitize_for_log(min(missing))} not found.")
 
 
 async def merge_db_operations(
@@ -49,21 +251,72 @@ async def merge_db_operations(
     new_user_id: int,
     old_user_id: int,
 ):
-    await merge_classes(session, new_user_id, old_user_id)
-    await merge_institutions(session, new_user_id, old_user_id)
-    await merge_assistants(session, new_user_id, old_user_id)
-    await merge_threads(session, new_user_id, old_user_id)
-    await merge_agreement_acceptances(session, new_user_id, old_user_id)
-    await merge_mcp_created_by(session, new_user_id, old_user_id)
-    await merge_mcp_updated_by(session, new_user_id, old_user_id)
-    await merge_files(session, new_user_id, old_user_id)
-    await merge_lecture_videos(session, new_user_id, old_user_id)
-    await merge_lecture_video_thread_states(session, new_user_id, old_user_id)
-    await merge_lecture_video_interactions(session, new_user_id, old_user_id)
-    await merge_lms_users(session, new_user_id, old_user_id)
-    await merge_lti_users(session, new_user_id, old_user_id)
-    await merge_external_logins(session, new_user_id, old_user_id)
-    await merge_user_files(session, new_user_id, old_user_id)
+    await _merge_db_rows(session, {old_user_id: new_user_id})
+
+
+async def _merge_db_rows(
+    session: AsyncSession, mapping: MergeMapping
+) -> dict[str, Counter[int]]:
+    """Moves the rows of every merge in `mapping` to the new users.
+
+    Returns how many rows of each table moved, by new user id. No new user may
+    appear twice in `mapping` (see `_merge_batches`).
+    """
+    moved: dict[str, Counter[int]] = {}
+    for name, model, columns, unique_columns in _COPIED_USER_ROWS:
+        moved[name] = await _copy_user_rows(
+            session, model, columns, unique_columns, mapping
+        )
+    for name, table, column_name in _REASSIGNED_USER_COLUMNS:
+        moved[name] = await _reassign_user_column(session, table, column_name, mapping)
+    moved["external_logins"] = await _merge_external_logins(session, mapping)
+    return moved
+
+
+def _user_column(table, column_name: str):
+    return (
+        table.c[column_name]
+        if isinstance(table, Table)
+        else getattr(table, column_name)
+    )
+
+
+async def _reassign_user_column(
+    session: AsyncSession, table, column_name: str, mapping: MergeMapping
+) -> Counter[int]:
+    column = _user_column(table, column_name)
+    stmt = (
+        update(table)
+        .where(column.in_(list(mapping)))
+        .values({column_name: case(mapping, value=column)})
+        .returning(column)
+    )
+    return Counter((await session.execute(stmt)).scalars())
+
+
+async def _copy_user_rows(
+    session: AsyncSession,
+    model,
+    columns: Sequence[str],
+    unique_columns: Sequence[str],
+    mapping: MergeMapping,
+) -> Counter[int]:
+    table = model.__table__
+    copy_stmt = (
+        _get_upsert_stmt(session)(table)
+        .from_select(
+            ["user_id", *columns],
+            select(
+                case(mapping, value=table.c.user_id),
+                *(table.c[column] for column in columns),
+            ).where(table.c.user_id.in_(list(mapping))),
+        )
+        .on_conflict_do_nothing(index_elements=list(unique_columns))
+        .returning(table.c.user_id)
+    )
+    copied = Counter((await session.execute(copy_stmt)).scalars())
+    await session.execute(delete(model).where(model.user_id.in_(list(mapping))))
+    return copied
 
 
 async def merge_missing_permissions(
@@ -97,55 +350,33 @@ async def merge_missing_permissions(
 async def merge_classes(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> None:
-    upsert_stmt = text("""
-    INSERT INTO users_classes (user_id, class_id, role, title, lms_tenant, lms_type)
-    SELECT :new_user_id, class_id, role, title, lms_tenant, lms_type
-    FROM users_classes
-    WHERE user_id = :old_user_id
-    ON CONFLICT (user_id, class_id) DO NOTHING
-    """)
-
-    await session.execute(
-        upsert_stmt, {"new_user_id": new_user_id, "old_user_id": old_user_id}
-    )
-
-    stmt_delete_old_user = delete(UserClassRole).where(
-        UserClassRole.user_id == old_user_id
+    await _copy_user_rows(
+        session,
+        UserClassRole,
+        ("class_id", "role", "title", "lms_tenant", "lms_type"),
+        ("user_id", "class_id"),
+        {old_user_id: new_user_id},
     )
-    await session.execute(stmt_delete_old_user)
 
 
 async def merge_institutions(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> None:
-    upsert_stmt = text("""
-    INSERT INTO users_institutions (user_id, institution_id, role, title)
-    SELECT :new_user_id, institution_id, role, title
-    FROM users_institutions
-    WHERE user_id = :old_user_id
-    ON CONFLICT (user_id, institution_id) DO NOTHING
-    """)
-
-    await session.execute(
-        upsert_stmt, {"new_user_id": new_user_id, "old_user_id": old_user_id}
+    await _copy_user_rows(
+        session,
+        UserInstitutionRole,
+        ("institution_id", "role", "title"),
+        ("user_id", "institution_id"),
+        {old_user_id: new_user_id},
     )
 
-    # Remove the old user from all institutions
-    delete_stmt = delete(UserInstitutionRole).where(
-        UserInstitutionRole.user_id == old_user_id
-    )
-    await session.execute(delete_stmt)
-
 
 async def merge_assistants(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> None:
-    stmt = (
-        update(Assistant)
-        .where(Assistant.creator_id == old_user_id)
-        .values(creator_id=new_user_id)
+    await _reassign_user_column(
+        session, Assistant, "creator_id", {old_user_id: new_user_id}
     )
-    await session.execute(stmt)
 
 
 async def merge_missing_assistant_permissions(
@@ -160,12 +391,9 @@ async def merge_missing_assistant_permissions(
 async def merge_threads(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> None:
-    stmt = (
-        update(user_thread_association)
-        .where(user_thread_association.c.user_id == old_user_id)
-        .values(user_id=new_user_id)
+    await _reassign_user_column(
+        session, user_thread_association, "user_id", {old_user_id: new_user_id}
     )
-    await session.execute(stmt)
 
 
 async def merge_missing_thread_permissions(
@@ -183,117 +411,92 @@ async def merge_missing_thread_permissions(
 async def merge_lms_users(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> None:
-    stmt = (
-        update(Class)
-        .where(Class.lms_user_id == old_user_id)
-        .values(lms_user_id=new_user_id)
+    await _reassign_user_column(
+        session, Class, "lms_user_id", {old_user_id: new_user_id}
     )
-    await session.execute(stmt)
 
 
 async def merge_lti_users(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> None:
-    stmt = (
-        update(LTIClass)
-        .where(LTIClass.setup_user_id == old_user_id)
-        .values(setup_user_id=new_user_id)
+    await _reassign_user_column(
+        session, LTIClass, "setup_user_id", {old_user_id: new_user_id}
     )
-    await session.execute(stmt)
 
 
 async def merge_agreement_acceptances(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> None:
-    upsert_stmt = text("""
-    INSERT INTO agreement_acceptances (user_id, agreement_id, policy_id, accepted_at)
-    SELECT :new_user_id, agreement_id, policy_id, accepted_at
-    FROM agreement_acceptances
-    WHERE user_id = :old_user_id
-    ON CONFLICT (user_id, agreement_id) DO NOTHING
-    """)
-
-    await session.execute(
-        upsert_stmt, {"new_user_id": new_user_id, "old_user_id": old_user_id}
-    )
-
-    stmt_delete_old_user = delete(AgreementAcceptance).where(
-        AgreementAcceptance.user_id == old_user_id
+    await _copy_user_rows(
+        session,
+        AgreementAcceptance,
+        ("agreement_id", "policy_id", "accepted_at"),
+        ("user_id", "agreement_id"),
+        {old_user_id: new_user_id},
     )
-    await session.execute(stmt_delete_old_user)
 
 
 async def merge_files(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> None:
-    stmt = (
-        update(File)
-        .where(File.uploader_id == old_user_id)
-        .values(uploader_id=new_user_id)
+    await _reassign_user_column(
+        session, File, "uploader_id", {old_user_id: new_user_id}
     )
-    await session.execute(stmt)
 
 
 async def merge_lecture_videos(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> None:
-    stmt = (
-        update(LectureVideo)
-        .where(LectureVideo.uploader_id == old_user_id)
-        .values(uploader_id=new_user_id)
+    await _reassign_user_column(
+        session, LectureVideo, "uploader_id", {old_user_id: new_user_id}
     )
-    await session.execute(stmt)
 
 
 async def merge_lecture_video_thread_states(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> None:
-    stmt = (
-        update(LectureVideoThreadState)
-        .where(LectureVideoThreadState.controller_user_id == old_user_id)
-        .values(
-            controller_user_id=new_user_id,
-        )
+    await _reassign_user_column(
+        session,
+        LectureVideoThreadState,
+        "controller_user_id",
+        {old_user_id: new_user_id},
     )
-    await session.execute(stmt)
 
 
 async def merge_lecture_video_interactions(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> None:
-    stmt = (
-        update(LectureVideoInteraction)
-        .where(LectureVideoInteraction.actor_user_id == old_user_id)
-        .values(actor_user_id=new_user_id)
+    await _reassign_user_column(
+        session, LectureVideoInteraction, "actor_user_id", {old_user_id: new_user_id}
     )
-    await session.execute(stmt)
 
 
 async def merge_mcp_created_by(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> None:
-    stmt = (
-        update(MCPServerTool)
-        .where(MCPServerTool.created_by_user_id == old_user_id)
-        .values(created_by_user_id=new_user_id)
+    await _reassign_user_column(
+        session, MCPServerTool, "created_by_user_id", {old_user_id: new_user_id}
     )
-    await session.execute(stmt)
 
 
 async def merge_mcp_updated_by(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> None:
-    stmt = (
-        update(MCPServerTool)
-        .where(MCPServerTool.updated_by_user_id == old_user_id)
-        .values(updated_by_user_id=new_user_id)
+    await _reassign_user_column(
+        session, MCPServerTool, "updated_by_user_id", {old_user_id: new_user_id}
     )
-    await session.execute(stmt)
 
 
 async def merge_external_logins(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> None:
+    await _merge_external_logins(session, {old_user_id: new_user_id})
+
+
+async def _merge_external_logins(
+    session: AsyncSession, mapping: MergeMapping
+) -> Counter[int]:
+    old_user_ids = list(mapping)
     old_login = ExternalLogin.__table__.alias("old_login")
     existing_login = ExternalLogin.__table__.alias("existing_login")
     internal_only_provider_ids = select(ExternalLoginProvider.id).where(
@@ -302,6 +505,7 @@ async def merge_external_logins(
     internal_only_provider_names = select(ExternalLoginProvider.name).where(
         ExternalLoginProvider.internal_only.is_(True)
     )
+    new_user_id = case(mapping, value=old_login.c.user_id)
     old_login_is_internal_only = or_(
         and_(
             old_login.c.provider_id.is_not(None),
@@ -351,7 +555,7 @@ async def merge_external_logins(
 
     move_old_logins_stmt = select(old_login.c.id).where(
         and_(
-            old_login.c.user_id == old_user_id,
+            old_login.c.user_id.in_(old_user_ids),
             ~conflicting_provider_login_exists,
             ~conflicting_identifier_login_exists,
         )
@@ -360,26 +564,25 @@ async def merge_external_logins(
     move_stmt = (
         update(ExternalLogin)
         .where(ExternalLogin.id.in_(move_old_logins_stmt))
-        .values(user_id=new_user_id)
+        .values(user_id=case(mapping, value=ExternalLogin.user_id))
+        .returning(ExternalLogin.user_id)
     )
-    await session.execute(move_stmt)
+    moved = Counter((await session.execute(move_stmt)).scalars())
 
     # Remove old-user logins that conflict with already-present new-user logins.
     delete_conflicting_stmt = delete(ExternalLogin).where(
-        ExternalLogin.user_id == old_user_id
+        ExternalLogin.user_id.in_(old_user_ids)
     )
     await session.execute(delete_conflicting_stmt)
+    return moved
 
 
 async def merge_user_files(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> None:
-    stmt = (
-        update(File)
-        .where(File.uploader_id == old_user_id)
-        .values(uploader_id=new_user_id)
+    await _reassign_user_column(
+        session, File, "uploader_id", {old_user_id: new_user_id}
     )
-    await session.execute(stmt)
 
 
 async def merge_missing_user_file_permissions(
@@ -406,9 +609,15 @@ async def merge_missing_class_file_permissions(
 
 def get_types() -> list[str]:
     """Get a list of object types used in the authz model."""
-    with open(config.authz.driver.model_config) as f:
+    return list(_load_types(config.authz.driver.model_config))
+
+
+@lru_cache(maxsize=None)
+def _load_types(model_config: str) -> tuple[str, ...]:
+    # The model only changes with a deploy, so it is read once per process.
+    with open(model_config) as f:
         model = json.load(f)
-    return [t["type"] for t in model["type_definitions"]]
+    return tuple(t["type"] for t in model["type_definitions"])
 
 
 async def list_all_permissions(
@@ -450,24 +659,111 @@ async def get_merged_user_tuples(
 async def merge_permissions(
     client: OpenFgaAuthzClient, new_user_id: int, old_user_id: int
 ) -> None:
-    old_permissions = await list_all_permissions(client, old_user_id)
-    new_permissions = [(f"user:{new_user_id}", r, o) for _, r, o in old_permissions]
-    await client.write_safe(grant=new_permissions, revoke=old_permissions)
+    await _merge_permissions(client, {old_user_id: new_user_id})
+
+
+async def _merge_permissions(
+    client: OpenFgaAuthzClient, mapping: MergeMapping
+) -> dict[int, int]:
+    """Moves every tuple of the old users to their new users.
+
+    Returns the number of tuples found for each old user.
+    """
+    semaphore = asyncio.Semaphore(MERGE_AUTHZ_CONCURRENCY)
+
+    async def _list(old_user_id: int) -> tuple[int, list[Relation]]:
+        async with semaphore:
+            return old_user_id, await list_all_permissions(client, old_user_id)
+
+    grants: list[Relation] = []
+    revokes: list[Relation] = []
+    tuples_moved: dict[int, int] = {}
+    for old_user_id, old_permissions in await asyncio.gather(
+        *(_list(old_user_id) for old_user_id in mapping)
+    ):
+        new_user_id = mapping[old_user_id]
+        revokes.extend(old_permissions)
+        grants.extend((f"user:{new_user_id}", r, o) for _, r, o in old_permissions)
+        tuples_moved[old_user_id] = len(old_permissions)
+
+    # Two old users in the same class grant the new user the same tuple.
+    await _write_permissions(client, list(dict.fromkeys(grants)), revokes)
+    return tuples_moved
+
+
+async def _write_permissions(
+    client: OpenFgaAuthzClient, grants: list[Relation], revokes: list[Relation]
+) -> None:
+    """Writes grants and revokes in concurrent batches, retrying failed ones.
+
+    Every grant is written before any tuple is revoked, so a merge that fails
+    partway leaves the old users' permissions in place instead of users who
+    have lost access on both accounts. `write_safe` skips tuples that are
+    already in the requested state, so a failed merge can be retried as is.
+    """
+    semaphore = asyncio.Semaphore(MERGE_AUTHZ_CONCURRENCY)
+
+    async def _write_batch(grant: list[Relation], revoke: list[Relation]) -> None:
+        for attempt in range(1, MERGE_AUTHZ_WRITE_ATTEMPTS + 1):
+            try:
+                async with semaphore:
+                    await client.write_safe(grant=grant, revoke=revoke)
+                return
+            except Exception:
+                if attempt == MERGE_AUTHZ_WRITE_ATTEMPTS:
+                    raise
+                logger.warning(
+                    "Failed to write merged permissions (attempt %s of %s), retrying",
+                    attempt,
+                    MERGE_AUTHZ_WRITE_ATTEMPTS,
+                    exc_info=True,
+                )
+                await asyncio.sleep(retry_delay(attempt, max_delay=10))
+
+    def _batches(relations: list[Relation]) -> list[list[Relation]]:
+        return [
+            relations[start : start + MERGE_AUTHZ_BATCH_SIZE]
+            for start in range(0, len(relations), MERGE_AUTHZ_BATCH_SIZE)
+        ]
+
+    await asyncio.gather(*(_write_batch(batch, []) for batch in _batches(grants)))
+    await asyncio.gather(*(_write_batch([], batch) for batch in _batches(revokes)))
 
 
 async def merge_users(
     session: AsyncSession, new_user_id: int, old_user_id: int
 ) -> "User":
-    old_user = await User.get_by_id(session, old_user_id)
-    new_user = await User.get_by_id(session, new_user_id)
-    if not new_user:
-        raise ValueError(f"New user {sanitize_for_log(new_user_id)} not found.")
-    if not old_user:
-        logging.warning(
-            f"Old user {sanitize_for_log(old_user_id)} not found, continuing with adding the merge tuple only."
+    users = await _merge_user_rows(session, {old_user_id: new_user_id})
+    return users[new_user_id]
+
+
+async def _merge_user_rows(
+    session: AsyncSession, mapping: MergeMapping
+) -> dict[int, User]:
+    """Folds the old users into the new users and deletes them.
+
+    Returns the new users by id. No new user may appear twice in `mapping`.
+    """
+    users = {
+        user.id: user
+        for user in await User.get_all_by_id(
+            session, [*mapping, *set(mapping.values())]
         )
+    }
+    for new_user_id in mapping.values():
+        if new_user_id not in users:
+            raise ValueError(f"New user {sanitize_for_log(new_user_id)} not found.")
+
+    preserved_emails: list[tuple[int, int, str]] = []
+    for old_user_id, new_user_id in mapping.items():
+        old_user = users.get(old_user_id)
+        new_user = users[new_user_id]
+        if not old_user:
+            logging.warning(
+                f"Old user {sanitize_for_log(old_user_id)} not found, continuing with adding the merge tuple only."
+            )
+            continue
 
-    if old_user:
         old_user_email = old_user.email.strip() if old_user.email else None
         new_user_email = new_user.email.strip() if new_user.email else None
         match old_user.state:
@@ -481,40 +777,63 @@ async def merge_users(
                 pass
 
         new_user.super_admin = new_user.super_admin or old_user.super_admin
+        if old_user_email and old_user_email.lower() != (new_user_email or "").lower():
+            preserved_emails.append((new_user_id, old_user_id, old_user_email))
+
+    old_user_ids = [old_user_id for old_user_id in mapping if old_user_id in users]
+    if old_user_ids:
         update_merged_account_tuple_stmt = (
             update(user_merge_association)
-            .where(user_merge_association.c.user_id == old_user_id)
-            .values(user_id=new_user_id)
+            .where(user_merge_association.c.user_id.in_(old_user_ids))
+            .values(
+                user_id=case(
+                    {old: mapping[old] for old in old_user_ids},
+                    value=user_merge_association.c.user_id,
+                )
+            )
         )
         await session.execute(update_merged_account_tuple_stmt)
-        delete_old_user_stmt = delete(User).where(User.id == old_user_id)
+        delete_old_user_stmt = delete(User).where(User.id.in_(old_user_ids))
         await session.execute(delete_old_user_stmt)
-        if old_user_email and old_user_email.lower() != (new_user_email or "").lower():
-            try:
-                await ExternalLogin.create_or_update(
-                    session,
-                    new_user_id,
-                    provider="email",
-                    identifier=old_user_email,
-                    called_by="merge_users",
-                )
-            except ValueError:
-                logger.exception(
-                    "Failed to preserve old primary email during user merge "
-                    "(new_user_id=%s old_user_id=%s email=%s)",
-                    sanitize_for_log(new_user_id),
-                    sanitize_for_log(old_user_id),
-                    sanitize_for_log(old_user_email),
-                )
+
+    for new_user_id, old_user_id, old_user_email in preserved_emails:
+        try:
+            await ExternalLogin.create_or_update(
+                session,
+                new_user_id,
+                provider="email",
+                identifier=old_user_email,
+                called_by="merge_users",
+            )
+        except ValueError:
+            logger.exception(
+                "Failed to preserve old primary email during user merge "
+                "(new_user_id=%s old_user_id=%s email=%s)",
+                sanitize_for_log(new_user_id),
+                sanitize_for_log(old_user_id),
+                sanitize_for_log(old_user_email),
+            )
+
     add_new_merge_tuple_stmt = (
         _get_upsert_stmt(session)(user_merge_association)
-        .values(user_id=new_user_id, merged_user_id=old_user_id)
+        .values(
+            [
+                {"user_id": new_user_id, "merged_user_id": old_user_id}
+                for old_user_id, new_user_id in mapping.items()
+            ]
+        )
         .on_conflict_do_nothing(
             index_elements=["user_id", "merged_user_id"],
         )
     )
     await session.execute(add_new_merge_tuple_stmt)
-    session.add(new_user)
+    new_users = [users[new_user_id] for new_user_id in set(mapping.values())]
+    session.add_all(new_users)
     await session.flush()
-    await session.refresh(new_user)
-    return new_user
+    # Reload server-side changes (e.g. `updated`) in one query.
+    await session.execute(
+        select(User)
+        .where(User.id.in_([user.id for user in new_users]))
+        .execution_options(populate_existing=True)
+    )
+    return {user.id: user for user in new_users}
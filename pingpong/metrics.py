@@ -26,6 +26,86 @@ inbound_messages = Counter(
 )
 
 
+voice_event_loop_lag = Histogram(
+    "voice_event_loop_lag",
+    "How late the event loop woke a voice session's lag probe",
+    unit="s",
+    labels=["app"],
+)
+
+
+voice_audio_bytes = Counter(
+    "voice_audio_bytes",
+    "Bytes of voice audio sent over browser websockets",
+    unit="By",
+    labels=["app", "direction", "encoding"],
+)
+
+
+voice_audio_codec_seconds = Counter(
+    "voice_audio_codec_seconds",
+    "Time spent encoding and decoding voice audio websocket messages",
+    unit="s",
+    labels=["app", "direction", "encoding"],
+)
+
+
+voice_response_latency = Histogram(
+    "voice_response_latency",
+    "Time from the end of user speech to the first assistant audio delta",
+    unit="s",
+    labels=["app"],
+)
+
+
+voice_playback_start_latency = Histogram(
+    "voice_playback_start_latency",
+    "Time from sending a response's first audio delta to browser playback",
+    unit="s",
+    labels=["app"],
+)
+
+
+voice_ordering_wait = Histogram(
+    "voice_ordering_wait",
+    "Time a completed voice transcript waits in the ordering buffer",
+    unit="s",
+    labels=["app"],
+)
+
+
+voice_task_queue_depth = Histogram(
+    "voice_task_queue_depth",
+    "Tasks waiting in a voice session task queue when one is started",
+    unit="tasks",
+    labels=["app", "queue"],
+)
+
+
+voice_audio_delta_issues = Counter(
+    "voice_audio_delta_issues",
+    "Assistant audio deltas that were invalid, dropped or truncated",
+    unit="deltas",
+    labels=["app", "kind"],
+)
+
+
+email_outbox_depth = Gauge(
+    "email_outbox_depth",
+    "Emails in the outbox by status",
+    unit="emails",
+    labels=["app", "status"],
+)
+
+
+email_send_latency = Histogram(
+    "email_send_latency",
+    "Time from queueing an email to its delivery attempt",
+    unit="s",
+    labels=["app", "outcome"],
+)
+
+
 in_flight = Gauge(
     "in_flight",
     "Number of in-flight requests",
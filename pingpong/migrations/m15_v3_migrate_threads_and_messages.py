@@ -17,10 +17,17 @@ from openai.types.beta.threads.runs import (
 )
 from sqlalchemy import delete, exists, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 import pingpong.models as models
 from pingpong.ai import get_openai_client_by_class_id
 from pingpong.files import file_extension_to_mime_type
+from pingpong.migrations.sharded import (
+    BatchResult,
+    MigrationContext,
+    OpenAIClientCache,
+    ShardedMigration,
+)
 from pingpong.schemas import (
     CodeInterpreterOutputType,
     InteractionMode,
@@ -74,36 +81,18 @@ async def migrate_threads_and_messages_to_v3(
             async for thread in _v2_threads_for_assistant(
                 session, assistant.id, resume=resume
             ):
-                # Keep each OpenAI-backed thread sync isolated. _migrate_thread may
-                # flush several local rows before a later OpenAI request fails, so the
-                # savepoint lets us undo only this thread's partial work.
-                async with session.begin_nested() as savepoint:
-                    try:
-                        await _migrate_thread(session, openai_client, thread, assistant)
-                        # Non-empty threads remain v2 until their message parts and
-                        # attachments are migrated. Empty threads have no downstream work,
-                        # so _migrate_thread promotes them directly to v3.
-                    except AuthenticationError as e:
-                        await savepoint.rollback()
-                        logger.error(
-                            "Could not authenticate with OpenAI during m15. "
-                            "class_id=%s status_code=%s error_code=%s",
-                            class_id,
-                            e.status_code,
-                            e.code,
-                        )
-                        authentication_failed_class_ids.append(class_id)
-                        authentication_failed = True
-                        break
-                    except Exception:
-                        await savepoint.rollback()
-                        logger.exception(
-                            f"Could not migrate thread {thread.id} "
-                            f"for assistant {assistant.id}"
-                        )
-                        failed_threads.append(
-                            f"class {class_id} assistant {assistant.id} thread {thread.id}"
-                        )
+                try:
+                    migrated = await _migrate_thread_in_savepoint(
+                        session, openai_client, thread, assistant
+                    )
+                except AuthenticationError:
+                    authentication_failed_class_ids.append(class_id)
+                    authentication_failed = True
+                    break
+                if not migrated:
+                    failed_threads.append(
+                        f"class {class_id} assistant {assistant.id} thread {thread.id}"
+                    )
             # Commit the successful threads for this assistant even if another thread
             # failed and was rolled back to its savepoint.
             await session.commit()
@@ -130,6 +119,102 @@ async def migrate_threads_and_messages_to_v3(
         raise RuntimeError("; ".join(failures))
 
 
+def threads_and_messages_migration(
+    *, resume: bool = False
+) -> ShardedMigration[models.Thread]:
+    """`migrate_threads_and_messages_to_v3` for `run_sharded_migration`, sharded
+    by thread id.
+
+    A class that fails to authenticate with OpenAI is skipped for the rest of the
+    run, and its remaining threads are counted as failed.
+    """
+    openai_clients = OpenAIClientCache(get_openai_client_by_class_id)
+
+    async def migrate_batch(
+        session: AsyncSession,
+        threads: list[models.Thread],
+        context: MigrationContext,
+    ) -> BatchResult:
+        result = BatchResult()
+        for thread in threads:
+            class_id = thread.assistant.class_id
+            openai_client = await openai_clients.get(session, class_id)
+            if openai_client is None:
+                result.failed += 1
+                continue
+            await context.wait_for_openai()
+            try:
+                migrated = await _migrate_thread_in_savepoint(
+                    session, openai_client, thread, thread.assistant
+                )
+            except AuthenticationError:
+                openai_clients.disable(class_id)
+                migrated = False
+            if migrated:
+                result.migrated += 1
+            else:
+                result.failed += 1
+        return result
+
+    async def fetch_batch(
+        session: AsyncSession, *, after_id: int, before_id: int, limit: int
+    ) -> list[models.Thread]:
+        return await _fetch_v2_threads(
+            session, after_id=after_id, before_id=before_id, limit=limit, resume=resume
+        )
+
+    return ShardedMigration(
+        name="m15_v3_migrate_threads_and_messages",
+        key=models.Thread.id,
+        key_of=lambda thread: int(thread.id),
+        filters=lambda: _v2_thread_filters(resume=resume),
+        fetch_batch=fetch_batch,
+        migrate_batch=migrate_batch,
+    )
+
+
+async def _migrate_thread_in_savepoint(
+    session: AsyncSession,
+    openai_client: OpenAIClient,
+    thread: models.Thread,
+    assistant: models.Assistant,
+) -> bool:
+    """Migrates one thread, returning False if it failed and was rolled back.
+
+    Raises AuthenticationError, after rolling back, if OpenAI rejected the
+    class's credentials.
+    """
+    # Keep each OpenAI-backed thread sync isolated. _migrate_thread may flush
+    # several local rows before a later OpenAI request fails, so the savepoint
+    # lets us undo only this thread's partial work.
+    authentication_error: AuthenticationError | None = None
+    async with session.begin_nested() as savepoint:
+        try:
+            await _migrate_thread(session, openai_client, thread, assistant)
+            # Non-empty threads remain v2 until their message parts and
+            # attachments are migrated. Empty threads have no downstream work,
+            # so _migrate_thread promotes them directly to v3.
+        except AuthenticationError as e:
+            await savepoint.rollback()
+            logger.error(
+                "Could not authenticate with OpenAI during m15. "
+                "class_id=%s status_code=%s error_code=%s",
+                assistant.class_id,
+                e.status_code,
+                e.code,
+            )
+            authentication_error = e
+        except Exception:
+            await savepoint.rollback()
+            logger.exception(
+                f"Could not migrate thread {thread.id} for assistant {assistant.id}"
+            )
+            return False
+    if authentication_error is not None:
+        raise authentication_error
+    return True
+
+
 def _v2_thread_filters(*, resume: bool) -> tuple:
     filters = (
         models.Thread.version == 2,
@@ -250,6 +335,30 @@ async def _fetch_threads_for_assistant_batch(
     return list(result.scalars())
 
 
+async def _fetch_v2_threads(
+    session: AsyncSession,
+    *,
+    after_id: int,
+    before_id: int,
+    limit: int,
+    resume: bool = False,
+) -> list[models.Thread]:
+    stmt = (
+        select(models.Thread)
+        .join(models.Assistant, models.Thread.assistant_id == models.Assistant.id)
+        .where(
+            models.Thread.id > after_id,
+            models.Thread.id < before_id,
+            *_v2_thread_filters(resume=resume),
+        )
+        .order_by(models.Thread.id)
+        .limit(limit)
+        .options(selectinload(models.Thread.assistant))
+    )
+    result = await session.execute(stmt)
+    return list(result.scalars())
+
+
 async def _v2_threads_for_assistant(
     session: AsyncSession, assistant_id: int, *, resume: bool = False
 ) -> AsyncIterator[models.Thread]:
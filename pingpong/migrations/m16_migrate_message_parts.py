@@ -30,6 +30,12 @@ from pingpong.ai import get_openai_client_by_class_id
 from pingpong.authz.base import AuthzClient, Relation
 from pingpong.config import config
 from pingpong.files import _file_grants, _is_ci_supported, file_extension_to_mime_type
+from pingpong.migrations.sharded import (
+    BatchResult,
+    MigrationContext,
+    OpenAIClientCache,
+    ShardedMigration,
+)
 from pingpong.server import OpenAIClient
 
 logger = logging.getLogger(__name__)
@@ -108,38 +114,90 @@ async def migrate_message_parts(
             )
 
             for local_message in local_messages:
-                # Authz grants are written separately from DB sessions, so we need to keep
-                # track of those writes so we can revoke if the nested session fails
-                written_grants: list[Relation] = []
-                async with session.begin_nested() as savepoint:
-                    try:
-                        await _migrate_message_parts(
-                            session,
-                            authz_client,
-                            openai_client,
-                            local_message,
-                            written_grants,
-                        )
-                        local_message.message_metadata[
-                            "assistants_to_responses_api_thread_migration"
-                        ]["message_parts"] = "complete"
-                        # Notifies SQLAlchemy that `message_metadata` changed (since it's JSON it
-                        # wouldn't be detected otherwise)
-                        flag_modified(local_message, "message_metadata")
-                    except Exception:
-                        await savepoint.rollback()
-                        await authz_client.write_safe(revoke=written_grants)
-                        logger.exception(
-                            f"Unexpected error backfilling message parts. "
-                            f"thread_id={local_message.thread_id} "
-                            f"openai_thread_id={local_message.thread.thread_id}"
-                        )
-
+                await _migrate_message_and_mark_complete(
+                    session, authz_client, openai_client, local_message
+                )
                 await session.commit()
 
             last_message_id = local_messages[-1].id
 
 
+def message_parts_migration(
+    authz_client: AuthzClient,
+) -> ShardedMigration[models.Message]:
+    """`migrate_message_parts` for `run_sharded_migration`, sharded by message id."""
+    openai_clients = OpenAIClientCache(get_openai_client_by_class_id)
+
+    async def migrate_batch(
+        session: AsyncSession,
+        local_messages: list[models.Message],
+        context: MigrationContext,
+    ) -> BatchResult:
+        result = BatchResult()
+        for local_message in local_messages:
+            openai_client = await openai_clients.get(
+                session, local_message.thread.class_id
+            )
+            if openai_client is None:
+                result.failed += 1
+                continue
+            await context.wait_for_openai()
+            if await _migrate_message_and_mark_complete(
+                session, authz_client, openai_client, local_message
+            ):
+                result.migrated += 1
+            else:
+                result.failed += 1
+            await session.commit()
+        return result
+
+    return ShardedMigration(
+        name="m16_migrate_message_parts",
+        key=models.Message.id,
+        key_of=lambda message: int(message.id),
+        filters=_message_fields_filters,
+        fetch_batch=_fetch_message_fields,
+        migrate_batch=migrate_batch,
+    )
+
+
+async def _migrate_message_and_mark_complete(
+    session: AsyncSession,
+    authz_client: AuthzClient,
+    openai_client: OpenAIClient,
+    local_message: models.Message,
+) -> bool:
+    """Backfills one message in a savepoint. Returns False if it was rolled back."""
+    # Authz grants are written separately from DB sessions, so we need to keep
+    # track of those writes so we can revoke if the nested session fails
+    written_grants: list[Relation] = []
+    async with session.begin_nested() as savepoint:
+        try:
+            await _migrate_message_parts(
+                session,
+                authz_client,
+                openai_client,
+                local_message,
+                written_grants,
+            )
+            local_message.message_metadata[
+                "assistants_to_responses_api_thread_migration"
+            ]["message_parts"] = "complete"
+            # Notifies SQLAlchemy that `message_metadata` changed (since it's JSON it
+            # wouldn't be detected otherwise)
+            flag_modified(local_message, "message_metadata")
+        except Exception:
+            await savepoint.rollback()
+            await authz_client.write_safe(revoke=written_grants)
+            logger.exception(
+                f"Unexpected error backfilling message parts. "
+                f"thread_id={local_message.thread_id} "
+                f"openai_thread_id={local_message.thread.thread_id}"
+            )
+            return False
+    return True
+
+
 def _message_fields_filters():
     migration_metadata = models.Message.message_metadata[
         "assistants_to_responses_api_thread_migration"
@@ -204,6 +262,7 @@ async def _fetch_message_fields(
     *,
     class_id: int | None = None,
     after_id: int | None = None,
+    before_id: int | None = None,
     limit: int | None = None,
 ) -> list[models.Message]:
     """
@@ -223,6 +282,8 @@ async def _fetch_message_fields(
         stmt = stmt.where(models.Thread.class_id == class_id)
     if after_id is not None:
         stmt = stmt.where(models.Message.id > after_id)
+    if before_id is not None:
+        stmt = stmt.where(models.Message.id < before_id)
     stmt = stmt.order_by(models.Message.id).options(
         selectinload(models.Message.thread)
         .selectinload(models.Thread.anonymous_sessions)
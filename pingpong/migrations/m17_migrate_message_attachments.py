@@ -12,6 +12,12 @@ from sqlalchemy.orm.attributes import flag_modified
 
 import pingpong.models as models
 from pingpong.ai import get_openai_client_by_class_id
+from pingpong.migrations.sharded import (
+    BatchResult,
+    MigrationContext,
+    OpenAIClientCache,
+    ShardedMigration,
+)
 from pingpong.schemas import MessageRole
 from pingpong.server import OpenAIClient
 
@@ -63,30 +69,78 @@ async def migrate_message_attachments(session: AsyncSession) -> None:
             )
 
             for local_message in local_messages:
-                async with session.begin_nested() as savepoint:
-                    try:
-                        await _migrate_message_attachments(
-                            session, openai_client, local_message
-                        )
-                        local_message.message_metadata[
-                            "assistants_to_responses_api_thread_migration"
-                        ]["attachments"] = "complete"
-                        # Notifies SQLAlchemy that `message_metadata` changed (since it's
-                        # JSON it wouldn't be detected otherwise).
-                        flag_modified(local_message, "message_metadata")
-                    except Exception:
-                        await savepoint.rollback()
-                        logger.exception(
-                            f"Unexpected error backfilling message attachments. "
-                            f"thread_id={local_message.thread_id} "
-                            f"openai_thread_id={local_message.thread.thread_id}"
-                        )
-
+                await _migrate_message_and_mark_complete(
+                    session, openai_client, local_message
+                )
                 await session.commit()
 
             last_message_id = local_messages[-1].id
 
 
+def message_attachments_migration() -> ShardedMigration[models.Message]:
+    """`migrate_message_attachments` for `run_sharded_migration`, sharded by
+    message id."""
+    openai_clients = OpenAIClientCache(get_openai_client_by_class_id)
+
+    async def migrate_batch(
+        session: AsyncSession,
+        local_messages: list[models.Message],
+        context: MigrationContext,
+    ) -> BatchResult:
+        result = BatchResult()
+        for local_message in local_messages:
+            openai_client = await openai_clients.get(
+                session, local_message.thread.class_id
+            )
+            if openai_client is None:
+                result.failed += 1
+                continue
+            await context.wait_for_openai()
+            if await _migrate_message_and_mark_complete(
+                session, openai_client, local_message
+            ):
+                result.migrated += 1
+            else:
+                result.failed += 1
+            await session.commit()
+        return result
+
+    return ShardedMigration(
+        name="m17_migrate_message_attachments",
+        key=models.Message.id,
+        key_of=lambda message: int(message.id),
+        filters=_message_filters,
+        fetch_batch=_fetch_messages,
+        migrate_batch=migrate_batch,
+    )
+
+
+async def _migrate_message_and_mark_complete(
+    session: AsyncSession,
+    openai_client: OpenAIClient,
+    local_message: models.Message,
+) -> bool:
+    """Backfills one message in a savepoint. Returns False if it was rolled back."""
+    async with session.begin_nested() as savepoint:
+        try:
+            await _migrate_message_attachments(session, openai_client, local_message)
+            local_message.message_metadata[
+                "assistants_to_responses_api_thread_migration"
+            ]["attachments"] = "complete"
+            # Notifies SQLAlchemy that `message_metadata` changed (since it's
+            # JSON it wouldn't be detected otherwise).
+            flag_modified(local_message, "message_metadata")
+        except Exception:
+            await savepoint.rollback()
+            logger.exception(
+                f"Unexpected error backfilling message attachments. "
+                f"thread_id={local_message.thread_id} "
+                f"openai_thread_id={local_message.thread.thread_id}"
+            )
+            return False
+    return True
+
+
 def _message_filters():
     migration_metadata = models.Message.message_metadata[
         "assistants_to_responses_api_thread_migration"
@@ -145,6 +199,7 @@ async def _fetch_messages(
     *,
     class_id: int | None = None,
     after_id: int | None = None,
+    before_id: int | None = None,
     limit: int | None = None,
 ) -> list[models.Message]:
     stmt = select(models.Message).where(*_message_filters())
@@ -153,6 +208,8 @@ async def _fetch_messages(
         stmt = stmt.where(models.Thread.class_id == class_id)
     if after_id is not None:
         stmt = stmt.where(models.Message.id > after_id)
+    if before_id is not None:
+        stmt = stmt.where(models.Message.id < before_id)
     stmt = stmt.order_by(models.Message.id).options(selectinload(models.Message.thread))
     if limit is not None:
         stmt = stmt.limit(limit)
@@ -6,6 +6,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 import pingpong.models as models
 import pingpong.schemas as schemas
+from pingpong.migrations.sharded import (
+    BatchResult,
+    MigrationContext,
+    ShardedMigration,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +50,30 @@ async def finalize_v2_threads_to_v3(session: AsyncSession) -> None:
     )
 
 
+def finalize_v2_threads_migration() -> ShardedMigration[models.Thread]:
+    """`finalize_v2_threads_to_v3` for `run_sharded_migration`, sharded by thread
+    id."""
+
+    async def migrate_batch(
+        session: AsyncSession,
+        threads: list[models.Thread],
+        context: MigrationContext,
+    ) -> BatchResult:
+        for thread in threads:
+            thread.version = 3
+            session.add(thread)
+        return BatchResult(migrated=len(threads))
+
+    return ShardedMigration(
+        name="m21_finalize_v2_threads_to_v3",
+        key=models.Thread.id,
+        key_of=lambda thread: int(thread.id),
+        filters=_completely_migrated_v2_thread_filters,
+        fetch_batch=_fetch_completely_migrated_v2_threads,
+        migrate_batch=migrate_batch,
+    )
+
+
 async def revert_finalized_v3_threads_to_v2(session: AsyncSession) -> None:
     """Flip migrated chat threads finalized by m21 back to v2.
 
@@ -226,6 +255,7 @@ async def _fetch_completely_migrated_v2_threads(
     *,
     after_id: int,
     limit: int,
+    before_id: int | None = None,
 ) -> list[models.Thread]:
     stmt = (
         select(models.Thread)
@@ -236,6 +266,8 @@ async def _fetch_completely_migrated_v2_threads(
         .order_by(models.Thread.id)
         .limit(limit)
     )
+    if before_id is not None:
+        stmt = stmt.where(models.Thread.id < before_id)
     result = await session.execute(stmt)
     return list(result.scalars())
 
@@ -0,0 +1,315 @@
+"""Sharded, checkpointed runner for long data migrations.
+
+`run_sharded_migration` splits the keys a migration still has to process into
+contiguous ranges ("shards") and works through them with a fixed number of
+workers, each with its own database session. After every batch the shard's
+cursor is committed to `data_migration_shards`, so an interrupted run picks up
+where each shard stopped instead of starting over. Requests to OpenAI and
+batches against the database are rate limited across all workers, and progress
+is logged with an ETA as the run goes.
+
+A migration opts in by describing itself as a `ShardedMigration`: the key and
+filters that select its pending rows, how to fetch one batch from a key range,
+and how to migrate one batch.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Generic, TypeVar
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import pingpong.models as models
+from pingpong.ai import OpenAIClientType
+from pingpong.config import config
+from pingpong.now import utcnow
+from pingpong.roster_sync import HostRateLimiter
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_WORKERS = 4
+MIGRATION_SHARDS_PER_WORKER = 4
+MIGRATION_BATCH_SIZE = 100
+MIGRATION_OPENAI_REQUESTS_PER_SECOND = 20.0
+MIGRATION_DB_BATCHES_PER_SECOND = 20.0
+MIGRATION_PROGRESS_INTERVAL_SECONDS = 30.0
+
+T = TypeVar("T")
+
+
+@dataclass
+class BatchResult:
+    migrated: int = 0
+    failed: int = 0
+
+
+class MigrationContext:
+    """Shared by every batch of a run."""
+
+    def __init__(self, openai_limiter: HostRateLimiter):
+        self._openai_limiter = openai_limiter
+
+    async def wait_for_openai(self) -> None:
+        """Waits until another request to OpenAI fits in the run's rate limit."""
+        await self._openai_limiter.acquire("openai")
+
+
+class OpenAIClientCache:
+    """One OpenAI client per class for the length of a run.
+
+    Classes whose client can't be created, or that were disabled after failing
+    to authenticate, get None so their rows are counted as failed without
+    making more requests.
+    """
+
+    def __init__(
+        self,
+        get_client: Callable[[AsyncSession, int], Awaitable[OpenAIClientType]],
+    ):
+        self._get_client = get_client
+        self._clients: dict[int, OpenAIClientType | None] = {}
+
+    async def get(
+        self, session: AsyncSession, class_id: int
+    ) -> OpenAIClientType | None:
+        if class_id not in self._clients:
+            try:
+                self._clients[class_id] = await self._get_client(session, class_id)
+            except Exception:
+                logger.exception(
+                    "Could not get OpenAI client for class. class_id=%s", class_id
+                )
+                self._clients[class_id] = None
+        return self._clients[class_id]
+
+    def disable(self, class_id: int) -> None:
+        self._clients[class_id] = None
+
+
+@dataclass(frozen=True)
+class ShardedMigration(Generic[T]):
+    name: str
+    key: Any
+    """Integer column the migration's rows are ordered and sharded by."""
+    key_of: Callable[[T], int]
+    """Returns a fetched row's value of `key`."""
+    filters: Callable[[], tuple]
+    """Where clauses selecting the rows left to migrate."""
+    fetch_batch: Callable[..., Awaitable[list[T]]]
+    """Called with `session, after_id=, before_id=, limit=`; returns rows with keys
+    in (after_id, before_id), ordered by key."""
+    migrate_batch: Callable[
+        [AsyncSession, list[T], MigrationContext], Awaitable[BatchResult]
+    ]
+    """Migrates a fetched batch. Failures of single rows are counted, not raised."""
+
+
+@dataclass
+class MigrationProgress:
+    migration: str
+    total: int
+    shards: int
+    shards_done: int = 0
+    migrated: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def done(self) -> int:
+        return self.migrated + self.failed
+
+    def add(self, result: BatchResult) -> None:
+        self.migrated += result.migrated
+        self.failed += result.failed
+
+    def eta(self) -> timedelta | None:
+        elapsed = time.monotonic() - self.started_at
+        if not self.done or not elapsed:
+            return None
+        remaining = max(self.total - self.done, 0)
+        return timedelta(seconds=round(remaining * elapsed / self.done))
+
+    def log(self) -> None:
+        elapsed = time.monotonic() - self.started_at
+        logger.info(
+            "%s progress: %s/%s rows (%.1f%%), %s failed, %s/%s shards done, "
+            "%.1f rows/s, ETA %s",
+            self.migration,
+            self.done,
+            self.total,
+            100 * self.done / self.total if self.total else 100.0,
+            self.failed,
+            self.shards_done,
+            self.shards,
+            self.done / elapsed if elapsed else 0.0,
+            self.eta() or "unknown",
+        )
+
+
+def _plan_ranges(min_id: int, max_id: int, shards: int) -> list[tuple[int, int]]:
+    """Splits [min_id, max_id] into at most `shards` (after_id, end_id) ranges."""
+    size = max(1, math.ceil((max_id - min_id + 1) / shards))
+    return [
+        (start - 1, min(start + size, max_id + 1))
+        for start in range(min_id, max_id + 1, size)
+    ]
+
+
+async def _load_or_plan_shards(
+    session: AsyncSession,
+    migration: ShardedMigration[Any],
+    shard_count: int,
+    restart: bool,
+) -> list[models.DataMigrationShard]:
+    if not restart:
+        shards = await models.DataMigrationShard.get_by_migration(
+            session, migration.name
+        )
+        unfinished = [s for s in shards if s.completed_at is None]
+        if unfinished:
+            logger.info(
+                "%s resuming from checkpoints. unfinished_shards=%s shards=%s",
+                migration.name,
+                len(unfinished),
+                len(shards),
+            )
+            return shards
+
+    # Either asked to start over, or the last run finished: plan a new run.
+    await models.DataMigrationShard.delete_by_migration(session, migration.name)
+    min_id, max_id = (
+        await session.execute(
+            select(func.min(migration.key), func.max(migration.key)).where(
+                *migration.filters()
+            )
+        )
+    ).one()
+    if min_id is None:
+        return []
+    return await models.DataMigrationShard.create_many(
+        session, migration.name, _plan_ranges(min_id, max_id, shard_count)
+    )
+
+
+async def _count_pending(
+    session: AsyncSession,
+    migration: ShardedMigration[Any],
+    shards: list[models.DataMigrationShard],
+) -> int:
+    if not shards:
+        return 0
+    in_shards = or_(
+        *(
+            and_(migration.key > shard.cursor, migration.key < shard.end_id)
+            for shard in shards
+        )
+    )
+    stmt = select(func.count(migration.key)).where(*migration.filters(), in_shards)
+    return await session.scalar(stmt) or 0
+
+
+async def run_sharded_migration(
+    migration: ShardedMigration[T],
+    *,
+    workers: int = MIGRATION_WORKERS,
+    shards: int | None = None,
+    batch_size: int = MIGRATION_BATCH_SIZE,
+    openai_requests_per_second: float = MIGRATION_OPENAI_REQUESTS_PER_SECOND,
+    db_batches_per_second: float = MIGRATION_DB_BATCHES_PER_SECOND,
+    restart: bool = False,
+    progress_interval: float = MIGRATION_PROGRESS_INTERVAL_SECONDS,
+) -> MigrationProgress:
+    """Runs `migration` over its pending rows with `workers` shards at a time.
+
+    Unfinished shards from an earlier run are resumed from their checkpoints,
+    keeping that run's shard layout; pass `restart` to discard them. A batch
+    that raises stops the run with every other shard's checkpoint intact.
+    """
+    workers = max(1, workers)
+    shard_count = shards or workers * MIGRATION_SHARDS_PER_WORKER
+    async with config.db.driver.async_session() as session:
+        planned = await _load_or_plan_shards(session, migration, shard_count, restart)
+        pending = [s for s in planned if s.completed_at is None]
+        total = await _count_pending(session, migration, pending)
+        await session.commit()
+
+    progress = MigrationProgress(
+        migration=migration.name,
+        total=total,
+        shards=len(planned),
+        shards_done=len(planned) - len(pending),
+    )
+    logger.info(
+        "%s starting. rows=%s shards=%s workers=%s",
+        migration.name,
+        total,
+        len(pending),
+        workers,
+    )
+    context = MigrationContext(
+        HostRateLimiter(openai_requests_per_second, burst=workers)
+    )
+    db_limiter = HostRateLimiter(db_batches_per_second, burst=workers)
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for shard in pending:
+        queue.put_nowait(shard.id)
+
+    async def _run_shard(shard_id: int) -> None:
+        async with config.db.driver.async_session() as session:
+            shard = await models.DataMigrationShard.get_by_id(session, shard_id)
+            assert shard is not None
+            while True:
+                await db_limiter.acquire("db")
+                rows = await migration.fetch_batch(
+                    session,
+                    after_id=shard.cursor,
+                    before_id=shard.end_id,
+                    limit=batch_size,
+                )
+                if not rows:
+                    shard.completed_at = utcnow()
+                    session.add(shard)
+                    await session.commit()
+                    progress.shards_done += 1
+                    return
+
+                result = await migration.migrate_batch(session, rows, context)
+                shard.cursor = migration.key_of(rows[-1])
+                shard.processed += result.migrated
+                shard.failed += result.failed
+                session.add(shard)
+                await session.commit()
+                progress.add(result)
+
+    async def _worker() -> None:
+        while True:
+            try:
+                shard_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await _run_shard(shard_id)
+
+    async def _report() -> None:
+        while True:
+            await asyncio.sleep(progress_interval)
+            progress.log()
+
+    reporter = asyncio.create_task(_report())
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(min(workers, len(pending))):
+                tg.create_task(_worker())
+    except ExceptionGroup as e:
+        for error in e.exceptions[1:]:
+            logger.error("%s worker failed: %r", migration.name, error)
+        raise e.exceptions[0]
+    finally:
+        reporter.cancel()
+    progress.log()
+    return progress
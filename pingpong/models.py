@@ -140,6 +140,14 @@ def _sanitize_str_fields(data: dict) -> dict:
     return {key: _strip_nulls(value) for key, value in data.items()}
 
 
+# Keeps IN lists well under the bind parameter limits of SQLite and Postgres.
+_IN_CHUNK_SIZE = 500
+
+
+def _chunked(values: Sequence[T], size: int = _IN_CHUNK_SIZE) -> list[Sequence[T]]:
+    return [values[i : i + size] for i in range(0, len(values), size)]
+
+
 def _get_upsert_stmt(session: AsyncSession):
     """Get the appropriate upsert statement for the current database."""
     dialect = session.bind.dialect.name
@@ -163,6 +171,19 @@ class PeriodicTask(Base):
         "ScheduledJob",
         back_populates="task",
     )
+    # Scheduler leadership. Each new lease increments the fencing token, so
+    # writes made under an older lease can be rejected.
+    leader_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    fencing_token: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    # The next occurrence of the schedule that has not been run or skipped.
+    next_run_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
 
     __table_args__ = (Index("idx_task_name", "task_name", unique=True),)
 
@@ -173,6 +194,239 @@ class PeriodicTask(Base):
         stmt = select(PeriodicTask).where(PeriodicTask.task_name == task_name)
         return await session.scalar(stmt)
 
+    @classmethod
+    async def get_or_create_id(cls, session: AsyncSession, task_name: str) -> int:
+        stmt = (
+            _get_upsert_stmt(session)(PeriodicTask)
+            .values(task_name=task_name)
+            .on_conflict_do_nothing(index_elements=["task_name"])
+        )
+        await session.execute(stmt)
+        return await session.scalar(
+            select(PeriodicTask.id).where(PeriodicTask.task_name == task_name)
+        )
+
+    @classmethod
+    async def acquire_lease(
+        cls,
+        session: AsyncSession,
+        task_id: int,
+        leader_id: str,
+        now: datetime,
+        lease_seconds: float,
+    ) -> int | None:
+        """Takes the task's lease if it is free or expired.
+
+        Returns the new fencing token, or None if another leader holds it.
+        """
+        stmt = (
+            update(PeriodicTask)
+            .where(
+                PeriodicTask.id == task_id,
+                or_(
+                    PeriodicTask.lease_expires_at.is_(None),
+                    PeriodicTask.lease_expires_at < now,
+                ),
+            )
+            .values(
+                leader_id=leader_id,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                fencing_token=PeriodicTask.fencing_token + 1,
+            )
+            .returning(PeriodicTask.fencing_token)
+        )
+        return await session.scalar(stmt)
+
+    @classmethod
+    async def renew_lease(
+        cls,
+        session: AsyncSession,
+        task_id: int,
+        leader_id: str,
+        fencing_token: int,
+        now: datetime,
+        lease_seconds: float,
+    ) -> bool:
+        """Extends a lease that is still held under `fencing_token`.
+
+        On Postgres the row stays locked until the transaction ends, so writes
+        made in the same transaction are fenced by the lease.
+        """
+        stmt = (
+            update(PeriodicTask)
+            .where(
+                PeriodicTask.id == task_id,
+                PeriodicTask.leader_id == leader_id,
+                PeriodicTask.fencing_token == fencing_token,
+                PeriodicTask.lease_expires_at >= now,
+            )
+            .values(lease_expires_at=now + timedelta(seconds=lease_seconds))
+        )
+        result = await session.execute(stmt)
+        return result.rowcount == 1
+
+    @classmethod
+    async def release_lease(
+        cls,
+        session: AsyncSession,
+        task_id: int,
+        leader_id: str,
+        fencing_token: int,
+    ) -> None:
+        stmt = (
+            update(PeriodicTask)
+            .where(
+                PeriodicTask.id == task_id,
+                PeriodicTask.leader_id == leader_id,
+                PeriodicTask.fencing_token == fencing_token,
+            )
+            .values(lease_expires_at=None)
+        )
+        await session.execute(stmt)
+
+    @classmethod
+    async def set_next_run_at(
+        cls, session: AsyncSession, task_id: int, next_run_at: datetime
+    ) -> None:
+        stmt = (
+            update(PeriodicTask)
+            .where(PeriodicTask.id == task_id)
+            .values(next_run_at=next_run_at)
+        )
+        await session.execute(stmt)
+
+
+class PeriodicTaskRun(Base):
+    """One occurrence of a periodic task's schedule.
+
+    The unique (task_id, scheduled_for) key means only one scheduler can
+    claim an occurrence, even if two briefly believe they are the leader.
+    """
+
+    __tablename__ = "periodic_task_runs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    task_id: Mapped[int] = mapped_column(
+        ForeignKey("periodic_tasks.id", ondelete="cascade"), nullable=False
+    )
+    scheduled_for: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    status: Mapped[schemas.PeriodicTaskRunStatus] = mapped_column(
+        SQLEnum(schemas.PeriodicTaskRunStatus), nullable=False
+    )
+    fencing_token: Mapped[int] = mapped_column(Integer, nullable=False)
+    executor: Mapped[str] = mapped_column(String, nullable=False)
+    started_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    completed_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    error: Mapped[str | None] = mapped_column(String, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "task_id", "scheduled_for", name="periodic_task_runs_occurrence_uc"
+        ),
+    )
+
+    @classmethod
+    async def claim_many(
+        cls,
+        session: AsyncSession,
+        task_id: int,
+        occurrences: list[tuple[datetime, schemas.PeriodicTaskRunStatus]],
+        fencing_token: int,
+        executor: str,
+        now: datetime,
+    ) -> list["PeriodicTaskRun"]:
+        """Records (scheduled_for, status) occurrences that nobody has claimed.
+
+        Returns the runs that were inserted.
+        """
+        if not occurrences:
+            return []
+        stmt = (
+            _get_upsert_stmt(session)(PeriodicTaskRun)
+            .values(
+                [
+                    {
+                        "task_id": task_id,
+                        "scheduled_for": scheduled_for,
+                        "status": status,
+                        "fencing_token": fencing_token,
+                        "executor": executor,
+                        "started_at": now
+                        if status == schemas.PeriodicTaskRunStatus.RUNNING
+                        else None,
+                        "completed_at": None
+                        if status == schemas.PeriodicTaskRunStatus.RUNNING
+                        else now,
+                    }
+                    for scheduled_for, status in occurrences
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=["task_id", "scheduled_for"])
+            .returning(PeriodicTaskRun)
+        )
+        return list((await session.scalars(stmt)).all())
+
+    @classmethod
+    async def finish(
+        cls,
+        session: AsyncSession,
+        run_id: int,
+        status: schemas.PeriodicTaskRunStatus,
+        now: datetime,
+        error: str | None = None,
+    ) -> None:
+        stmt = (
+            update(PeriodicTaskRun)
+            .where(
+                PeriodicTaskRun.id == run_id,
+                PeriodicTaskRun.status == schemas.PeriodicTaskRunStatus.RUNNING,
+            )
+            .values(status=status, completed_at=now, error=error)
+        )
+        await session.execute(stmt)
+
+    @classmethod
+    async def abandon_stale(
+        cls,
+        session: AsyncSession,
+        task_id: int,
+        fencing_token: int,
+        now: datetime,
+    ) -> int:
+        """Fails runs left running by leaders older than `fencing_token`."""
+        stmt = (
+            update(PeriodicTaskRun)
+            .where(
+                PeriodicTaskRun.task_id == task_id,
+                PeriodicTaskRun.status == schemas.PeriodicTaskRunStatus.RUNNING,
+                PeriodicTaskRun.fencing_token < fencing_token,
+            )
+            .values(
+                status=schemas.PeriodicTaskRunStatus.FAILED,
+                completed_at=now,
+                error="Scheduler lost its lease before the run finished.",
+            )
+        )
+        result = await session.execute(stmt)
+        return result.rowcount
+
+    @classmethod
+    async def list_by_task_id(
+        cls, session: AsyncSession, task_id: int
+    ) -> list["PeriodicTaskRun"]:
+        stmt = (
+            select(PeriodicTaskRun)
+            .where(PeriodicTaskRun.task_id == task_id)
+            .order_by(PeriodicTaskRun.scheduled_for)
+        )
+        return list((await session.scalars(stmt)).all())
+
 
 class ScheduledJob(Base):
     __tablename__ = "scheduled_jobs"
@@ -297,6 +551,25 @@ class UserClassRole(Base):
         )
         await session.execute(stmt)
 
+    @classmethod
+    async def mark_summary_sent(
+        cls,
+        session: AsyncSession,
+        user_ids: List[int],
+        class_id: int,
+        sent_at: datetime,
+    ) -> None:
+        for chunk in _chunked(user_ids):
+            stmt = (
+                update(UserClassRole)
+                .where(
+                    UserClassRole.class_id == class_id,
+                    UserClassRole.user_id.in_(chunk),
+                )
+                .values(last_summary_sent_at=sent_at, last_summary_empty=False)
+            )
+            await session.execute(stmt)
+
     @classmethod
     async def is_subscribed_to_summaries(
         cls, session: AsyncSession, user_id: int, class_id: int
@@ -461,6 +734,52 @@ class UserClassRole(Base):
             )
         return result
 
+    @classmethod
+    async def create_many(
+        cls,
+        session: AsyncSession,
+        class_id: int,
+        subscribed_to_summaries_by_user_id: dict[int, bool],
+        lms_tenant: str | None = None,
+        lms_type: schemas.LMSType | None = None,
+        lti_class_id: int | None = None,
+    ) -> None:
+        """Set-based `create` for many users at once.
+
+        Like `create`, an existing enrollment keeps its role and summary
+        subscription (unless newly subscribed) but takes the new sync source.
+        """
+        if not subscribed_to_summaries_by_user_id:
+            return
+        upsert = _get_upsert_stmt(session)
+        for chunk in _chunked(sorted(subscribed_to_summaries_by_user_id.items())):
+            stmt = upsert(UserClassRole).values(
+                [
+                    dict(
+                        user_id=int(user_id),
+                        class_id=int(class_id),
+                        lms_tenant=lms_tenant,
+                        lms_type=lms_type,
+                        subscribed_to_summaries=subscribed_to_summaries,
+                        lti_class_id=lti_class_id,
+                    )
+                    for user_id, subscribed_to_summaries in chunk
+                ]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UserClassRole.user_id, UserClassRole.class_id],
+                set_=dict(
+                    lms_tenant=stmt.excluded.lms_tenant,
+                    lms_type=stmt.excluded.lms_type,
+                    subscribed_to_summaries=or_(
+                        stmt.excluded.subscribed_to_summaries,
+                        UserClassRole.subscribed_to_summaries,
+                    ),
+                    lti_class_id=stmt.excluded.lti_class_id,
+                ),
+            )
+            await session.execute(stmt)
+
     @classmethod
     async def delete(cls, session: AsyncSession, user_id: int, class_id: int) -> None:
         stmt = delete(UserClassRole).where(
@@ -552,6 +871,83 @@ class UserClassRole(Base):
         await session.execute(stmt_)
         return users_to_delete
 
+    @classmethod
+    async def delete_synced_users(
+        cls,
+        session: AsyncSession,
+        class_id: int,
+        user_ids: list[int],
+        lms_type: schemas.LMSType | None,
+        lms_tenant: str | None = None,
+        lti_class_id: int | None = None,
+    ) -> list[int]:
+        """
+        Removes the given users' `UserClassRole`s if they were synced from the given LMS tenant or LTI class.
+
+        Enrollments that were added manually or by another sync source are left alone.
+
+        Returns:
+            list[int]: List of user ids whose enrollments were removed.
+        """
+        if not user_ids:
+            return []
+        source_condition = (
+            UserClassRole.lms_tenant == lms_tenant
+            if lms_tenant
+            else UserClassRole.lti_class_id == lti_class_id
+        )
+        stmt = (
+            delete(UserClassRole)
+            .where(
+                and_(
+                    UserClassRole.class_id == int(class_id),
+                    UserClassRole.user_id.in_(user_ids),
+                    UserClassRole.lms_type == lms_type,
+                    source_condition,
+                )
+            )
+            .returning(UserClassRole.user_id)
+        )
+        result = await session.execute(stmt)
+        return list(result.scalars())
+
+
+class RosterSnapshot(Base):
+    """The last roster synced into a class from one LMS source.
+
+    `entries` maps each member's roster key to the fingerprint of their roster
+    row and the user id it resolved to, so the next sync only has to apply the
+    rows that changed.
+    """
+
+    __tablename__ = "roster_snapshots"
+    __table_args__ = (
+        UniqueConstraint("class_id", "source", name="_roster_snapshot_class_source_uc"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    class_id: Mapped[int] = mapped_column(
+        ForeignKey("classes.id", ondelete="cascade"), nullable=False
+    )
+    source: Mapped[str] = mapped_column(String, nullable=False)
+    content_hash: Mapped[str] = mapped_column(String, nullable=False)
+    entries: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False)
+    last_full_sync_at = Column(DateTime(timezone=True), nullable=False)
+    created = Column(DateTime(timezone=True), server_default=func.now())
+    updated = Column(DateTime(timezone=True), onupdate=func.now())
+
+    @classmethod
+    async def get(
+        cls, session: AsyncSession, class_id: int, source: str
+    ) -> Optional["RosterSnapshot"]:
+        stmt = select(RosterSnapshot).where(
+            and_(
+                RosterSnapshot.class_id == int(class_id),
+                RosterSnapshot.source == source,
+            )
+        )
+        return await session.scalar(stmt)
+
 
 class UserInstitutionRole(Base):
     __tablename__ = "users_institutions"
@@ -996,6 +1392,74 @@ class ExternalLogin(Base):
         result = await session.scalar(stmt)
         return result
 
+    @classmethod
+    async def get_linked_identities(
+        cls, session: AsyncSession, user_ids: Collection[int]
+    ) -> set[tuple[int, str, str]]:
+        """Returns the (user id, provider, identifier) external logins of the users.
+
+        Only logins fully linked to their provider (`provider` matches the name
+        of the `provider_id` row) are returned; `create_or_update` would not
+        change any of them.
+        """
+        linked: set[tuple[int, str, str]] = set()
+        for chunk in _chunked(sorted(set(user_ids))):
+            rows = await session.execute(
+                select(
+                    ExternalLogin.user_id,
+                    ExternalLogin.provider,
+                    ExternalLogin.identifier,
+                )
+                .join(
+                    ExternalLoginProvider,
+                    ExternalLogin.provider_id == ExternalLoginProvider.id,
+                )
+                .where(
+                    and_(
+                        ExternalLogin.user_id.in_(chunk),
+                        ExternalLogin.provider == ExternalLoginProvider.name,
+                    )
+                )
+            )
+            linked.update(
+                (user_id, provider, identifier)
+                for user_id, provider, identifier in rows
+            )
+        return linked
+
+    @classmethod
+    async def create_many(
+        cls, session: AsyncSession, logins: Collection[tuple[int, str, str]]
+    ) -> int:
+        """Inserts (user id, provider, identifier) external logins in bulk.
+
+        Meant for users who were just created and identifiers that are not
+        linked to anyone yet, where `create_or_update` would insert every row.
+        Rows that already exist are skipped. Returns the number inserted.
+        """
+        provider_ids = {
+            name: (await ExternalLoginProvider.get_or_create_by_name(session, name)).id
+            for name in sorted({provider for _, provider, _ in logins})
+        }
+        values = [
+            {
+                "user_id": user_id,
+                "provider": provider,
+                "provider_id": provider_ids[provider],
+                "identifier": identifier,
+            }
+            for user_id, provider, identifier in logins
+        ]
+        inserted = 0
+        for chunk in _chunked(values):
+            result = await session.execute(
+                _get_upsert_stmt(session)(ExternalLogin)
+                .values(list(chunk))
+                .on_conflict_do_nothing()
+            )
+            inserted += max(result.rowcount, 0)
+        return inserted
+
     @classmethod
     async def create_or_update(
         cls,
@@ -1436,6 +1900,177 @@ user_merge_association = Table(
 )
 
 
+class UserMergeAudit(Base):
+    """What one user merge moved, written by `merge.merge_many`.
+
+    User ids are kept as plain integers since the old user is deleted by the
+    merge, and the record should outlive either account.
+    """
+
+    __tablename__ = "user_merge_audits"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    batch_id: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    new_user_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    old_user_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    # table or relation name -> number of rows moved to the new user
+    rows_moved: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False)
+    tuples_moved: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created = Column(DateTime(timezone=True), server_default=func.now())
+
+    @classmethod
+    async def get_by_old_user_id(
+        cls, session: AsyncSession, old_user_id: int
+    ) -> list["UserMergeAudit"]:
+        stmt = select(UserMergeAudit).where(UserMergeAudit.old_user_id == old_user_id)
+        return list(await session.scalars(stmt))
+
+
+class ClassCopyJob(Base):
+    """Progress of one class copy, written by `copy.run_class_copy`.
+
+    Each step of the copy commits together with its entry in
+    `completed_steps`, and assistants are recorded in `copied_assistants` as
+    they are copied, so a failed copy can be resumed where it stopped.
+    """
+
+    __tablename__ = "class_copy_jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    source_class_id: Mapped[int] = mapped_column(
+        ForeignKey("classes.id", ondelete="cascade"), nullable=False, index=True
+    )
+    target_class_id: Mapped[int | None] = mapped_column(
+        ForeignKey("classes.id", ondelete="SET NULL"), nullable=True
+    )
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="cascade"), nullable=False
+    )
+    # schemas.CopyClassRequest
+    options: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False)
+    status: Mapped[schemas.ClassCopyJobStatus] = mapped_column(
+        SQLEnum(schemas.ClassCopyJobStatus), nullable=False
+    )
+    completed_steps: Mapped[list[str]] = mapped_column(
+        JSON, nullable=False, default=list
+    )
+    # source assistant id -> copied assistant id
+    copied_assistants: Mapped[dict[str, int]] = mapped_column(
+        JSON, nullable=False, default=dict
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[str | None] = mapped_column(String, nullable=True)
+    created = Column(DateTime(timezone=True), server_default=func.now())
+    updated = Column(DateTime(timezone=True), onupdate=func.now())
+    finished_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    @classmethod
+    async def create(
+        cls,
+        session: AsyncSession,
+        source_class_id: int,
+        user_id: int,
+        options: schemas.CopyClassRequest,
+    ) -> "ClassCopyJob":
+        job = ClassCopyJob(
+            source_class_id=source_class_id,
+            user_id=user_id,
+            options=options.model_dump(mode="json"),
+            status=schemas.ClassCopyJobStatus.RUNNING,
+            completed_steps=[],
+            copied_assistants={},
+        )
+        session.add(job)
+        await session.flush()
+        return job
+
+    @classmethod
+    async def get_by_id(cls, session: AsyncSession, id_: int) -> "ClassCopyJob | None":
+        return await session.get(ClassCopyJob, int(id_), populate_existing=True)
+
+    @classmethod
+    async def list_failed(cls, session: AsyncSession) -> list["ClassCopyJob"]:
+        stmt = (
+            select(ClassCopyJob)
+            .where(ClassCopyJob.status == schemas.ClassCopyJobStatus.FAILED)
+            .order_by(ClassCopyJob.id)
+        )
+        return list(await session.scalars(stmt))
+
+
+class DataMigrationShard(Base):
+    """Checkpoint for one key range of a data migration run by
+    `migrations.sharded.run_sharded_migration`.
+
+    `cursor` is the last key the shard has processed. It is committed after
+    every batch, so an interrupted run resumes from there.
+    """
+
+    __tablename__ = "data_migration_shards"
+    __table_args__ = (
+        UniqueConstraint("migration", "shard", name="uq_data_migration_shard"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    migration: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    shard: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Keys in (cursor, end_id) are left to process.
+    end_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    cursor: Mapped[int] = mapped_column(Integer, nullable=False)
+    processed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created = Column(DateTime(timezone=True), server_default=func.now())
+    updated = Column(DateTime(timezone=True), onupdate=func.now())
+    completed_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    @classmethod
+    async def create_many(
+        cls, session: AsyncSession, migration: str, ranges: list[tuple[int, int]]
+    ) -> list["DataMigrationShard"]:
+        """Create one shard for each (after_id, end_id) range."""
+        shards = [
+            DataMigrationShard(
+                migration=migration,
+                shard=i,
+                cursor=after_id,
+                end_id=end_id,
+                processed=0,
+                failed=0,
+            )
+            for i, (after_id, end_id) in enumerate(ranges)
+        ]
+        session.add_all(shards)
+        await session.flush()
+        return shards
+
+    @classmethod
+    async def get_by_migration(
+        cls, session: AsyncSession, migration: str
+    ) -> list["DataMigrationShard"]:
+        stmt = (
+            select(DataMigrationShard)
+            .where(DataMigrationShard.migration == migration)
+            .order_by(DataMigrationShard.shard)
+        )
+        return list(await session.scalars(stmt))
+
+    @classmethod
+    async def get_by_id(
+        cls, session: AsyncSession, id_: int
+    ) -> "DataMigrationShard | None":
+        return await session.get(DataMigrationShard, int(id_), populate_existing=True)
+
+    @classmethod
+    async def delete_by_migration(cls, session: AsyncSession, migration: str) -> None:
+        await session.execute(
+            delete(DataMigrationShard).where(DataMigrationShard.migration == migration)
+        )
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -1676,6 +2311,161 @@ class User(Base):
 
         return email_match, sorted(all_matched_user_ids)
 
+    @classmethod
+    async def get_many_by_email_external_logins_priority(
+        cls,
+        session: AsyncSession,
+        lookups: list[tuple[str, list[schemas.ExternalLoginLookupItem]]],
+    ) -> list[tuple["User | None", list[int]] | None]:
+        """Batched `get_by_email_external_logins_priority` for many lookups.
+
+        Runs a fixed number of queries however many lookups there are. Each
+        result matches what `get_by_email_external_logins_priority` would return
+        for that lookup against the current database, or is None if the lookup
+        has to go through `get_by_email_external_logins_priority` to raise the
+        right error (invalid lookup items, ambiguous matches).
+        """
+        emails: set[str] = set()
+        provider_ids_requested: set[int] = set()
+        provider_names_requested: set[str] = set()
+        for email, lookup_items in lookups:
+            email = email.strip()
+            if email and email.isascii():
+                emails.add(email.lower())
+            for item in lookup_items:
+                if item.provider_id is not None:
+                    provider_ids_requested.add(item.provider_id)
+                if item.provider is not None and item.provider.strip():
+                    provider_names_requested.add(item.provider.lower().strip())
+
+        users_by_email: dict[str, User] = {}
+        ambiguous_emails: set[str] = set()
+        for chunk in _chunked(sorted(emails)):
+            for user in await session.scalars(
+                select(User).where(func.lower(User.email).in_(chunk))
+            ):
+                key = user.email.lower()
+                if key in users_by_email:
+                    ambiguous_emails.add(key)
+                users_by_email[key] = user
+
+        provider_names_by_id: dict[int, str] = {}
+        provider_ids_by_name: dict[str, int] = {}
+        provider_filters: list[BinaryExpression] = []
+        if provider_ids_requested:
+            provider_filters.append(
+                ExternalLoginProvider.id.in_(provider_ids_requested)
+            )
+        if provider_names_requested:
+            provider_filters.append(
+                func.lower(ExternalLoginProvider.name).in_(provider_names_requested)
+            )
+        if provider_filters:
+            provider_rows = await session.execute(
+                select(ExternalLoginProvider.id, ExternalLoginProvider.name).where(
+                    or_(*provider_filters)
+                )
+            )
+            for provider_id, provider_name in provider_rows:
+                normalized_provider_name = provider_name.lower().strip()
+                provider_names_by_id[provider_id] = normalized_provider_name
+                provider_ids_by_name[normalized_provider_name] = provider_id
+
+        # Resolve each lookup's items to (provider id, identifier) pairs, the
+        # same way `get_by_email_external_logins_priority` does.
+        pairs_by_lookup: list[list[tuple[int, str]] | None] = []
+        all_pairs: set[tuple[int, str]] = set()
+        for email, lookup_items in lookups:
+            pairs: list[tuple[int, str]] | None = []
+            for lookup_item in lookup_items:
+                identifier = lookup_item.identifier.strip()
+                provider_name = (
+                    lookup_item.provider.lower().strip()
+                    if lookup_item.provider is not None
+                    else None
+                ) or None
+                provider_id = lookup_item.provider_id
+                if not identifier or (provider_name is None and provider_id is None):
+                    pairs = None
+                    break
+                if provider_id is not None:
+                    provider_name_from_id = provider_names_by_id.get(provider_id)
+                    if provider_name_from_id is None:
+                        if provider_name is not None:
+                            pairs = None
+                            break
+                        continue
+                    if provider_name and provider_name != provider_name_from_id:
+                        pairs = None
+                        break
+                    resolved_provider_id = provider_id
+                else:
+                    resolved_provider_id = provider_ids_by_name.get(provider_name)
+                    if resolved_provider_id is None:
+                        continue
+                pairs.append((resolved_provider_id, identifier))
+            pairs_by_lookup.append(pairs)
+            all_pairs.update(pairs or [])
+
+        user_ids_by_pair: dict[tuple[int, str], set[int]] = {}
+        for chunk in _chunked(sorted(all_pairs)):
+            matched_rows = await session.execute(
+                select(
+                    ExternalLogin.provider_id,
+                    ExternalLogin.identifier,
+                    ExternalLogin.user_id,
+                ).where(
+                    tuple_(ExternalLogin.provider_id, ExternalLogin.identifier).in_(
+                        chunk
+                    )
+                )
+            )
+            for provider_id, identifier, user_id in matched_rows:
+                user_ids_by_pair.setdefault((provider_id, identifier), set()).add(
+                    user_id
+                )
+
+        matched_user_ids = {
+            user_id for user_ids in user_ids_by_pair.values() for user_id in user_ids
+        }
+        users_by_id = {user.id: user for user in users_by_email.values()}
+        missing_user_ids = sorted(matched_user_ids - set(users_by_id))
+        for chunk in _chunked(missing_user_ids):
+            for user in await session.scalars(select(User).where(User.id.in_(chunk))):
+                users_by_id[user.id] = user
+
+        results: list[tuple[User | None, list[int]] | None] = []
+        for (email, _), pairs in zip(lookups, pairs_by_lookup):
+            email_key = email.strip().lower()
+            if (
+                pairs is None
+                or not email_key
+                or not email_key.isascii()
+                or email_key in ambiguous_emails
+            ):
+                results.append(None)
+                continue
+            email_match = users_by_email.get(email_key)
+            all_matched_user_ids = {email_match.id} if email_match else set()
+            for pair in pairs:
+                all_matched_user_ids.update(user_ids_by_pair.get(pair, set()))
+
+            result: tuple[User | None, list[int]] | None = (
+                email_match,
+                sorted(all_matched_user_ids),
+            )
+            for pair in pairs:
+                matched_user_ids_for_pair = user_ids_by_pair.get(pair, set())
+                if len(matched_user_ids_for_pair) == 1:
+                    user = users_by_id.get(next(iter(matched_user_ids_for_pair)))
+                    result = (user, sorted(all_matched_user_ids)) if user else None
+                    break
+                if len(matched_user_ids_for_pair) > 1:
+                    result = None
+                    break
+            results.append(result)
+        return results
+
     @classmethod
     async def get_by_email_sso(
         cls,
@@ -1870,6 +2660,25 @@ class User(Base):
         result = await session.execute(stmt)
         return [row.User for row in result]
 
+    @classmethod
+    async def create_many(
+        cls, session: AsyncSession, users: list["User"]
+    ) -> list["User"]:
+        """Inserts new users in one flush and loads their server defaults."""
+        if not users:
+            return []
+        session.add_all(users)
+        await session.flush()
+        ids = [user.id for user in users]
+        for chunk in _chunked(ids):
+            result = await session.scalars(
+                select(User)
+                .where(User.id.in_(chunk))
+                .execution_options(populate_existing=True)
+            )
+            result.all()
+        return users
+
     @classmethod
     async def get_all_by_id_if_in_class(
         cls, session: AsyncSession, ids: List[int], class_id: int
@@ -5780,6 +6589,22 @@ class VectorStore(Base):
             return []
         return vector_store.files
 
+    @classmethod
+    async def get_files_by_ids(
+        cls, session: AsyncSession, ids: list[int]
+    ) -> dict[int, list["File"]]:
+        """Bulk `get_files_by_id`, keyed by vector store id."""
+        files = dict[int, list[File]]()
+        for chunk in _chunked(sorted({int(id_) for id_ in ids})):
+            stmt = (
+                select(VectorStore)
+                .where(VectorStore.id.in_(chunk))
+                .options(selectinload(VectorStore.files))
+            )
+            for vector_store in await session.scalars(stmt):
+                files[vector_store.id] = vector_store.files
+        return files
+
     @classmethod
     async def get_file_obj_ids_by_id(cls, session: AsyncSession, id_: int) -> List[str]:
         stmt = (
@@ -6214,8 +7039,21 @@ class Assistant(Base):
                 selectinload(LectureSlideDeck.additional_context_files).selectinload(
                     LectureSlideAdditionalContextFile.file
                 ),
-                selectinload(LectureSlideDeck.pages),
-                selectinload(LectureSlideDeck.questions),
+                selectinload(LectureSlideDeck.pages).selectinload(
+                    LectureSlidePage.narration
+                ),
+                selectinload(LectureSlideDeck.questions).selectinload(
+                    LectureSlideQuestion.options
+                ),
+                selectinload(LectureSlideDeck.questions).selectinload(
+                    LectureSlideQuestion.correct_option
+                ),
+                selectinload(LectureSlideDeck.questions).selectinload(
+                    LectureSlideQuestion.intro_narration
+                ),
+                selectinload(LectureSlideDeck.questions)
+                .selectinload(LectureSlideQuestion.options)
+                .selectinload(LectureSlideQuestionOption.post_narration),
             ),
         )
 
@@ -9952,6 +10790,21 @@ class Thread(Base):
         for row in result:
             yield row.Thread
 
+    @classmethod
+    async def get_threads_by_assistant_ids(
+        cls,
+        session: AsyncSession,
+        assistant_ids: Sequence[int],
+        after: datetime | None = None,
+    ) -> list["Thread"]:
+        threads = list["Thread"]()
+        for chunk in _chunked(list(assistant_ids)):
+            stmt = select(Thread).where(Thread.assistant_id.in_(chunk))
+            if after:
+                stmt = stmt.where(Thread.last_activity > after)
+            threads.extend((await session.scalars(stmt.order_by(Thread.id))).all())
+        return threads
+
     @classmethod
     async def get_id_by_thread_id(cls, session: AsyncSession, thread_id: str) -> int:
         stmt = select(Thread.id).where(Thread.thread_id == thread_id)
@@ -10651,6 +11504,44 @@ class Thread(Base):
         result = await session.execute(stmt)
         return result.scalars().all()
 
+    @classmethod
+    async def list_first_messages_by_thread_ids(
+        cls,
+        session: AsyncSession,
+        thread_ids: Sequence[int],
+        limit: int = 10,
+    ) -> dict[int, list["Message"]]:
+        """The first `limit` messages of each thread, in output order.
+
+        Equivalent to `list_messages(..., limit=limit, order="asc")` per thread,
+        in one query per chunk of threads.
+        """
+        messages = dict[int, list["Message"]]()
+        for chunk in _chunked(list(thread_ids)):
+            position = (
+                func.row_number()
+                .over(
+                    partition_by=Message.thread_id,
+                    order_by=(asc(Message.output_index), asc(Message.id)),
+                )
+                .label("position")
+            )
+            ranked = (
+                select(Message.id, position)
+                .where(Message.thread_id.in_(chunk))
+                .subquery()
+            )
+            stmt = (
+                select(Message)
+                .join(ranked, ranked.c.id == Message.id)
+                .where(ranked.c.position <= limit)
+                .order_by(Message.thread_id, ranked.c.position)
+                .options(selectinload(Message.content))
+            )
+            for message in (await session.scalars(stmt)).all():
+                messages.setdefault(message.thread_id, []).append(message)
+        return messages
+
     @classmethod
     async def list_all_messages_gen(
         cls,
@@ -11246,3 +12137,96 @@ class LTIOIDCSession(Base):
         session.add(oidc_session)
         await session.flush()
         return oidc_session
+
+
+class EmailOutbox(Base):
+    """An outbound email waiting for, or done with, delivery.
+
+    Rows are claimed by the dispatcher in `pingpong.email_outbox` with a
+    lease, so a crashed dispatcher's emails go out again once it expires.
+    """
+
+    __tablename__ = "email_outbox"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # Enqueueing a key that is already in the outbox is a no-op.
+    idempotency_key: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    to_address: Mapped[str] = mapped_column(String, nullable=False)
+    subject: Mapped[str] = mapped_column(String, nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[schemas.EmailOutboxStatus] = mapped_column(
+        SQLEnum(schemas.EmailOutboxStatus),
+        nullable=False,
+        server_default=schemas.EmailOutboxStatus.QUEUED.name,
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    last_error: Mapped[str | None] = mapped_column(String, nullable=True)
+    lease_token: Mapped[str | None] = mapped_column(String, nullable=True)
+    leased_by: Mapped[str | None] = mapped_column(String, nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    sent_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    created: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        Index("email_outbox_status_next_attempt_idx", "status", "next_attempt_at"),
+    )
+
+    @classmethod
+    async def enqueue_many(
+        cls, session: AsyncSession, emails: list[dict[str, Any]]
+    ) -> int:
+        """Adds emails to the outbox, skipping idempotency keys already in it.
+
+        Each email is a dict of `idempotency_key`, `to_address`, `subject`,
+        `body` and `next_attempt_at`. Returns the number of emails added.
+        """
+        added = 0
+        for chunk in _chunked(emails):
+            stmt = (
+                _get_upsert_stmt(session)(EmailOutbox)
+                .values(chunk)
+                .on_conflict_do_nothing(index_elements=["idempotency_key"])
+                .returning(EmailOutbox.id)
+            )
+            added += len((await session.execute(stmt)).all())
+        return added
+
+    @classmethod
+    async def count_by_status(
+        cls,
+        session: AsyncSession,
+        statuses: Sequence[schemas.EmailOutboxStatus],
+    ) -> dict[schemas.EmailOutboxStatus, int]:
+        stmt = (
+            select(EmailOutbox.status, func.count(EmailOutbox.id))
+            .where(EmailOutbox.status.in_(statuses))
+            .group_by(EmailOutbox.status)
+        )
+        return {status: n for status, n in await session.execute(stmt)}
+
+    @classmethod
+    async def requeue_dead(cls, session: AsyncSession, now: datetime) -> int:
+        """Puts dead-lettered emails back in the queue with fresh attempts."""
+        stmt = (
+            update(EmailOutbox)
+            .where(EmailOutbox.status == schemas.EmailOutboxStatus.DEAD)
+            .values(
+                status=schemas.EmailOutboxStatus.QUEUED,
+                attempts=0,
+                next_attempt_at=now,
+            )
+        )
+        result = await session.execute(stmt)
+        return result.rowcount
@@ -1,7 +1,9 @@
 import asyncio
 import calendar
+import functools
 import logging
-from datetime import datetime, timedelta, timezone
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta, timezone, tzinfo
 from typing import Callable, Optional
 
 NowFn = Callable[[], datetime]
@@ -16,6 +18,14 @@ def offset(now: NowFn, seconds: int = 0) -> NowFn:
     return lambda: now() + timedelta(seconds=seconds)
 
 
+def as_utc(value: datetime) -> datetime:
+    """Return `value` with UTC timezone info if it has none.
+
+    SQLite returns naive datetimes even for timezone-aware columns.
+    """
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
 def _parse_cron_element(element: str) -> list[int]:
     """
     Parse a cron element into a list of valid integers.
@@ -85,6 +95,124 @@ def _matches(
         raise ValueError(f"Invalid cron pattern: {pattern}") from e
 
 
+_MINUTES = range(0, 60)
+_HOURS = range(0, 24)
+_DAYS = range(1, 32)
+_MONTHS = range(1, 13)
+# Sunday is 0.
+_WEEKDAYS = range(0, 7)
+
+_SEARCH_YEARS = 400
+"""The Gregorian calendar repeats every 400 years, weekdays included."""
+
+
+def _bits(values: Iterable[int]) -> int:
+    mask = 0
+    for value in values:
+        mask |= 1 << value
+    return mask
+
+
+def _first_bit(mask: int, start: int = 0) -> int | None:
+    """The lowest set bit of `mask` at or above `start`."""
+    mask &= ~((1 << start) - 1)
+    if not mask:
+        return None
+    return (mask & -mask).bit_length() - 1
+
+
+def _iter_bits(mask: int, start: int = 0) -> Iterator[int]:
+    while (value := _first_bit(mask, start)) is not None:
+        yield value
+        start = value + 1
+
+
+class CronSchedule:
+    """A cron expression compiled into one bitset per field.
+
+    Fields are matched as `_matches` does: the day of month and the day of
+    week must both match, and `*/n` steps count from 0 in every field.
+    """
+
+    __slots__ = ("minutes", "hours", "days", "months", "_days_by_first_weekday")
+
+    def __init__(self, sched: str):
+        try:
+            minute, hour, day, month, weekday = sched.split()
+        except ValueError:
+            raise ValueError("Invalid cron format. Expected 5 fields.")
+
+        self.minutes = self._field(minute, _MINUTES)
+        self.hours = self._field(hour, _HOURS)
+        self.days = self._field(day, _DAYS)
+        self.months = self._field(month, _MONTHS)
+        weekdays = self._field(weekday, _WEEKDAYS)
+        # Days of the month that fall on a matching weekday, for each weekday
+        # the month can start on.
+        self._days_by_first_weekday = [
+            self.days & _bits(d for d in _DAYS if weekdays >> ((first + d - 1) % 7) & 1)
+            for first in _WEEKDAYS
+        ]
+
+    @staticmethod
+    def _field(pattern: str, domain: range) -> int:
+        try:
+            values = _parse_cron_element(pattern)
+        except ValueError as e:
+            raise ValueError(f"Invalid cron pattern: {pattern}") from e
+        if not values:
+            return _bits(domain)
+        return _bits(v for v in values if v in domain)
+
+    def _days_in(self, year: int, month: int) -> int:
+        first_weekday, last_day = calendar.monthrange(year, month)
+        # calendar counts weekdays from Monday.
+        days = self._days_by_first_weekday[(first_weekday + 1) % 7]
+        return days & ((1 << (last_day + 1)) - 1)
+
+    def _wall_times(self, start: datetime) -> Iterator[datetime]:
+        """Matching naive times at or after `start`, in order."""
+        for year in range(start.year, start.year + _SEARCH_YEARS):
+            same_year = year == start.year
+            for month in _iter_bits(self.months, start.month if same_year else 1):
+                same_month = same_year and month == start.month
+                days = self._days_in(year, month)
+                for day in _iter_bits(days, start.day if same_month else 1):
+                    same_day = same_month and day == start.day
+                    for hour in _iter_bits(self.hours, start.hour if same_day else 0):
+                        same_hour = same_day and hour == start.hour
+                        for minute in _iter_bits(
+                            self.minutes, start.minute if same_hour else 0
+                        ):
+                            yield datetime(year, month, day, hour, minute)
+
+    def next_run_time(self, ts: datetime, tz: tzinfo = timezone.utc) -> datetime:
+        """The first matching minute after `ts`, as wall-clock time in `tz`.
+
+        A time skipped by a DST change runs at the same offset past the
+        change (02:30 becomes 03:30). A time that repeats runs once, on its
+        first occurrence.
+        """
+        ts_utc = ts.astimezone(timezone.utc)
+        local = ts.astimezone(tz)
+        start = local.replace(tzinfo=None, second=0, microsecond=0)
+        start += timedelta(minutes=1)
+        for wall in self._wall_times(start):
+            candidate = wall.replace(tzinfo=tz).astimezone(timezone.utc)
+            # Compare in UTC: comparing in `tz` ignores which pass through a
+            # repeated hour each time is on.
+            if candidate > ts_utc:
+                return candidate.astimezone(tz)
+        raise ValueError(
+            "Unable to find next run time. Possible invalid cron expression."
+        )
+
+
+@functools.lru_cache(maxsize=128)
+def compile_cron(sched: str) -> CronSchedule:
+    return CronSchedule(sched)
+
+
 def _get_next_run_time(sched: str, ts: datetime, tz=timezone.utc) -> datetime:
     """
     Calculate the next run time based on a cron expression.
@@ -98,97 +226,9 @@ def _get_next_run_time(sched: str, ts: datetime, tz=timezone.utc) -> datetime:
         datetime: The next run time.
 
     Raises:
-        ValueError: If the cron format is invalid or if unable to find next run time within MAX_ITERATIONS
+        ValueError: If the cron format is invalid or if no time can ever match it
     """
-    MAX_ITERATIONS = 1000  # Prevent infinite loops
-    iteration_count = 0
-
-    # Split the cron schedule into its components
-    try:
-        minute, hour, day, month, weekday = sched.split()
-    except ValueError:
-        raise ValueError("Invalid cron format. Expected 5 fields.")
-
-    # Start with the current timestamp
-    ts = ts.astimezone(tz)
-    ts = ts.replace(second=0, microsecond=0)
-    original_ts = ts
-
-    # If we're looking for a specific day (not *), store it
-    target_day = None if day == "*" else int(day)
-
-    while iteration_count < MAX_ITERATIONS:
-        iteration_count += 1
-
-        if target_day:
-            _, last_day = calendar.monthrange(ts.year, ts.month)
-            if target_day > last_day:
-                # Skip to next month if target day is greater than days in current month
-                if ts.month == 12:
-                    ts = ts.replace(year=ts.year + 1, month=1, day=1)
-                else:
-                    ts = ts.replace(month=ts.month + 1, day=1)
-                ts = ts.replace(hour=0, minute=0, second=0)
-                continue
-            elif ts.day > target_day:
-                # If we've passed the target day in current month, move to next month
-                if ts.month == 12:
-                    ts = ts.replace(year=ts.year + 1, month=1, day=target_day)
-                else:
-                    ts = ts.replace(month=ts.month + 1, day=target_day)
-                ts = ts.replace(hour=0, minute=0, second=0)
-                continue
-
-        # Convert weekday to cron format (0-6, where 0 is Sunday)
-        cron_wday = ts.weekday()
-        if weekday != "*":  # Only adjust if we're checking specific days
-            cron_wday = (
-                ts.weekday() + 1
-            ) % 7  # Convert to cron format where 1-7 represents Mon-Sun
-
-        matches_all = (
-            _matches(minute, ts.minute)
-            and _matches(hour, ts.hour)
-            and _matches(day, ts.day, ts.year, ts.month)
-            and _matches(month, ts.month)
-            and _matches(weekday, cron_wday)
-        )
-
-        if matches_all:
-            if ts <= original_ts:
-                ts += timedelta(minutes=1)
-                ts = ts.replace(second=0)
-                continue
-            return ts
-
-        if not _matches(minute, ts.minute):
-            ts += timedelta(minutes=1)
-            ts = ts.replace(second=0)
-            continue
-
-        if not _matches(hour, ts.hour):
-            ts += timedelta(hours=1)
-            ts = ts.replace(minute=0, second=0)
-            continue
-
-        if not _matches(day, ts.day, ts.year, ts.month) or not _matches(
-            weekday, cron_wday
-        ):
-            ts += timedelta(days=1)
-            ts = ts.replace(hour=0, minute=0, second=0)
-            continue
-
-        if not _matches(month, ts.month):
-            if ts.month == 12:
-                ts = ts.replace(year=ts.year + 1, month=1, day=1)
-            else:
-                ts = ts.replace(month=ts.month + 1, day=1)
-            ts = ts.replace(hour=0, minute=0, second=0)
-            continue
-
-    raise ValueError(
-        f"Unable to find next run time within {MAX_ITERATIONS} iterations. Possible invalid cron expression or infinite loop detected."
-    )
+    return compile_cron(sched).next_run_time(ts, tz)
 
 
 async def croner(
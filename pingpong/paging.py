@@ -0,0 +1,100 @@
+"""Pipelined paging through LMS APIs.
+
+Canvas and NRPS both page with a `next` link, so a page cannot be requested
+before the previous one has arrived. What can overlap is the network and the
+caller: `prefetch_pages` fetches ahead in a background task while the caller
+is still processing earlier pages, up to `lookahead` pages ahead, and hands
+pages over strictly in order.
+
+`shared_connector` gives the LMS clients one pooled connector per event loop,
+so keep-alive connections to each host are reused across the many short-lived
+client sessions of a roster sync run instead of being opened per class.
+"""
+
+import asyncio
+import weakref
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from typing import TypeVar
+
+import aiohttp
+
+T = TypeVar("T")
+
+PAGE_PREFETCH_LOOKAHEAD = 2
+LMS_CONNECTIONS_PER_HOST = 16
+LMS_DNS_CACHE_TTL_SECONDS = 300
+
+# Connectors are bound to the loop they were created on.
+_connectors: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, aiohttp.TCPConnector
+] = weakref.WeakKeyDictionary()
+
+
+def shared_connector() -> aiohttp.TCPConnector:
+    """Returns the pooled connector for LMS requests on the running loop.
+
+    Sessions using it must pass `connector_owner=False` so closing a session
+    leaves the pool open.
+    """
+    loop = asyncio.get_running_loop()
+    connector = _connectors.get(loop)
+    if connector is None or connector.closed:
+        connector = aiohttp.TCPConnector(
+            limit_per_host=LMS_CONNECTIONS_PER_HOST,
+            ttl_dns_cache=LMS_DNS_CACHE_TTL_SECONDS,
+        )
+        _connectors[loop] = connector
+    return connector
+
+
+async def close_shared_connector() -> None:
+    """Closes the pooled connector of the running loop, if there is one."""
+    connector = _connectors.pop(asyncio.get_running_loop(), None)
+    if connector is not None:
+        await connector.close()
+
+
+_DONE = object()
+
+
+async def prefetch_pages(
+    fetch_page: Callable[[str], Awaitable[tuple[T, str | None]]],
+    start_url: str,
+    lookahead: int = PAGE_PREFETCH_LOOKAHEAD,
+) -> AsyncGenerator[T, None]:
+    """Yields every page of a `next`-linked listing, fetching ahead.
+
+    `fetch_page` returns a page and the URL of the next one, if any. An error
+    while fetching is raised after the pages before it have been yielded. If
+    the caller stops early, the fetch in flight is cancelled once the
+    generator is closed, so callers that may stop early should iterate it in
+    `contextlib.aclosing`. `fetch_page` runs in a background task and must not
+    use the caller's DB session.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, lookahead))
+
+    async def _fetch_all() -> None:
+        next_url: str | None = start_url
+        try:
+            while next_url:
+                page, next_url = await fetch_page(next_url)
+                await queue.put((page, None))
+        except Exception as e:
+            await queue.put((None, e))
+            return
+        await queue.put((_DONE, None))
+
+    fetcher = asyncio.create_task(_fetch_all())
+    try:
+        while True:
+            page, error = await queue.get()
+            if error is not None:
+                raise error
+            if page is _DONE:
+                return
+            yield page
+    finally:
+        # Wait for the cancelled fetch to unwind, so the caller can close
+        # whatever it shares with `fetch_page` (e.g. an HTTP session).
+        fetcher.cancel()
+        await asyncio.wait([fetcher])
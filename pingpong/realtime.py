@@ -1,10 +1,9 @@
 import asyncio
 import binascii
-import base64
 from collections import deque
 import json
 import logging
-import struct
+import time
 from dataclasses import dataclass
 from heapq import heappop, heappush
 from typing import Awaitable, Callable, Literal, cast
@@ -21,9 +20,13 @@ from openai.resources.realtime.realtime import AsyncRealtimeConnection
 from pingpong.ai import (
     OpenAIClientType,
 )
+import pingpong.metrics as metrics
 import pingpong.schemas as schemas
+from pingpong.config import config
 from pingpong.log_utils import sanitize_for_log
 from pingpong.models import Thread, MessagePart, Message, Run
+from pingpong.realtime_audio_frames import AudioFrameError, RealtimeAudioTransport
+from pingpong.realtime_telemetry import VoiceSessionTelemetry
 from pingpong.realtime_recorder import (
     AUDIO_CHANNELS,
     AUDIO_FRAME_RATE,
@@ -47,6 +50,7 @@ openai_connection_logger = logging.getLogger("realtime_openai")
 TaskFunc = Callable[[], Awaitable[object]]
 ConversationRole = Literal["user", "assistant"]
 UNSET_PREVIOUS_ITEM_ID = "__UNSET_PREVIOUS_ITEM_ID__"
+EVENT_LOOP_LAG_PROBE_INTERVAL_SECONDS = 0.5
 
 
 def _serialize_realtime_error(_error) -> dict[str, str | None]:
@@ -716,6 +720,7 @@ async def enqueue_ready_thread_message_tasks(
     browser_connection: StateWebSocket,
     thread: Thread,
     realtime_recorder: RealtimeRecorder | None,
+    telemetry: VoiceSessionTelemetry | None = None,
 ) -> None:
     while True:
         next_ready_message = ordering_buffer.pop_next_ready_message()
@@ -723,6 +728,8 @@ async def enqueue_ready_thread_message_tasks(
             return
 
         item_id, transcript_text, role, output_index = next_ready_message
+        if telemetry:
+            telemetry.message_dispatched(item_id)
 
         async def task(
             item_id: str = item_id,
@@ -749,7 +756,13 @@ async def handle_browser_messages(
     realtime_connection: AsyncRealtimeConnection,
     assistant_audio_tracker: RealtimeAssistantAudioTracker,
     realtime_recorder: RealtimeRecorder | None = None,
+    audio_transport: RealtimeAudioTransport | None = None,
+    telemetry: VoiceSessionTelemetry | None = None,
 ):
+    if audio_transport is None:
+        audio_transport = RealtimeAudioTransport()
+    if telemetry is None:
+        telemetry = VoiceSessionTelemetry()
     try:
         while True:
             message = await browser_connection.receive()
@@ -818,14 +831,13 @@ async def handle_browser_messages(
                             item_id=item_id,
                         )
                         await assistant_audio_tracker.forget_item(item_id)
+                        telemetry.response_truncated(item_id)
                         if realtime_recorder:
                             await realtime_recorder.stopped_playing_assistant_response(
                                 item_id=item_id,
                                 final_duration_ms=audio_end_ms,
                             )
                     elif type == "response.audio.delta.started":
-                        if not realtime_recorder:
-                            continue
                         item_id = data.get("item_id")
                         event_id = data.get("event_id")
                         started_playing_at_ms = data.get("started_playing_at")
@@ -841,6 +853,9 @@ async def handle_browser_messages(
                                 ),
                             )
                             continue
+                        telemetry.playback_started(item_id, event_id)
+                        if not realtime_recorder:
+                            continue
                         await (
                             realtime_recorder.started_playing_assistant_response_delta(
                                 item_id=item_id,
@@ -875,23 +890,22 @@ async def handle_browser_messages(
                         f"Failed to decode unexpected message JSON: {e}"
                     )
             elif "bytes" in message:
-                buffer = message["bytes"]
-
-                timestamp_size = 8
-                if len(buffer) >= timestamp_size:
-                    timestamp = struct.unpack(">d", buffer[:8])[0]
-                    audio_chunk = buffer[8:]
-                    await realtime_connection.input_audio_buffer.append(
-                        audio=base64.b64encode(cast(bytes, audio_chunk)).decode("utf-8")
+                try:
+                    timestamp, audio_chunk = audio_transport.decode_user_audio(
+                        message["bytes"]
                     )
-                    if realtime_recorder:
-                        await realtime_recorder.add_user_audio(
-                            audio_chunk=audio_chunk,
-                            timestamp=timestamp,
-                        )
-                else:
+                except AudioFrameError as e:
                     browser_connection_logger.exception(
-                        f"Received insufficient data for timestamp and audio: {len(buffer)} bytes"
+                        f"Received invalid audio frame: {e}"
+                    )
+                    continue
+                await realtime_connection.input_audio_buffer.append(
+                    audio=pybase64.b64encode(audio_chunk).decode("utf-8")
+                )
+                if realtime_recorder:
+                    await realtime_recorder.add_user_audio(
+                        audio_chunk=audio_chunk,
+                        timestamp=timestamp,
                     )
             else:
                 browser_connection_logger.exception(
@@ -917,7 +931,13 @@ async def handle_openai_events(
     openai_task_queue: asyncio.Queue,
     assistant_audio_tracker: RealtimeAssistantAudioTracker,
     realtime_recorder: RealtimeRecorder | None = None,
+    audio_transport: RealtimeAudioTransport | None = None,
+    telemetry: VoiceSessionTelemetry | None = None,
 ):
+    if audio_transport is None:
+        audio_transport = RealtimeAudioTransport()
+    if telemetry is None:
+        telemetry = VoiceSessionTelemetry()
     initial_output_index = 0
     if thread.version == 3:
         try:
@@ -966,11 +986,13 @@ async def handle_openai_events(
                         browser_connection=browser_connection,
                         thread=thread,
                         realtime_recorder=realtime_recorder,
+                        telemetry=telemetry,
                     )
                 case "response.output_audio_transcript.done":
                     ordering_buffer.register_transcription(
                         event.item_id, event.transcript, "assistant"
                     )
+                    telemetry.transcript_completed(event.item_id)
                     await enqueue_ready_thread_message_tasks(
                         ordering_buffer=ordering_buffer,
                         openai_task_queue=openai_task_queue,
@@ -978,6 +1000,7 @@ async def handle_openai_events(
                         browser_connection=browser_connection,
                         thread=thread,
                         realtime_recorder=realtime_recorder,
+                        telemetry=telemetry,
                     )
                 case "response.output_audio_transcript.delta":
                     ordering_buffer.register_transcription_delta(
@@ -1021,6 +1044,7 @@ async def handle_openai_events(
                     ordering_buffer.register_transcription(
                         event.item_id, event.transcript, "user"
                     )
+                    telemetry.transcript_completed(event.item_id)
                     await enqueue_ready_thread_message_tasks(
                         ordering_buffer=ordering_buffer,
                         openai_task_queue=openai_task_queue,
@@ -1028,6 +1052,7 @@ async def handle_openai_events(
                         browser_connection=browser_connection,
                         thread=thread,
                         realtime_recorder=realtime_recorder,
+                        telemetry=telemetry,
                     )
                 case "conversation.item.input_audio_transcription.delta":
                     ordering_buffer.register_transcription_delta(
@@ -1042,20 +1067,24 @@ async def handle_openai_events(
                             "Failed to decode realtime assistant audio delta: %s",
                             e,
                         )
+                        telemetry.assistant_audio_delta_invalid()
                         continue
                     await assistant_audio_tracker.add_audio_delta(
                         item_id=event.item_id,
                         event_id=event.event_id,
                         audio_bytes=delta_audio_bytes,
                     )
-                    await browser_connection.send_json(
-                        {
-                            "type": "response.audio.delta",
-                            "audio": delta_audio_b64,
-                            "item_id": event.item_id,
-                            "event_id": event.event_id,
-                        }
+                    audio_message = audio_transport.encode_assistant_audio(
+                        item_id=event.item_id,
+                        event_id=event.event_id,
+                        audio=delta_audio_bytes,
+                        audio_b64=delta_audio_b64,
                     )
+                    if isinstance(audio_message, bytes):
+                        await browser_connection.send_bytes(audio_message)
+                    else:
+                        await browser_connection.send_text(audio_message)
+                    telemetry.assistant_audio_delta_sent(event.item_id, event.event_id)
                     if realtime_recorder:
                         await realtime_recorder.add_assistant_response_delta(
                             audio_chunk_bytes=delta_audio_bytes,
@@ -1066,6 +1095,8 @@ async def handle_openai_events(
                     await assistant_audio_tracker.mark_item_audio_done(
                         getattr(event, "item_id", None)
                     )
+                case "input_audio_buffer.speech_stopped":
+                    telemetry.speech_stopped()
                 case "input_audio_buffer.speech_started":
                     await browser_connection.send_json(
                         {
@@ -1083,7 +1114,6 @@ async def handle_openai_events(
                     | "conversation.item.deleted"
                     | "input_audio_buffer.committed"
                     | "input_audio_buffer.cleared"
-                    | "input_audio_buffer.speech_stopped"
                     | "response.created"
                     | "response.done"
                     | "response.output_item.added"
@@ -1130,6 +1160,9 @@ async def process_queue_tasks(
     try:
         while True:
             task_func = await task_queue.get()
+            metrics.voice_task_queue_depth.observe(
+                task_queue.qsize() + 1, app=config.public_url, queue=task_queue.name
+            )
             try:
                 await task_func()
             except Exception as e:
@@ -1139,6 +1172,35 @@ async def process_queue_tasks(
         task_logger.debug("Task queue processor was cancelled.")
 
 
+class EventLoopLagProbe:
+    """
+    Measures how late the event loop resumes a sleeping task during a voice
+    session. Anything that blocks the loop (e.g. CPU-bound audio work) delays
+    the audio relay by the same amount, so this is the lag users hear.
+    """
+
+    def __init__(self, interval: float = EVENT_LOOP_LAG_PROBE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.samples = 0
+        self.max_lag = 0.0
+
+    async def run(self) -> None:
+        try:
+            while True:
+                started_at = time.perf_counter()
+                await asyncio.sleep(self.interval)
+                lag = max(0.0, time.perf_counter() - started_at - self.interval)
+                self.samples += 1
+                self.max_lag = max(self.max_lag, lag)
+                metrics.voice_event_loop_lag.observe(lag, app=config.public_url)
+        except asyncio.CancelledError:
+            browser_connection_logger.debug(
+                "Voice session event loop lag: samples=%s max_lag_ms=%.1f",
+                self.samples,
+                self.max_lag * 1000,
+            )
+
+
 @ws_auth_middleware
 @ws_db_middleware
 @ws_parse_session_token
@@ -1159,6 +1221,19 @@ async def browser_realtime_websocket(
 
     openai_task_queue: NamedQueue = NamedQueue("openai_task_queue")
     assistant_audio_tracker = RealtimeAssistantAudioTracker()
+    audio_transport = RealtimeAudioTransport()
+    telemetry = VoiceSessionTelemetry()
+    if "audio_frames_version" in browser_connection.state and (
+        audio_transport.negotiate(browser_connection.state["audio_frames_version"])
+    ):
+        # Sent before any OpenAI events, so the browser knows the audio format
+        # before it starts recording or receives assistant audio.
+        await browser_connection.send_json(
+            {
+                "type": "session.audio_frames",
+                "version": browser_connection.state["audio_frames_version"],
+            }
+        )
 
     realtime_recorder: RealtimeRecorder | None = None
     if thread.display_user_info:
@@ -1177,6 +1252,8 @@ async def browser_realtime_websocket(
                 realtime_connection,
                 assistant_audio_tracker,
                 realtime_recorder,
+                audio_transport,
+                telemetry,
             )
         )
     )
@@ -1190,37 +1267,44 @@ async def browser_realtime_websocket(
                 openai_task_queue,
                 assistant_audio_tracker,
                 realtime_recorder,
+                audio_transport,
+                telemetry,
             )
         )
     )
     openai_queue_processor = asyncio.create_task(
         process_queue_tasks(openai_task_queue, openai_connection_logger)
     )
+    event_loop_lag_probe = asyncio.create_task(EventLoopLagProbe().run())
+    try:
+        if realtime_recorder:
+            realtime_tasks.append(
+                asyncio.create_task(realtime_recorder.handle_saving_buffer(every=10))
+            )
 
-    if realtime_recorder:
-        realtime_tasks.append(
-            asyncio.create_task(realtime_recorder.handle_saving_buffer(every=10))
+        _, pending = await asyncio.wait(
+            realtime_tasks,
+            return_when=asyncio.FIRST_COMPLETED,
         )
 
-    _, pending = await asyncio.wait(
-        realtime_tasks,
-        return_when=asyncio.FIRST_COMPLETED,
-    )
+        for task in pending:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, ClientDisconnect):
+                # Suppress cancellation/client disconnect exceptions: expected during shutdown/cleanup.
+                pass
+
+        # Make sure to wait for the task queue to finish processing
+        await openai_task_queue.join()
 
-    for task in pending:
-        task.cancel()
+        openai_queue_processor.cancel()
         try:
-            await task
+            await openai_queue_processor
         except (asyncio.CancelledError, ClientDisconnect):
             # Suppress cancellation/client disconnect exceptions: expected during shutdown/cleanup.
             pass
-
-    # Make sure to wait for the task queue to finish processing
-    await openai_task_queue.join()
-
-    openai_queue_processor.cancel()
-    try:
-        await openai_queue_processor
-    except (asyncio.CancelledError, ClientDisconnect):
-        # Suppress cancellation/client disconnect exceptions: expected during shutdown/cleanup.
-        pass
+    finally:
+        event_loop_lag_probe.cancel()
+        audio_transport.log_summary(browser_connection_logger)
+        telemetry.finish()
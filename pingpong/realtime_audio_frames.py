@@ -0,0 +1,230 @@
+"""Binary audio frames for the voice mode browser websocket.
+
+Audio used to travel to the browser as JSON text messages with a base64
+payload. A browser opts into binary frames with the `audio_frames=<version>`
+query parameter; when the server supports that version it replies with a
+`session.audio_frames` control event before anything else, and from then on
+audio in both directions is sent as binary websocket messages laid out as:
+
+    type (u8) | timestamp_ms (f64) | len(item_id) (u8) | len(event_id) (u8)
+    | item_id (utf-8) | event_id (utf-8) | PCM16 audio
+
+All integers are big-endian. Control events stay JSON. Browsers that never
+negotiate keep the legacy encoding: JSON assistant deltas, and user audio as
+an 8-byte timestamp followed by PCM.
+"""
+
+import json
+import logging
+import struct
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Literal
+
+import pingpong.metrics as metrics
+from pingpong.config import config
+
+AUDIO_FRAME_PROTOCOL_VERSION = 1
+_FRAME_HEADER = struct.Struct(">BdBB")
+_LEGACY_TIMESTAMP = struct.Struct(">d")
+_MAX_ID_BYTES = 255
+
+AudioFrameDirection = Literal["inbound", "outbound"]
+AudioFrameEncoding = Literal["binary", "legacy"]
+
+
+class AudioFrameType(IntEnum):
+    USER_AUDIO = 1
+    ASSISTANT_AUDIO = 2
+
+
+class AudioFrameError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class AudioFrame:
+    type: AudioFrameType
+    timestamp_ms: float
+    item_id: str
+    event_id: str
+    audio: bytes
+
+
+def encode_audio_frame(
+    frame_type: AudioFrameType,
+    *,
+    timestamp_ms: float,
+    audio: bytes,
+    item_id: str = "",
+    event_id: str = "",
+) -> bytes:
+    item_id_bytes = item_id.encode("utf-8")
+    event_id_bytes = event_id.encode("utf-8")
+    if len(item_id_bytes) > _MAX_ID_BYTES or len(event_id_bytes) > _MAX_ID_BYTES:
+        raise AudioFrameError("Audio frame ids must be at most 255 bytes.")
+    return b"".join(
+        (
+            _FRAME_HEADER.pack(
+                frame_type, timestamp_ms, len(item_id_bytes), len(event_id_bytes)
+            ),
+            item_id_bytes,
+            event_id_bytes,
+            audio,
+        )
+    )
+
+
+def decode_audio_frame(buffer: bytes) -> AudioFrame:
+    if len(buffer) < _FRAME_HEADER.size:
+        raise AudioFrameError(
+            f"Audio frame is shorter than its header: {len(buffer)} bytes"
+        )
+    frame_type, timestamp_ms, item_id_length, event_id_length = (
+        _FRAME_HEADER.unpack_from(buffer)
+    )
+    try:
+        frame_type = AudioFrameType(frame_type)
+    except ValueError:
+        raise AudioFrameError(f"Unknown audio frame type: {frame_type}")
+    ids_end = _FRAME_HEADER.size + item_id_length + event_id_length
+    if len(buffer) < ids_end:
+        raise AudioFrameError("Audio frame is shorter than its ids.")
+    try:
+        item_id = bytes(
+            buffer[_FRAME_HEADER.size : _FRAME_HEADER.size + item_id_length]
+        ).decode("utf-8")
+        event_id = bytes(buffer[_FRAME_HEADER.size + item_id_length : ids_end]).decode(
+            "utf-8"
+        )
+    except UnicodeDecodeError:
+        raise AudioFrameError("Audio frame ids are not valid UTF-8.")
+    return AudioFrame(
+        type=frame_type,
+        timestamp_ms=timestamp_ms,
+        item_id=item_id,
+        event_id=event_id,
+        audio=buffer[ids_end:],
+    )
+
+
+class RealtimeAudioTransport:
+    """
+    Per-connection audio encoding state for the browser websocket.
+
+    Tracks whether the browser negotiated binary frames, and how many bytes
+    and how much encode/decode time each direction cost, so the two encodings
+    can be compared per connection.
+    """
+
+    def __init__(self):
+        self.binary_frames = False
+        self.frames: dict[tuple[AudioFrameDirection, AudioFrameEncoding], int] = {}
+        self.wire_bytes: dict[tuple[AudioFrameDirection, AudioFrameEncoding], int] = {}
+        self.codec_seconds: dict[
+            tuple[AudioFrameDirection, AudioFrameEncoding], float
+        ] = {}
+
+    def negotiate(self, version: int | None) -> bool:
+        """Switches to binary frames if the browser asked for a supported version."""
+        self.binary_frames = version == AUDIO_FRAME_PROTOCOL_VERSION
+        return self.binary_frames
+
+    def _record(
+        self,
+        direction: AudioFrameDirection,
+        encoding: AudioFrameEncoding,
+        wire_bytes: int,
+        codec_seconds: float,
+    ) -> None:
+        key = (direction, encoding)
+        self.frames[key] = self.frames.get(key, 0) + 1
+        self.wire_bytes[key] = self.wire_bytes.get(key, 0) + wire_bytes
+        self.codec_seconds[key] = self.codec_seconds.get(key, 0.0) + codec_seconds
+        labels = {
+            "app": config.public_url,
+            "direction": direction,
+            "encoding": encoding,
+        }
+        metrics.voice_audio_bytes.inc(wire_bytes, **labels)
+        metrics.voice_audio_codec_seconds.inc(codec_seconds, **labels)
+
+    def decode_user_audio(self, buffer: bytes) -> tuple[float, bytes]:
+        """Returns the browser timestamp and PCM from an inbound binary message."""
+        started_at = time.perf_counter()
+        if self.binary_frames:
+            frame = decode_audio_frame(buffer)
+            if frame.type != AudioFrameType.USER_AUDIO:
+                raise AudioFrameError(
+                    f"Unexpected inbound audio frame type: {frame.type.name}"
+                )
+            timestamp_ms, audio = frame.timestamp_ms, frame.audio
+        else:
+            if len(buffer) < _LEGACY_TIMESTAMP.size:
+                raise AudioFrameError(
+                    f"Received insufficient data for timestamp and audio: "
+                    f"{len(buffer)} bytes"
+                )
+            timestamp_ms = _LEGACY_TIMESTAMP.unpack_from(buffer)[0]
+            audio = buffer[_LEGACY_TIMESTAMP.size :]
+        self._record(
+            "inbound",
+            "binary" if self.binary_frames else "legacy",
+            len(buffer),
+            time.perf_counter() - started_at,
+        )
+        return timestamp_ms, audio
+
+    def encode_assistant_audio(
+        self, *, item_id: str, event_id: str, audio: bytes, audio_b64: str
+    ) -> bytes | str:
+        """
+        Returns the outbound message for an assistant audio delta: a binary
+        frame if negotiated, otherwise the legacy JSON text message.
+        """
+        started_at = time.perf_counter()
+        message: bytes | str | None = None
+        if self.binary_frames:
+            try:
+                message = encode_audio_frame(
+                    AudioFrameType.ASSISTANT_AUDIO,
+                    timestamp_ms=time.time() * 1000,
+                    audio=audio,
+                    item_id=item_id,
+                    event_id=event_id,
+                )
+            except AudioFrameError:
+                # Ids that do not fit the header fall back to JSON for this delta.
+                message = None
+        if message is None:
+            # Matches the separators Starlette's send_json uses.
+            message = json.dumps(
+                {
+                    "type": "response.audio.delta",
+                    "audio": audio_b64,
+                    "item_id": item_id,
+                    "event_id": event_id,
+                },
+                separators=(",", ":"),
+                ensure_ascii=False,
+            )
+        self._record(
+            "outbound",
+            "binary" if isinstance(message, bytes) else "legacy",
+            len(message) if isinstance(message, bytes) else len(message.encode()),
+            time.perf_counter() - started_at,
+        )
+        return message
+
+    def log_summary(self, logger: logging.Logger) -> None:
+        for (direction, encoding), frames in sorted(self.frames.items()):
+            logger.debug(
+                "Voice audio transport: direction=%s encoding=%s frames=%s "
+                "bytes=%s codec_ms=%.1f",
+                direction,
+                encoding,
+                frames,
+                self.wire_bytes[(direction, encoding)],
+                self.codec_seconds[(direction, encoding)] * 1000,
+            )
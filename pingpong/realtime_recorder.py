@@ -1,6 +1,8 @@
 import asyncio
+import audioop
 from bisect import bisect
-from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, wraps
 import inspect
 from io import BytesIO
 import logging
@@ -27,12 +29,53 @@ AUDIO_APPLICATION = "voip"
 MIN_AUDIO_CHUNK_SIZE = 5 * 1024 * 1024  # S3 multipart minimum (except last)
 AUDIO_SIZE_TO_READ = 4_096
 STDIN_CHUNK_SIZE = 32_768
+# Mixing is CPU-bound, so it runs off the event loop. Each recorder has at most
+# one buffer being mixed at a time (saves are serialized by its save loop), and
+# this cap bounds how many sessions mix at once across the process.
+RECORDER_MIX_WORKERS = 2
 
 
 def make_audio_recording_id(thread_obj_id: str) -> str:
     return f"realtime_recorder_{thread_obj_id}_{uuid.uuid4().hex}.webm"
 
 
+def _frames_for_ms(duration_ms: float) -> int:
+    # Same millisecond-to-frame conversion AudioSegment uses when slicing.
+    return int(duration_ms * AUDIO_FRAME_RATE / 1000.0)
+
+
+def mix_pcm16(duration_ms: int, placements: list[tuple[int, bytes]]) -> bytes:
+    """
+    Mixes raw PCM16 clips into a silent timeline of `duration_ms`.
+
+    Each placement is `(position_ms, data)`. Overlapping samples are summed and
+    clipped exactly like `AudioSegment.overlay`, but each clip only touches its
+    own span of one preallocated buffer instead of copying the whole timeline.
+    Parts of a clip that fall outside the timeline are dropped.
+    """
+    frame_width = AUDIO_SAMPLE_WIDTH * AUDIO_CHANNELS
+    timeline = bytearray(_frames_for_ms(duration_ms) * frame_width)
+    for position_ms, data in placements:
+        start = _frames_for_ms(position_ms) * frame_width
+        if start < 0:
+            data = data[-start:]
+            start = 0
+        end = min(len(timeline), start + len(data) // frame_width * frame_width)
+        if end <= start:
+            continue
+        timeline[start:end] = audioop.add(
+            timeline[start:end], data[: end - start], AUDIO_SAMPLE_WIDTH
+        )
+    return bytes(timeline)
+
+
+@cache
+def _mix_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=RECORDER_MIX_WORKERS, thread_name_prefix="realtime-mix"
+    )
+
+
 class UserAudioChunk(BaseModel):
     audio: AudioSegment
     ends_at: int
@@ -687,20 +730,15 @@ class RealtimeRecorder:
         if buffer_to_save_duration <= 0:
             return
 
-        new_audio_segment = AudioSegment.silent(
-            duration=buffer_to_save_duration, frame_rate=AUDIO_FRAME_RATE
-        )
-
-        # Overlay the user audio chunks on top of the silent audio segment
-        for audio_chunk in user_audio_chunks_to_save:
-            new_audio_segment = new_audio_segment.overlay(
-                audio_chunk.audio,
-                position=(
-                    audio_chunk.ends_at - len(audio_chunk.audio) - self.end_timestamp
-                ),
+        placements: list[tuple[int, bytes]] = [
+            (
+                audio_chunk.ends_at - len(audio_chunk.audio) - self.end_timestamp,
+                audio_chunk.audio.raw_data,
             )
+            for audio_chunk in user_audio_chunks_to_save
+        ]
 
-        # Overlay the assistant audio chunks on top of the audio segment
+        # Place the assistant audio chunks on top of the user audio
         for response in assistant_responses_to_save:
             if response.starts_at is None:
                 continue
@@ -722,25 +760,36 @@ class RealtimeRecorder:
                     continue
                 if duration_so_far + len(audio_chunk.audio) > response.duration:
                     # Assistant response was interrupted during this chunk
-                    clipped_length = response.duration - duration_so_far
-
-                    clipped_audio_chunk = audio_chunk.audio[:clipped_length]
-                    new_audio_segment = new_audio_segment.overlay(
-                        clipped_audio_chunk,
-                        position=(audio_chunk.starts_at - self.end_timestamp),
+                    clipped_length = max(response.duration - duration_so_far, 0)
+                    placements.append(
+                        (
+                            audio_chunk.starts_at - self.end_timestamp,
+                            audio_chunk.audio.raw_data[
+                                : _frames_for_ms(clipped_length)
+                                * AUDIO_SAMPLE_WIDTH
+                                * AUDIO_CHANNELS
+                            ],
+                        )
                     )
                     break
                 else:
-                    new_audio_segment = new_audio_segment.overlay(
-                        audio_chunk.audio,
-                        position=(audio_chunk.starts_at - self.end_timestamp),
+                    placements.append(
+                        (
+                            audio_chunk.starts_at - self.end_timestamp,
+                            audio_chunk.audio.raw_data,
+                        )
                     )
                     duration_so_far += len(audio_chunk.audio)
 
         # Export the audio segment to a file
         try:
-            # Write the audio segment to FFmpeg's stdin
-            await self._write_to_ffmpeg(new_audio_segment.raw_data)
+            # Mix on a worker thread so the websocket relay keeps running, then
+            # write the mixed PCM to FFmpeg's stdin. The write drains the pipe,
+            # so a slow encoder holds back this save loop, not the event loop.
+            mixed = await asyncio.get_running_loop().run_in_executor(
+                _mix_executor(), mix_pcm16, buffer_to_save_duration, placements
+            )
+            await self._write_to_ffmpeg(mixed)
 
             # Update the end timestamp to the last assistant response ends at
             self.end_timestamp = last_assistant_response_ends_at
@@ -0,0 +1,255 @@
+"""Latency and audio quality telemetry for voice mode sessions.
+
+`VoiceSessionTelemetry` is fed by the realtime websocket handlers and records
+into the `voice_*` metrics with low-cardinality labels only. Times come from
+an injectable clock so recorded event traces can be replayed offline through
+the same handlers with `replay_voice_trace`.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Callable, Iterable, Literal
+
+from fastapi import WebSocketDisconnect
+from starlette.datastructures import State
+
+import pingpong.metrics as metrics
+from pingpong.config import config
+from pingpong.otel import Histogram
+
+logger = logging.getLogger("realtime_telemetry")
+
+VoiceTelemetrySample = Literal[
+    "response_latency", "playback_start_latency", "ordering_wait"
+]
+
+
+class VoiceSessionTelemetry:
+    """
+    Per-session voice mode timings.
+
+    - response latency: OpenAI reports the end of user speech -> the first
+      assistant audio delta for the next response is sent to the browser.
+    - playback start latency: first delta of a response sent -> the browser
+      reports that it started playing it (server receipt time, so it includes
+      the upstream hop).
+    - ordering wait: a transcript is complete -> the ordering buffer releases
+      it to be saved.
+    - delta issues: deltas that could not be decoded (`invalid`), were sent
+      but never started playing (`dropped`), or responses cut off by the
+      user (`truncated`).
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._speech_stopped_at: float | None = None
+        self._response_item_ids: set[str] = set()
+        self._first_delta_sent_at_by_item_id: dict[str, float] = {}
+        self._unplayed_event_ids_by_item_id: dict[str, set[str]] = {}
+        self._transcript_completed_at_by_item_id: dict[str, float] = {}
+        self.samples: dict[VoiceTelemetrySample, list[float]] = {
+            "response_latency": [],
+            "playback_start_latency": [],
+            "ordering_wait": [],
+        }
+        self.delta_issues: Counter[str] = Counter()
+
+    def speech_stopped(self) -> None:
+        self._speech_stopped_at = self._clock()
+
+    def assistant_audio_delta_sent(self, item_id: str, event_id: str) -> None:
+        now = self._clock()
+        if item_id not in self._response_item_ids:
+            self._response_item_ids.add(item_id)
+            self._first_delta_sent_at_by_item_id[item_id] = now
+            if self._speech_stopped_at is not None:
+                self._observe(
+                    "response_latency",
+                    metrics.voice_response_latency,
+                    now - self._speech_stopped_at,
+                )
+                self._speech_stopped_at = None
+        self._unplayed_event_ids_by_item_id.setdefault(item_id, set()).add(event_id)
+
+    def assistant_audio_delta_invalid(self) -> None:
+        self._count_delta_issue("invalid")
+
+    def playback_started(self, item_id: str, event_id: str) -> None:
+        unplayed_event_ids = self._unplayed_event_ids_by_item_id.get(item_id)
+        if unplayed_event_ids is not None:
+            unplayed_event_ids.discard(event_id)
+            if not unplayed_event_ids:
+                self._unplayed_event_ids_by_item_id.pop(item_id)
+        first_delta_sent_at = self._first_delta_sent_at_by_item_id.pop(item_id, None)
+        if first_delta_sent_at is not None:
+            self._observe(
+                "playback_start_latency",
+                metrics.voice_playback_start_latency,
+                self._clock() - first_delta_sent_at,
+            )
+
+    def response_truncated(self, item_id: str) -> None:
+        self._count_delta_issue("truncated")
+        self._first_delta_sent_at_by_item_id.pop(item_id, None)
+        unplayed_event_ids = self._unplayed_event_ids_by_item_id.pop(item_id, set())
+        self._count_delta_issue("dropped", len(unplayed_event_ids))
+
+    def transcript_completed(self, item_id: str) -> None:
+        self._transcript_completed_at_by_item_id.setdefault(item_id, self._clock())
+
+    def message_dispatched(self, item_id: str) -> None:
+        completed_at = self._transcript_completed_at_by_item_id.pop(item_id, None)
+        if completed_at is not None:
+            self._observe(
+                "ordering_wait",
+                metrics.voice_ordering_wait,
+                self._clock() - completed_at,
+            )
+
+    def finish(self) -> None:
+        """Counts deltas that never started playing before the session ended."""
+        for unplayed_event_ids in self._unplayed_event_ids_by_item_id.values():
+            self._count_delta_issue("dropped", len(unplayed_event_ids))
+        self._unplayed_event_ids_by_item_id.clear()
+        self._first_delta_sent_at_by_item_id.clear()
+        logger.debug(
+            "Voice session telemetry: responses=%s max_response_latency_ms=%s "
+            "max_playback_start_latency_ms=%s max_ordering_wait_ms=%s "
+            "delta_issues=%s",
+            len(self._response_item_ids),
+            self._max_ms("response_latency"),
+            self._max_ms("playback_start_latency"),
+            self._max_ms("ordering_wait"),
+            dict(self.delta_issues),
+        )
+
+    def _observe(
+        self, sample: VoiceTelemetrySample, histogram: Histogram, value: float
+    ) -> None:
+        value = max(0.0, value)
+        self.samples[sample].append(value)
+        histogram.observe(value, app=config.public_url)
+
+    def _count_delta_issue(self, kind: str, count: int = 1) -> None:
+        if count <= 0:
+            return
+        self.delta_issues[kind] += count
+        metrics.voice_audio_delta_issues.inc(count, app=config.public_url, kind=kind)
+
+    def _max_ms(self, sample: VoiceTelemetrySample) -> int | None:
+        values = self.samples[sample]
+        return round(max(values) * 1000) if values else None
+
+
+def _to_event(value: Any) -> Any:
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _to_event(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_to_event(item) for item in value]
+    return value
+
+
+class _ReplayClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _ReplayBrowserConnection:
+    def __init__(self):
+        self.state = State()
+        self.messages: list[dict] = []
+
+    async def receive(self) -> dict:
+        if not self.messages:
+            raise WebSocketDisconnect()
+        return self.messages.pop(0)
+
+    def _raise_on_disconnect(self, message: dict) -> None:
+        pass
+
+    async def send_json(self, data: dict) -> None:
+        pass
+
+    async def send_text(self, data: str) -> None:
+        pass
+
+    async def send_bytes(self, data: bytes) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class _ReplayRealtimeConnection:
+    """Stands in for the OpenAI connection in both directions during replay."""
+
+    def __init__(self, entries: list[dict], clock: _ReplayClock, replay_browser):
+        self._entries = entries
+        self._clock = clock
+        self._replay_browser = replay_browser
+        self.input_audio_buffer = SimpleNamespace(append=self._ignore)
+        self.conversation = SimpleNamespace(item=SimpleNamespace(truncate=self._ignore))
+
+    async def _ignore(self, **kwargs) -> None:
+        pass
+
+    async def __aiter__(self):
+        for entry in self._entries:
+            self._clock.now = float(entry["t"])
+            if entry["source"] == "browser":
+                await self._replay_browser(entry["message"])
+            else:
+                yield _to_event(entry["event"])
+
+
+async def replay_voice_trace(lines: Iterable[str]) -> VoiceSessionTelemetry:
+    """
+    Feeds a recorded voice session trace through the realtime handlers.
+
+    Each line is a JSON object with a time `t` in seconds and either
+    `"source": "openai", "event": {...}` (a realtime server event) or
+    `"source": "browser", "message": {...}` (a browser control event). Entries
+    must be in time order. Saving transcripts is skipped; everything up to the
+    ordering buffer runs as it does live.
+    """
+    from pingpong.realtime import (
+        RealtimeAssistantAudioTracker,
+        handle_browser_messages,
+        handle_openai_events,
+    )
+
+    entries = [json.loads(line) for line in lines if line.strip()]
+    clock = _ReplayClock()
+    telemetry = VoiceSessionTelemetry(clock=clock)
+    assistant_audio_tracker = RealtimeAssistantAudioTracker()
+    browser_connection = _ReplayBrowserConnection()
+    openai_task_queue: asyncio.Queue = asyncio.Queue()
+
+    async def replay_browser(message: dict) -> None:
+        browser_connection.messages.append({"text": json.dumps(message)})
+        await handle_browser_messages(
+            browser_connection,  # type: ignore[arg-type]
+            realtime_connection,  # type: ignore[arg-type]
+            assistant_audio_tracker,
+            telemetry=telemetry,
+        )
+
+    realtime_connection = _ReplayRealtimeConnection(entries, clock, replay_browser)
+    await handle_openai_events(
+        browser_connection,  # type: ignore[arg-type]
+        realtime_connection,  # type: ignore[arg-type]
+        openai_client=None,  # type: ignore[arg-type]
+        thread=SimpleNamespace(id=0, version=1),  # type: ignore[arg-type]
+        openai_task_queue=openai_task_queue,
+        assistant_audio_tracker=assistant_audio_tracker,
+        telemetry=telemetry,
+    )
+    telemetry.finish()
+    return telemetry
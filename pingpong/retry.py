@@ -1,8 +1,53 @@
 import asyncio
 import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from aiohttp import ClientResponseError
 from typing import Any, Mapping, Callable
 
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+"""Statuses worth retrying against a rate-limited or briefly unavailable API."""
+
+
+def parse_retry_after(value: str | None, now: datetime | None = None) -> float | None:
+    """Returns the delay in seconds requested by a `Retry-After` header.
+
+    The header is either a number of seconds or an HTTP date. Returns None if
+    it is missing or cannot be parsed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (retry_at - now).total_seconds())
+
+
+def retry_delay(
+    attempt: int,
+    retry_after: str | None = None,
+    backoff: int = 2,
+    max_delay: int = 60,
+) -> float:
+    """Returns how long to wait before retry number `attempt` (starting at 1).
+
+    A `Retry-After` header from the server wins over the jittered exponential
+    backoff. Either way the delay is capped at `max_delay`.
+    """
+    requested = parse_retry_after(retry_after)
+    if requested is not None:
+        return min(max_delay, requested)
+    return random.random() * min(max_delay, backoff**attempt)
+
 
 def with_retry(
     max_retries: int = 5,
@@ -23,9 +68,16 @@ def with_retry(
                 except ClientResponseError as e:
                     last_error = e
                     attempt += 1
-                    t = min(max_delay, backoff**attempt)
-                    jittered = random.random() * t
-                    await asyncio.sleep(jittered)
+                    if attempt >= max_retries:
+                        break
+                    retry_after = (
+                        e.headers.get("Retry-After")
+                        if e.headers and e.status in RETRYABLE_STATUSES
+                        else None
+                    )
+                    await asyncio.sleep(
+                        retry_delay(attempt, retry_after, backoff, max_delay)
+                    )
                 except Exception as e:
                     raise e
             if last_error:
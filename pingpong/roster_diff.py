@@ -0,0 +1,250 @@
+"""Diff-based roster syncs against a persisted snapshot.
+
+Every sync of a class from an LMS source stores a `RosterSnapshot`: a
+fingerprint of each roster member's row and the user id it resolved to, plus a
+hash over all of them. The next sync compares the fresh roster to it:
+
+- same hash: nothing changed, so nothing is written at all;
+- otherwise only the added and changed members go through `AddNewUsers`, and
+  only the members who left are unenrolled;
+- no snapshot yet, a manual sync, or a snapshot whose last full reconcile is
+  older than `ROSTER_FULL_RECONCILE_INTERVAL`: the whole roster goes through
+  `AddNewUsers` as before, which also repairs any drift (e.g. enrollments
+  changed outside of the sync).
+"""
+
+import hashlib
+import json
+import logging
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Protocol
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import pingpong.models as models
+import pingpong.schemas as schemas
+from pingpong.now import as_utc
+
+logger = logging.getLogger(__name__)
+
+ROSTER_FULL_RECONCILE_INTERVAL = timedelta(days=7)
+
+
+class RosterAdder(Protocol):
+    synced_user_ids: dict[str, int]
+
+    async def add_new_users(self) -> schemas.CreateUserResults: ...
+
+
+# (roles to add or update, user ids to unenroll or None for a full reconcile)
+RosterAdderFactory = Callable[
+    [schemas.CreateUserClassRoles, list[int] | None], RosterAdder
+]
+
+
+def roster_entry_key(ucr: schemas.CreateUserClassRole) -> str:
+    return ucr.email.strip().lower()
+
+
+def roster_source(
+    new_ucr: schemas.CreateUserClassRoles, lms_course_id: int | str | None = None
+) -> str:
+    """Identifies the LMS course a roster was synced from."""
+    if new_ucr.lti_class_id is not None:
+        return f"lti:{new_ucr.lti_class_id}"
+    lms_type = new_ucr.lms_type.value if new_ucr.lms_type else "lms"
+    return f"{lms_type}:{new_ucr.lms_tenant}:{lms_course_id}"
+
+
+def _digest(value: object) -> str:
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _roster_context(new_ucr: schemas.CreateUserClassRoles, user_id: int) -> dict:
+    # Anything outside the rows that changes how a row is applied.
+    return {
+        "user_id": user_id,
+        "sso_tenant": new_ucr.sso_tenant,
+        "lms_type": new_ucr.lms_type.value if new_ucr.lms_type else None,
+        "silent": new_ucr.silent,
+    }
+
+
+def roster_fingerprints(
+    new_ucr: schemas.CreateUserClassRoles, user_id: int
+) -> dict[str, str]:
+    """Returns the fingerprint of each member's roster rows, by roster key.
+
+    `last_active` is left out since it changes on every sync without changing
+    the enrollment.
+    """
+    context = _roster_context(new_ucr, user_id)
+    rows_by_key: dict[str, list[dict]] = {}
+    for ucr in new_ucr.roles:
+        row = ucr.model_dump(mode="json", exclude={"last_active"})
+        row["external_logins"] = sorted(
+            row["external_logins"],
+            key=lambda item: (
+                item["provider"] or "",
+                item["provider_id"] or 0,
+                item["identifier"],
+            ),
+        )
+        rows_by_key.setdefault(roster_entry_key(ucr), []).append(row)
+    return {key: _digest([context, rows]) for key, rows in rows_by_key.items()}
+
+
+def roster_content_hash(fingerprints: dict[str, str]) -> str:
+    return _digest(sorted(fingerprints.items()))
+
+
+@dataclass
+class RosterDiff:
+    added: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    # roster key -> user id
+    removed: dict[str, int] = field(default_factory=dict)
+    unchanged: list[str] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.changed or self.removed)
+
+
+def diff_roster(fingerprints: dict[str, str], entries: dict[str, dict]) -> RosterDiff:
+    """Compares fresh roster fingerprints to the entries of a snapshot."""
+    diff = RosterDiff()
+    for key, fingerprint in fingerprints.items():
+        entry = entries.get(key)
+        if entry is None:
+            diff.added.append(key)
+        elif entry["fingerprint"] != fingerprint:
+            diff.changed.append(key)
+        else:
+            diff.unchanged.append(key)
+    for key, entry in entries.items():
+        if key not in fingerprints:
+            diff.removed[key] = entry["user_id"]
+    return diff
+
+
+@dataclass
+class RosterSyncStats:
+    full_reconcile: bool
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    unchanged: int = 0
+
+
+async def sync_roster_diff(
+    session: AsyncSession,
+    class_id: int,
+    user_id: int,
+    new_ucr: schemas.CreateUserClassRoles,
+    source: str,
+    make_adder: RosterAdderFactory,
+    *,
+    now: datetime,
+    full_reconcile: bool = False,
+    full_reconcile_interval: timedelta = ROSTER_FULL_RECONCILE_INTERVAL,
+) -> tuple[schemas.CreateUserResults, RosterSyncStats]:
+    """Applies the roster in `new_ucr` to a class, writing only what changed.
+
+    `make_adder` builds the `AddNewUsers` for the rows to apply. The snapshot
+    is written in `session`, so it is only kept if the caller commits the sync.
+    """
+    snapshot = await models.RosterSnapshot.get(session, class_id, source)
+    fingerprints = roster_fingerprints(new_ucr, user_id)
+    content_hash = roster_content_hash(fingerprints)
+    full_reconcile = (
+        full_reconcile
+        or snapshot is None
+        or as_utc(snapshot.last_full_sync_at) + full_reconcile_interval <= now
+    )
+
+    if full_reconcile:
+        stats = RosterSyncStats(full_reconcile=True, added=len(fingerprints))
+        adder = make_adder(new_ucr, None)
+        results = await adder.add_new_users()
+        kept_entries: dict[str, dict] = {}
+        applied_keys: Sequence[str] = list(fingerprints)
+    else:
+        assert snapshot is not None
+        if snapshot.content_hash == content_hash:
+            logger.info(
+                "Roster for class %s (%s) is unchanged; skipping sync.",
+                class_id,
+                source,
+            )
+            return schemas.CreateUserResults(results=[]), RosterSyncStats(
+                full_reconcile=False, unchanged=len(fingerprints)
+            )
+
+        diff = diff_roster(fingerprints, snapshot.entries)
+        stats = RosterSyncStats(
+            full_reconcile=False,
+            added=len(diff.added),
+            changed=len(diff.changed),
+            removed=len(diff.removed),
+            unchanged=len(diff.unchanged),
+        )
+        applied_keys = diff.added + diff.changed
+        applied = set(applied_keys)
+        adder = make_adder(
+            new_ucr.model_copy(
+                update={
+                    "roles": [
+                        ucr for ucr in new_ucr.roles if roster_entry_key(ucr) in applied
+                    ]
+                }
+            ),
+            sorted(set(diff.removed.values())),
+        )
+        results = await adder.add_new_users()
+        kept_entries = {key: snapshot.entries[key] for key in diff.unchanged}
+
+    # Rows that failed to apply are left out so the next sync retries them.
+    entries = dict(kept_entries)
+    for key in applied_keys:
+        synced_user_id = adder.synced_user_ids.get(key)
+        if synced_user_id is not None:
+            entries[key] = {
+                "fingerprint": fingerprints[key],
+                "user_id": synced_user_id,
+            }
+    stored_hash = roster_content_hash(
+        {key: entry["fingerprint"] for key, entry in entries.items()}
+    )
+
+    if snapshot is None:
+        snapshot = models.RosterSnapshot(
+            class_id=class_id,
+            source=source,
+            content_hash=stored_hash,
+            entries=entries,
+            last_full_sync_at=now,
+        )
+    else:
+        snapshot.content_hash = stored_hash
+        snapshot.entries = entries
+        if full_reconcile:
+            snapshot.last_full_sync_at = now
+    session.add(snapshot)
+    await session.flush()
+
+    logger.info(
+        "Synced roster for class %s (%s): full_reconcile=%s added=%s changed=%s "
+        "removed=%s unchanged=%s",
+        class_id,
+        source,
+        stats.full_reconcile,
+        stats.added,
+        stats.changed,
+        stats.removed,
+        stats.unchanged,
+    )
+    return results, stats
@@ -0,0 +1,229 @@
+"""Concurrent roster syncs across many classes.
+
+`run_roster_syncs` syncs classes with a fixed number of workers. Each class is
+synced by a caller-provided coroutine that is expected to open its own
+database session and commit its own transaction, so one failing or slow class
+cannot roll back or hold up the others. `HostRateLimiter` keeps the combined
+request rate against each LMS host bounded no matter how many classes are in
+flight.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Literal
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+ROSTER_SYNC_CONCURRENCY = 8
+ROSTER_SYNC_CLASS_TIMEOUT_SECONDS = 600
+ROSTER_SYNC_REQUESTS_PER_SECOND = 10.0
+ROSTER_SYNC_BURST = 10
+ROSTER_SYNC_MAX_ATTEMPTS = 2
+
+RosterSyncStatus = Literal["succeeded", "warning", "failed"]
+
+
+class HostRateLimiter:
+    """Token bucket rate limit per host, shared by every request in a sync run.
+
+    Waiters reserve a token before sleeping, so concurrent callers are served
+    in order without a lock.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = ROSTER_SYNC_REQUESTS_PER_SECOND,
+        burst: int = ROSTER_SYNC_BURST,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second must be positive")
+        self.requests_per_second = requests_per_second
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._sleep = sleep
+        # host -> (available tokens, last refill time)
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    async def acquire(self, host: str) -> None:
+        now = self._clock()
+        tokens, updated_at = self._buckets.get(host, (float(self.burst), now))
+        tokens = min(
+            float(self.burst),
+            tokens + (now - updated_at) * self.requests_per_second,
+        )
+        tokens -= 1
+        self._buckets[host] = (tokens, now)
+        if tokens < 0:
+            await self._sleep(-tokens / self.requests_per_second)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Returns a trace config that rate limits every request of a session."""
+
+        async def _on_request_start(
+            session: aiohttp.ClientSession,
+            trace_config_ctx: SimpleNamespace,
+            params: aiohttp.TraceRequestStartParams,
+        ) -> None:
+            await self.acquire(params.url.host or "")
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(_on_request_start)
+        trace_config.freeze()
+        return trace_config
+
+
+@dataclass
+class RosterSyncResult:
+    class_id: int
+    status: RosterSyncStatus
+    detail: str | None = None
+    attempts: int = 1
+    elapsed: float = 0.0
+
+
+@dataclass
+class RosterSyncSummary:
+    results: list[RosterSyncResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def _with_status(self, status: RosterSyncStatus) -> list[RosterSyncResult]:
+        return [result for result in self.results if result.status == status]
+
+    @property
+    def succeeded(self) -> list[RosterSyncResult]:
+        return self._with_status("succeeded")
+
+    @property
+    def warnings(self) -> list[RosterSyncResult]:
+        return self._with_status("warning")
+
+    @property
+    def failed(self) -> list[RosterSyncResult]:
+        return self._with_status("failed")
+
+    def log(self, label: str) -> None:
+        logger.info(
+            "%s roster sync finished in %.1fs: %s succeeded, %s warnings, %s failed",
+            label,
+            self.elapsed,
+            len(self.succeeded),
+            len(self.warnings),
+            len(self.failed),
+        )
+        for result in self.warnings:
+            logger.warning(
+                "%s roster sync warning for class %s: %s",
+                label,
+                result.class_id,
+                result.detail,
+            )
+        for result in self.failed:
+            logger.error(
+                "%s roster sync failed for class %s after %s attempt(s): %s",
+                label,
+                result.class_id,
+                result.attempts,
+                result.detail,
+            )
+
+
+def _exception_detail(e: BaseException) -> str:
+    detail = getattr(e, "detail", None)
+    if isinstance(detail, str) and detail:
+        return detail
+    return str(e) or type(e).__name__
+
+
+async def run_roster_syncs(
+    class_ids: Sequence[int],
+    sync_class: Callable[[int], Awaitable[str | None]],
+    *,
+    concurrency: int = ROSTER_SYNC_CONCURRENCY,
+    class_timeout: float = ROSTER_SYNC_CLASS_TIMEOUT_SECONDS,
+    warning_exceptions: tuple[type[BaseException], ...] = (),
+    retry_exceptions: tuple[type[BaseException], ...] = (),
+    max_attempts: int = ROSTER_SYNC_MAX_ATTEMPTS,
+    on_failure: Callable[[int, BaseException], Awaitable[None]] | None = None,
+) -> RosterSyncSummary:
+    """Syncs every class with at most `concurrency` running at once.
+
+    `sync_class` returns a warning detail, or None if the class synced
+    cleanly. Exceptions in `warning_exceptions` are recorded as warnings;
+    `retry_exceptions` (e.g. unique constraint conflicts with a class that
+    added the same user concurrently) are retried up to `max_attempts`. Any
+    other exception, or running longer than `class_timeout` seconds, fails
+    the class and is passed to `on_failure`.
+    """
+    started_at = time.monotonic()
+    summary = RosterSyncSummary()
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for class_id in class_ids:
+        queue.put_nowait(class_id)
+
+    async def _sync(class_id: int) -> RosterSyncResult:
+        class_started_at = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            deadline = asyncio.timeout(class_timeout)
+            try:
+                async with deadline:
+                    detail = await sync_class(class_id)
+                status: RosterSyncStatus = "warning" if detail else "succeeded"
+                error: BaseException | None = None
+            except warning_exceptions as e:
+                status, detail, error = "warning", _exception_detail(e), None
+            except retry_exceptions as e:
+                if attempt < max_attempts:
+                    logger.warning(
+                        "Retrying roster sync for class %s after error: %s",
+                        class_id,
+                        e,
+                    )
+                    continue
+                status, detail, error = "failed", _exception_detail(e), e
+            except Exception as e:
+                if isinstance(e, TimeoutError) and deadline.expired():
+                    logger.warning("Roster sync for class %s timed out", class_id)
+                    detail = f"Timed out after {class_timeout:g}s"
+                else:
+                    logger.exception("Error syncing class %s: %s", class_id, e)
+                    detail = _exception_detail(e)
+                status, error = "failed", e
+
+            if error is not None and on_failure is not None:
+                try:
+                    await on_failure(class_id, error)
+                except Exception:
+                    logger.exception(
+                        "Error recording roster sync failure for class %s", class_id
+                    )
+            return RosterSyncResult(
+                class_id=class_id,
+                status=status,
+                detail=detail,
+                attempts=attempt,
+                elapsed=time.monotonic() - class_started_at,
+            )
+
+    async def _worker() -> None:
+        while True:
+            try:
+                class_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            logger.info("Syncing class %s...", class_id)
+            summary.results.append(await _sync(class_id))
+
+    workers = max(1, min(concurrency, len(class_ids)))
+    await asyncio.gather(*(_worker() for _ in range(workers)))
+    summary.elapsed = time.monotonic() - started_at
+    return summary
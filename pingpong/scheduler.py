@@ -0,0 +1,293 @@
+"""Leader-elected scheduling of periodic tasks.
+
+Several `schedule schedule_tasks` processes can run the same tasks for
+availability, but only one of them runs each task. For every task the
+schedulers elect a leader through a lease on the task's `periodic_tasks` row:
+
+- Each new lease increments the task's fencing token. The leader renews its
+  lease in the same transaction that claims an occurrence, so a scheduler
+  that has lost its lease cannot claim anything.
+- Claims are rows in `periodic_task_runs`, unique per occurrence, so each
+  occurrence of the schedule runs at most once.
+- The task's `next_run_at` cursor survives leader changes, so a new leader
+  knows which occurrences were missed and handles them according to the
+  task's `MisfirePolicy`.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+
+import pingpong.models as models
+from pingpong.config import config
+from pingpong.now import NowFn, _get_next_run_time, as_utc, utcnow
+from pingpong.schemas import MisfirePolicy, PeriodicTaskRunStatus
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_LEASE_SECONDS = 60.0
+"""How long a leader keeps a task without renewing its lease."""
+
+SCHEDULER_MISFIRE_GRACE_SECONDS = 60.0
+"""Occurrences found later than this after their time count as missed."""
+
+SCHEDULER_MAX_MISSED_RUNS = 1000
+"""Missed occurrences looked at per tick; older ones are dropped unrecorded."""
+
+_ERROR_MAX_LENGTH = 1000
+
+
+def build_scheduler_id() -> str:
+    return f"scheduler:{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class TaskScheduler:
+    """Runs one periodic task on its cron schedule while it holds the lease."""
+
+    def __init__(
+        self,
+        task_name: str,
+        cron: str,
+        run_task: Callable[[], Awaitable[None]],
+        misfire_policy: MisfirePolicy = MisfirePolicy.SKIP,
+        *,
+        scheduler_id: str | None = None,
+        nowfn: NowFn = utcnow,
+        lease_seconds: float = SCHEDULER_LEASE_SECONDS,
+        misfire_grace_seconds: float = SCHEDULER_MISFIRE_GRACE_SECONDS,
+    ):
+        self.task_name = task_name
+        self.cron = cron
+        self.run_task = run_task
+        self.misfire_policy = misfire_policy
+        self.scheduler_id = scheduler_id or build_scheduler_id()
+        self.nowfn = nowfn
+        self.lease_seconds = lease_seconds
+        self.misfire_grace = timedelta(seconds=misfire_grace_seconds)
+        self.fencing_token: int | None = None
+        self._task_id: int | None = None
+        self._next_run_at: datetime | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.fencing_token is not None
+
+    async def run(self, stop: asyncio.Event | None = None) -> None:
+        """Schedules the task until `stop` is set, then gives up the lease."""
+        stop = stop or asyncio.Event()
+        try:
+            while not stop.is_set():
+                try:
+                    wake_at = await self.tick()
+                except Exception:
+                    logger.exception(f"Scheduler for {self.task_name} failed")
+                    wake_at = self.nowfn() + timedelta(seconds=self.lease_seconds / 3)
+                wait = (wake_at - self.nowfn()).total_seconds()
+                if wait > 0:
+                    try:
+                        await asyncio.wait_for(stop.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            await self.release()
+
+    async def tick(self) -> datetime:
+        """Holds the lease and runs or skips whatever is due.
+
+        Returns when to tick next.
+        """
+        run = await self._claim()
+        if run is not None:
+            await self._execute(run)
+            # More missed runs may be waiting to catch up.
+            return self.nowfn()
+        renew_at = self.nowfn() + timedelta(seconds=self.lease_seconds / 3)
+        if self.is_leader and self._next_run_at is not None:
+            return min(self._next_run_at, renew_at)
+        return renew_at
+
+    async def release(self) -> None:
+        """Gives up the lease so another scheduler can take over right away."""
+        if self.fencing_token is None or self._task_id is None:
+            return
+        async with config.db.driver.async_session() as session:
+            await models.PeriodicTask.release_lease(
+                session, self._task_id, self.scheduler_id, self.fencing_token
+            )
+            await session.commit()
+        self.fencing_token = None
+
+    async def _hold_lease(self, session, task_id: int, now: datetime) -> int | None:
+        """Renews or acquires the lease. Returns the fencing token it is held with."""
+        if self.fencing_token is not None:
+            if await models.PeriodicTask.renew_lease(
+                session,
+                task_id,
+                self.scheduler_id,
+                self.fencing_token,
+                now,
+                self.lease_seconds,
+            ):
+                return self.fencing_token
+            logger.warning(
+                f"{self.scheduler_id} lost the scheduler lease for {self.task_name}"
+            )
+            self.fencing_token = None
+
+        token = await models.PeriodicTask.acquire_lease(
+            session, task_id, self.scheduler_id, now, self.lease_seconds
+        )
+        if token is None:
+            return None
+        self.fencing_token = token
+        logger.info(
+            f"{self.scheduler_id} is now the scheduler for {self.task_name} "
+            f"(fencing token {token})"
+        )
+        abandoned = await models.PeriodicTaskRun.abandon_stale(
+            session, task_id, token, now
+        )
+        if abandoned:
+            logger.warning(
+                f"Marked {abandoned} unfinished run(s) of {self.task_name} as failed"
+            )
+        return token
+
+    def _apply_policy(
+        self, due: list[datetime], now: datetime
+    ) -> tuple[datetime | None, list[datetime]]:
+        """Splits due occurrences into the one to run now and those to skip."""
+        if not due:
+            return None, []
+        match self.misfire_policy:
+            case MisfirePolicy.CATCH_UP:
+                return due[0], []
+            case MisfirePolicy.RUN_ONCE:
+                return due[-1], due[:-1]
+            case _:
+                if now - due[-1] <= self.misfire_grace:
+                    return due[-1], due[:-1]
+                return None, due
+
+    async def _claim(self) -> models.PeriodicTaskRun | None:
+        async with config.db.driver.async_session() as session:
+            now = self.nowfn()
+            task_id = self._task_id
+            if task_id is None:
+                task_id = await models.PeriodicTask.get_or_create_id(
+                    session, self.task_name
+                )
+                self._task_id = task_id
+            fencing_token = await self._hold_lease(session, task_id, now)
+            if fencing_token is None:
+                await session.commit()
+                return None
+
+            task = await session.get(
+                models.PeriodicTask, task_id, populate_existing=True
+            )
+            if task is None:
+                raise RuntimeError(f"Periodic task {self.task_name} not found")
+            next_run_at = (
+                as_utc(task.next_run_at)
+                if task.next_run_at
+                else _get_next_run_time(self.cron, now)
+            )
+            due = list[datetime]()
+            while next_run_at <= now and len(due) < SCHEDULER_MAX_MISSED_RUNS:
+                due.append(next_run_at)
+                next_run_at = _get_next_run_time(self.cron, next_run_at)
+            if next_run_at <= now:
+                logger.warning(
+                    f"{self.task_name} missed more than {SCHEDULER_MAX_MISSED_RUNS} "
+                    "runs; dropping the oldest"
+                )
+                due = due[1:] + [next_run_at]
+                next_run_at = _get_next_run_time(self.cron, now)
+
+            to_run, to_skip = self._apply_policy(due, now)
+            if to_run is not None and to_run != due[-1]:
+                next_run_at = _get_next_run_time(self.cron, to_run)
+            occurrences = [(ts, PeriodicTaskRunStatus.SKIPPED) for ts in to_skip]
+            if to_run is not None:
+                occurrences.append((to_run, PeriodicTaskRunStatus.RUNNING))
+            claimed = await models.PeriodicTaskRun.claim_many(
+                session,
+                task_id,
+                occurrences,
+                fencing_token,
+                self.scheduler_id,
+                now,
+            )
+            await models.PeriodicTask.set_next_run_at(session, task_id, next_run_at)
+            await session.commit()
+
+        self._next_run_at = next_run_at
+        if to_skip:
+            logger.warning(
+                f"Skipped {len(to_skip)} missed run(s) of {self.task_name} "
+                f"({self.misfire_policy} policy)"
+            )
+        if to_run is None:
+            wait = (next_run_at - now).total_seconds()
+            logger.info(
+                f"Next run for {self.task_name} scheduled at: {next_run_at} (in {wait} seconds)"
+            )
+        return next(
+            (run for run in claimed if run.status == PeriodicTaskRunStatus.RUNNING),
+            None,
+        )
+
+    async def _execute(self, run: models.PeriodicTaskRun) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(run.task_id))
+        status, error = PeriodicTaskRunStatus.COMPLETED, None
+        try:
+            await self.run_task()
+            logger.info(
+                f"Task '{self.task_name}' run for {run.scheduled_for} completed successfully"
+            )
+        except Exception as e:
+            logger.exception(f"Error in task '{self.task_name}': {e}")
+            status, error = PeriodicTaskRunStatus.FAILED, str(e)[:_ERROR_MAX_LENGTH]
+        finally:
+            heartbeat.cancel()
+            try:
+                await heartbeat
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                # The run's outcome is still recorded below.
+                logger.exception(
+                    f"Scheduler heartbeat for {self.task_name} failed during a run"
+                )
+
+        async with config.db.driver.async_session() as session:
+            await models.PeriodicTaskRun.finish(
+                session, run.id, status, self.nowfn(), error
+            )
+            await session.commit()
+
+    async def _heartbeat(self, task_id: int) -> None:
+        """Keeps the lease while a long run is in progress."""
+        while self.fencing_token is not None:
+            await asyncio.sleep(self.lease_seconds / 3)
+            async with config.db.driver.async_session() as session:
+                renewed = await models.PeriodicTask.renew_lease(
+                    session,
+                    task_id,
+                    self.scheduler_id,
+                    self.fencing_token,
+                    self.nowfn(),
+                    self.lease_seconds,
+                )
+                await session.commit()
+            if not renewed:
+                logger.warning(
+                    f"{self.scheduler_id} lost the scheduler lease for "
+                    f"{self.task_name} during a run"
+                )
+                self.fencing_token = None
@@ -2630,6 +2630,37 @@ class EmailValidationRequest(BaseModel):
     emails: str
 
 
+class EmailOutboxStatus(StrEnum):
+    QUEUED = "queued"
+    SENDING = "sending"
+    SENT = "sent"
+    DEAD = "dead"
+
+
+class PeriodicTaskRunStatus(StrEnum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+
+class MisfirePolicy(StrEnum):
+    """What the scheduler does with runs missed while no scheduler was up."""
+
+    SKIP = "skip"
+    """Record missed runs as skipped and wait for the next one."""
+    RUN_ONCE = "run_once"
+    """Run the most recent missed run and skip the rest."""
+    CATCH_UP = "catch_up"
+    """Run every missed run, oldest first."""
+
+
+class ClassCopyJobStatus(StrEnum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
 class EmailValidationResult(BaseModel):
     email: str
     valid: bool
@@ -70,6 +70,7 @@ from pingpong.artifacts import ArtifactStoreError
 from pingpong.audio_store import AudioStoreError
 from pingpong.bg_tasks import safe_task
 from pingpong.copy import copy_assistant as copy_assistant_to_class
+from pingpong.copy import ensure_lecture_slide_assistant_copy_ready
 from pingpong.copy import ensure_lecture_video_assistant_copy_ready
 from pingpong.copy import ensure_lecture_video_copy_credentials
 from pingpong.copy import copy_group
@@ -187,6 +188,7 @@ from .canvas import (
     get_canvas_config,
 )
 from .config import config
+from .email_outbox import outbound_email_sender
 from .errors import async_sentry
 from .files import (
     FILE_TYPES,
@@ -205,6 +207,7 @@ from .lti.course_bridge import (
 )
 from .merge import list_all_permissions, merge
 from .now import NowFn, utcnow
+from .paging import close_shared_connector
 from .permission import (
     ARCHIVED_DETAIL,
     And,
@@ -1242,13 +1245,13 @@ async def add_email_to_user(user_id: str, email: str, request: StateRequest):
             }
         )
 
-        await config.email.sender.send(
+        await outbound_email_sender().send(
             _new_email,
             "A login email was added to your PingPong account",
             message_to_new,
         )
 
-        await config.email.sender.send(
+        await outbound_email_sender().send(
             user.email,
             "A login email was added to your PingPong account",
             message_to_current,
@@ -1352,7 +1355,7 @@ async def login_magic(body: schemas.MagicLoginRequest, request: StateRequest):
         }
     )
 
-    await config.email.sender.send(
+    await outbound_email_sender().send(
         email,
         "Log back in to PingPong",
         message,
@@ -2194,14 +2197,14 @@ async def set_lti_registration_status(
         try:
             if body.review_status == schemas.LTIRegistrationReviewStatus.APPROVED:
                 await send_lti_registration_approved(
-                    config.email.sender,
+                    outbound_email_sender(),
                     admin_email=registration.admin_email,
                     admin_name=admin_name,
                     integration_name=integration_name,
                 )
             elif body.review_status == schemas.LTIRegistrationReviewStatus.REJECTED:
                 await send_lti_registration_rejected(
-                    config.email.sender,
+                    outbound_email_sender(),
                     admin_email=registration.admin_email,
                     admin_name=admin_name,
                     integration_name=integration_name,
@@ -4444,9 +4447,11 @@ async def audio_stream(
     share_token: str | None = None,
     session_token: str | None = None,
     lti_session: str | None = None,
+    audio_frames: int | None = None,
 ):
     websocket.state["anonymous_share_token"] = share_token
     websocket.state["anonymous_session_token"] = session_token
+    websocket.state["audio_frames_version"] = audio_frames
     # WebSocket requests from LTI iframes can lose first-party cookies.
     # Treat lti_session like a session cookie for websocket auth.
     if lti_session and websocket.cookies.get("session") is None:
@@ -13189,6 +13194,7 @@ async def _ensure_lecture_video_assistant_copy_allowed(
 ) -> None:
     try:
         ensure_lecture_video_assistant_copy_ready(assistant)
+        ensure_lecture_slide_assistant_copy_ready(assistant)
     except ValueError as e:
         raise HTTPException(
             status_code=409,
@@ -17034,6 +17040,9 @@ async def lifespan(app: FastAPI):
 
             yield
 
+            await close_shared_connector()
+            await config.email.sender.close()
+
 
 app = FastAPI(
     lifespan=lifespan,
@@ -54,6 +54,7 @@ class WebSocketState(BaseConnectionState):
     conversation_instructions: NotRequired[str]
     realtime_connection: NotRequired[AsyncRealtimeConnection]
     voice_mode_run_id: NotRequired[int]
+    audio_frames_version: NotRequired[int | None]
 
 
 if TYPE_CHECKING:
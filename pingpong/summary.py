@@ -1,11 +1,16 @@
+import asyncio
 import hashlib
 import logging
 import openai
+from dataclasses import dataclass
 from openai.types import Reasoning
+from openai.types.responses import ResponseUsage
 from pingpong.auth import generate_auth_link
 from .authz import AuthzClient
 from pingpong.config import config
-from pingpong.invite import send_summary
+from pingpong.email import EmailSender
+from pingpong.email_outbox import OutboxEmailSender, outbound_email_sender
+from pingpong.invite import SummaryEmailRenderer, send_summaries, send_summary
 import pingpong.models as models
 
 from datetime import datetime
@@ -29,6 +34,45 @@ logger = logging.getLogger(__name__)
 CLASS_SUMMARY_OPENAI_MODEL = "gpt-5.6-luna"
 CLASS_SUMMARY_SAFETY_IDENTIFIER_PREFIX = "pp:v1:class-summary:"
 
+SUMMARY_CLASS_CONCURRENCY = 4
+"""Classes summarized at once by the weekly summary job."""
+
+SUMMARY_ASSISTANT_CONCURRENCY = 4
+"""Assistants summarized at once within a class."""
+
+SUMMARY_THREAD_FETCH_CONCURRENCY = 8
+"""v2 threads whose messages are fetched from OpenAI at once."""
+
+SUMMARY_THREAD_MESSAGE_LIMIT = 10
+"""Messages read from the start of each thread."""
+
+SUMMARY_EMAIL_BATCH_SIZE = 50
+"""Recipients queued in the outbox and marked as sent per commit."""
+
+SUMMARY_DIRECT_EMAIL_BATCH_SIZE = 8
+"""Recipients emailed directly and marked as sent per commit. A crash before
+the commit re-sends at most this many emails."""
+
+
+@dataclass
+class SummaryUsage:
+    """OpenAI token spend for generating summaries."""
+
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    def record(self, usage: ResponseUsage | None) -> None:
+        self.requests += 1
+        if usage is not None:
+            self.input_tokens += usage.input_tokens
+            self.output_tokens += usage.output_tokens
+
+    def merge(self, other: "SummaryUsage") -> None:
+        self.requests += other.requests
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+
 
 async def send_class_summary_for_class_task(
     cli: openai.AsyncClient,
@@ -63,6 +107,7 @@ async def send_class_summary_for_class(
     summary_type: str | None = None,
     summary_email_header: str | None = None,
     sent_before: datetime | None = None,
+    usage: SummaryUsage | None = None,
 ) -> None:
     class_ = await models.Class.get_by_id(session, class_id)
 
@@ -91,6 +136,7 @@ async def send_class_summary_for_class(
         summary_email_header,
         subscribed_only=True,
         sent_before=sent_before or class_.last_summary_sent_at,
+        usage=usage,
     )
 
 
@@ -168,13 +214,14 @@ async def send_class_summary_to_class_users(
     summary_email_header: str | None = None,
     subscribed_only: bool | None = None,
     sent_before: datetime | None = None,
+    usage: SummaryUsage | None = None,
 ) -> None:
     class_ = await models.Class.get_by_id(session, class_id)
     if not class_:
         raise ValueError(f"Class with ID {class_id} not found")
 
     summary_html = await generate_class_summary(
-        cli, session, class_.id, class_.name, after
+        cli, session, class_.id, class_.name, after, usage=usage
     )
     if not summary_html:
         class_.last_summary_sent_at = nowfn()
@@ -188,33 +235,67 @@ async def send_class_summary_to_class_users(
         session, user_ids, class_id, subscribed_only, sent_before
     )
 
+    # With the outbox enabled, each batch of summary emails is queued in the
+    # same commit that marks its users as sent, so a re-run neither drops nor
+    # repeats them. Emails sent directly can't be taken back, so they go out in
+    # smaller batches: a crash before a batch is marked re-sends only that batch.
+    sender = outbound_email_sender(
+        session,
+        idempotency_key=(
+            f"class-summary:{class_id}:{sent_before.isoformat()}"
+            if sent_before
+            else None
+        ),
+    )
+    batch_size = (
+        SUMMARY_EMAIL_BATCH_SIZE
+        if isinstance(sender, OutboxEmailSender)
+        else SUMMARY_DIRECT_EMAIL_BATCH_SIZE
+    )
+    renderer = SummaryEmailRenderer(
+        class_.name,
+        summary_html,
+        _time_since(after, nowfn),
+        summary_type,
+        summary_email_header,
+    )
     no_errors = True
-    for ucr in user_roles:
+    for start in range(0, len(user_roles), batch_size):
+        batch = user_roles[start : start + batch_size]
         try:
-            await send_class_summary(
-                summary_html,
-                class_.name,
-                class_.id,
-                ucr.user_id,
-                ucr.user.first_name or ucr.user.display_name or "Moderator",
-                ucr.user.email,
-                after,
-                nowfn,
-                summary_type,
-                summary_email_header,
+            results = await send_summaries(
+                sender,
+                renderer,
+                [
+                    (
+                        ucr.user.email,
+                        ucr.user.first_name or ucr.user.display_name or "Moderator",
+                        _summary_link(ucr.user_id, class_id, nowfn),
+                    )
+                    for ucr in batch
+                ],
             )
-
-            ucr.last_summary_sent_at = nowfn()
-            ucr.last_summary_empty = False
-
-            # Commit for every user so we don't lose progress if we hit an error
-            await session.commit()
-
         except Exception as e:
-            logger.exception(f"Failed to send summary to user {ucr.user_id}: {e}")
+            logger.exception(f"Failed to send summaries for class {class_id}: {e}")
             no_errors = False
             continue
 
+        sent_user_ids = list[int]()
+        for ucr, result in zip(batch, results):
+            if result.error is None:
+                sent_user_ids.append(ucr.user_id)
+            else:
+                logger.error(
+                    f"Failed to send summary to user {ucr.user_id}: {result.error}"
+                )
+                no_errors = False
+
+        # Commit for every batch so we don't lose progress if we hit an error
+        await models.UserClassRole.mark_summary_sent(
+            session, sent_user_ids, class_id, nowfn()
+        )
+        await session.commit()
+
     if no_errors:
         # Update last summary sent for all users
         class_.last_summary_sent_at = nowfn()
@@ -232,28 +313,33 @@ async def send_class_summary(
     nowfn: NowFn = utcnow,
     summary_type: str | None = None,
     summary_email_header: str | None = None,
+    sender: EmailSender | None = None,
 ) -> None:
-    magic_link = generate_auth_link(
-        user_id,
-        expiry=86_400 * 7,
-        nowfn=nowfn,
-        redirect=f"/group/{class_id}/manage?section=summary",
-    )
-
-    days_before_today = (nowfn() - after).days
-
     export_options = ClassSummaryExport(
         class_name=class_name,
         summary_html=summary_html,
-        link=magic_link,
+        link=_summary_link(user_id, class_id, nowfn),
         first_name=user_name,
         email=user_email,
-        time_since=f"the last {days_before_today} days",
+        time_since=_time_since(after, nowfn),
         summary_type=summary_type,
         title=summary_email_header,
     )
 
-    await send_summary(config.email.sender, export_options)
+    await send_summary(sender or outbound_email_sender(), export_options)
+
+
+def _summary_link(user_id: int, class_id: int, nowfn: NowFn) -> str:
+    return generate_auth_link(
+        user_id,
+        expiry=86_400 * 7,
+        nowfn=nowfn,
+        redirect=f"/group/{class_id}/manage?section=summary",
+    )
+
+
+def _time_since(after: datetime, nowfn: NowFn) -> str:
+    return f"the last {(nowfn() - after).days} days"
 
 
 async def generate_class_summary(
@@ -263,9 +349,10 @@ async def generate_class_summary(
     class_name: str,
     after: datetime,
     summarize_even_if_no_threads: bool = False,
+    usage: SummaryUsage | None = None,
 ) -> str | None:
     ai_assistant_summaries = await generate_assistant_summaries(
-        cli, session, class_id, after, summarize_even_if_no_threads
+        cli, session, class_id, after, summarize_even_if_no_threads, usage
     )
     if not ai_assistant_summaries:
         return None
@@ -284,52 +371,56 @@ async def generate_assistant_summaries(
     class_id: int,
     after: datetime,
     summarize_even_if_no_threads: bool = False,
+    usage: SummaryUsage | None = None,
 ) -> list[AIAssistantSummary] | None:
-    summaries = list[AIAssistantSummary]()
-    current_period_contains_threads = False
-
-    # Get all assistants for the class
-    async for id_, name in models.Assistant.async_get_id_name_by_class_id(
-        session=session, class_id=class_id
-    ):
-        user_messages_list = list[ThreadUserMessages]()
-        async for thread in models.Thread.get_threads_by_assistant_id(
-            session=session, assistant_id=id_, after=after
-        ):
-            thread_id = thread.thread_id if thread.version <= 2 else str(thread.id)
-            user_messages_list.append(
-                ThreadUserMessages(
-                    id=thread.id,
-                    thread_id=thread_id,
-                    user_messages=await get_thread_user_messages(
-                        session,
-                        cli,
-                        thread_id,
-                        thread_version=thread.version,
-                    ),
-                )
+    assistants = [
+        (id_, name)
+        async for id_, name in models.Assistant.async_get_id_name_by_class_id(
+            session=session, class_id=class_id
+        )
+    ]
+    threads = await models.Thread.get_threads_by_assistant_ids(
+        session, [id_ for id_, _ in assistants], after=after
+    )
+    if not threads and not summarize_even_if_no_threads:
+        return None
+
+    user_messages = await get_threads_user_messages(session, cli, threads)
+    user_messages_by_assistant = dict[int, list[ThreadUserMessages]]()
+    for thread in threads:
+        user_messages_by_assistant.setdefault(thread.assistant_id, []).append(
+            ThreadUserMessages(
+                id=thread.id,
+                thread_id=thread.thread_id if thread.version <= 2 else str(thread.id),
+                user_messages=user_messages[thread.id],
             )
+        )
 
-        if user_messages_list:
-            current_period_contains_threads = True
+    semaphore = asyncio.Semaphore(SUMMARY_ASSISTANT_CONCURRENCY)
+
+    async def _summarize(
+        name: str, user_messages_list: list[ThreadUserMessages]
+    ) -> AIAssistantSummary:
+        if not user_messages_list:
+            return AIAssistantSummary(assistant_name=name, topics=[], has_threads=False)
+        async with semaphore:
             assistant_summary = await generate_thread_summary(
-                cli, user_messages_list, class_id=class_id
-            )
-            summaries.append(
-                AIAssistantSummary(
-                    assistant_name=name,
-                    topics=assistant_summary.topics if assistant_summary else [],
-                    has_threads=True,
-                )
-            )
-        else:
-            summaries.append(
-                AIAssistantSummary(assistant_name=name, topics=[], has_threads=False)
+                cli, user_messages_list, class_id=class_id, usage=usage
             )
+        return AIAssistantSummary(
+            assistant_name=name,
+            topics=assistant_summary.topics if assistant_summary else [],
+            has_threads=True,
+        )
 
-    if not current_period_contains_threads and not summarize_even_if_no_threads:
-        return None
-    return summaries
+    return list(
+        await asyncio.gather(
+            *(
+                _summarize(name, user_messages_by_assistant.get(id_, []))
+                for id_, name in assistants
+            )
+        )
+    )
 
 
 def convert_thread_id_to_url(thread_id: int, class_id: int) -> str:
@@ -383,41 +474,87 @@ async def get_thread_user_messages(
     thread_version: int = 2,
 ) -> list[str]:
     if thread_version <= 2:
-        messages = await cli.beta.threads.messages.list(
-            thread_id, limit=10, order="asc"
-        )
-
-        user_messages = list[str]()
-        for message in messages.data:
-            for content in message.content:
-                if message.role == "user":
-                    if content.type == "text":
-                        user_messages.append(
-                            f"{' '.join(content.text.value.split()[:words])}"
-                        )
-                    if content.type in ["image_file", "image_url"]:
-                        user_messages.append("User uploaded an image file")
-        return user_messages
+        return await _get_v2_thread_user_messages(cli, thread_id, words)
     elif thread_version == 3:
         messages_v3 = await models.Thread.list_messages(
-            session, int(thread_id), limit=10, order="asc"
+            session, int(thread_id), limit=SUMMARY_THREAD_MESSAGE_LIMIT, order="asc"
         )
-
-        user_messages = list[str]()
-        for message in messages_v3:
-            if message.role == "user":
-                for content in message.content:
-                    if content.type == MessagePartType.INPUT_TEXT:
-                        user_messages.append(
-                            f"{' '.join(content.text.split()[:words])}"
-                        )
-                    elif content.type == MessagePartType.INPUT_IMAGE:
-                        user_messages.append("User uploaded an image file")
-        return user_messages
+        return _v3_user_messages(messages_v3, words)
     else:
         raise ValueError(f"Invalid thread version: {thread_version}")
 
 
+async def get_threads_user_messages(
+    session: AsyncSession,
+    cli: openai.AsyncClient,
+    threads: list[models.Thread],
+    words: int = 100,
+    concurrency: int = SUMMARY_THREAD_FETCH_CONCURRENCY,
+) -> dict[int, list[str]]:
+    """User messages of each thread, keyed by thread ID.
+
+    v3 messages are loaded for all threads in one query; v2 messages are
+    fetched from OpenAI for up to `concurrency` threads at once.
+    """
+    for thread in threads:
+        if thread.version > 3:
+            raise ValueError(f"Invalid thread version: {thread.version}")
+
+    v3_ids = [thread.id for thread in threads if thread.version == 3]
+    v3_messages = await models.Thread.list_first_messages_by_thread_ids(
+        session, v3_ids, limit=SUMMARY_THREAD_MESSAGE_LIMIT
+    )
+    user_messages = {
+        id_: _v3_user_messages(v3_messages.get(id_, []), words) for id_ in v3_ids
+    }
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _fetch(thread_id: str) -> list[str]:
+        async with semaphore:
+            return await _get_v2_thread_user_messages(cli, thread_id, words)
+
+    v2_threads = [thread for thread in threads if thread.version <= 2]
+    v2_messages = await asyncio.gather(
+        *(_fetch(thread.thread_id) for thread in v2_threads)
+    )
+    for thread, messages in zip(v2_threads, v2_messages):
+        user_messages[thread.id] = messages
+    return user_messages
+
+
+async def _get_v2_thread_user_messages(
+    cli: openai.AsyncClient, thread_id: str, words: int
+) -> list[str]:
+    messages = await cli.beta.threads.messages.list(
+        thread_id, limit=SUMMARY_THREAD_MESSAGE_LIMIT, order="asc"
+    )
+
+    user_messages = list[str]()
+    for message in messages.data:
+        for content in message.content:
+            if message.role == "user":
+                if content.type == "text":
+                    user_messages.append(
+                        f"{' '.join(content.text.value.split()[:words])}"
+                    )
+                if content.type in ["image_file", "image_url"]:
+                    user_messages.append("User uploaded an image file")
+    return user_messages
+
+
+def _v3_user_messages(messages: list[models.Message], words: int) -> list[str]:
+    user_messages = list[str]()
+    for message in messages:
+        if message.role == "user":
+            for content in message.content:
+                if content.type == MessagePartType.INPUT_TEXT:
+                    user_messages.append(f"{' '.join(content.text.split()[:words])}")
+                elif content.type == MessagePartType.INPUT_IMAGE:
+                    user_messages.append("User uploaded an image file")
+    return user_messages
+
+
 summarization_prompt = """
 Analyze user questions to identify 2-3 common topics members ask about. Prioritize frequent topics and return results without exceeding 5 relevant threads. IF THERE ARE NO VALUABLE TOPICS OR THREADS, DO NOT RETURN ANY RESULTS. Ensure that no single thread ID is listed more than once for the same topic.
 
@@ -467,6 +604,7 @@ async def generate_thread_summary(
     cli: openai.AsyncClient,
     thread_messages: list[ThreadUserMessages],
     class_id: int | None = None,
+    usage: SummaryUsage | None = None,
 ) -> AIAssistantSummaryOutput | None:
     safety_identifier: str | openai.NotGiven = (
         build_class_summary_safety_identifier(class_id)
@@ -483,6 +621,8 @@ async def generate_thread_summary(
         reasoning=Reasoning(effort="low", summary=None),
         safety_identifier=safety_identifier,
     )
+    if usage is not None:
+        usage.record(completion.usage)
 
     return completion.output_parsed
 
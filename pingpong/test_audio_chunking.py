@@ -0,0 +1,176 @@
+import asyncio
+import shutil
+import subprocess
+
+import pytest
+
+from pingpong.audio_chunking import (
+    AudioChunk,
+    plan_audio_chunks,
+    scan_audio_silences,
+    transcribe_audio_chunks,
+)
+
+
+def test_plan_audio_chunks_keeps_short_recordings_whole() -> None:
+    assert plan_audio_chunks(
+        900_000, [], target_ms=600_000, max_ms=1_200_000, overlap_ms=5_000
+    ) == [
+        AudioChunk(
+            start_ms=0,
+            end_ms=900_000,
+            keep_start_ms=0,
+            keep_end_ms=900_000,
+            is_last=True,
+        )
+    ]
+
+
+def test_plan_audio_chunks_cuts_at_silence_nearest_target() -> None:
+    chunks = plan_audio_chunks(
+        2_000_000,
+        [(350_000, 352_000), (640_000, 642_000), (1_250_000, 1_251_000)],
+        target_ms=600_000,
+        max_ms=900_000,
+        overlap_ms=5_000,
+    )
+
+    assert [(chunk.keep_start_ms, chunk.keep_end_ms) for chunk in chunks] == [
+        (0, 641_000),
+        (641_000, 1_250_500),
+        (1_250_500, 2_000_000),
+    ]
+    assert [(chunk.start_ms, chunk.end_ms) for chunk in chunks] == [
+        (0, 646_000),
+        (636_000, 1_255_500),
+        (1_245_500, 2_000_000),
+    ]
+    assert [chunk.is_last for chunk in chunks] == [False, False, True]
+
+
+def test_plan_audio_chunks_falls_back_to_hard_cut_without_silence() -> None:
+    chunks = plan_audio_chunks(
+        1_700_000,
+        [(100_000, 101_000)],
+        target_ms=600_000,
+        max_ms=900_000,
+        overlap_ms=2_000,
+    )
+
+    assert [(chunk.keep_start_ms, chunk.keep_end_ms) for chunk in chunks] == [
+        (0, 600_000),
+        (600_000, 1_200_000),
+        (1_200_000, 1_700_000),
+    ]
+
+
+def test_audio_chunk_owns_items_by_midpoint() -> None:
+    first = AudioChunk(start_ms=0, end_ms=605_000, keep_start_ms=0, keep_end_ms=600_000)
+    last = AudioChunk(
+        start_ms=595_000,
+        end_ms=900_000,
+        keep_start_ms=600_000,
+        keep_end_ms=900_000,
+        is_last=True,
+    )
+
+    assert first.owns(599_000, 600_800)
+    assert not last.owns(599_000, 600_800)
+    assert not first.owns(599_800, 601_000)
+    assert last.owns(599_800, 601_000)
+    assert last.owns(899_900, 900_300)
+
+
+async def test_transcribe_audio_chunks_bounds_concurrency_and_keeps_order(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> None:
+    written: list[str] = []
+    in_flight = 0
+    max_in_flight = 0
+
+    def fake_write_audio_chunk(_input_path, _chunk, *, output_path, **_kwargs):
+        written.append(output_path)
+        with open(output_path, "wb") as chunk_file:
+            chunk_file.write(b"audio")
+
+    async def transcribe(chunk: AudioChunk, chunk_path: str) -> int:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        # Later chunks finish first to check results keep chunk order.
+        await asyncio.sleep(0.01 * (5 - chunk.keep_start_ms // 1000))
+        in_flight -= 1
+        return chunk.keep_start_ms
+
+    monkeypatch.setattr(
+        "pingpong.audio_chunking.write_audio_chunk", fake_write_audio_chunk
+    )
+    chunks = [
+        AudioChunk(
+            start_ms=index * 1000,
+            end_ms=(index + 1) * 1000,
+            keep_start_ms=index * 1000,
+            keep_end_ms=(index + 1) * 1000,
+        )
+        for index in range(5)
+    ]
+
+    results = await transcribe_audio_chunks(
+        "recording.webm",
+        chunks,
+        transcribe,
+        ffmpeg_path="/ffmpeg",
+        temp_dir=str(tmp_path),
+        encode_args=[],
+        suffix=".webm",
+        concurrency=2,
+    )
+
+    assert results == [0, 1000, 2000, 3000, 4000]
+    assert max_in_flight == 2
+    assert len(written) == 5
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_scan_audio_silences_reports_duration_and_pauses(tmp_path) -> None:
+    ffmpeg_path = shutil.which("ffmpeg")
+    assert ffmpeg_path is not None
+    recording_path = tmp_path / "recording.webm"
+    subprocess.run(
+        [
+            ffmpeg_path,
+            "-y",
+            "-f",
+            "lavfi",
+            "-i",
+            "sine=f=440:d=3",
+            "-f",
+            "lavfi",
+            "-i",
+            "anullsrc=r=48000:cl=mono:d=2",
+            "-f",
+            "lavfi",
+            "-i",
+            "sine=f=300:d=4",
+            "-filter_complex",
+            "[0][1][2]concat=n=3:v=0:a=1",
+            "-ac",
+            "1",
+            "-c:a",
+            "libopus",
+            str(recording_path),
+        ],
+        capture_output=True,
+        check=True,
+    )
+
+    duration_ms, silences = scan_audio_silences(
+        str(recording_path), ffmpeg_path=ffmpeg_path
+    )
+
+    assert abs(duration_ms - 9_000) < 100
+    assert len(silences) == 1
+    silence_start_ms, silence_end_ms = silences[0]
+    assert abs(silence_start_ms - 3_000) < 100
+    assert abs(silence_end_ms - 5_000) < 100
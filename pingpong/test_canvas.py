@@ -1,8 +1,11 @@
+import asyncio
+from types import SimpleNamespace
 from unittest.mock import AsyncMock
 
 import pytest
 
 from pingpong.canvas import CanvasCourseClient, CanvasException
+from pingpong.schemas import CanvasRequestResponse
 
 
 class StubCanvasCourseClient(CanvasCourseClient):
@@ -44,3 +47,29 @@ async def test_roster_access_check_preserves_numeric_course_ids():
     assert requested_paths == [
         ("/api/v1/courses/123/users", {"params": {"include[]": ["enrollments"]}})
     ]
+
+
+@pytest.mark.asyncio
+async def test_in_teaching_staff_stops_paging_without_touching_the_db():
+    client = object.__new__(StubCanvasCourseClient)
+    client.config = SimpleNamespace(url=lambda path: f"https://canvas.test{path}")
+    client._get_access_token = AsyncMock(return_value="token")
+    fetches = []
+
+    async def make_authed_request_get(path, params=None, **kwargs):
+        fetches.append((asyncio.current_task(), kwargs))
+        page = len(fetches)
+        return CanvasRequestResponse(
+            response=[{"course_id": page}],
+            next_page=f"https://canvas.test/api/v1/users/self/enrollments?page={page + 1}",
+        )
+
+    client._make_authed_request_get = make_authed_request_get
+
+    assert await client._in_teaching_staff("1") is True
+
+    # The token is looked up once, by the caller, before paging starts; the
+    # background fetches only reuse it and are stopped once the check returns.
+    client._get_access_token.assert_awaited_once_with(check_authorized_user=True)
+    assert all(kwargs == {"access_token": "token"} for _, kwargs in fetches)
+    assert all(task.done() for task, _ in fetches)
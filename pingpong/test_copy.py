@@ -0,0 +1,423 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import openai
+import pytest
+from sqlalchemy import delete, func, select, update
+
+import pingpong.copy as copy_module
+from pingpong import lecture_slide_service, models, schemas
+from pingpong.config import LocalAudioStoreSettings
+
+pytestmark = pytest.mark.asyncio
+
+ASSISTANT_IDS = [10, 11, 12, 13]
+
+
+class FakeAuthz:
+    """In-memory authz client that records each write."""
+
+    def __init__(self, grants):
+        self.grants = set(grants)
+        self.writes: list[list[tuple[str, str, str]]] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def list(self, entity, relation, type_):
+        return [
+            int(target.split(":")[1])
+            for ent, rel, target in self.grants
+            if ent == entity and rel == relation and target.startswith(f"{type_}:")
+        ]
+
+    async def list_entities(self, target, relation, type_):
+        return [
+            int(ent.split(":")[1])
+            for ent, rel, obj in self.grants
+            if obj == target and rel == relation and ent.startswith(f"{type_}:")
+        ]
+
+    async def check(self, checks):
+        return [c in self.grants for c in checks]
+
+    async def write(self, grant=None, revoke=None):
+        self.writes.append(list(grant or []))
+        self.grants.update(grant or [])
+
+    write_safe = write
+
+
+class FakeOpenAI:
+    """Creates vector stores after a delay, failing those holding `failing` once."""
+
+    def __init__(self, failing: set[str] = frozenset()):
+        self.failing = set(failing)
+        self.created: list[str] = []
+        self.deleted: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.vector_stores = SimpleNamespace(
+            create=self._create,
+            delete=self._delete,
+            file_batches=SimpleNamespace(create_and_poll=self._upload),
+        )
+        self.assistants_created: list[str] = []
+        self.assistants_deleted: list[str] = []
+        self.beta = SimpleNamespace(
+            assistants=SimpleNamespace(
+                create=self._create_assistant, delete=self._delete_assistant
+            )
+        )
+
+    async def _create(self, metadata):
+        id_ = f"vs-copy-{len(self.created)}"
+        self.created.append(id_)
+        return SimpleNamespace(id=id_)
+
+    async def _upload(self, vector_store_id, file_ids):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if self.failing.intersection(file_ids):
+            self.failing.clear()
+            raise openai.BadRequestError(
+                "rejected",
+                response=SimpleNamespace(request=None, status_code=400, headers={}),
+                body=None,
+            )
+
+    async def _delete(self, vector_store_id):
+        self.deleted.append(vector_store_id)
+
+    async def _create_assistant(self, **kwargs):
+        id_ = f"asst-copy-{len(self.assistants_created)}"
+        self.assistants_created.append(id_)
+        return SimpleNamespace(id=id_)
+
+    async def _delete_assistant(self, assistant_id):
+        self.assistants_deleted.append(assistant_id)
+
+
+async def _seed(db) -> FakeAuthz:
+    async with db.async_session() as session:
+        session.add(models.Institution(id=1, name="Test Institution"))
+        session.add(
+            models.Class(
+                id=1, name="Source Class", term="Fall", institution_id=1, api_key="sk"
+            )
+        )
+        session.add_all(
+            models.User(id=id_, email=f"user{id_}@example.com") for id_ in (1, 2, 3)
+        )
+        await session.flush()
+        session.add_all(
+            models.UserClassRole(user_id=id_, class_id=1) for id_ in (1, 2, 3)
+        )
+        shared = await models.File.create(
+            session,
+            {"name": "Syllabus", "content_type": "text/plain", "file_id": "file-1"},
+            class_id=1,
+        )
+        for id_ in ASSISTANT_IDS:
+            file = await models.File.create(
+                session,
+                {
+                    "name": "Notes",
+                    "content_type": "text/plain",
+                    "file_id": f"file-{id_}",
+                },
+                class_id=1,
+            )
+            vector_store_id = await models.VectorStore.create(
+                session,
+                {
+                    "type": schemas.VectorStoreType.ASSISTANT,
+                    "class_id": 1,
+                    "version": 2,
+                    "vector_store_id": f"vs-{id_}",
+                },
+                [file.file_id],
+            )
+            session.add(
+                models.Assistant(
+                    id=id_,
+                    name=f"Assistant {id_}",
+                    instructions="Be helpful",
+                    interaction_mode=schemas.InteractionMode.CHAT,
+                    model="gpt-4o-mini",
+                    class_id=1,
+                    tools="[]",
+                    creator_id=1,
+                    vector_store_id=vector_store_id,
+                    version=3,
+                    published=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                )
+            )
+        await session.commit()
+
+    return FakeAuthz(
+        [
+            ("user:1", "teacher", "class:1"),
+            ("user:1", "supervisor", "class:1"),
+            ("user:2", "student", "class:1"),
+            ("user:3", "student", "class:1"),
+            ("class:1", "parent", f"class_file:{shared.id}"),
+        ]
+    )
+
+
+@pytest.fixture
+def notifications(monkeypatch):
+    sent = AsyncMock(return_value=None)
+    failed = AsyncMock(return_value=None)
+    monkeypatch.setattr(copy_module, "send_clone_group_notification", sent)
+    monkeypatch.setattr(copy_module, "send_clone_group_failed", failed)
+    return SimpleNamespace(sent=sent, failed=failed)
+
+
+def _copy_options() -> schemas.CopyClassRequest:
+    return schemas.CopyClassRequest(
+        name="Copied Class", term="Spring", copy_assistants="all", copy_users="all"
+    )
+
+
+async def _job(db) -> models.ClassCopyJob:
+    async with db.async_session() as session:
+        return await session.scalar(select(models.ClassCopyJob))
+
+
+async def _copied_assistants(db, class_id: int) -> list[models.Assistant]:
+    async with db.async_session() as session:
+        return await models.Assistant.get_by_class_id(session, class_id)
+
+
+async def test_copy_group_copies_vector_stores_concurrently(
+    config, db, monkeypatch, notifications
+):
+    authz = await _seed(db)
+    monkeypatch.setattr(config.authz.driver, "get_client", lambda: authz)
+    cli = FakeOpenAI()
+
+    await copy_module.copy_group(_copy_options(), cli, "1", 1)
+
+    job = await _job(db)
+    assert job.status == schemas.ClassCopyJobStatus.COMPLETED
+    assert job.completed_steps == ["class", "shared_files", "users", "assistants"]
+    copied = await _copied_assistants(db, job.target_class_id)
+    assert sorted(job.copied_assistants) == [str(id_) for id_ in ASSISTANT_IDS]
+    assert sorted(a.id for a in copied) == sorted(job.copied_assistants.values())
+    assert len({a.vector_store_id for a in copied}) == len(ASSISTANT_IDS)
+    assert cli.max_in_flight == len(ASSISTANT_IDS)
+
+    # One write for each step: class, shared files, users, assistants.
+    assert len(authz.writes) == 4
+    for role, user_id in [("teacher", 1), ("student", 2), ("student", 3)]:
+        assert (f"user:{user_id}", role, f"class:{job.target_class_id}") in (
+            authz.grants
+        )
+    notifications.sent.assert_awaited_once()
+
+
+async def test_failed_copy_resumes_where_it_stopped(
+    config, db, monkeypatch, notifications
+):
+    authz = await _seed(db)
+    monkeypatch.setattr(config.authz.driver, "get_client", lambda: authz)
+    monkeypatch.setattr(copy_module, "CLASS_COPY_ASSISTANT_BATCH_SIZE", 2)
+    cli = FakeOpenAI(failing={"file-12"})
+
+    with pytest.raises(Exception):
+        await copy_module.copy_group(_copy_options(), cli, "1", 1)
+
+    job = await _job(db)
+    assert job.status == schemas.ClassCopyJobStatus.FAILED
+    assert job.completed_steps == ["class", "shared_files", "users"]
+    assert sorted(job.copied_assistants) == ["10", "11"]
+    target_class_id = job.target_class_id
+    assert len(await _copied_assistants(db, target_class_id)) == 2
+    # Vector stores made for the failed batch are deleted.
+    assert sorted(cli.deleted) == sorted(cli.created[2:])
+    notifications.failed.assert_awaited_once()
+
+    await copy_module.resume_class_copy(job.id, cli)
+
+    job = await _job(db)
+    assert job.status == schemas.ClassCopyJobStatus.COMPLETED
+    assert job.attempts == 2
+    assert job.target_class_id == target_class_id
+    copied = await _copied_assistants(db, target_class_id)
+    assert sorted(a.name for a in copied) == [
+        f"Assistant {id_}" for id_ in ASSISTANT_IDS
+    ]
+    async with db.async_session() as session:
+        classes = await session.scalars(select(models.Class.id))
+        assert sorted(classes) == [1, target_class_id]
+        roles = await session.scalars(
+            select(models.UserClassRole.user_id).where(
+                models.UserClassRole.class_id == target_class_id
+            )
+        )
+        assert sorted(roles) == [1, 2, 3]
+    notifications.sent.assert_awaited_once()
+
+
+async def test_failed_batch_deletes_its_openai_assistants(
+    config, db, monkeypatch, notifications
+):
+    authz = await _seed(db)
+    async with db.async_session() as session:
+        await session.execute(update(models.Assistant).values(version=2))
+        await session.commit()
+    write = authz.write
+
+    async def _fail_assistant_grants(grant=None, revoke=None):
+        if any(obj.startswith("assistant:") for _, _, obj in grant or []):
+            raise RuntimeError("authz unavailable")
+        await write(grant, revoke)
+
+    authz.write_safe = _fail_assistant_grants
+    monkeypatch.setattr(config.authz.driver, "get_client", lambda: authz)
+    cli = FakeOpenAI()
+
+    with pytest.raises(RuntimeError, match="authz unavailable"):
+        await copy_module.copy_group(_copy_options(), cli, "1", 1)
+
+    assert len(cli.assistants_created) == len(ASSISTANT_IDS)
+    assert sorted(cli.assistants_deleted) == sorted(cli.assistants_created)
+    assert sorted(cli.deleted) == sorted(cli.created)
+    job = await _job(db)
+    assert job.copied_assistants == {}
+
+
+async def test_copy_assistant_shares_lecture_slide_media(
+    config, db, monkeypatch, tmp_path
+):
+    narration_dir = tmp_path / "narrations"
+    narration_dir.mkdir()
+    monkeypatch.setattr(
+        config,
+        "lecture_video_audio_store",
+        LocalAudioStoreSettings(save_target=str(narration_dir)),
+    )
+    async with db.async_session() as session:
+        session.add(models.Institution(id=1, name="Test Institution"))
+        session.add(models.User(id=1, email="user1@example.com"))
+        session.add_all(
+            models.Class(id=id_, name=f"Class {id_}", institution_id=1, api_key="sk")
+            for id_ in (1, 2)
+        )
+        await session.flush()
+        source = await models.LectureSlideSourceStoredObject.create(
+            session,
+            key="lecture.pdf",
+            original_filename="lecture.pdf",
+            content_type="application/pdf",
+            content_length=128,
+        )
+        deck = await models.LectureSlideDeck.create(
+            session,
+            class_id=1,
+            source_stored_object_id=source.id,
+            uploader_id=1,
+            display_name="lecture.pdf",
+            slide_count=1,
+            voice_id="voice-test-id",
+            status=schemas.LectureSlideDeckStatus.READY,
+        )
+        audio = models.LectureSlideNarrationStoredObject(
+            key="slide.ogg", content_type="audio/ogg", content_length=100
+        )
+        session.add(audio)
+        await session.flush()
+        (narration_dir / audio.key).write_bytes(b"slide-audio")
+        narration = models.LectureSlideNarration(
+            stored_object_id=audio.id,
+            status=schemas.LectureSlideNarrationStatus.READY,
+        )
+        session.add(narration)
+        await session.flush()
+        session.add(
+            models.LectureSlidePage(
+                lecture_slide_deck_id=deck.id, position=0, narration_id=narration.id
+            )
+        )
+        file = await models.File.create(
+            session,
+            {
+                "name": "Notes",
+                "content_type": "text/plain",
+                "file_id": "file-notes",
+                "private": True,
+                "uploader_id": 1,
+            },
+            class_id=1,
+        )
+        await models.LectureSlideAdditionalContextFile.create(
+            session,
+            lecture_slide_deck_id=deck.id,
+            file_object_id=file.id,
+            class_id=1,
+            uploader_id=1,
+            position=0,
+            original_filename="notes.txt",
+            content_type="text/plain",
+            content_length=64,
+        )
+        session.add(
+            models.Assistant(
+                id=20,
+                name="Slides",
+                instructions="Be helpful",
+                interaction_mode=schemas.InteractionMode.LECTURE_SLIDES,
+                model="gpt-4o-mini",
+                class_id=1,
+                tools="[]",
+                creator_id=1,
+                version=3,
+                lecture_slide_deck_id=deck.id,
+            )
+        )
+        await session.commit()
+
+    authz = FakeAuthz([])
+    async with db.async_session() as session:
+        assistant = await models.Assistant.get_by_id_with_copy_context(session, 20)
+        copied = await copy_module.copy_assistant(
+            session, authz, None, 2, assistant, require_published=False
+        )
+        await session.commit()
+
+    async with db.async_session() as session:
+        copied_deck = await models.LectureSlideDeck.get_by_id_with_processing_context(
+            session, copied.lecture_slide_deck_id
+        )
+        assert copied_deck.id != deck.id
+        assert copied_deck.class_id == 2
+        assert copied_deck.source_stored_object_id == source.id
+        assert copied_deck.pages[0].narration.stored_object_id == audio.id
+        assert [f.class_id for f in copied_deck.additional_context_files] == [2]
+        assert ("class:2", "parent", f"user_file:{file.id}") in authz.grants
+        assert (
+            await session.scalar(
+                select(func.count()).select_from(
+                    models.LectureSlideNarrationStoredObject
+                )
+            )
+            == 1
+        )
+
+        # Deleting the source deck keeps the media the copy still uses.
+        await session.execute(delete(models.Assistant).where(models.Assistant.id == 20))
+        await lecture_slide_service.delete_lecture_slide_deck_if_unused(
+            session, deck.id
+        )
+        await session.commit()
+        assert await session.get(models.LectureSlideNarrationStoredObject, audio.id)
+    assert (narration_dir / "slide.ogg").exists()
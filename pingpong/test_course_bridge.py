@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime, timedelta, timezone
 from types import SimpleNamespace
 
@@ -8,6 +9,7 @@ from yarl import URL
 import pingpong.config as config_module
 import pingpong.schemas as schemas
 from pingpong.lti import course_bridge as course_bridge_module
+from pingpong.roster_diff import RosterSyncStats
 
 
 class FakeTokenResponse:
@@ -158,33 +160,31 @@ class FakeWriteDB:
         self.flush_count += 1
 
 
-class FakeSavepoint:
+class FakeSyncSession(FakeWriteDB):
     def __init__(self):
-        self.rollback_count = 0
+        super().__init__()
+        self.commit_count = 0
+        self.closed = False
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
+        self.closed = True
         return False
 
-    async def rollback(self):
-        self.rollback_count += 1
+    async def commit(self):
+        self.commit_count += 1
 
 
-class FakeSyncSession(FakeWriteDB):
+class FakeSessionFactory:
     def __init__(self):
-        super().__init__()
-        self.savepoints: list[FakeSavepoint] = []
-        self.commit_count = 0
+        self.sessions: list[FakeSyncSession] = []
 
-    def begin_nested(self):
-        savepoint = FakeSavepoint()
-        self.savepoints.append(savepoint)
-        return savepoint
-
-    async def commit(self):
-        self.commit_count += 1
+    def __call__(self):
+        session = FakeSyncSession()
+        self.sessions.append(session)
+        return session
 
 
 class FakeSSOProvider:
@@ -192,6 +192,19 @@ class FakeSSOProvider:
         self.name = name
 
 
+@pytest.fixture(autouse=True)
+def _skip_roster_snapshots(monkeypatch):
+    # The sync tests use fake sessions; run every sync as a full reconcile
+    # without reading or writing a roster snapshot.
+    async def _sync_roster_diff(
+        session, class_id, user_id, new_ucr, source, make_adder, **kwargs
+    ):
+        results = await make_adder(new_ucr, None).add_new_users()
+        return results, RosterSyncStats(full_reconcile=True)
+
+    monkeypatch.setattr(course_bridge_module, "sync_roster_diff", _sync_roster_diff)
+
+
 @pytest.fixture(autouse=True)
 def _patch_lti_security_config(monkeypatch):
     allow_deny = SimpleNamespace(allow=["*"], deny=[])
@@ -1703,6 +1716,154 @@ async def test_request_all_nrps_pages_detects_loop_for_canonicalized_next_page(
     assert fake_session.requests[1]["url"] == context_memberships_url
 
 
+@pytest.mark.asyncio
+async def test_request_all_nrps_pages_retries_rate_limits_and_outages(monkeypatch):
+    context_memberships_url = (
+        "https://canvas.example.com/api/lti/courses/1/names_and_roles"
+    )
+    registration = SimpleNamespace(
+        client_id="client-123",
+        issuer="https://canvas.example.com",
+        openid_configuration=(
+            '{"token_endpoint":"https://canvas.example.com/login/oauth2/token"}'
+        ),
+        auth_token_url="https://canvas.example.com/fallback-token",
+    )
+    lti_class = SimpleNamespace(
+        id=23,
+        registration=registration,
+        context_memberships_url=context_memberships_url,
+        resource_link_id=None,
+        course_id="1",
+    )
+
+    async def _get_by_id_with_registration(cls, db, id_):
+        return lti_class
+
+    monkeypatch.setattr(
+        course_bridge_module.LTIClass,
+        "get_by_id_with_registration",
+        classmethod(_get_by_id_with_registration),
+    )
+    monkeypatch.setattr(
+        course_bridge_module.jwt,
+        "encode",
+        lambda *args, **kwargs: "signed-client-assertion",
+    )
+    monkeypatch.setattr(course_bridge_module.uuid, "uuid7", lambda: "uuid7-test")
+    delays: list[tuple[int, str | None]] = []
+
+    def _retry_delay(attempt, retry_after=None, **kwargs):
+        delays.append((attempt, retry_after))
+        return 0
+
+    monkeypatch.setattr(course_bridge_module, "retry_delay", _retry_delay)
+
+    second_page_url = f"{context_memberships_url}?page=2"
+    fake_session = FakeClientSession(
+        [
+            FakeTokenResponse(
+                payload={"access_token": "short-lived-token", "expires_in": 3600}
+            ),
+            FakeTokenResponse(status=429, headers={"Retry-After": "7"}),
+            FakeTokenResponse(status=503, payload={"error": "unavailable"}),
+            FakeTokenResponse(payload={"members": [1], "next": second_page_url}),
+            FakeTokenResponse(status=502),
+            FakeTokenResponse(payload={"members": [2]}),
+        ]
+    )
+    monkeypatch.setattr(
+        course_bridge_module.aiohttp,
+        "ClientSession",
+        _client_session_factory(fake_session),
+    )
+
+    async with course_bridge_module.CourseBridgeClient(
+        db=SimpleNamespace(),
+        lti_class_id=23,
+        key_manager=FakeKeyManager(),
+        nowfn=lambda: datetime(2026, 2, 10, 10, 0, tzinfo=timezone.utc),
+    ) as client:
+        pages = [
+            page
+            async for page in client._request_all_nrps_pages(context_memberships_url)
+        ]
+
+    assert [page["members"] for page in pages] == [[1], [2]]
+    assert delays == [(1, "7"), (2, None), (1, None)]
+    assert [request["url"] for request in fake_session.requests[1:]] == [
+        context_memberships_url,
+        context_memberships_url,
+        context_memberships_url,
+        second_page_url,
+        second_page_url,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_make_authed_nrps_get_gives_up_after_max_attempts(monkeypatch):
+    lti_class = SimpleNamespace(
+        id=23,
+        registration=SimpleNamespace(
+            client_id="client-123",
+            issuer="https://canvas.example.com",
+            openid_configuration=None,
+            auth_token_url="https://canvas.example.com/login/oauth2/token",
+        ),
+        context_memberships_url=None,
+        resource_link_id=None,
+        course_id="1",
+    )
+
+    async def _get_by_id_with_registration(cls, db, id_):
+        return lti_class
+
+    monkeypatch.setattr(
+        course_bridge_module.LTIClass,
+        "get_by_id_with_registration",
+        classmethod(_get_by_id_with_registration),
+    )
+    monkeypatch.setattr(
+        course_bridge_module.jwt,
+        "encode",
+        lambda *args, **kwargs: "signed-client-assertion",
+    )
+    monkeypatch.setattr(course_bridge_module.uuid, "uuid7", lambda: "uuid7-test")
+    monkeypatch.setattr(course_bridge_module, "retry_delay", lambda *a, **k: 0)
+
+    attempts = course_bridge_module.NRPS_PAGE_MAX_ATTEMPTS
+    fake_session = FakeClientSession(
+        [
+            FakeTokenResponse(
+                payload={"access_token": "short-lived-token", "expires_in": 3600}
+            ),
+            *(
+                FakeTokenResponse(status=503, payload={"error": "unavailable"})
+                for _ in range(attempts)
+            ),
+        ]
+    )
+    monkeypatch.setattr(
+        course_bridge_module.aiohttp,
+        "ClientSession",
+        _client_session_factory(fake_session),
+    )
+
+    async with course_bridge_module.CourseBridgeClient(
+        db=SimpleNamespace(),
+        lti_class_id=23,
+        key_manager=FakeKeyManager(),
+        nowfn=lambda: datetime(2026, 2, 10, 10, 0, tzinfo=timezone.utc),
+    ) as client:
+        with pytest.raises(course_bridge_module.CourseBridgeException) as excinfo:
+            await client._make_authed_nrps_get(
+                "https://canvas.example.com/api/lti/courses/1/names_and_roles"
+            )
+
+    assert excinfo.value.detail == "unavailable"
+    assert len(fake_session.requests) == 1 + attempts
+
+
 async def _async_return(value):
     return value
 
@@ -1965,12 +2126,15 @@ async def test_sync_calls_add_new_users_script_with_lti_class_context(monkeypatc
     captured: dict[str, object] = {}
 
     class FakeAddNewUsersScript:
-        def __init__(self, class_id, user_id, session, client, new_ucr):
+        def __init__(
+            self, class_id, user_id, session, client, new_ucr, removed_user_ids
+        ):
             captured["class_id"] = class_id
             captured["user_id"] = user_id
             captured["session"] = session
             captured["client"] = client
             captured["new_ucr"] = new_ucr
+            captured["removed_user_ids"] = removed_user_ids
 
         async def add_new_users(self):
             return course_bridge_module.CreateUserResults(
@@ -2003,6 +2167,7 @@ async def test_sync_calls_add_new_users_script_with_lti_class_context(monkeypatc
     assert captured["session"] is db
     assert captured["client"] is authz_client
     assert captured["new_ucr"] is expected_ucr
+    assert captured["removed_user_ids"] is None
     assert lti_class.lti_status == course_bridge_module.LTIStatus.LINKED
     assert lti_class.last_sync_error is None
     assert lti_class.last_synced == fixed_now
@@ -2218,7 +2383,9 @@ async def test_manual_course_bridge_sync_roster_calls_add_new_users_manual(
     captured: dict[str, object] = {}
 
     class FakeAddNewUsersManual:
-        def __init__(self, class_id, new_ucr, request, tasks, user_id=None):
+        def __init__(
+            self, class_id, new_ucr, request, tasks, user_id=None, removed_user_ids=None
+        ):
             captured["class_id"] = class_id
             captured["new_ucr"] = new_ucr
             captured["request"] = request
@@ -2310,7 +2477,9 @@ async def test_manual_course_bridge_sync_roster_raises_manual_error_on_failure(
     )
 
     class FakeAddNewUsersManual:
-        def __init__(self, class_id, new_ucr, request, tasks, user_id=None):
+        def __init__(
+            self, class_id, new_ucr, request, tasks, user_id=None, removed_user_ids=None
+        ):
             pass
 
         async def add_new_users(self):
@@ -2367,7 +2536,9 @@ async def test_script_course_bridge_sync_roster_uses_script_client(monkeypatch):
         )
 
     class FakeAddNewUsersScript:
-        def __init__(self, class_id, user_id, session, client, new_ucr):
+        def __init__(
+            self, class_id, user_id, session, client, new_ucr, removed_user_ids
+        ):
             captured["class_id"] = class_id
             captured["user_id"] = user_id
             captured["session"] = session
@@ -2442,7 +2613,9 @@ async def test_script_course_bridge_sync_roster_marks_error_on_row_failures(
         )
 
     class FakeAddNewUsersScript:
-        def __init__(self, class_id, user_id, session, client, new_ucr):
+        def __init__(
+            self, class_id, user_id, session, client, new_ucr, removed_user_ids
+        ):
             pass
 
         async def add_new_users(self):
@@ -2577,7 +2750,9 @@ async def test_manual_course_bridge_sync_roster_marks_error_on_row_failures(
         )
 
     class FakeAddNewUsersManual:
-        def __init__(self, class_id, new_ucr, request, tasks, user_id=None):
+        def __init__(
+            self, class_id, new_ucr, request, tasks, user_id=None, removed_user_ids=None
+        ):
             pass
 
         async def add_new_users(self):
@@ -2646,9 +2821,12 @@ async def test_course_bridge_sync_all_skips_class_error_for_global_failure(
     async def _get_all_to_sync(cls, session, sync_classes_with_error_status=False):
         yield lti_class
 
+    async def _get_by_id(cls, session, id_):
+        raise AssertionError("global failures should not mark the class")
+
     class FakeScriptCourseBridgeClient:
-        def __init__(self, *, db, client, lti_class_id):
-            assert db is session
+        def __init__(self, *, db, client, lti_class_id, rate_limiter):
+            assert db is session_factory.sessions[-1]
             assert client is authz_client
             assert lti_class_id == lti_class.id
 
@@ -2668,20 +2846,109 @@ async def test_course_bridge_sync_all_skips_class_error_for_global_failure(
         "get_all_to_sync",
         classmethod(_get_all_to_sync),
     )
+    monkeypatch.setattr(
+        course_bridge_module.LTIClass, "get_by_id", classmethod(_get_by_id)
+    )
     monkeypatch.setattr(
         course_bridge_module,
         "ScriptCourseBridgeClient",
         FakeScriptCourseBridgeClient,
     )
 
-    session = FakeSyncSession()
+    session_factory = FakeSessionFactory()
     authz_client = SimpleNamespace()
 
-    await course_bridge_module.course_bridge_sync_all(session, authz_client)
+    summary = await course_bridge_module.course_bridge_sync_all(
+        session_factory, authz_client
+    )
 
-    assert len(session.savepoints) == 1
-    assert session.savepoints[0].rollback_count == 1
+    # One session to list classes, one for the class's sync.
+    assert len(session_factory.sessions) == 2
+    assert session_factory.sessions[1].commit_count == 0
     assert lti_class.lti_status == course_bridge_module.LTIStatus.LINKED
     assert lti_class.last_sync_error == "old-error"
-    assert session.added == []
-    assert session.commit_count == 1
+    assert [result.status for result in summary.failed] == ["failed"]
+
+
+@pytest.mark.asyncio
+async def test_course_bridge_sync_all_isolates_classes(monkeypatch):
+    lti_classes = {
+        class_id: SimpleNamespace(
+            id=class_id,
+            lti_status=course_bridge_module.LTIStatus.LINKED,
+            last_sync_error=None,
+        )
+        for class_id in (401, 402, 403, 404)
+    }
+    in_flight = 0
+    max_in_flight = 0
+
+    async def _get_all_to_sync(cls, session, sync_classes_with_error_status=False):
+        for lti_class in lti_classes.values():
+            yield lti_class
+
+    async def _get_by_id(cls, session, id_):
+        return lti_classes[id_]
+
+    class FakeScriptCourseBridgeClient:
+        def __init__(self, *, db, client, lti_class_id, rate_limiter):
+            self.db = db
+            self.lti_class_id = lti_class_id
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+        async def sync_roster(self):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            try:
+                await asyncio.sleep(0.01)
+                if self.lti_class_id == 402:
+                    raise course_bridge_module.CourseBridgeException(
+                        detail="NRPS unavailable"
+                    )
+                if self.lti_class_id == 403:
+                    await asyncio.sleep(10)
+                self.db.add(self.lti_class_id)
+            finally:
+                in_flight -= 1
+
+    monkeypatch.setattr(
+        course_bridge_module.LTIClass,
+        "get_all_to_sync",
+        classmethod(_get_all_to_sync),
+    )
+    monkeypatch.setattr(
+        course_bridge_module.LTIClass, "get_by_id", classmethod(_get_by_id)
+    )
+    monkeypatch.setattr(
+        course_bridge_module,
+        "ScriptCourseBridgeClient",
+        FakeScriptCourseBridgeClient,
+    )
+
+    session_factory = FakeSessionFactory()
+    summary = await course_bridge_module.course_bridge_sync_all(
+        session_factory, SimpleNamespace(), concurrency=3, class_timeout=0.2
+    )
+
+    assert max_in_flight == 3
+    assert sorted(result.class_id for result in summary.succeeded) == [401, 404]
+    assert sorted(result.class_id for result in summary.failed) == [402, 403]
+    assert lti_classes[402].lti_status == course_bridge_module.LTIStatus.ERROR
+    assert lti_classes[402].last_sync_error == "NRPS unavailable"
+    assert lti_classes[403].lti_status == course_bridge_module.LTIStatus.ERROR
+    assert lti_classes[403].last_sync_error == "Sync timed out after 0.2 seconds"
+    assert lti_classes[401].lti_status == course_bridge_module.LTIStatus.LINKED
+    committed = [
+        added
+        for session in session_factory.sessions
+        if session.commit_count
+        for added in session.added
+        if isinstance(added, int)
+    ]
+    assert sorted(committed) == [401, 404]
@@ -0,0 +1,175 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+
+from pingpong import models, schemas
+from pingpong.config import EmailOutboxSettings
+from pingpong.email import MockEmailSender
+from pingpong.email_outbox import (
+    EmailOutboxDispatcher,
+    OutboxEmailSender,
+    enqueue_emails,
+    outbound_email_sender,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+class FlakySender(MockEmailSender):
+    """Fails every send to an address in `failing`."""
+
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = set(failing)
+
+    async def send(self, to, subject, message):
+        if to in self.failing:
+            raise RuntimeError(f"rejected {to}")
+        self.sent.append((to, subject, message))
+
+
+def _settings(**kwargs) -> EmailOutboxSettings:
+    defaults = dict(
+        enabled=True,
+        rate_limit_per_second=1000,
+        burst=1000,
+        max_attempts=3,
+        retry_base_seconds=60,
+    )
+    return EmailOutboxSettings(**(defaults | kwargs))
+
+
+async def _outbox(db) -> list[models.EmailOutbox]:
+    async with db.async_session() as session:
+        result = await session.scalars(
+            select(models.EmailOutbox).order_by(models.EmailOutbox.id)
+        )
+        return list(result.all())
+
+
+async def test_enqueue_skips_repeated_idempotency_key(db):
+    emails = [("a@example.com", "Hi", "A"), ("b@example.com", "Hi", "B")]
+    async with db.async_session() as session:
+        assert await enqueue_emails(session, emails, "summary:1") == 2
+        assert await enqueue_emails(session, emails, "summary:1") == 0
+        assert await enqueue_emails(session, emails[:1], "summary:2") == 1
+        await session.commit()
+
+    rows = await _outbox(db)
+    assert [r.to_address for r in rows] == [
+        "a@example.com",
+        "b@example.com",
+        "a@example.com",
+    ]
+    assert {r.status for r in rows} == {schemas.EmailOutboxStatus.QUEUED}
+
+
+async def test_outbox_sender_joins_callers_transaction(db):
+    async with db.async_session() as session:
+        await OutboxEmailSender(session).send("a@example.com", "Hi", "A")
+        await session.rollback()
+    assert await _outbox(db) == []
+
+    async with db.async_session() as session:
+        await OutboxEmailSender(session).send("a@example.com", "Hi", "A")
+        await session.commit()
+    assert [r.to_address for r in await _outbox(db)] == ["a@example.com"]
+
+
+async def test_outbound_sender_uses_provider_when_outbox_disabled(config, monkeypatch):
+    monkeypatch.setattr(config, "email_outbox", EmailOutboxSettings(enabled=False))
+    assert outbound_email_sender() is config.email.sender
+
+    monkeypatch.setattr(config, "email_outbox", EmailOutboxSettings(enabled=True))
+    assert isinstance(outbound_email_sender(), OutboxEmailSender)
+
+
+async def test_dispatch_sends_queued_emails(db, now):
+    async with db.async_session() as session:
+        await enqueue_emails(
+            session,
+            [(f"u{i}@example.com", "Hi", f"<p>{i}</p>") for i in range(5)],
+            nowfn=now,
+        )
+        await session.commit()
+
+    sender = FlakySender()
+    dispatcher = EmailOutboxDispatcher(sender, _settings(batch_size=3), nowfn=now)
+    assert await dispatcher.dispatch_once() == 3
+    assert await dispatcher.dispatch_once() == 2
+    assert await dispatcher.dispatch_once() == 0
+
+    assert sorted(to for to, _, _ in sender.sent) == [
+        f"u{i}@example.com" for i in range(5)
+    ]
+    rows = await _outbox(db)
+    assert {r.status for r in rows} == {schemas.EmailOutboxStatus.SENT}
+    assert all(r.attempts == 1 and r.lease_token is None for r in rows)
+
+
+async def test_failed_emails_back_off_then_dead_letter(db, now):
+    async with db.async_session() as session:
+        await enqueue_emails(
+            session,
+            [("ok@example.com", "Hi", "A"), ("bad@example.com", "Hi", "B")],
+            nowfn=now,
+        )
+        await session.commit()
+
+    current = now()
+    sender = FlakySender(failing={"bad@example.com"})
+    dispatcher = EmailOutboxDispatcher(sender, _settings(), nowfn=lambda: current)
+
+    assert await dispatcher.dispatch_once() == 2
+    _, bad = await _outbox(db)
+    assert bad.status == schemas.EmailOutboxStatus.QUEUED
+    assert bad.attempts == 1
+    assert bad.last_error == "rejected bad@example.com"
+    # Not due again until the backoff has passed.
+    assert await dispatcher.dispatch_once() == 0
+
+    for _ in range(2):
+        current += timedelta(hours=1)
+        assert await dispatcher.dispatch_once() == 1
+
+    ok, bad = await _outbox(db)
+    assert ok.status == schemas.EmailOutboxStatus.SENT
+    assert bad.status == schemas.EmailOutboxStatus.DEAD
+    assert bad.attempts == 3
+
+    async with db.async_session() as session:
+        assert await models.EmailOutbox.requeue_dead(session, current) == 1
+        await session.commit()
+    sender.failing.clear()
+    assert await dispatcher.dispatch_once() == 1
+    assert {r.status for r in await _outbox(db)} == {schemas.EmailOutboxStatus.SENT}
+
+
+async def test_expired_lease_is_reclaimed(db, now):
+    async with db.async_session() as session:
+        await enqueue_emails(session, [("a@example.com", "Hi", "A")], nowfn=now)
+        await session.commit()
+
+    current = now()
+    settings = _settings(lease_seconds=60)
+    crashed = EmailOutboxDispatcher(
+        FlakySender(), settings, nowfn=lambda: current, dispatcher_id="crashed"
+    )
+    claimed, stale_token = await crashed._claim()
+    assert len(claimed) == 1
+
+    sender = FlakySender()
+    dispatcher = EmailOutboxDispatcher(sender, settings, nowfn=lambda: current)
+    # Still leased by the crashed dispatcher.
+    assert await dispatcher.dispatch_once() == 0
+
+    current += timedelta(seconds=61)
+    assert await dispatcher.dispatch_once() == 1
+    assert [to for to, _, _ in sender.sent] == ["a@example.com"]
+
+    # The crashed dispatcher's late update is fenced off by its stale lease.
+    await crashed._record(claimed, [RuntimeError("late")], stale_token)
+    [row] = await _outbox(db)
+    assert row.status == schemas.EmailOutboxStatus.SENT
+    assert row.last_error is None
@@ -0,0 +1,148 @@
+import asyncio
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from pingpong.email import MockEmailSender, SmtpEmailSender
+
+pytestmark = pytest.mark.asyncio
+
+
+class SinkHandler:
+    """Accepts every message and records which SMTP session carried it."""
+
+    def __init__(self):
+        self.messages: list[tuple[object, list[str]]] = []
+        self.reject: set[str] = set()
+
+    @property
+    def sessions(self) -> set[int]:
+        return {id(session) for session, _ in self.messages}
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.reject:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        # Keep the session alive so its id is not reused.
+        self.messages.append((session, list(envelope.rcpt_tos)))
+        return "250 Message accepted for delivery"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def sink():
+    handler = SinkHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    try:
+        yield handler, controller
+    finally:
+        controller.stop()
+
+
+def _sender(controller: Controller, **kwargs) -> SmtpEmailSender:
+    return SmtpEmailSender(
+        "noreply@example.com",
+        host=controller.hostname,
+        port=controller.port,
+        **kwargs,
+    )
+
+
+async def test_send_many_reuses_pooled_connections(sink):
+    handler, controller = sink
+    sender = _sender(controller, pool_size=3)
+
+    pool = sender.pool
+    results = await sender.send_many(
+        (f"user{i}@example.com", "Hello", f"<p>Message {i}</p>") for i in range(30)
+    )
+    await sender.close()
+
+    assert [r.to for r in results] == [f"user{i}@example.com" for i in range(30)]
+    assert all(r.error is None for r in results)
+    assert len(handler.messages) == 30
+    assert len(handler.sessions) <= 3
+    assert pool.connections_opened == len(handler.sessions)
+
+
+async def test_send_many_reports_per_recipient_errors(sink):
+    handler, controller = sink
+    handler.reject = {"bounced@example.com"}
+    sender = _sender(controller, pool_size=2)
+
+    results = await sender.send_many(
+        [
+            ("first@example.com", "Hello", "<p>1</p>"),
+            ("bounced@example.com", "Hello", "<p>2</p>"),
+            ("last@example.com", "Hello", "<p>3</p>"),
+        ]
+    )
+    await sender.close()
+
+    assert [r.error is None for r in results] == [True, False, True]
+    assert [rcpts for _, rcpts in handler.messages] == [
+        ["first@example.com"],
+        ["last@example.com"],
+    ]
+
+
+async def test_send_reconnects_after_server_drops_pooled_sessions():
+    handler = SinkHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    sender = _sender(controller, pool_size=1)
+    pool = sender.pool
+    try:
+        await sender.send("before@example.com", "Hello", "<p>1</p>")
+    finally:
+        controller.stop()
+
+    # Restart the server on the same port; the pooled session is now dead.
+    controller = Controller(handler, hostname="127.0.0.1", port=controller.port)
+    controller.start()
+    try:
+        await sender.send("after@example.com", "Hello", "<p>2</p>")
+        await sender.close()
+    finally:
+        controller.stop()
+
+    assert [rcpts for _, rcpts in handler.messages] == [
+        ["before@example.com"],
+        ["after@example.com"],
+    ]
+    assert pool.connections_opened == 2
+
+
+async def test_idle_sessions_are_recycled(sink):
+    handler, controller = sink
+    sender = _sender(controller, pool_size=1, idle_timeout=0.05)
+    await sender.send("one@example.com", "Hello", "<p>1</p>")
+    await sender.send("two@example.com", "Hello", "<p>2</p>")
+    await asyncio.sleep(0.1)
+    await sender.send("three@example.com", "Hello", "<p>3</p>")
+    await sender.close()
+
+    assert len(handler.messages) == 3
+    assert len(handler.sessions) == 2
+
+
+async def test_send_many_default_uses_send(monkeypatch):
+    sender = MockEmailSender()
+    monkeypatch.setattr("builtins.print", lambda *args, **kwargs: None)
+
+    results = await sender.send_many(
+        [("a@example.com", "Hi", "A"), ("b@example.com", "Hi", "B")]
+    )
+
+    assert [r.to for r in results] == ["a@example.com", "b@example.com"]
+    assert [email.to for email in sender.sent] == ["a@example.com", "b@example.com"]
@@ -1,6 +1,9 @@
 import asyncio
 import json
 import logging
+import shutil
+import subprocess
+from collections import OrderedDict
 from datetime import timedelta
 from pathlib import Path
 from types import SimpleNamespace
@@ -9,7 +12,7 @@ import httpx
 import openai
 import pytest
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, undefer
 
 from pingpong import lecture_slide_processing, lecture_slide_service, models, schemas
 from pingpong.config import config
@@ -526,14 +529,34 @@ async def test_translation_chunks_large_source_payloads(db, monkeypatch):
         run_id = run.id
 
     captured_positions = []
+    glossary_positions = []
+    glossary_hints = []
+    in_flight = 0
+    max_in_flight = 0
 
     async def fake_get_openai_client(_session, _class_id):
         return SimpleNamespace()
 
     async def fake_parse(_client, **kwargs):
-        payload = kwargs["input_messages"][0]["content"][0]["text"]
-        source_items = json.loads(payload.split("\n", 3)[-1])
+        nonlocal in_flight, max_in_flight
+        content = kwargs["input_messages"][0]["content"]
+        source_items = json.loads(content[0]["text"].split("\n", 3)[-1])
+        if kwargs["response_model"] is lecture_slide_processing.TranslationGlossary:
+            glossary_positions.append([item["slide_position"] for item in source_items])
+            return lecture_slide_processing.TranslationGlossary(
+                terms=[
+                    lecture_slide_processing.TranslationGlossaryTerm(
+                        source_term="slide",
+                        translated_term="diapositiva",
+                    )
+                ]
+            )
+        glossary_hints.append(content[1]["text"])
         captured_positions.append([item["slide_position"] for item in source_items])
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
         return lecture_slide_processing.TranslatedSlideNarrationSet(
             slides=[
                 lecture_slide_processing.TranslatedSlideNarration(
@@ -552,6 +575,9 @@ async def test_translation_chunks_large_source_payloads(db, monkeypatch):
         "LECTURE_SLIDE_TRANSLATION_SOURCE_TOKEN_BUDGET",
         15,
     )
+    monkeypatch.setattr(
+        lecture_slide_processing, "LECTURE_SLIDE_TRANSLATION_CHUNK_CONCURRENCY", 2
+    )
     monkeypatch.setattr(
         lecture_slide_processing, "_count_text_tokens", lambda _text: 10
     )
@@ -574,9 +600,166 @@ async def test_translation_chunks_large_source_payloads(db, monkeypatch):
     )
 
     assert result is not None
-    assert captured_positions == [[0], [1], [2]]
+    assert glossary_positions == [[0]]
+    assert sorted(captured_positions) == [[0], [1], [2]]
+    assert max_in_flight == 2
+    assert all('"translated_term": "diapositiva"' in hint for hint in glossary_hints)
     assert [slide.slide_position for slide in result.slides] == [0, 1, 2]
 
+    async with db.async_session() as session:
+        translated_pages = (
+            await session.scalars(
+                select(models.LectureSlideTranslationPage)
+                .where(
+                    models.LectureSlideTranslationPage.translation_id == translation_id
+                )
+                .order_by(models.LectureSlideTranslationPage.position)
+            )
+        ).all()
+        run = await session.get(models.LectureSlideTranslationRun, run_id)
+
+    assert [page.narration_text for page in translated_pages] == [
+        "Diapositiva 0.",
+        "Diapositiva 1.",
+        "Diapositiva 2.",
+    ]
+    assert run.total_parts == 3
+    assert run.completed_parts == 0
+
+
+async def test_translation_of_deck_without_pages_has_all_page_rows(db):
+    async with db.async_session() as session:
+        class_ = models.Class(id=1, name="Slide Class", api_key="sk-test")
+        deck = _deck(status=schemas.LectureSlideDeckStatus.READY, slide_count=0)
+        deck.class_ = class_
+        translation = models.LectureSlideTranslation(
+            lecture_slide_deck=deck,
+            language_code="es",
+            language_name="Spanish",
+            openai_model="gpt-4.1-mini",
+            status=schemas.LectureSlideTranslationStatus.PROCESSING,
+            stage=schemas.LectureSlideTranslationStage.TRANSLATION_TEXT,
+        )
+        session.add_all([class_, deck, translation])
+        await session.commit()
+        translation_id = translation.id
+
+    assert await lecture_slide_processing._translation_has_all_page_rows(translation_id)
+
+
+async def test_translation_resumes_with_only_untranslated_slides(db, monkeypatch):
+    async with db.async_session() as session:
+        class_ = models.Class(id=1, name="Slide Class", api_key="sk-test")
+        deck = _deck(status=schemas.LectureSlideDeckStatus.READY, slide_count=3)
+        deck.class_ = class_
+        pages = [
+            models.LectureSlidePage(
+                lecture_slide_deck=deck,
+                position=position,
+                content_kind=schemas.LectureSlideContentKind.SLIDE,
+                narration_text=f"Explain slide {position}.",
+            )
+            for position in range(3)
+        ]
+        translation = models.LectureSlideTranslation(
+            lecture_slide_deck=deck,
+            language_code="es",
+            language_name="Spanish",
+            openai_model="gpt-4.1-mini",
+            status=schemas.LectureSlideTranslationStatus.PROCESSING,
+            stage=schemas.LectureSlideTranslationStage.TRANSLATION_TEXT,
+        )
+        already_translated = models.LectureSlideTranslationPage(
+            translation=translation,
+            position=1,
+            narration_text="Diapositiva 1 de un intento anterior.",
+        )
+        run = models.LectureSlideTranslationRun(
+            translation=translation,
+            translation_id_snapshot=0,
+            stage=schemas.LectureSlideTranslationStage.TRANSLATION_TEXT,
+            attempt_number=2,
+            status=schemas.LectureSlideTranslationRunStatus.RUNNING,
+            lease_token="translation-token",
+        )
+        session.add_all([class_, deck, *pages, translation, already_translated, run])
+        await session.flush()
+        run.translation_id_snapshot = translation.id
+        await session.commit()
+        translation_id = translation.id
+        run_id = run.id
+
+    assert not await lecture_slide_processing._translation_has_all_page_rows(
+        translation_id
+    )
+
+    captured_positions = []
+
+    async def fake_get_openai_client(_session, _class_id):
+        return SimpleNamespace()
+
+    async def fake_parse(_client, **kwargs):
+        assert (
+            kwargs["response_model"]
+            is lecture_slide_processing.TranslatedSlideNarrationSet
+        )
+        payload = kwargs["input_messages"][0]["content"][0]["text"]
+        source_items = json.loads(payload.split("\n", 3)[-1])
+        captured_positions.append([item["slide_position"] for item in source_items])
+        return lecture_slide_processing.TranslatedSlideNarrationSet(
+            slides=[
+                lecture_slide_processing.TranslatedSlideNarration(
+                    slide_position=item["slide_position"],
+                    narration_text=f"Diapositiva {item['slide_position']}.",
+                )
+                for item in source_items
+            ]
+        )
+
+    async def immediate_heartbeat(_run_id, _lease_token, awaitable):
+        return await awaitable
+
+    monkeypatch.setattr(
+        lecture_slide_processing,
+        "get_openai_client_by_class_id",
+        fake_get_openai_client,
+    )
+    monkeypatch.setattr(
+        lecture_slide_processing, "_count_text_tokens", lambda _text: 10
+    )
+    monkeypatch.setattr(lecture_slide_processing, "_parse_responses_output", fake_parse)
+    monkeypatch.setattr(
+        lecture_slide_processing,
+        "_await_with_translation_lease_heartbeat",
+        immediate_heartbeat,
+    )
+
+    result = await lecture_slide_processing._generate_translation_text(
+        run_id,
+        "translation-token",
+        translation_id,
+    )
+
+    assert result is not None
+    assert captured_positions == [[0, 2]]
+    assert await lecture_slide_processing._translation_has_all_page_rows(translation_id)
+    async with db.async_session() as session:
+        translated_pages = (
+            await session.scalars(
+                select(models.LectureSlideTranslationPage)
+                .where(
+                    models.LectureSlideTranslationPage.translation_id == translation_id
+                )
+                .order_by(models.LectureSlideTranslationPage.position)
+            )
+        ).all()
+
+    assert [page.narration_text for page in translated_pages] == [
+        "Diapositiva 0.",
+        "Diapositiva 1 de un intento anterior.",
+        "Diapositiva 2.",
+    ]
+
 
 async def test_translation_rejects_a_single_oversized_slide(monkeypatch):
     monkeypatch.setattr(
@@ -2747,6 +2930,120 @@ async def test_slide_manifest_chunk_planning_splits_on_token_budget(monkeypatch)
     ]
 
 
+class _CountingTokenizer:
+    name = "counting-test-encoding"
+
+    def __init__(self):
+        self.encoded: list[str] = []
+
+    def encode(self, text: str) -> list[str]:
+        self.encoded.append(text)
+        return text.split()
+
+
+async def test_count_text_tokens_encodes_identical_text_once(monkeypatch):
+    tokenizer = _CountingTokenizer()
+    monkeypatch.setattr(
+        lecture_slide_processing, "_slide_manifest_tokenizer", lambda: tokenizer
+    )
+    monkeypatch.setattr(lecture_slide_processing, "_text_token_counts", OrderedDict())
+    monkeypatch.setattr(
+        lecture_slide_processing, "SLIDE_TOKEN_COUNT_CACHE_MAX_TEXTS", 2
+    )
+
+    assert lecture_slide_processing._count_text_tokens("one two three") == 3
+    assert lecture_slide_processing._count_text_tokens("one two three") == 3
+    assert lecture_slide_processing._count_text_tokens("four") == 1
+    assert lecture_slide_processing._count_text_tokens("five six") == 2
+    assert lecture_slide_processing._count_text_tokens("one two three") == 3
+
+    assert tokenizer.encoded == ["one two three", "four", "five six", "one two three"]
+
+
+def test_transcript_source_token_estimate_covers_the_prompt_text(monkeypatch):
+    monkeypatch.setattr(lecture_slide_processing, "_text_token_counts", OrderedDict())
+    monkeypatch.setattr(lecture_slide_processing, "_word_token_counts", OrderedDict())
+    transcript = [
+        schemas.LectureVideoManifestWordV3(
+            id=f"w{index}",
+            word=word,
+            start_offset_ms=index * 350,
+            end_offset_ms=index * 350 + 300,
+        )
+        for index, word in enumerate(
+            ["The", "Fourier", "transform", "isn't", "naïve", "—", "x²", '"q"']
+        )
+    ]
+
+    source_text = lecture_slide_processing._generation_transcript_source_text(
+        transcript, compact=False
+    )
+
+    assert lecture_slide_processing._transcript_source_token_estimate(
+        transcript
+    ) >= len(lecture_slide_processing._slide_manifest_tokenizer().encode(source_text))
+
+
+async def test_transcript_word_token_counts_are_stored_and_reused(db, monkeypatch):
+    tokenizer = _CountingTokenizer()
+    monkeypatch.setattr(
+        lecture_slide_processing, "_slide_manifest_tokenizer", lambda: tokenizer
+    )
+    monkeypatch.setattr(lecture_slide_processing, "_word_token_counts", OrderedDict())
+    transcript = [
+        schemas.LectureVideoManifestWordV3(
+            id=f"slide-0-word-{index}",
+            word=f"word{index}",
+            start_offset_ms=index * 100,
+            end_offset_ms=(index + 1) * 100,
+        )
+        for index in range(3)
+    ]
+    async with db.async_session() as session:
+        deck = _deck(status=schemas.LectureSlideDeckStatus.PROCESSING)
+        deck.transcript_data = lecture_slide_processing.transcript_data_from_words(
+            transcript
+        )
+        session.add_all([models.Class(id=1, name="Slide Class"), deck])
+        await session.commit()
+        deck_id = deck.id
+
+    assert "word_token_counts" not in deck.transcript_data
+
+    await lecture_slide_processing._load_transcript_word_token_counts(
+        deck_id, transcript
+    )
+
+    assert len(tokenizer.encoded) == 3
+    async with db.async_session() as session:
+        deck = await session.get(
+            models.LectureSlideDeck,
+            deck_id,
+            options=[undefer(models.LectureSlideDeck.transcript_data)],
+        )
+        stored_counts = deck.transcript_data["word_token_counts"]
+    assert stored_counts["encoding"] == "counting-test-encoding"
+    assert stored_counts["counts"] == [
+        lecture_slide_processing._word_token_estimate(word) for word in transcript
+    ]
+    assert len(tokenizer.encoded) == 3
+
+    # A fresh worker process primes its cache from the stored counts.
+    monkeypatch.setattr(lecture_slide_processing, "_word_token_counts", OrderedDict())
+    await lecture_slide_processing._load_transcript_word_token_counts(
+        deck_id, transcript
+    )
+    for word in transcript:
+        lecture_slide_processing._word_token_estimate(word)
+    assert len(tokenizer.encoded) == 3
+    assert (
+        lecture_slide_processing.transcript_data_from_words(transcript)[
+            "word_token_counts"
+        ]
+        == stored_counts
+    )
+
+
 async def test_slide_manifest_generation_window_prompt_matches_filter_contract():
     instructions = (
         lecture_slide_processing._build_slide_manifest_generation_instructions(
@@ -2960,10 +3257,51 @@ async def _async_value(value):
     return value
 
 
+class _FakeFfmpegStderr:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def read(self) -> bytes:
+        return self.data
+
+
+class _FakeFfmpegProcess:
+    """Reads the concat demuxer's inputs in order, as ffmpeg does."""
+
+    def __init__(
+        self, command, *, returncode=0, stderr=b"", output=b"", read_inputs=True
+    ):
+        self.command = list(command)
+        self.inputs: list[bytes] = []
+        self.stderr = _FakeFfmpegStderr(stderr)
+        self._exit_code = returncode
+        self._output = output
+        self.returncode = None
+        self.killed = False
+        self._reader = asyncio.create_task(self._read_inputs()) if read_inputs else None
+
+    async def _read_inputs(self) -> None:
+        concat_path = Path(self.command[self.command.index("-i") + 1])
+        for line in concat_path.read_text().splitlines():
+            input_path = Path(line.removeprefix("file '").removesuffix("'"))
+            self.inputs.append(await asyncio.to_thread(input_path.read_bytes))
+
+    async def wait(self) -> int:
+        if self._reader is not None and not self.killed:
+            # Like Process.wait, cancelling one waiter leaves the process be.
+            await asyncio.shield(self._reader)
+        if self._exit_code == 0 and self._output:
+            Path(self.command[-1]).write_bytes(self._output)
+        self.returncode = self._exit_code
+        return self._exit_code
+
+    def kill(self) -> None:
+        self.killed = True
+
+
 async def test_combine_audio_objects_uses_ffmpeg_stream_copy(monkeypatch):
     downloaded_keys: list[str] = []
-    commands: list[list[str]] = []
-    concat_files: list[str] = []
+    processes: list[_FakeFfmpegProcess] = []
 
     class FakeAudioStore:
         async def get_file(self, key):
@@ -2971,12 +3309,11 @@ async def test_combine_audio_objects_uses_ffmpeg_stream_copy(monkeypatch):
             yield key.encode("utf-8")
             yield b"-audio"
 
-    def fake_run(command, *, capture_output, text, timeout):
-        commands.append(command)
-        concat_files.append(Path(command[command.index("-i") + 1]).read_text())
-        assert timeout == lecture_slide_processing.FFMPEG_CONCAT_TIMEOUT_SECONDS
-        Path(command[-1]).write_bytes(b"combined-audio")
-        return SimpleNamespace(returncode=0, stderr="")
+    async def fake_create_subprocess_exec(*command, stdin, stdout, stderr):
+        assert stdin == asyncio.subprocess.DEVNULL
+        process = _FakeFfmpegProcess(command, output=b"combined-audio")
+        processes.append(process)
+        return process
 
     monkeypatch.setattr(
         config, "lecture_video_audio_store", SimpleNamespace(store=FakeAudioStore())
@@ -2984,7 +3321,11 @@ async def test_combine_audio_objects_uses_ffmpeg_stream_copy(monkeypatch):
     monkeypatch.setattr(
         lecture_slide_processing.shutil, "which", lambda _name: "ffmpeg"
     )
-    monkeypatch.setattr(lecture_slide_processing.subprocess, "run", fake_run)
+    monkeypatch.setattr(
+        lecture_slide_processing.asyncio,
+        "create_subprocess_exec",
+        fake_create_subprocess_exec,
+    )
 
     result = await lecture_slide_processing._combine_audio_objects(
         [SimpleNamespace(key="first.ogg"), SimpleNamespace(key="second.ogg")]
@@ -2992,27 +3333,29 @@ async def test_combine_audio_objects_uses_ffmpeg_stream_copy(monkeypatch):
 
     assert result == b"combined-audio"
     assert downloaded_keys == ["first.ogg", "second.ogg"]
-    assert len(commands) == 1
-    assert commands[0][commands[0].index("-c") + 1] == "copy"
-    assert commands[0][-1].endswith(".webm")
-    assert "file '" in concat_files[0]
-    assert "input-0.audio" in concat_files[0]
-    assert "input-1.audio" in concat_files[0]
+    assert len(processes) == 1
+    command = processes[0].command
+    assert command[command.index("-f") + 1] == "concat"
+    assert command[command.index("-c") + 1] == "copy"
+    assert command[-1].endswith(".webm")
+    # Each clip is a separate concat input, so its timestamps are rebased.
+    assert processes[0].inputs == [b"first.ogg-audio", b"second.ogg-audio"]
 
 
 async def test_combine_audio_objects_reencodes_when_stream_copy_fails(monkeypatch):
-    commands: list[list[str]] = []
+    processes: list[_FakeFfmpegProcess] = []
 
     class FakeAudioStore:
         async def get_file(self, key):
             yield key.encode("utf-8")
 
-    def fake_run(command, *, capture_output, text, timeout):
-        commands.append(command)
-        if len(commands) == 1:
-            return SimpleNamespace(returncode=1, stderr="copy failed")
-        Path(command[-1]).write_bytes(b"reencoded-audio")
-        return SimpleNamespace(returncode=0, stderr="")
+    async def fake_create_subprocess_exec(*command, stdin, stdout, stderr):
+        if not processes:
+            process = _FakeFfmpegProcess(command, returncode=1, stderr=b"copy failed")
+        else:
+            process = _FakeFfmpegProcess(command, output=b"reencoded-audio")
+        processes.append(process)
+        return process
 
     monkeypatch.setattr(
         config, "lecture_video_audio_store", SimpleNamespace(store=FakeAudioStore())
@@ -3020,18 +3363,24 @@ async def test_combine_audio_objects_reencodes_when_stream_copy_fails(monkeypatc
     monkeypatch.setattr(
         lecture_slide_processing.shutil, "which", lambda _name: "ffmpeg"
     )
-    monkeypatch.setattr(lecture_slide_processing.subprocess, "run", fake_run)
+    monkeypatch.setattr(
+        lecture_slide_processing.asyncio,
+        "create_subprocess_exec",
+        fake_create_subprocess_exec,
+    )
 
     result = await lecture_slide_processing._combine_audio_objects(
         [SimpleNamespace(key="first.ogg")]
     )
 
     assert result == b"reencoded-audio"
-    assert len(commands) == 2
-    assert commands[0][commands[0].index("-c") + 1] == "copy"
-    assert commands[1][commands[1].index("-c:a") + 1] == "libopus"
-    assert commands[1][commands[1].index("-b:a") + 1] == "64k"
-    assert commands[1][commands[1].index("-application") + 1] == "voip"
+    assert len(processes) == 2
+    first, second = (process.command for process in processes)
+    assert first[first.index("-c") + 1] == "copy"
+    assert second[second.index("-c:a") + 1] == "libopus"
+    assert second[second.index("-b:a") + 1] == "64k"
+    assert second[second.index("-application") + 1] == "voip"
+    assert processes[1].inputs == [b"first.ogg"]
 
 
 async def test_combine_audio_objects_requires_ffmpeg(monkeypatch):
@@ -3050,20 +3399,28 @@ async def test_combine_audio_objects_requires_ffmpeg(monkeypatch):
 
 
 async def test_combine_audio_objects_reencodes_when_stream_copy_times_out(monkeypatch):
-    commands: list[list[str]] = []
+    processes: list[_FakeFfmpegProcess] = []
 
     class FakeAudioStore:
         async def get_file(self, key):
             yield key.encode("utf-8")
 
-    def fake_run(command, *, capture_output, text, timeout):
-        commands.append(command)
-        if len(commands) == 1:
-            raise lecture_slide_processing.subprocess.TimeoutExpired(
-                command, timeout, stderr=b"stalled"
+    class StalledFfmpegProcess(_FakeFfmpegProcess):
+        async def wait(self) -> int:
+            if not self.killed:
+                await asyncio.sleep(10)
+            self.returncode = -9
+            return -9
+
+    async def fake_create_subprocess_exec(*command, stdin, stdout, stderr):
+        if not processes:
+            process = StalledFfmpegProcess(
+                command, stderr=b"stalled", read_inputs=False
             )
-        Path(command[-1]).write_bytes(b"reencoded-audio")
-        return SimpleNamespace(returncode=0, stderr="")
+        else:
+            process = _FakeFfmpegProcess(command, output=b"reencoded-audio")
+        processes.append(process)
+        return process
 
     monkeypatch.setattr(
         config, "lecture_video_audio_store", SimpleNamespace(store=FakeAudioStore())
@@ -3071,16 +3428,119 @@ async def test_combine_audio_objects_reencodes_when_stream_copy_times_out(monkey
     monkeypatch.setattr(
         lecture_slide_processing.shutil, "which", lambda _name: "ffmpeg"
     )
-    monkeypatch.setattr(lecture_slide_processing.subprocess, "run", fake_run)
+    monkeypatch.setattr(lecture_slide_processing, "FFMPEG_CONCAT_TIMEOUT_SECONDS", 0.5)
+    monkeypatch.setattr(
+        lecture_slide_processing.asyncio,
+        "create_subprocess_exec",
+        fake_create_subprocess_exec,
+    )
 
     result = await lecture_slide_processing._combine_audio_objects(
         [SimpleNamespace(key="first.ogg")]
     )
 
     assert result == b"reencoded-audio"
-    assert len(commands) == 2
-    assert commands[0][commands[0].index("-c") + 1] == "copy"
-    assert commands[1][commands[1].index("-c:a") + 1] == "libopus"
+    assert len(processes) == 2
+    assert processes[0].killed
+    first, second = (process.command for process in processes)
+    assert first[first.index("-c") + 1] == "copy"
+    assert second[second.index("-c:a") + 1] == "libopus"
+
+
+async def test_combine_audio_objects_kills_ffmpeg_when_download_fails(monkeypatch):
+    processes: list[_FakeFfmpegProcess] = []
+
+    class FakeAudioStore:
+        async def get_file(self, key):
+            if key == "missing.ogg":
+                raise FileNotFoundError(key)
+            yield key.encode("utf-8")
+
+    async def fake_create_subprocess_exec(*command, stdin, stdout, stderr):
+        process = _FakeFfmpegProcess(command)
+        processes.append(process)
+        return process
+
+    monkeypatch.setattr(
+        config, "lecture_video_audio_store", SimpleNamespace(store=FakeAudioStore())
+    )
+    monkeypatch.setattr(
+        lecture_slide_processing.shutil, "which", lambda _name: "ffmpeg"
+    )
+    monkeypatch.setattr(
+        lecture_slide_processing.asyncio,
+        "create_subprocess_exec",
+        fake_create_subprocess_exec,
+    )
+
+    with pytest.raises(FileNotFoundError):
+        await lecture_slide_processing._combine_audio_objects(
+            [SimpleNamespace(key="first.ogg"), SimpleNamespace(key="missing.ogg")]
+        )
+
+    assert len(processes) == 1
+    assert processes[0].killed
+    assert processes[0].inputs[0] == b"first.ogg"
+
+
+@pytest.mark.skipif(
+    shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+    reason="ffmpeg is not installed",
+)
+async def test_combine_audio_objects_rebases_clip_timestamps(monkeypatch, tmp_path):
+    ffmpeg_path = shutil.which("ffmpeg")
+    ffprobe_path = shutil.which("ffprobe")
+    assert ffmpeg_path is not None and ffprobe_path is not None
+    clips: dict[str, bytes] = {}
+    for name, duration in (("first.ogg", 1.5), ("second.ogg", 2.5)):
+        clip_path = tmp_path / name
+        subprocess.run(
+            [
+                ffmpeg_path,
+                "-y",
+                "-f",
+                "lavfi",
+                "-i",
+                f"sine=f=440:d={duration}",
+                "-c:a",
+                "libopus",
+                str(clip_path),
+            ],
+            capture_output=True,
+            check=True,
+        )
+        clips[name] = clip_path.read_bytes()
+
+    class FakeAudioStore:
+        async def get_file(self, key):
+            data = clips[key]
+            for start in range(0, len(data), 4096):
+                yield data[start : start + 4096]
+
+    monkeypatch.setattr(
+        config, "lecture_video_audio_store", SimpleNamespace(store=FakeAudioStore())
+    )
+
+    combined_path = tmp_path / "combined.webm"
+    combined_path.write_bytes(
+        await lecture_slide_processing._combine_audio_objects(
+            [SimpleNamespace(key="first.ogg"), SimpleNamespace(key="second.ogg")]
+        )
+    )
+
+    def _probe(*args: str) -> list[str]:
+        completed = subprocess.run(
+            [ffprobe_path, "-v", "error", *args, "-of", "csv=p=0", str(combined_path)],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        return [line for line in completed.stdout.splitlines() if line]
+
+    [duration] = _probe("-show_entries", "format=duration")
+    assert abs(float(duration) - 4.0) < 0.1
+    pts = [int(value) for value in _probe("-show_entries", "packet=pts")]
+    assert pts == sorted(set(pts))
 
 
 async def test_remux_continuous_narration_to_webm_uses_direct_ffmpeg_input(
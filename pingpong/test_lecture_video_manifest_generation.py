@@ -1,5 +1,7 @@
+import asyncio
 import shutil
 import subprocess
+from pathlib import Path
 from types import SimpleNamespace
 from typing import cast
 
@@ -234,6 +236,81 @@ async def test_transcribe_video_words_uses_prepared_audio_without_timestamp_resc
     ]
 
 
+@pytest.mark.asyncio
+async def test_transcribe_video_words_stitches_long_video_chunks(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path,
+) -> None:
+    async def fake_ffprobe_duration_ms(_video_path: str) -> int:
+        return 1_300_000
+
+    async def fail_prepare(*, video_path: str, temp_dir: str) -> str:
+        raise AssertionError("Long videos should be transcribed in chunks.")
+
+    async def fake_transcribe_audio_chunks(_input_path, chunks, transcribe, **_kwargs):  # type: ignore[no-untyped-def]
+        results = []
+        for index, chunk in enumerate(chunks):
+            chunk_path = tmp_path / f"chunk-{index}.webm"
+            chunk_path.write_bytes(str(index).encode())
+            results.append(await transcribe(chunk, str(chunk_path)))
+        return results
+
+    class FakeTranscriptions:
+        async def create(self, *, file, **_kwargs):
+            if file.read() == b"0":
+                # The first clip runs 2s past its 640s cut into the overlap.
+                return SimpleNamespace(
+                    words=[
+                        SimpleNamespace(word="First", start=1.0, end=1.5),
+                        SimpleNamespace(word="pause", start=639.0, end=639.8),
+                        SimpleNamespace(word="Again", start=640.6, end=641.0),
+                    ],
+                    segments=[{"text": "First.", "start": 1.0, "end": 1.5}],
+                )
+            # The second clip starts 2s before the cut at 638s.
+            return SimpleNamespace(
+                words=[
+                    SimpleNamespace(word="pause", start=1.0, end=1.8),
+                    SimpleNamespace(word="Again", start=2.6, end=3.0),
+                    SimpleNamespace(word="Last", start=100.0, end=100.5),
+                ],
+                segments=[{"text": "Again, last.", "start": 2.6, "end": 100.5}],
+            )
+
+    monkeypatch.setattr(
+        manifest_generation, "_ffprobe_duration_ms", fake_ffprobe_duration_ms
+    )
+    monkeypatch.setattr(
+        manifest_generation,
+        "_prepare_lecture_video_audio_for_whisper_async",
+        fail_prepare,
+    )
+    monkeypatch.setattr(manifest_generation.shutil, "which", lambda _name: "/ffmpeg")
+    monkeypatch.setattr(
+        manifest_generation,
+        "scan_audio_silences",
+        lambda _path, *, ffmpeg_path: (1_300_000, [(639_900, 640_100)]),
+    )
+    monkeypatch.setattr(
+        manifest_generation, "transcribe_audio_chunks", fake_transcribe_audio_chunks
+    )
+
+    words = await manifest_generation.transcribe_video_words(
+        "/tmp/lecture.mp4",
+        SimpleNamespace(audio=SimpleNamespace(transcriptions=FakeTranscriptions())),
+        temp_dir=str(tmp_path),
+    )
+
+    assert [
+        (word.id, word.word, word.start_offset_ms, word.end_offset_ms) for word in words
+    ] == [
+        ("0", "First.", 1000, 1500),
+        ("1", "pause", 639000, 639800),
+        ("2", "Again,", 640600, 641000),
+        ("3", "last.", 738000, 738500),
+    ]
+
+
 @pytest.mark.asyncio
 async def test_transcribe_video_words_skips_empty_words_with_context_warning(
     caplog: pytest.LogCaptureFixture,
@@ -837,13 +914,24 @@ async def test_upload_and_generate_manifest_threads_summary_between_top_level_ch
     async def fake_ffprobe_duration_ms(_video_path: str) -> int:
         return 600_000
 
+    async def fake_upload_manifest_chunk_to_gemini(
+        *,
+        chunk: manifest_generation.ManifestGenerationChunk,
+        **_kwargs: object,
+    ) -> manifest_generation.GeminiFileRef:
+        return manifest_generation.GeminiFileRef(
+            name=f"files/chunk-{chunk.generation_start_ms}"
+        )
+
     async def fake_upload_and_generate_manifest_chunks(
         *,
         chunk: manifest_generation.ManifestGenerationChunk,
         previous_summary_checkpoint: schemas.LectureVideoManifestSummaryCheckpointV4
         | None,
+        gemini_file_upload,
         **_kwargs: object,
     ) -> list[schemas.LectureVideoManifestV4]:
+        await gemini_file_upload
         captured_previous_offsets.append(
             previous_summary_checkpoint.end_offset_ms
             if previous_summary_checkpoint is not None
@@ -868,6 +956,11 @@ async def test_upload_and_generate_manifest_threads_summary_between_top_level_ch
         "_ffprobe_duration_ms",
         fake_ffprobe_duration_ms,
     )
+    monkeypatch.setattr(
+        manifest_generation,
+        "_upload_manifest_chunk_to_gemini",
+        fake_upload_manifest_chunk_to_gemini,
+    )
     monkeypatch.setattr(
         manifest_generation,
         "_upload_and_generate_manifest_chunks",
@@ -891,6 +984,275 @@ async def test_upload_and_generate_manifest_threads_summary_between_top_level_ch
     assert captured_previous_offsets == [None, 300_000]
 
 
+class _FakeGeminiFiles:
+    def __init__(self, *, failing_uploads: dict[str, int] | None = None) -> None:
+        self.failing_uploads = dict(failing_uploads or {})
+        self.uploads: list[str] = []
+        self.deleted: list[str] = []
+
+    async def upload(self, *, file: str) -> SimpleNamespace:
+        name = f"files/{Path(file).stem}"
+        self.uploads.append(name)
+        await asyncio.sleep(0)
+        if self.failing_uploads.get(name, 0) > 0:
+            self.failing_uploads[name] -= 1
+            raise RuntimeError("503 UNAVAILABLE. The service is overloaded.")
+        return SimpleNamespace(
+            name=name,
+            uri=f"https://generativelanguage.googleapis.com/v1beta/{name}",
+            mime_type="video/mp4",
+            state=SimpleNamespace(name="ACTIVE"),
+        )
+
+    async def get(self, *, name: str) -> SimpleNamespace:
+        raise AssertionError(f"Unexpected Gemini file refetch: {name}")
+
+    async def delete(self, *, name: str) -> None:
+        self.deleted.append(name)
+
+
+class _FakeGeminiModels:
+    def __init__(
+        self,
+        files: _FakeGeminiFiles,
+        *,
+        failing_chunk_starts: set[int] | None = None,
+    ) -> None:
+        self.files = files
+        self.failing_chunk_starts = failing_chunk_starts or set()
+        self.generated: list[tuple[int, str | None]] = []
+        self.uploads_before_first_generation: list[str] | None = None
+
+    async def generate_content(self, *, model, config, contents):  # type: ignore[no-untyped-def]
+        if self.uploads_before_first_generation is None:
+            # Let prefetched uploads for later chunks make progress first.
+            for _ in range(5):
+                await asyncio.sleep(0)
+            self.uploads_before_first_generation = list(self.files.uploads)
+        _prefix, start_ms, end_ms = Path(contents[0].file_data.file_uri).name.split(
+            "_"
+        )[-3:]
+        start_ms, end_ms = int(start_ms), int(end_ms)
+        prior_summary = next(
+            (
+                part.text
+                for part in contents[1:]
+                if part.text is not None and "Summary through" in part.text
+            ),
+            None,
+        )
+        self.generated.append((start_ms, prior_summary))
+        if start_ms in self.failing_chunk_starts:
+            raise RuntimeError("400 INVALID_ARGUMENT. Malformed request.")
+        quiz = manifest_generation.GeneratedQuizWithVideoContext(
+            video_summary="A lecture chunk.",
+            summary_checkpoints=[
+                manifest_generation.GeneratedSummaryCheckpoint(
+                    end_offset_ms=end_ms,
+                    summary=f"Summary through {end_ms}ms.",
+                )
+            ],
+            moment_contexts=[
+                manifest_generation.GeneratedMomentContext(
+                    center_offset_ms=end_ms,
+                    start_offset_ms=end_ms - 15_000,
+                    end_offset_ms=end_ms,
+                    before="Before.",
+                    at="At.",
+                    after="After.",
+                )
+            ],
+            questions=[
+                _generated_question().model_copy(
+                    update={
+                        "pause_after_word_id": f"w{start_ms}a",
+                        "pause_at": (start_ms + 1000) / 1000,
+                        "choice_feedback": {
+                            text: feedback.model_copy(
+                                update={
+                                    "resume_at_word_id": f"w{start_ms}b",
+                                    "resume_at": (start_ms + 1500) / 1000,
+                                }
+                            )
+                            for text, feedback in _generated_question().choice_feedback.items()
+                        },
+                    }
+                )
+            ],
+        )
+        return SimpleNamespace(text=quiz.model_dump_json())
+
+
+class _FakeGeminiClient:
+    def __init__(
+        self,
+        *,
+        failing_uploads: dict[str, int] | None = None,
+        failing_chunk_starts: set[int] | None = None,
+    ) -> None:
+        self.files = _FakeGeminiFiles(failing_uploads=failing_uploads)
+        self.models = _FakeGeminiModels(
+            self.files, failing_chunk_starts=failing_chunk_starts
+        )
+
+
+def _chunked_lecture_transcript(
+    chunk_starts: list[int],
+) -> list[schemas.LectureVideoManifestWordV3]:
+    return [
+        word
+        for start_ms in chunk_starts
+        for word in (
+            schemas.LectureVideoManifestWordV3(
+                id=f"w{start_ms}a",
+                word="expression",
+                start_offset_ms=start_ms,
+                end_offset_ms=start_ms + 1000,
+            ),
+            schemas.LectureVideoManifestWordV3(
+                id=f"w{start_ms}b",
+                word="Next",
+                start_offset_ms=start_ms + 1500,
+                end_offset_ms=start_ms + 2000,
+            ),
+        )
+    ]
+
+
+def _patch_chunked_generation(
+    monkeypatch,
+) -> list[list[schemas.LectureVideoManifestV4]]:
+    merged: list[list[schemas.LectureVideoManifestV4]] = []
+
+    async def fake_ffprobe_duration_ms(_video_path: str) -> int:
+        return 900_000
+
+    async def fake_write_video_clip(
+        _video_path: str,
+        *,
+        temp_dir: str,
+        chunk: manifest_generation.ManifestGenerationChunk,
+    ) -> str:
+        clip_path = (
+            Path(temp_dir)
+            / f"manifest_chunk_{chunk.generation_start_ms}_{chunk.generation_end_ms}.mp4"
+        )
+        clip_path.write_bytes(b"clip")
+        return str(clip_path)
+
+    async def fake_merge_chunk_manifests(
+        *,
+        chunk_manifests: list[schemas.LectureVideoManifestV4],
+        **_kwargs: object,
+    ) -> schemas.LectureVideoManifestV4:
+        merged.append(chunk_manifests)
+        return chunk_manifests[-1]
+
+    monkeypatch.setattr(
+        manifest_generation, "_ffprobe_duration_ms", fake_ffprobe_duration_ms
+    )
+    monkeypatch.setattr(manifest_generation, "_write_video_clip", fake_write_video_clip)
+    monkeypatch.setattr(
+        manifest_generation, "_merge_chunk_manifests", fake_merge_chunk_manifests
+    )
+    monkeypatch.setattr(
+        manifest_generation, "_GEMINI_GENERATION_RETRY_DELAY_SECONDS", 0
+    )
+    return merged
+
+
+async def test_upload_and_generate_manifest_prefetches_chunk_uploads_in_order(
+    monkeypatch, tmp_path
+) -> None:
+    merged = _patch_chunked_generation(monkeypatch)
+    client = _FakeGeminiClient()
+
+    await manifest_generation.upload_and_generate_manifest(
+        video_path="lecture.mp4",
+        gemini_client=client,  # type: ignore[arg-type]
+        generation_prompt_content="Generate checks.",
+        transcript=_chunked_lecture_transcript([0, 300_000, 600_000]),
+        temp_dir=str(tmp_path),
+        model="gemini-test",
+    )
+
+    # Later chunks are uploaded while the first chunk is still generating.
+    assert client.models.uploads_before_first_generation == [
+        "files/manifest_chunk_0_300000",
+        "files/manifest_chunk_300000_600000",
+        "files/manifest_chunk_600000_900000",
+    ]
+    assert [start_ms for start_ms, _summary in client.models.generated] == [
+        0,
+        300_000,
+        600_000,
+    ]
+    prior_summaries = [summary for _start_ms, summary in client.models.generated]
+    assert prior_summaries[0] is None
+    assert "Summary through 300000ms." in (prior_summaries[1] or "")
+    assert "Summary through 600000ms." in (prior_summaries[2] or "")
+    assert [
+        manifest.summary_checkpoints[-1].end_offset_ms for manifest in merged[0]
+    ] == [300_000, 600_000, 900_000]
+    assert sorted(client.files.deleted) == sorted(client.files.uploads)
+    assert list(tmp_path.iterdir()) == []
+
+
+async def test_upload_and_generate_manifest_retries_only_failed_chunk_upload(
+    monkeypatch, tmp_path
+) -> None:
+    merged = _patch_chunked_generation(monkeypatch)
+    client = _FakeGeminiClient(
+        failing_uploads={"files/manifest_chunk_300000_600000": 1}
+    )
+
+    await manifest_generation.upload_and_generate_manifest(
+        video_path="lecture.mp4",
+        gemini_client=client,  # type: ignore[arg-type]
+        generation_prompt_content="Generate checks.",
+        transcript=_chunked_lecture_transcript([0, 300_000, 600_000]),
+        temp_dir=str(tmp_path),
+        model="gemini-test",
+    )
+
+    assert sorted(client.files.uploads) == [
+        "files/manifest_chunk_0_300000",
+        "files/manifest_chunk_300000_600000",
+        "files/manifest_chunk_300000_600000",
+        "files/manifest_chunk_600000_900000",
+    ]
+    assert [start_ms for start_ms, _summary in client.models.generated] == [
+        0,
+        300_000,
+        600_000,
+    ]
+    assert len(merged[0]) == 3
+
+
+async def test_upload_and_generate_manifest_deletes_prefetched_uploads_on_failure(
+    monkeypatch, tmp_path
+) -> None:
+    merged = _patch_chunked_generation(monkeypatch)
+    client = _FakeGeminiClient(failing_chunk_starts={300_000})
+
+    with pytest.raises(RuntimeError, match="INVALID_ARGUMENT"):
+        await manifest_generation.upload_and_generate_manifest(
+            video_path="lecture.mp4",
+            gemini_client=client,  # type: ignore[arg-type]
+            generation_prompt_content="Generate checks.",
+            transcript=_chunked_lecture_transcript([0, 300_000, 600_000]),
+            temp_dir=str(tmp_path),
+            model="gemini-test",
+        )
+
+    assert [start_ms for start_ms, _summary in client.models.generated] == [
+        0,
+        300_000,
+    ]
+    assert merged == []
+    assert sorted(client.files.deleted) == sorted(client.files.uploads)
+
+
 async def test_upload_and_generate_manifest_chunks_threads_summary_through_split(
     monkeypatch,
 ) -> None:
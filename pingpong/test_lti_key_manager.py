@@ -1,3 +1,4 @@
+import asyncio
 import json
 from datetime import datetime, timedelta, timezone
 
@@ -368,3 +369,150 @@ async def test_verify_jwt_kid_not_found():
 
     with pytest.raises(ValueError):
         await manager.verify_jwt("token", kid="missing")
+
+
+class CountingKeyStore(InMemoryKeyStore):
+    def __init__(self, keys=None):
+        super().__init__(keys)
+        self.loads = 0
+        self.load_error = None
+        self.load_delay = 0.0
+
+    async def load_keys(self):
+        self.loads += 1
+        await asyncio.sleep(self.load_delay)
+        if self.load_error:
+            raise self.load_error
+        return await super().load_keys()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_key_manager_caches_keys_until_ttl():
+    now = datetime.now(timezone.utc)
+    store = CountingKeyStore(keys=[_make_key_pair("kid", now)])
+    clock = FakeClock()
+    manager = LTIKeyManager(store, cache_ttl=60, clock=clock)
+
+    for _ in range(5):
+        assert (await manager.get_current_key()).kid == "kid"
+        assert (await manager.get_key_by_kid("kid")).kid == "kid"
+    assert store.loads == 1
+    first_version = (await manager.get_key_set()).version
+
+    clock.now += 60
+    await manager.get_current_key()
+    assert store.loads == 2
+    # Unchanged keys keep the same version.
+    assert (await manager.get_key_set()).version == first_version
+
+    store.keys = [_make_key_pair("newer", now + timedelta(hours=1))] + store.keys
+    clock.now += 60
+    assert (await manager.get_current_key()).kid == "newer"
+    assert (await manager.get_key_set()).version == first_version + 1
+
+
+@pytest.mark.asyncio
+async def test_key_manager_concurrent_reloads_share_one_load():
+    store = CountingKeyStore(keys=[_make_key_pair("kid", datetime.now(timezone.utc))])
+    store.load_delay = 0.01
+    manager = LTIKeyManager(store)
+
+    keys = await asyncio.gather(*(manager.get_current_key() for _ in range(20)))
+
+    assert store.loads == 1
+    assert {key.kid for key in keys} == {"kid"}
+
+
+@pytest.mark.asyncio
+async def test_rotate_keys_refreshes_cache_immediately(monkeypatch):
+    now = datetime.now(timezone.utc)
+    store = CountingKeyStore(keys=[_make_key_pair("old", now - timedelta(days=1))])
+    manager = LTIKeyManager(store, cache_ttl=3600)
+    assert (await manager.get_current_key()).kid == "old"
+
+    new_key = _make_key_pair("new", now)
+    monkeypatch.setattr(manager, "_generate_key_pair", lambda key_size=2048: new_key)
+    await manager.rotate_keys()
+    loads_after_rotation = store.loads
+
+    assert (await manager.get_current_key()).kid == "new"
+    assert (await manager.get_key_by_kid("old")).kid == "old"
+    assert store.loads == loads_after_rotation
+
+
+@pytest.mark.asyncio
+async def test_get_key_by_kid_miss_reloads_at_most_once_per_interval():
+    now = datetime.now(timezone.utc)
+    store = CountingKeyStore(keys=[_make_key_pair("old", now)])
+    clock = FakeClock()
+    manager = LTIKeyManager(store, cache_ttl=3600, clock=clock)
+    await manager.get_current_key()
+
+    # Rotated by another process.
+    store.keys = [_make_key_pair("new", now)] + store.keys
+    assert await manager.get_key_by_kid("new") is None
+    assert store.loads == 1
+
+    clock.now += key_manager_module.LTI_KEY_MISS_REFRESH_INTERVAL_SECONDS
+    assert (await manager.get_key_by_kid("new")).kid == "new"
+    assert store.loads == 2
+    for _ in range(5):
+        assert await manager.get_key_by_kid("missing") is None
+    assert store.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_key_manager_keeps_keys_when_reload_fails():
+    store = CountingKeyStore(keys=[_make_key_pair("kid", datetime.now(timezone.utc))])
+    clock = FakeClock()
+    manager = LTIKeyManager(store, cache_ttl=60, clock=clock)
+    await manager.get_current_key()
+
+    store.load_error = LTIKeyStoreError(code=500, detail="boom")
+    clock.now += 60
+    assert (await manager.get_current_key()).kid == "kid"
+    assert store.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_key_manager_first_load_error_propagates():
+    store = CountingKeyStore()
+    store.load_error = LTIKeyStoreError(code=500, detail="boom")
+    manager = LTIKeyManager(store)
+
+    with pytest.raises(LTIKeyStoreError):
+        await manager.get_current_key()
+
+
+@pytest.mark.asyncio
+async def test_get_public_keys_jwks_is_built_once_per_key_set(monkeypatch):
+    pair = LTIKeyManager(InMemoryKeyStore())._generate_key_pair()
+    store = CountingKeyStore(keys=[pair])
+    clock = FakeClock()
+    manager = LTIKeyManager(store, cache_ttl=60, clock=clock)
+    calls = 0
+    to_jwk = LTIKeyPair.to_jwk
+
+    def _counting_to_jwk(self):
+        nonlocal calls
+        calls += 1
+        return to_jwk(self)
+
+    monkeypatch.setattr(LTIKeyPair, "to_jwk", _counting_to_jwk)
+
+    for _ in range(3):
+        jwks = await manager.get_public_keys_jwks()
+        jwks["keys"].clear()
+    clock.now += 60
+    jwks = await manager.get_public_keys_jwks()
+
+    assert jwks["keys"][0]["kid"] == pair.kid
+    assert calls == 1
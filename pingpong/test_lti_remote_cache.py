@@ -0,0 +1,223 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from pingpong.lti.remote_cache import RemoteDocumentCache, cache_ttl_from_headers
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _settings(**overrides):
+    values = dict(
+        min_ttl=60,
+        max_ttl=3600,
+        default_ttl=600,
+        max_stale=1800,
+        refresh_interval=30,
+        max_entries=16,
+    )
+    values.update(overrides)
+    return lambda: SimpleNamespace(**values)
+
+
+class CountingFetch:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.mark.parametrize(
+    "headers,expected",
+    [
+        ({}, None),
+        ({"Cache-Control": "public, max-age=300"}, 300),
+        ({"Cache-Control": "max-age=300", "Age": "100"}, 200),
+        ({"Cache-Control": "max-age=300", "Age": "500"}, 0),
+        ({"Cache-Control": "no-store"}, 0),
+        ({"Cache-Control": "max-age=300, no-cache"}, 0),
+        ({"Cache-Control": "max-age=abc"}, 0),
+        (
+            {
+                "Date": "Tue, 01 Jul 2025 00:00:00 GMT",
+                "Expires": "Tue, 01 Jul 2025 00:10:00 GMT",
+            },
+            600,
+        ),
+        ({"Expires": "0"}, 0),
+        (
+            {
+                "Cache-Control": "max-age=60",
+                "Date": "Tue, 01 Jul 2025 00:00:00 GMT",
+                "Expires": "Tue, 01 Jul 2025 00:10:00 GMT",
+            },
+            60,
+        ),
+    ],
+)
+def test_cache_ttl_from_headers(headers, expected):
+    assert cache_ttl_from_headers(headers) == expected
+
+
+@pytest.mark.asyncio
+async def test_remote_cache_honors_header_ttl_within_bounds():
+    clock = FakeClock()
+    cache = RemoteDocumentCache("JWKS", _settings(), clock=clock)
+    fetch = CountingFetch(({"keys": [1]}, 120.0), ({"keys": [2]}, 10.0))
+
+    assert await cache.get("url", fetch) == {"keys": [1]}
+    clock.now += 119
+    assert await cache.get("url", fetch) == {"keys": [1]}
+    assert fetch.calls == 1
+
+    clock.now += 1
+    assert await cache.get("url", fetch) == {"keys": [2]}
+    assert fetch.calls == 2
+
+    # A 10s header TTL is raised to the 60s floor.
+    clock.now += 59
+    assert await cache.get("url", fetch) == {"keys": [2]}
+    assert fetch.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_remote_cache_uses_default_and_max_ttl():
+    clock = FakeClock()
+    cache = RemoteDocumentCache("JWKS", _settings(), clock=clock)
+    default_fetch = CountingFetch(({"keys": []}, None))
+    long_fetch = CountingFetch(({"keys": []}, 10**9))
+
+    await cache.get("default", default_fetch)
+    await cache.get("long", long_fetch)
+    clock.now += 599
+    await cache.get("default", default_fetch)
+    assert default_fetch.calls == 1
+    clock.now += 1
+    await cache.get("default", default_fetch)
+    assert default_fetch.calls == 2
+
+    clock.now += 3000
+    await cache.get("long", long_fetch)
+    assert long_fetch.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_remote_cache_single_flight_for_concurrent_misses():
+    cache = RemoteDocumentCache("JWKS", _settings(), clock=FakeClock())
+    release = asyncio.Event()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"keys": [calls]}, None
+
+    waiters = [asyncio.create_task(cache.get("url", fetch)) for _ in range(20)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert calls == 1
+    assert results == [{"keys": [1]}] * 20
+
+
+@pytest.mark.asyncio
+async def test_remote_cache_single_flight_survives_cancelled_waiter():
+    cache = RemoteDocumentCache("JWKS", _settings(), clock=FakeClock())
+    release = asyncio.Event()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"keys": []}, None
+
+    first = asyncio.create_task(cache.get("url", fetch))
+    second = asyncio.create_task(cache.get("url", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == {"keys": []}
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_remote_cache_failed_fetch_is_not_cached():
+    cache = RemoteDocumentCache("JWKS", _settings(), clock=FakeClock())
+    fetch = CountingFetch(RuntimeError("down"), ({"keys": []}, None))
+
+    with pytest.raises(RuntimeError):
+        await cache.get("url", fetch)
+    assert await cache.get("url", fetch) == {"keys": []}
+    assert fetch.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_remote_cache_force_refresh_is_rate_limited():
+    clock = FakeClock()
+    cache = RemoteDocumentCache("JWKS", _settings(), clock=clock)
+    fetch = CountingFetch(({"keys": ["old"]}, None), ({"keys": ["new"]}, None))
+
+    await cache.get("url", fetch)
+    for _ in range(10):
+        clock.now += 1
+        assert await cache.get("url", fetch, force_refresh=True) == {"keys": ["old"]}
+    assert fetch.calls == 1
+
+    clock.now += 20
+    assert await cache.get("url", fetch, force_refresh=True) == {"keys": ["new"]}
+    assert fetch.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_remote_cache_serves_stale_when_refresh_fails():
+    clock = FakeClock()
+    cache = RemoteDocumentCache("JWKS", _settings(), clock=clock)
+    fetch = CountingFetch(({"keys": ["good"]}, 60.0), RuntimeError("down"))
+
+    await cache.get("url", fetch)
+    clock.now += 61
+    assert await cache.get("url", fetch) == {"keys": ["good"]}
+    assert fetch.calls == 2
+
+    # The failed refresh is not retried until min_ttl has passed.
+    clock.now += 59
+    assert await cache.get("url", fetch) == {"keys": ["good"]}
+    assert fetch.calls == 2
+
+    # Past max_stale the error surfaces.
+    clock.now += 1800
+    with pytest.raises(RuntimeError):
+        await cache.get("url", fetch)
+
+
+@pytest.mark.asyncio
+async def test_remote_cache_evicts_least_recently_used():
+    cache = RemoteDocumentCache("JWKS", _settings(max_entries=2), clock=FakeClock())
+    fetches = {key: CountingFetch(({"key": key}, None)) for key in "abc"}
+
+    await cache.get("a", fetches["a"])
+    await cache.get("b", fetches["b"])
+    await cache.get("a", fetches["a"])
+    await cache.get("c", fetches["c"])
+    await cache.get("a", fetches["a"])
+    await cache.get("b", fetches["b"])
+
+    assert fetches["a"].calls == 1
+    assert fetches["b"].calls == 2
@@ -1,7 +1,11 @@
+import asyncio
 import json
 from datetime import datetime, timezone
 from types import SimpleNamespace
 
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from cryptography.hazmat.primitives.asymmetric import rsa
 from multidict import CIMultiDict
 import pytest
 from fastapi import HTTPException
@@ -404,6 +408,15 @@ def _patch_lti_external_login_io(monkeypatch):
     )
 
 
+@pytest.fixture(autouse=True)
+def _clear_lti_remote_caches():
+    server_module._jwks_cache.clear()
+    server_module._openid_configuration_cache.clear()
+    yield
+    server_module._jwks_cache.clear()
+    server_module._openid_configuration_cache.clear()
+
+
 @pytest.fixture(autouse=True)
 def _patch_lti_security_config(monkeypatch):
     real_config = config_module.config
@@ -732,6 +745,151 @@ async def test_verify_lti_id_token_invalid_header(monkeypatch):
     assert excinfo.value.status_code == 400
 
 
+def _rsa_jwk(kid: str):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(
+        server_module.jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key())
+    )
+    jwk["kid"] = kid
+    return private_key, jwk
+
+
+@pytest.fixture
+async def stub_jwks_server(monkeypatch):
+    """Serves `state["jwks"]` over real HTTP, counting requests."""
+    state = {"jwks": {"keys": []}, "requests": 0, "headers": {}, "delay": 0.0}
+
+    async def handle_jwks(request):
+        state["requests"] += 1
+        await asyncio.sleep(state["delay"])
+        return web.json_response(state["jwks"], headers=state["headers"])
+
+    app = web.Application()
+    app.router.add_get("/jwks", handle_jwks)
+    server = TestServer(app)
+    await server.start_server()
+    # The URL allowlist only permits default ports; the stub runs on a random one.
+    monkeypatch.setattr(server_module, "generate_jwks_uri_url", lambda url, **_: url)
+    state["url"] = str(server.make_url("/jwks"))
+    try:
+        yield state
+    finally:
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_fetch_jwks_caches_per_cache_control(stub_jwks_server, monkeypatch):
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(server_module._jwks_cache, "_clock", lambda: clock.now)
+    stub_jwks_server["jwks"] = {"keys": [{"kid": "a"}]}
+    stub_jwks_server["headers"] = {"Cache-Control": "max-age=120"}
+
+    for _ in range(5):
+        assert await server_module._fetch_jwks(stub_jwks_server["url"]) == {
+            "keys": [{"kid": "a"}]
+        }
+    assert stub_jwks_server["requests"] == 1
+
+    stub_jwks_server["jwks"] = {"keys": [{"kid": "b"}]}
+    clock.now = 121
+    assert await server_module._fetch_jwks(stub_jwks_server["url"]) == {
+        "keys": [{"kid": "b"}]
+    }
+    assert stub_jwks_server["requests"] == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_jwks_concurrent_misses_share_one_request(stub_jwks_server):
+    stub_jwks_server["jwks"] = {"keys": [{"kid": "a"}]}
+    stub_jwks_server["delay"] = 0.05
+
+    results = await asyncio.gather(
+        *(server_module._fetch_jwks(stub_jwks_server["url"]) for _ in range(25))
+    )
+
+    assert stub_jwks_server["requests"] == 1
+    assert all(result == {"keys": [{"kid": "a"}]} for result in results)
+
+
+@pytest.mark.asyncio
+async def test_verify_lti_id_token_refreshes_jwks_for_rotated_kid(stub_jwks_server):
+    _, old_jwk = _rsa_jwk("old")
+    new_key, new_jwk = _rsa_jwk("new")
+    stub_jwks_server["jwks"] = {"keys": [old_jwk]}
+    stub_jwks_server["headers"] = {"Cache-Control": "max-age=3600"}
+    await server_module._fetch_jwks(stub_jwks_server["url"])
+    stub_jwks_server["jwks"] = {"keys": [old_jwk, new_jwk]}
+    server_module._jwks_cache._entries[stub_jwks_server["url"]].fetched_at -= 60
+
+    now = int(datetime.now(timezone.utc).timestamp())
+    id_token = server_module.jwt.encode(
+        {
+            "sub": "user",
+            "nonce": "nonce",
+            "iss": "issuer",
+            "aud": "client",
+            "iat": now,
+            "exp": now + 300,
+        },
+        new_key,
+        algorithm="RS256",
+        headers={"kid": "new"},
+    )
+
+    claims = await server_module._verify_lti_id_token(
+        id_token=id_token,
+        jwks_url=stub_jwks_server["url"],
+        expected_issuer="issuer",
+        expected_audience="client",
+        expected_algorithm="RS256",
+    )
+
+    assert claims["sub"] == "user"
+    assert stub_jwks_server["requests"] == 2
+
+
+@pytest.mark.asyncio
+async def test_verify_lti_id_token_unknown_kid_refresh_is_rate_limited(
+    stub_jwks_server,
+):
+    _, jwk = _rsa_jwk("known")
+    stub_jwks_server["jwks"] = {"keys": [jwk]}
+    unknown_key, _ = _rsa_jwk("unknown")
+    id_token = server_module.jwt.encode(
+        {"sub": "user"}, unknown_key, algorithm="RS256", headers={"kid": "unknown"}
+    )
+
+    for _ in range(10):
+        with pytest.raises(HTTPException) as excinfo:
+            await server_module._verify_lti_id_token(
+                id_token=id_token,
+                jwks_url=stub_jwks_server["url"],
+                expected_issuer="issuer",
+                expected_audience="client",
+                expected_algorithm="RS256",
+            )
+        assert excinfo.value.detail == "Unknown JWT key id (kid)"
+
+    assert stub_jwks_server["requests"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_jwks_serves_stale_when_platform_is_down(
+    stub_jwks_server, monkeypatch
+):
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(server_module._jwks_cache, "_clock", lambda: clock.now)
+    stub_jwks_server["jwks"] = {"keys": [{"kid": "a"}]}
+    await server_module._fetch_jwks(stub_jwks_server["url"])
+
+    stub_jwks_server["jwks"] = ["not", "a", "jwks"]
+    clock.now = 60 * 60
+    assert await server_module._fetch_jwks(stub_jwks_server["url"]) == {
+        "keys": [{"kid": "a"}]
+    }
+    assert stub_jwks_server["requests"] == 2
+
+
 def test_get_claim_object_returns_empty_dict_for_non_dict_claims():
     claims = {
         server_module.LTI_CLAIM_NRPS_KEY: "not-a-dict",
@@ -0,0 +1,191 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+import pingpong.merge as merge_module
+from pingpong import models
+
+pytestmark = pytest.mark.asyncio
+
+
+class FlakyAuthzClient:
+    """Stores tuples in memory and fails the first `failures` writes."""
+
+    def __init__(self, tuples=(), failures: int = 0):
+        self.tuples: set[tuple[str, str, str]] = set(tuples)
+        self.failures = failures
+        self.writes = 0
+
+    async def read(self, key):
+        obj_type = key.object.rstrip(":")
+        return [
+            SimpleNamespace(user=u, relation=r, object=o)
+            for u, r, o in sorted(self.tuples)
+            if u == key.user and o.split(":")[0] == obj_type
+        ]
+
+    async def write_safe(self, grant=None, revoke=None):
+        self.writes += 1
+        # Apply part of the batch before failing, like a dropped connection.
+        self.tuples.update((grant or [])[:1])
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("authz unavailable")
+        self.tuples.update(grant or [])
+        self.tuples.difference_update(revoke or [])
+
+
+@pytest.fixture(autouse=True)
+def _fast_merge(monkeypatch):
+    monkeypatch.setattr(merge_module, "get_types", lambda: ["class", "thread"])
+    monkeypatch.setattr(merge_module, "retry_delay", lambda *args, **kwargs: 0)
+
+
+async def _seed(session):
+    session.add(models.Class(id=700, name="Merge Class", api_key="test-key"))
+    session.add(models.Class(id=701, name="Other Class", api_key="test-key"))
+    for user_id in range(1, 7):
+        session.add(models.User(id=user_id, email=f"user{user_id}@example.com"))
+    await session.flush()
+    await models.UserClassRole.create(session, 1, 700)
+    await models.UserClassRole.create(session, 2, 700)
+    await models.UserClassRole.create(session, 3, 701)
+    await models.UserClassRole.create(session, 5, 701)
+    await models.ExternalLogin.create_or_update(session, 3, "harvard-sso", "HUID3")
+    await session.commit()
+
+
+def _tuples():
+    return {
+        ("user:2", "student", "class:700"),
+        ("user:3", "student", "class:701"),
+        ("user:5", "student", "class:701"),
+        ("user:5", "party", "thread:9"),
+    }
+
+
+async def _state(session):
+    roles = await session.execute(
+        select(models.UserClassRole.user_id, models.UserClassRole.class_id)
+    )
+    logins = await session.execute(
+        select(models.ExternalLogin.user_id, models.ExternalLogin.identifier).where(
+            models.ExternalLogin.provider != "email"
+        )
+    )
+    merged = await session.execute(
+        select(
+            models.user_merge_association.c.user_id,
+            models.user_merge_association.c.merged_user_id,
+        )
+    )
+    user_ids = await session.scalars(select(models.User.id))
+    return (
+        sorted(roles.all()),
+        sorted(logins.all()),
+        sorted(merged.all()),
+        sorted(user_ids),
+    )
+
+
+# 3 -> 2 -> 1 is a chain; 5 and 6 both merge into 4.
+PAIRS = [(2, 3), (1, 2), (4, 5), (4, 6)]
+
+
+async def test_merge_many_matches_merging_one_pair_at_a_time(db):
+    async with db.async_session() as session:
+        await _seed(session)
+    sequential_authz = FlakyAuthzClient(_tuples())
+    async with db.async_session() as session:
+        for new_user_id, old_user_id in PAIRS:
+            await merge_module.merge(
+                session, sequential_authz, new_user_id, old_user_id
+            )
+        await session.flush()
+        expected = await _state(session)
+        await session.rollback()
+
+    batch_authz = FlakyAuthzClient(_tuples())
+    async with db.async_session() as session:
+        await merge_module.merge_many(session, batch_authz, PAIRS)
+        await session.flush()
+        assert await _state(session) == expected
+
+    assert expected[0] == [(1, 700), (1, 701), (4, 701)]
+    assert expected[3] == [1, 4]
+    assert batch_authz.tuples == sequential_authz.tuples
+    assert batch_authz.tuples == {
+        ("user:1", "student", "class:700"),
+        ("user:1", "student", "class:701"),
+        ("user:4", "student", "class:701"),
+        ("user:4", "party", "thread:9"),
+    }
+
+
+async def test_merge_many_writes_an_audit_record_per_merge(db):
+    async with db.async_session() as session:
+        await _seed(session)
+        audits = await merge_module.merge_many(
+            session, FlakyAuthzClient(_tuples()), PAIRS
+        )
+        await session.commit()
+
+    assert len({audit.batch_id for audit in audits}) == 1
+    by_old_user = {audit.old_user_id: audit for audit in audits}
+    # The chain is followed to the final user.
+    assert {old: a.new_user_id for old, a in by_old_user.items()} == {
+        2: 1,
+        3: 1,
+        5: 4,
+        6: 4,
+    }
+    assert by_old_user[3].rows_moved["classes"] == 1
+    assert by_old_user[3].rows_moved["external_logins"] == 1
+    assert by_old_user[5].tuples_moved == 2
+    assert by_old_user[6].tuples_moved == 0
+
+    async with db.async_session() as session:
+        [audit] = await models.UserMergeAudit.get_by_old_user_id(session, 5)
+        assert audit.new_user_id == 4
+        assert audit.rows_moved == {"classes": 1}
+
+
+async def test_merge_many_retries_failed_permission_writes(db):
+    authz = FlakyAuthzClient(_tuples(), failures=1)
+    async with db.async_session() as session:
+        await _seed(session)
+        await merge_module.merge_many(session, authz, [(4, 5)])
+
+    # A failed and a retried grant, then the revoke.
+    assert authz.writes == 3
+    assert authz.tuples == {
+        ("user:2", "student", "class:700"),
+        ("user:3", "student", "class:701"),
+        ("user:4", "student", "class:701"),
+        ("user:4", "party", "thread:9"),
+    }
+
+
+async def test_merge_many_keeps_old_permissions_when_grants_fail(db):
+    authz = FlakyAuthzClient(
+        _tuples(), failures=merge_module.MERGE_AUTHZ_WRITE_ATTEMPTS
+    )
+    async with db.async_session() as session:
+        await _seed(session)
+        with pytest.raises(RuntimeError, match="authz unavailable"):
+            await merge_module.merge_many(session, authz, [(4, 5)])
+
+    # Only the grant batch was attempted; nothing of user 5 was revoked.
+    assert authz.writes == merge_module.MERGE_AUTHZ_WRITE_ATTEMPTS
+    assert _tuples() <= authz.tuples
+
+
+@pytest.mark.parametrize(
+    "pairs",
+    [[(1, 1)], [(1, 3), (2, 3)], [(1, 2), (2, 1)]],
+)
+async def test_merge_many_rejects_invalid_pairs(db, pairs):
+    async with db.async_session() as session:
+        with pytest.raises(ValueError):
+            await merge_module.merge_many(session, FlakyAuthzClient(), pairs)
@@ -5,6 +5,7 @@ from sqlalchemy import select
 
 from pingpong import models, schemas
 from pingpong.migrations import m16_migrate_message_parts as migration
+from pingpong.migrations.sharded import run_sharded_migration
 
 pytestmark = pytest.mark.asyncio
 
@@ -306,6 +307,59 @@ async def test_migrate_message_parts_continues_after_message_failure(db, monkeyp
     assert [(part.message_id, part.text) for part in parts] == [(2001, "backfilled")]
 
 
+async def test_message_parts_migration_runs_sharded(db, monkeypatch):
+    async with db.async_session() as session:
+        await _seed_thread(session, class_id=1, assistant_id=10, thread_id=100)
+        await _seed_thread(session, class_id=2, assistant_id=20, thread_id=200)
+        for id_, thread_id in [(1001, 100), (1002, 100), (2001, 200)]:
+            await _seed_message(
+                session,
+                id_=id_,
+                thread_id=thread_id,
+                run_id=thread_id,
+                openai_message_id=f"msg-{id_}",
+                output_index=id_ % 1000,
+                metadata=MIGRATION_METADATA,
+            )
+        await session.commit()
+
+    fake_client = _fake_openai_client(
+        {
+            "thread-100": [
+                _openai_message("msg-1001", [_text_content("first")]),
+                _openai_message("msg-1002", [_text_content("second")]),
+            ],
+        }
+    )
+    requested_class_ids = []
+
+    async def fake_get_openai_client_by_class_id(_session, class_id):
+        requested_class_ids.append(class_id)
+        if class_id == 2:
+            raise RuntimeError("no API key")
+        return fake_client
+
+    monkeypatch.setattr(
+        migration, "get_openai_client_by_class_id", fake_get_openai_client_by_class_id
+    )
+
+    progress = await run_sharded_migration(
+        migration.message_parts_migration(FakeAuthzClient()),
+        workers=1,
+        batch_size=10,
+    )
+
+    assert (progress.migrated, progress.failed) == (2, 1)
+    # Clients are created once per class, not once per message.
+    assert requested_class_ids == [1, 2]
+    async with db.async_session() as session:
+        parts = await _all(session, models.MessagePart, models.MessagePart.message_id)
+    assert [(part.message_id, part.text) for part in parts] == [
+        (1001, "first"),
+        (1002, "second"),
+    ]
+
+
 async def test_migrate_message_parts_reuses_existing_local_file(db):
     async with db.async_session() as session:
         await _seed_thread(session, class_id=1, assistant_id=10, thread_id=100)
@@ -3,6 +3,7 @@ from sqlalchemy import select
 
 from pingpong import models, schemas
 from pingpong.migrations import m21_finalize_v2_threads_to_v3 as migration
+from pingpong.migrations.sharded import run_sharded_migration
 
 pytestmark = pytest.mark.asyncio
 
@@ -205,6 +206,30 @@ async def test_finalize_v2_threads_to_v3_requires_a_migrated_message(db):
         assert thread.version == 2
 
 
+async def test_finalize_v2_threads_migration_runs_sharded(db):
+    async with db.async_session() as session:
+        for id_ in range(1, 11):
+            await _seed_thread(session, id_=id_)
+            await _seed_message(
+                session,
+                id_=id_ * 100 + 1,
+                thread_id=id_,
+                run_id=id_,
+                role=schemas.MessageRole.USER,
+                metadata=_metadata(attachments_complete=id_ != 5),
+            )
+        await session.commit()
+
+    progress = await run_sharded_migration(
+        migration.finalize_v2_threads_migration(), workers=2, shards=3, batch_size=2
+    )
+
+    assert progress.migrated == 9
+    async with db.async_session() as session:
+        versions = await _versions_by_id(session)
+    assert versions == {id_: 2 if id_ == 5 else 3 for id_ in range(1, 11)}
+
+
 async def test_revert_finalized_v3_threads_to_v2_only_reverts_migrated_threads(db):
     async with db.async_session() as session:
         await _seed_thread(session, id_=1, version=3)
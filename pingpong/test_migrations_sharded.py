@@ -0,0 +1,146 @@
+import pytest
+from sqlalchemy import select
+
+from pingpong import models
+from pingpong.migrations import sharded
+
+pytestmark = pytest.mark.asyncio
+
+MIGRATED_SUFFIX = " (migrated)"
+
+
+def _rename_classes_migration(
+    calls: list[list[int]], fail_on: set[int]
+) -> sharded.ShardedMigration[models.Class]:
+    """Renames classes, raising once for each batch holding an id in `fail_on`."""
+
+    def filters():
+        return (models.Class.name.not_like(f"%{MIGRATED_SUFFIX}"),)
+
+    async def fetch_batch(session, *, after_id, before_id, limit):
+        stmt = (
+            select(models.Class)
+            .where(*filters(), models.Class.id > after_id, models.Class.id < before_id)
+            .order_by(models.Class.id)
+            .limit(limit)
+        )
+        return list(await session.scalars(stmt))
+
+    async def migrate_batch(session, classes, context):
+        ids = [class_.id for class_ in classes]
+        calls.append(ids)
+        if fail_on.intersection(ids):
+            fail_on.difference_update(ids)
+            raise RuntimeError("database went away")
+        for class_ in classes:
+            class_.name += MIGRATED_SUFFIX
+        return sharded.BatchResult(migrated=len(classes))
+
+    return sharded.ShardedMigration(
+        name="test_rename_classes",
+        key=models.Class.id,
+        key_of=lambda class_: int(class_.id),
+        filters=filters,
+        fetch_batch=fetch_batch,
+        migrate_batch=migrate_batch,
+    )
+
+
+async def _seed_classes(db, ids) -> None:
+    async with db.async_session() as session:
+        session.add_all(models.Class(id=id_, name=f"Class {id_}") for id_ in ids)
+        await session.commit()
+
+
+async def _class_names(db) -> dict[int, str]:
+    async with db.async_session() as session:
+        rows = await session.execute(select(models.Class.id, models.Class.name))
+        return dict(rows.all())
+
+
+async def _shards(db) -> list[models.DataMigrationShard]:
+    async with db.async_session() as session:
+        return await models.DataMigrationShard.get_by_migration(
+            session, "test_rename_classes"
+        )
+
+
+def test_plan_ranges_covers_every_key_once():
+    assert sharded._plan_ranges(1, 10, 3) == [(0, 5), (4, 9), (8, 11)]
+    assert sharded._plan_ranges(5, 5, 4) == [(4, 6)]
+    assert sharded._plan_ranges(1, 3, 8) == [(0, 2), (1, 3), (2, 4)]
+
+
+async def test_run_sharded_migration_migrates_every_shard(db):
+    await _seed_classes(db, range(1, 21))
+    calls: list[list[int]] = []
+
+    progress = await sharded.run_sharded_migration(
+        _rename_classes_migration(calls, set()), workers=3, shards=4, batch_size=2
+    )
+
+    assert progress.total == 20
+    assert progress.migrated == 20
+    assert progress.shards_done == 4
+    assert sorted(id_ for batch in calls for id_ in batch) == list(range(1, 21))
+    assert all(
+        name.endswith(MIGRATED_SUFFIX) for name in (await _class_names(db)).values()
+    )
+    shards = await _shards(db)
+    assert [shard.processed for shard in shards] == [5, 5, 5, 5]
+    assert all(shard.completed_at is not None for shard in shards)
+
+
+async def test_run_sharded_migration_resumes_from_checkpoints(db):
+    await _seed_classes(db, range(1, 11))
+    calls: list[list[int]] = []
+    migration = _rename_classes_migration(calls, {7})
+
+    with pytest.raises(RuntimeError, match="database went away"):
+        await sharded.run_sharded_migration(
+            migration, workers=1, shards=2, batch_size=2
+        )
+
+    shards = await _shards(db)
+    assert [(s.cursor, s.end_id) for s in shards] == [(5, 6), (5, 11)]
+    assert [s.completed_at is not None for s in shards] == [True, False]
+    names = await _class_names(db)
+    migrated = [id_ for id_, name in names.items() if name.endswith(MIGRATED_SUFFIX)]
+    assert migrated == [1, 2, 3, 4, 5]
+
+    calls.clear()
+    progress = await sharded.run_sharded_migration(
+        migration, workers=1, shards=2, batch_size=2
+    )
+
+    # Only the unfinished shard runs again, from its last checkpoint.
+    assert calls == [[6, 7], [8, 9], [10]]
+    assert progress.total == 5
+    assert progress.shards_done == 2
+    assert all(
+        name.endswith(MIGRATED_SUFFIX) for name in (await _class_names(db)).values()
+    )
+
+
+async def test_run_sharded_migration_restart_discards_checkpoints(db):
+    await _seed_classes(db, range(1, 11))
+    calls: list[list[int]] = []
+    migration = _rename_classes_migration(calls, {7})
+
+    with pytest.raises(RuntimeError):
+        await sharded.run_sharded_migration(
+            migration, workers=1, shards=2, batch_size=2
+        )
+
+    calls.clear()
+    await sharded.run_sharded_migration(
+        migration, workers=1, shards=3, batch_size=10, restart=True
+    )
+
+    # A new run is planned over the rows still left to migrate.
+    assert calls == [[6, 7], [8, 9], [10]]
+    assert [(s.cursor, s.end_id) for s in await _shards(db)] == [
+        (7, 8),
+        (9, 10),
+        (10, 11),
+    ]
@@ -285,6 +285,101 @@ async def test_get_by_email_external_logins_priority_returns_none_when_all_miss(
         assert matched_user_ids == []
 
 
+async def test_get_many_by_email_external_logins_priority_matches_single_lookups(db):
+    async with db.async_session() as session:
+        saml_provider = await models.ExternalLoginProvider.get_or_create_by_name(
+            session, "saml"
+        )
+        email_user = await _create_user(session, 1451, "email-hit@example.com")
+        sso_user = await _create_user(session, 1452, "sso-user@example.com")
+        other_user = await _create_user(session, 1453, "other@example.com")
+        await _create_external_login(
+            session,
+            sso_user.id,
+            provider="saml",
+            identifier="sso-1",
+            provider_id=saml_provider.id,
+        )
+        await _create_external_login(
+            session,
+            other_user.id,
+            provider="saml",
+            identifier="sso-2",
+            provider_id=saml_provider.id,
+        )
+
+        def _saml(identifier: str, **kwargs) -> schemas.ExternalLoginLookupItem:
+            return schemas.ExternalLoginLookupItem(
+                provider="saml", identifier=identifier, **kwargs
+            )
+
+        lookups = [
+            ("EMAIL-HIT@example.com", []),
+            ("email-hit@example.com", [_saml("sso-1")]),
+            ("missing@example.com", [_saml("missing-id")]),
+            ("missing@example.com", []),
+            (
+                "email-hit@example.com",
+                [
+                    schemas.ExternalLoginLookupItem(
+                        provider_id=saml_provider.id, identifier="sso-2"
+                    )
+                ],
+            ),
+            ("other@example.com", [_saml("sso-1"), _saml("sso-2")]),
+            (
+                "new@example.com",
+                [schemas.ExternalLoginLookupItem(provider="unknown", identifier="x")],
+            ),
+        ]
+
+        results = await models.User.get_many_by_email_external_logins_priority(
+            session, lookups
+        )
+
+        assert len(results) == len(lookups)
+        for (email, lookup_items), result in zip(lookups, results):
+            expected = await models.User.get_by_email_external_logins_priority(
+                session, email, lookup_items
+            )
+            assert result is not None
+            assert (result[0].id if result[0] else None, result[1]) == (
+                expected[0].id if expected[0] else None,
+                expected[1],
+            )
+        assert results[1][0].id == sso_user.id
+        assert results[1][1] == [email_user.id, sso_user.id]
+
+
+async def test_get_many_by_email_external_logins_priority_defers_errors(db):
+    async with db.async_session() as session:
+        saml_provider = await models.ExternalLoginProvider.get_or_create_by_name(
+            session, "saml"
+        )
+        await _create_user(session, 1461, "a@example.com")
+
+        results = await models.User.get_many_by_email_external_logins_priority(
+            session,
+            [
+                (
+                    "a@example.com",
+                    [
+                        schemas.ExternalLoginLookupItem(
+                            provider="other",
+                            provider_id=saml_provider.id,
+                            identifier="x",
+                        )
+                    ],
+                ),
+                ("a@example.com", []),
+            ],
+        )
+
+        # The mismatched provider has to go through the single lookup to raise.
+        assert results[0] is None
+        assert results[1] is not None and results[1][0].id == 1461
+
+
 async def test_external_login_create_or_update_non_email_keeps_multiple_identifiers(db):
     async with db.async_session() as session:
         user = await _create_user(session, 1501, "issuer-user@example.com")
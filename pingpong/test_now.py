@@ -1,6 +1,11 @@
+import calendar
+import random
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
 import pytest
-from datetime import datetime, timezone
-from pingpong.now import _get_next_run_time, _matches
+
+from pingpong.now import _get_next_run_time, _matches, compile_cron
 
 
 @pytest.fixture
@@ -160,3 +165,220 @@ def test_cron_lists_and_ranges(tz):
     )  # 9 AM and every 2 hours from 1-5 PM weekdays
     expected_next_run = datetime(2025, 1, 7, 9, 0, 0, tzinfo=tz)
     assert next_run == expected_next_run
+
+
+def test_cron_first_weekday_of_month(tz):
+    """Day of month and day of week must both match."""
+    ts = datetime(2025, 1, 7, 12, 0, 0, tzinfo=tz)
+    next_run = _get_next_run_time("0 3 1-7 * 1", ts)  # First Monday, 3 AM
+    assert next_run == datetime(2025, 2, 3, 3, 0, 0, tzinfo=tz)
+
+
+@pytest.mark.parametrize(
+    "sched", ["0 0 31 4 *", "0 0 0 * *", "0 0 * * 7", "60 * * * *"]
+)
+def test_cron_never_matches(tz, sched):
+    with pytest.raises(ValueError):
+        _get_next_run_time(sched, datetime(2025, 1, 1, tzinfo=tz))
+
+
+def test_cron_is_compiled_once():
+    assert compile_cron("*/5 * * * *") is compile_cron("*/5 * * * *")
+
+
+def test_cron_in_other_timezone():
+    tz = ZoneInfo("Asia/Kolkata")
+    ts = datetime(2025, 1, 7, 4, 0, 0, tzinfo=timezone.utc)  # 09:30 in Kolkata
+    next_run = _get_next_run_time("0 10 * * *", ts, tz)
+    assert next_run == datetime(2025, 1, 7, 10, 0, 0, tzinfo=tz)
+    assert next_run.astimezone(timezone.utc) == datetime(
+        2025, 1, 7, 4, 30, tzinfo=timezone.utc
+    )
+
+
+def test_cron_spring_forward_runs_after_the_gap():
+    tz = ZoneInfo("America/New_York")
+    ts = datetime(2025, 3, 9, 1, 0, 0, tzinfo=tz)  # EST; 02:00-03:00 is skipped
+    next_run = _get_next_run_time("30 2 * * *", ts, tz)
+    assert next_run == datetime(2025, 3, 9, 7, 30, tzinfo=timezone.utc)  # 03:30 EDT
+    assert _get_next_run_time("30 2 * * *", next_run, tz) == datetime(
+        2025, 3, 10, 2, 30, tzinfo=tz
+    )
+
+
+def test_cron_fall_back_runs_repeated_time_once():
+    tz = ZoneInfo("America/New_York")
+    utc = timezone.utc
+    ts = datetime(2025, 11, 2, 0, 0, 0, tzinfo=tz)  # 01:00-02:00 happens twice
+    first = _get_next_run_time("30 1 * * *", ts, tz)
+    # Times in a repeated hour only compare equal in the same zone.
+    assert first.astimezone(utc) == datetime(2025, 11, 2, 5, 30, tzinfo=utc)  # EDT
+    # Not again at 01:30 EST an hour later.
+    assert _get_next_run_time("30 1 * * *", first, tz) == datetime(
+        2025, 11, 3, 1, 30, tzinfo=tz
+    )
+    # From inside the repeated hour, the next time is after it.
+    second_pass = datetime(2025, 11, 2, 6, 10, tzinfo=utc)  # 01:10 EST
+    next_run = _get_next_run_time("*/15 * * * *", second_pass, tz)
+    assert next_run.astimezone(utc) == datetime(2025, 11, 2, 7, 0, tzinfo=utc)
+
+
+def _random_field(rng: random.Random, low: int, high: int) -> str:
+    kind = rng.choice(["*", "value", "list", "range", "step", "range_step"])
+    if kind == "*":
+        return "*"
+    if kind == "value":
+        return str(rng.randint(low, high))
+    if kind == "list":
+        return ",".join(
+            str(v) for v in sorted(rng.sample(range(low, high + 1), rng.randint(2, 4)))
+        )
+    start = rng.randint(low, high)
+    end = rng.randint(start, high)
+    step = rng.randint(2, 5)
+    if kind == "range":
+        return f"{start}-{end}"
+    if kind == "step":
+        return f"*/{step}"
+    return f"{start}-{end}/{step}"
+
+
+def _random_sched(rng: random.Random) -> str:
+    # The previous implementation only supported "*" or one day of the month.
+    day = "*" if rng.random() < 0.6 else str(rng.randint(1, 31))
+    return " ".join(
+        [
+            _random_field(rng, 0, 59),
+            _random_field(rng, 0, 23),
+            day,
+            _random_field(rng, 1, 12),
+            _random_field(rng, 0, 6),
+        ]
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_cron_matches_stepping_implementation(tz, seed):
+    rng = random.Random(seed)
+    compared = 0
+    for _ in range(100):
+        sched = _random_sched(rng)
+        ts = datetime(2020, 1, 1, tzinfo=tz) + timedelta(
+            minutes=rng.randint(0, 10 * 365 * 24 * 60), seconds=rng.randint(0, 59)
+        )
+        try:
+            expected = _stepping_next_run_time(sched, ts, tz)
+        except ValueError:
+            # It gives up after 1000 steps; the compiled schedule doesn't.
+            continue
+        assert _get_next_run_time(sched, ts, tz) == expected, (sched, ts)
+        compared += 1
+    assert compared > 50
+
+
+def _stepping_next_run_time(sched: str, ts: datetime, tz=timezone.utc) -> datetime:
+    """
+    The previous implementation of `_get_next_run_time`, kept as an oracle.
+
+    Calculate the next run time based on a cron expression.
+
+    Args:
+        sched (str): The cron schedule string (e.g., "*/15 * * * *").
+        ts (datetime): The current timestamp.
+        tz (timezone): The timezone for the calculation (default is UTC).
+
+    Returns:
+        datetime: The next run time.
+
+    Raises:
+        ValueError: If the cron format is invalid or if unable to find next run time within MAX_ITERATIONS
+    """
+    MAX_ITERATIONS = 1000  # Prevent infinite loops
+    iteration_count = 0
+
+    # Split the cron schedule into its components
+    try:
+        minute, hour, day, month, weekday = sched.split()
+    except ValueError:
+        raise ValueError("Invalid cron format. Expected 5 fields.")
+
+    # Start with the current timestamp
+    ts = ts.astimezone(tz)
+    ts = ts.replace(second=0, microsecond=0)
+    original_ts = ts
+
+    # If we're looking for a specific day (not *), store it
+    target_day = None if day == "*" else int(day)
+
+    while iteration_count < MAX_ITERATIONS:
+        iteration_count += 1
+
+        if target_day:
+            _, last_day = calendar.monthrange(ts.year, ts.month)
+            if target_day > last_day:
+                # Skip to next month if target day is greater than days in current month
+                if ts.month == 12:
+                    ts = ts.replace(year=ts.year + 1, month=1, day=1)
+                else:
+                    ts = ts.replace(month=ts.month + 1, day=1)
+                ts = ts.replace(hour=0, minute=0, second=0)
+                continue
+            elif ts.day > target_day:
+                # If we've passed the target day in current month, move to next month
+                if ts.month == 12:
+                    ts = ts.replace(year=ts.year + 1, month=1, day=target_day)
+                else:
+                    ts = ts.replace(month=ts.month + 1, day=target_day)
+                ts = ts.replace(hour=0, minute=0, second=0)
+                continue
+
+        # Convert weekday to cron format (0-6, where 0 is Sunday)
+        cron_wday = ts.weekday()
+        if weekday != "*":  # Only adjust if we're checking specific days
+            cron_wday = (
+                ts.weekday() + 1
+            ) % 7  # Convert to cron format where 1-7 represents Mon-Sun
+
+        matches_all = (
+            _matches(minute, ts.minute)
+            and _matches(hour, ts.hour)
+            and _matches(day, ts.day, ts.year, ts.month)
+            and _matches(month, ts.month)
+            and _matches(weekday, cron_wday)
+        )
+
+        if matches_all:
+            if ts <= original_ts:
+                ts += timedelta(minutes=1)
+                ts = ts.replace(second=0)
+                continue
+            return ts
+
+        if not _matches(minute, ts.minute):
+            ts += timedelta(minutes=1)
+            ts = ts.replace(second=0)
+            continue
+
+        if not _matches(hour, ts.hour):
+            ts += timedelta(hours=1)
+            ts = ts.replace(minute=0, second=0)
+            continue
+
+        if not _matches(day, ts.day, ts.year, ts.month) or not _matches(
+            weekday, cron_wday
+        ):
+            ts += timedelta(days=1)
+            ts = ts.replace(hour=0, minute=0, second=0)
+            continue
+
+        if not _matches(month, ts.month):
+            if ts.month == 12:
+                ts = ts.replace(year=ts.year + 1, month=1, day=1)
+            else:
+                ts = ts.replace(month=ts.month + 1, day=1)
+            ts = ts.replace(hour=0, minute=0, second=0)
+            continue
+
+    raise ValueError(
+        f"Unable to find next run time within {MAX_ITERATIONS} iterations. Possible invalid cron expression or infinite loop detected."
+    )
@@ -0,0 +1,198 @@
+import asyncio
+import time
+from contextlib import aclosing
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from pingpong.paging import close_shared_connector, prefetch_pages, shared_connector
+from pingpong.retry import parse_retry_after, retry_delay, with_retry
+
+
+class PagedStub:
+    """A local API that serves `pages` pages linked with `Link: next` headers."""
+
+    def __init__(self, pages: int = 5, delay: float = 0.05):
+        self.pages = pages
+        self.delay = delay
+        # page -> statuses to return before serving it
+        self.failures: dict[int, list[tuple[int, dict[str, str]]]] = {}
+        self.requests: list[tuple[int, float]] = []
+
+    async def members(self, request: web.Request) -> web.Response:
+        page = int(request.query.get("page", "1"))
+        self.requests.append((page, time.monotonic()))
+        await asyncio.sleep(self.delay)
+        if self.failures.get(page):
+            status, headers = self.failures[page].pop(0)
+            return web.json_response({"error": "busy"}, status=status, headers=headers)
+        headers = {}
+        if page < self.pages:
+            headers["Link"] = f'<{self.base_url}/members?page={page + 1}>; rel="next"'
+        return web.json_response([{"page": page}], headers=headers)
+
+
+@pytest.fixture
+async def stub():
+    stub = PagedStub()
+    app = web.Application()
+    app.router.add_get("/members", stub.members)
+    server = TestServer(app)
+    await server.start_server()
+    stub.base_url = f"http://127.0.0.1:{server.port}"
+    try:
+        yield stub
+    finally:
+        await server.close()
+        await close_shared_connector()
+
+
+def _next_link(response: aiohttp.ClientResponse) -> str | None:
+    link = response.headers.get("Link")
+    return link[link.find("<") + 1 : link.find(">")] if link else None
+
+
+def _page_fetcher(http_session: aiohttp.ClientSession):
+    @with_retry(max_retries=3, max_delay=1)
+    async def _get(url: str, retry_attempt: int = 0):
+        async with http_session.get(url, raise_for_status=True) as response:
+            return await response.json(), _next_link(response)
+
+    return _get
+
+
+@pytest.mark.asyncio
+async def test_prefetch_pages_overlaps_fetching_with_processing(stub):
+    processed: list[tuple[int, float]] = []
+    async with aiohttp.ClientSession(
+        connector=shared_connector(), connector_owner=False
+    ) as http_session:
+        t0 = time.monotonic()
+        async for page in prefetch_pages(
+            _page_fetcher(http_session), f"{stub.base_url}/members"
+        ):
+            # Processing a page takes as long as fetching one.
+            await asyncio.sleep(stub.delay)
+            processed.append((page[0]["page"], time.monotonic()))
+        elapsed = time.monotonic() - t0
+
+    assert [page for page, _ in processed] == [1, 2, 3, 4, 5]
+    assert [page for page, _ in stub.requests] == [1, 2, 3, 4, 5]
+    # Each next page was requested before the previous one was processed.
+    requested_at = dict(stub.requests)
+    for page, done_at in processed[:-1]:
+        assert requested_at[page + 1] < done_at
+    # Serial fetch + process would take 10 delays; pipelined it is about 6.
+    assert elapsed < 8.5 * stub.delay
+
+
+@pytest.mark.asyncio
+async def test_prefetch_pages_bounds_lookahead_and_stops_early(stub):
+    stub.pages = 20
+    stub.delay = 0.01
+    seen = []
+    fetchers: set[asyncio.Task] = set()
+    async with aiohttp.ClientSession(
+        connector=shared_connector(), connector_owner=False
+    ) as http_session:
+        fetch = _page_fetcher(http_session)
+
+        async def _fetch(url: str):
+            fetchers.add(asyncio.current_task())
+            return await fetch(url)
+
+        async with aclosing(
+            prefetch_pages(_fetch, f"{stub.base_url}/members", lookahead=2)
+        ) as pages:
+            async for page in pages:
+                seen.append(page[0]["page"])
+                await asyncio.sleep(0.2)
+                if len(seen) == 2:
+                    break
+        # Closing the pages stopped the fetcher; nothing more is requested.
+        (fetcher,) = fetchers
+        assert fetcher.cancelled()
+        requested = len(stub.requests)
+
+    assert seen == [1, 2]
+    # Two queued pages plus the one waiting to be queued, no more.
+    assert requested <= 5
+
+
+@pytest.mark.asyncio
+async def test_prefetch_pages_retries_429_and_5xx_in_order(stub, monkeypatch):
+    stub.failures = {
+        2: [(429, {"Retry-After": "0"}), (503, {})],
+        4: [(500, {})],
+    }
+    sleeps: list[float] = []
+    real_retry_delay = retry_delay
+
+    def _recording_retry_delay(*args, **kwargs):
+        delay = real_retry_delay(*args, **kwargs)
+        sleeps.append(delay)
+        return delay / 100
+
+    monkeypatch.setattr("pingpong.retry.retry_delay", _recording_retry_delay)
+
+    async with aiohttp.ClientSession(
+        connector=shared_connector(), connector_owner=False
+    ) as http_session:
+        pages = [
+            page[0]["page"]
+            async for page in prefetch_pages(
+                _page_fetcher(http_session), f"{stub.base_url}/members"
+            )
+        ]
+
+    assert pages == [1, 2, 3, 4, 5]
+    assert [page for page, _ in stub.requests] == [1, 2, 2, 2, 3, 4, 4, 5]
+    # The 429 asked for an immediate retry.
+    assert sleeps[0] == 0
+
+
+@pytest.mark.asyncio
+async def test_prefetch_pages_raises_after_yielding_earlier_pages(stub):
+    stub.failures = {3: [(404, {})] * 3}
+    pages = []
+    async with aiohttp.ClientSession(
+        connector=shared_connector(), connector_owner=False
+    ) as http_session:
+        with pytest.raises(aiohttp.ClientResponseError) as excinfo:
+            async for page in prefetch_pages(
+                _page_fetcher(http_session), f"{stub.base_url}/members"
+            ):
+                pages.append(page[0]["page"])
+
+    assert excinfo.value.status == 404
+    assert pages == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_shared_connector_is_reused_per_loop():
+    connector = shared_connector()
+    assert shared_connector() is connector
+    await close_shared_connector()
+    assert connector.closed
+    assert shared_connector() is not connector
+    await close_shared_connector()
+
+
+def test_parse_retry_after():
+    now = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("-5") == 0
+    assert parse_retry_after(format_datetime(now + timedelta(seconds=30)), now) == 30
+    assert parse_retry_after(format_datetime(now - timedelta(seconds=30)), now) == 0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_retry_delay_prefers_retry_after_and_caps_it():
+    assert retry_delay(1, "3") == 3
+    assert retry_delay(1, "600", max_delay=30) == 30
+    assert 0 <= retry_delay(3, None, backoff=2, max_delay=5) <= 5
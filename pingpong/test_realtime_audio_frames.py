@@ -0,0 +1,79 @@
+import struct
+
+import pytest
+
+from pingpong.realtime_audio_frames import (
+    AudioFrameError,
+    AudioFrameType,
+    RealtimeAudioTransport,
+    decode_audio_frame,
+    encode_audio_frame,
+)
+
+
+def test_audio_frame_round_trip():
+    audio = bytes(range(256)) * 4
+
+    frame = decode_audio_frame(
+        encode_audio_frame(
+            AudioFrameType.ASSISTANT_AUDIO,
+            timestamp_ms=1_234.5,
+            audio=audio,
+            item_id="item_abc",
+            event_id="event_é",
+        )
+    )
+
+    assert frame.type == AudioFrameType.ASSISTANT_AUDIO
+    assert frame.timestamp_ms == 1_234.5
+    assert frame.item_id == "item_abc"
+    assert frame.event_id == "event_é"
+    assert frame.audio == audio
+
+
+@pytest.mark.parametrize(
+    "buffer",
+    [
+        b"\x01\x00",
+        struct.pack(">BdBB", 9, 0.0, 0, 0),
+        struct.pack(">BdBB", 1, 0.0, 4, 0) + b"ab",
+        struct.pack(">BdBB", 1, 0.0, 1, 0) + b"\xff",
+    ],
+)
+def test_decode_audio_frame_rejects_malformed_frames(buffer):
+    with pytest.raises(AudioFrameError):
+        decode_audio_frame(buffer)
+
+
+def test_encode_audio_frame_rejects_long_ids():
+    with pytest.raises(AudioFrameError):
+        encode_audio_frame(
+            AudioFrameType.ASSISTANT_AUDIO,
+            timestamp_ms=0.0,
+            audio=b"",
+            item_id="x" * 256,
+        )
+
+
+def test_transport_falls_back_to_json_for_ids_that_do_not_fit():
+    audio_transport = RealtimeAudioTransport()
+    audio_transport.negotiate(1)
+
+    message = audio_transport.encode_assistant_audio(
+        item_id="x" * 300, event_id="event_1", audio=b"\0\0", audio_b64="AAA="
+    )
+
+    assert isinstance(message, str)
+    assert audio_transport.frames == {("outbound", "legacy"): 1}
+
+
+def test_transport_rejects_assistant_frames_from_browser():
+    audio_transport = RealtimeAudioTransport()
+    audio_transport.negotiate(1)
+
+    with pytest.raises(AudioFrameError):
+        audio_transport.decode_user_audio(
+            encode_audio_frame(
+                AudioFrameType.ASSISTANT_AUDIO, timestamp_ms=0.0, audio=b"\0\0"
+            )
+        )
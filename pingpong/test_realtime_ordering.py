@@ -1,9 +1,12 @@
+import asyncio
 import logging
+import time
 
 import pytest
 
 from pingpong.realtime import (
     ConversationItemOrderingBuffer,
+    EventLoopLagProbe,
     RealtimeAssistantAudioTracker,
 )
 
@@ -326,3 +329,19 @@ def test_pruned_saved_predecessor_still_allows_late_descendant_dispatch():
     assert _drain_ready_messages(buffer) == [
         ("assistant-2", "assistant-2", "assistant", "2")
     ]
+
+
+@pytest.mark.asyncio
+async def test_event_loop_lag_probe_records_blocked_loop():
+    probe = EventLoopLagProbe(interval=0.01)
+    task = asyncio.create_task(probe.run())
+    await asyncio.sleep(0)
+
+    # Block the loop well past the probe interval.
+    time.sleep(0.1)
+    await asyncio.sleep(0.05)
+    task.cancel()
+    await task
+
+    assert probe.samples >= 1
+    assert probe.max_lag >= 0.05
@@ -1,11 +1,18 @@
+import array
+import threading
 from typing import Any
 
 import pytest
+from pydub import AudioSegment
 from sqlalchemy import select
 
-from pingpong import models, schemas
+from pingpong import models, realtime_recorder, schemas
 from pingpong.models import VoiceModeRecording
-from pingpong.realtime_recorder import RealtimeRecorder, make_audio_recording_id
+from pingpong.realtime_recorder import (
+    RealtimeRecorder,
+    make_audio_recording_id,
+    mix_pcm16,
+)
 
 
 ONE_SECOND_PCM16 = b"\0" * 48_000
@@ -391,6 +398,107 @@ async def test_finalize_clamps_duration_to_started_chunks():
     assert recorder.audio_duration == 1_000
 
 
+def _pcm16(samples: list[int]) -> bytes:
+    return array.array("h", samples).tobytes()
+
+
+def test_mix_pcm16_matches_audio_segment_overlay():
+    # 24 samples per millisecond at 24kHz.
+    loud = _pcm16([30_000] * 24 * 40)
+    quiet = _pcm16([-1_000, 1_000] * 12 * 25)
+    truncated = AudioSegment(
+        data=_pcm16(list(range(-240, 240))),
+        sample_width=2,
+        frame_rate=24_000,
+        channels=1,
+    )[:7]
+    placements = [
+        (0, loud),
+        (10, loud),
+        (30, quiet),
+        (95, quiet),
+        (42, truncated.raw_data),
+        (150, loud),
+    ]
+
+    expected = AudioSegment.silent(duration=100, frame_rate=24_000)
+    for position_ms, data in placements:
+        expected = expected.overlay(
+            AudioSegment(data=data, sample_width=2, frame_rate=24_000, channels=1),
+            position=position_ms,
+        )
+
+    assert mix_pcm16(100, placements) == expected.raw_data
+
+
+@pytest.mark.asyncio
+async def test_save_buffer_mixes_only_played_part_of_truncated_response():
+    recorder = make_recorder()
+    tone = _pcm16([1_000] * 24_000)
+
+    await recorder.add_user_audio(_pcm16([10] * 24_000), timestamp=2_000)
+    await recorder.add_assistant_response_delta(
+        audio_chunk_bytes=tone,
+        event_id="event-1",
+        item_id="item-1",
+    )
+    await recorder.started_playing_assistant_response_delta(
+        item_id="item-1",
+        event_id="event-1",
+        started_playing_at_ms=1_250,
+    )
+    await recorder.stopped_playing_assistant_response(
+        item_id="item-1",
+        final_duration_ms=500,
+    )
+
+    await recorder.save_buffer()
+
+    ffmpeg = recorder.ffmpeg
+    assert ffmpeg is not None
+    written = array.array("h", b"".join(cast_fake_ffmpeg(ffmpeg).stdin.writes))
+    assert len(written) == 24 * 750
+    assert set(written[: 24 * 250]) == {10}
+    assert set(written[24 * 250 :]) == {1_010}
+    assert recorder.audio_duration == 750
+
+
+@pytest.mark.asyncio
+async def test_save_buffer_mixes_off_the_event_loop_thread(monkeypatch):
+    recorder = make_recorder()
+    mixing_threads: list[threading.Thread] = []
+    original_mix_pcm16 = realtime_recorder.mix_pcm16
+
+    def recording_mix_pcm16(duration_ms, placements):
+        mixing_threads.append(threading.current_thread())
+        return original_mix_pcm16(duration_ms, placements)
+
+    monkeypatch.setattr(realtime_recorder, "mix_pcm16", recording_mix_pcm16)
+
+    await recorder.add_user_audio(ONE_SECOND_PCM16, timestamp=2_000)
+    await recorder.add_assistant_response_delta(
+        audio_chunk_bytes=ONE_SECOND_PCM16,
+        event_id="event-1",
+        item_id="item-1",
+    )
+    await recorder.started_playing_assistant_response_delta(
+        item_id="item-1",
+        event_id="event-1",
+        started_playing_at_ms=1_000,
+    )
+    await recorder.ended_playing_assistant_response_delta(
+        item_id="item-1", event_id="event-1"
+    )
+    await recorder.finalize()
+
+    await recorder.save_buffer()
+
+    assert len(mixing_threads) == 1
+    assert mixing_threads[0] is not threading.current_thread()
+    assert get_write_count(recorder) > 0
+    assert recorder.audio_duration == 1_000
+
+
 def get_write_count(recorder: RealtimeRecorder) -> int:
     ffmpeg = recorder.ffmpeg
     assert ffmpeg is not None
@@ -0,0 +1,163 @@
+import base64
+import json
+
+import pytest
+
+from pingpong.realtime_telemetry import VoiceSessionTelemetry, replay_voice_trace
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_telemetry_measures_response_and_playback_latency():
+    clock = FakeClock()
+    telemetry = VoiceSessionTelemetry(clock=clock)
+
+    clock.now = 10.0
+    telemetry.speech_stopped()
+    clock.now = 10.8
+    telemetry.assistant_audio_delta_sent("item-1", "event-1")
+    clock.now = 10.9
+    telemetry.assistant_audio_delta_sent("item-1", "event-2")
+    clock.now = 11.0
+    telemetry.playback_started("item-1", "event-1")
+    telemetry.playback_started("item-1", "event-2")
+    # A later response without new user speech has no response latency.
+    telemetry.assistant_audio_delta_sent("item-2", "event-3")
+    telemetry.finish()
+
+    assert telemetry.samples["response_latency"] == [pytest.approx(0.8)]
+    assert telemetry.samples["playback_start_latency"] == [pytest.approx(0.2)]
+    assert telemetry.delta_issues == {"dropped": 1}
+
+
+def test_telemetry_counts_truncated_response_and_unplayed_deltas():
+    telemetry = VoiceSessionTelemetry(clock=FakeClock())
+
+    for event_id in ("event-1", "event-2", "event-3"):
+        telemetry.assistant_audio_delta_sent("item-1", event_id)
+    telemetry.playback_started("item-1", "event-1")
+    telemetry.response_truncated("item-1")
+    telemetry.assistant_audio_delta_invalid()
+    telemetry.finish()
+
+    assert telemetry.delta_issues == {"truncated": 1, "dropped": 2, "invalid": 1}
+
+
+def test_telemetry_measures_ordering_wait():
+    clock = FakeClock()
+    telemetry = VoiceSessionTelemetry(clock=clock)
+
+    clock.now = 1.0
+    telemetry.transcript_completed("item-1")
+    clock.now = 1.5
+    telemetry.transcript_completed("item-1")
+    clock.now = 3.0
+    telemetry.message_dispatched("item-1")
+    telemetry.message_dispatched("item-unknown")
+
+    assert telemetry.samples["ordering_wait"] == [pytest.approx(2.0)]
+
+
+def _trace_line(t: float, source: str, payload: dict) -> str:
+    key = "event" if source == "openai" else "message"
+    return json.dumps({"t": t, "source": source, key: payload})
+
+
+async def test_replay_voice_trace_runs_events_through_handlers():
+    audio = base64.b64encode(b"\0\0" * 2_400).decode("utf-8")
+    lines = [
+        _trace_line(
+            0.0,
+            "openai",
+            {
+                "type": "conversation.item.added",
+                "previous_item_id": None,
+                "item": {"id": "user-1", "type": "message", "role": "user"},
+            },
+        ),
+        _trace_line(1.0, "openai", {"type": "input_audio_buffer.speech_stopped"}),
+        _trace_line(
+            1.1,
+            "openai",
+            {
+                "type": "conversation.item.added",
+                "previous_item_id": "user-1",
+                "item": {"id": "assistant-1", "type": "message", "role": "assistant"},
+            },
+        ),
+        _trace_line(
+            1.6,
+            "openai",
+            {
+                "type": "response.output_audio.delta",
+                "delta": audio,
+                "item_id": "assistant-1",
+                "event_id": "event-1",
+            },
+        ),
+        _trace_line(
+            1.7,
+            "openai",
+            {
+                "type": "response.output_audio.delta",
+                "delta": audio,
+                "item_id": "assistant-1",
+                "event_id": "event-2",
+            },
+        ),
+        _trace_line(
+            1.7,
+            "openai",
+            {
+                "type": "response.output_audio_transcript.done",
+                "item_id": "assistant-1",
+                "transcript": "Hello!",
+            },
+        ),
+        _trace_line(
+            1.9,
+            "browser",
+            {
+                "type": "response.audio.delta.started",
+                "item_id": "assistant-1",
+                "event_id": "event-1",
+                "started_playing_at": 1_900,
+            },
+        ),
+        _trace_line(
+            2.5,
+            "openai",
+            {
+                "type": "conversation.item.input_audio_transcription.completed",
+                "item_id": "user-1",
+                "transcript": "Hi there",
+            },
+        ),
+        _trace_line(
+            3.0,
+            "browser",
+            {
+                "type": "conversation.item.truncate",
+                "item_id": "assistant-1",
+                "event_id": "event-1",
+                "audio_end_ms": 50,
+            },
+        ),
+    ]
+
+    telemetry = await replay_voice_trace(lines)
+
+    assert telemetry.samples["response_latency"] == [pytest.approx(0.6)]
+    assert telemetry.samples["playback_start_latency"] == [pytest.approx(0.3)]
+    # The assistant transcript waits for the user transcript before it.
+    assert telemetry.samples["ordering_wait"] == [
+        pytest.approx(0.0),
+        pytest.approx(0.8),
+    ]
+    assert telemetry.delta_issues == {"truncated": 1, "dropped": 1}
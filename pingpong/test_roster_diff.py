@@ -0,0 +1,243 @@
+from datetime import datetime, timedelta, timezone
+
+import pingpong.models as models
+import pingpong.schemas as schemas
+from pingpong.roster_diff import (
+    diff_roster,
+    roster_fingerprints,
+    roster_source,
+    sync_roster_diff,
+)
+
+
+def _ucr(email, student=True, teacher=False, **kwargs):
+    return schemas.CreateUserClassRole(
+        email=email,
+        roles=schemas.ClassUserRoles(admin=False, teacher=teacher, student=student),
+        **kwargs,
+    )
+
+
+def _roster(*roles):
+    return schemas.CreateUserClassRoles(
+        roles=list(roles),
+        silent=True,
+        lms_tenant="harvard",
+        lms_type=schemas.LMSType.CANVAS,
+        sso_tenant="harvard-sso",
+    )
+
+
+class FakeAdder:
+    """Stands in for AddNewUsers, resolving each email to a stable user id."""
+
+    user_ids = {
+        "a@example.com": 1,
+        "b@example.com": 2,
+        "c@example.com": 3,
+        "d@example.com": 4,
+    }
+
+    def __init__(self, calls, failing=()):
+        self.calls = calls
+        self.failing = set(failing)
+
+    def __call__(self, new_ucr, removed_user_ids):
+        self.calls.append(
+            ([ucr.email for ucr in new_ucr.roles], removed_user_ids),
+        )
+        self.synced_user_ids = {
+            ucr.email.lower(): self.user_ids[ucr.email.lower()]
+            for ucr in new_ucr.roles
+            if ucr.email not in self.failing
+        }
+        return self
+
+    async def add_new_users(self):
+        return schemas.CreateUserResults(results=[])
+
+
+def test_roster_fingerprints_ignore_last_active_and_login_order():
+    logins = [
+        schemas.ExternalLoginLookupItem(provider="issuer", identifier="sub-1"),
+        schemas.ExternalLoginLookupItem(provider="email", identifier="a@example.com"),
+    ]
+    first = _roster(
+        _ucr("A@example.com", external_logins=logins, last_active=datetime.now())
+    )
+    second = _roster(_ucr("A@example.com", external_logins=logins[::-1]))
+
+    assert roster_fingerprints(first, 1) == roster_fingerprints(second, 1)
+    assert list(roster_fingerprints(first, 1)) == ["a@example.com"]
+    # The user running the sync is skipped by it, so it is part of the fingerprint.
+    assert roster_fingerprints(first, 1) != roster_fingerprints(first, 2)
+
+
+def test_diff_roster():
+    old = roster_fingerprints(
+        _roster(_ucr("a@example.com"), _ucr("b@example.com"), _ucr("c@example.com")),
+        1,
+    )
+    new = roster_fingerprints(
+        _roster(
+            _ucr("a@example.com"),
+            _ucr("b@example.com", student=False, teacher=True),
+            _ucr("d@example.com"),
+        ),
+        1,
+    )
+    entries = {
+        key: {"fingerprint": fingerprint, "user_id": index}
+        for index, (key, fingerprint) in enumerate(old.items(), start=1)
+    }
+
+    diff = diff_roster(new, entries)
+
+    assert diff.added == ["d@example.com"]
+    assert diff.changed == ["b@example.com"]
+    assert diff.removed == {"c@example.com": 3}
+    assert diff.unchanged == ["a@example.com"]
+    assert not diff.is_empty
+    assert diff_roster(old, entries).is_empty
+
+
+def test_roster_source():
+    assert roster_source(_roster(), 1234) == "canvas:harvard:1234"
+    lti_roster = schemas.CreateUserClassRoles(
+        roles=[], lms_type=schemas.LMSType.CANVAS, lti_class_id=7
+    )
+    assert roster_source(lti_roster) == "lti:7"
+
+
+async def test_sync_roster_diff_applies_only_changes(db):
+    async with db.async_session() as session:
+        class_ = models.Class(name="Roster Class", api_key="test-key")
+        session.add(class_)
+        await session.flush()
+        class_id = class_.id
+        await session.commit()
+
+    now = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    calls = []
+
+    async def _sync(roster, at, adder=None, **kwargs):
+        async with db.async_session() as session:
+            _, stats = await sync_roster_diff(
+                session,
+                class_id,
+                99,
+                roster,
+                "canvas:harvard:1234",
+                adder or FakeAdder(calls),
+                now=at,
+                **kwargs,
+            )
+            await session.commit()
+        return stats
+
+    roster = _roster(
+        _ucr("a@example.com"), _ucr("b@example.com"), _ucr("c@example.com")
+    )
+    stats = await _sync(roster, now)
+    assert stats.full_reconcile
+    assert calls == [(["a@example.com", "b@example.com", "c@example.com"], None)]
+
+    # Nothing changed: no writes at all.
+    stats = await _sync(roster, now + timedelta(days=1))
+    assert not stats.full_reconcile
+    assert stats.unchanged == 3
+    assert len(calls) == 1
+
+    # Only the deltas are applied, and only the member who left is removed.
+    roster = _roster(
+        _ucr("a@example.com"),
+        _ucr("b@example.com", student=False, teacher=True),
+        _ucr("d@example.com"),
+    )
+    stats = await _sync(roster, now + timedelta(days=2))
+    assert (stats.added, stats.changed, stats.removed, stats.unchanged) == (1, 1, 1, 1)
+    assert calls[-1] == (["b@example.com", "d@example.com"], [3])
+
+    async with db.async_session() as session:
+        snapshot = await models.RosterSnapshot.get(
+            session, class_id, "canvas:harvard:1234"
+        )
+        assert {key: entry["user_id"] for key, entry in snapshot.entries.items()} == {
+            "a@example.com": 1,
+            "b@example.com": 2,
+            "d@example.com": 4,
+        }
+
+    # The periodic full reconcile pushes the whole roster again.
+    stats = await _sync(roster, now + timedelta(days=7))
+    assert stats.full_reconcile
+    assert calls[-1] == (["a@example.com", "b@example.com", "d@example.com"], None)
+
+    # So does a manual sync.
+    stats = await _sync(roster, now + timedelta(days=8), full_reconcile=True)
+    assert stats.full_reconcile
+    assert len(calls) == 4
+
+
+async def test_sync_roster_diff_retries_failed_rows(db):
+    async with db.async_session() as session:
+        class_ = models.Class(name="Roster Class", api_key="test-key")
+        session.add(class_)
+        await session.flush()
+        class_id = class_.id
+        await session.commit()
+
+    now = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    calls = []
+    roster = _roster(_ucr("a@example.com"), _ucr("b@example.com"))
+
+    for adder in (FakeAdder(calls, failing={"b@example.com"}), FakeAdder(calls)):
+        async with db.async_session() as session:
+            await sync_roster_diff(
+                session,
+                class_id,
+                99,
+                roster,
+                "lti:7",
+                adder,
+                now=now,
+            )
+            await session.commit()
+
+    # The row that failed the first time is not in the snapshot, so the next
+    # sync applies it again even though the roster did not change.
+    assert calls == [
+        (["a@example.com", "b@example.com"], None),
+        (["b@example.com"], []),
+    ]
+
+
+async def test_delete_synced_users_only_removes_enrollments_from_source(db):
+    async with db.async_session() as session:
+        class_ = models.Class(name="Roster Class", api_key="test-key")
+        session.add(class_)
+        await session.flush()
+        for user_id, lms_tenant in [(1, "harvard"), (2, "harvard"), (3, None)]:
+            session.add(models.User(id=user_id, email=f"{user_id}@example.com"))
+            session.add(
+                models.UserClassRole(
+                    user_id=user_id,
+                    class_id=class_.id,
+                    lms_tenant=lms_tenant,
+                    lms_type=schemas.LMSType.CANVAS if lms_tenant else None,
+                )
+            )
+        await session.flush()
+
+        deleted = await models.UserClassRole.delete_synced_users(
+            session,
+            class_.id,
+            [1, 3],
+            schemas.LMSType.CANVAS,
+            lms_tenant="harvard",
+        )
+
+        assert deleted == [1]
+        assert await models.UserClassRole.get(session, 1, class_.id) is None
+        assert await models.UserClassRole.get(session, 2, class_.id) is not None
+        assert await models.UserClassRole.get(session, 3, class_.id) is not None
@@ -0,0 +1,186 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from pingpong.roster_sync import HostRateLimiter, run_roster_syncs
+
+
+class FakeLMS:
+    """A local LMS that serves paged rosters and records request arrivals."""
+
+    def __init__(self):
+        self.arrivals: dict[str, list[float]] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.slow_courses: set[int] = set()
+        self.broken_courses: set[int] = set()
+        self.pages = 3
+
+    async def roster(self, request: web.Request) -> web.Response:
+        host = request.headers["X-Test-Host"]
+        self.arrivals.setdefault(host, []).append(time.monotonic())
+        course_id = int(request.match_info["course_id"])
+        page = int(request.query.get("page", "1"))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(1.5 if course_id in self.slow_courses else 0.01)
+            if course_id in self.broken_courses:
+                return web.json_response({"error": "unavailable"}, status=503)
+            headers = {}
+            if page < self.pages:
+                headers["Link"] = f'<?page={page + 1}>; rel="next"'
+            members = [{"user_id": f"{course_id}-{page}-{n}"} for n in range(10)]
+            return web.json_response({"members": members}, headers=headers)
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+async def fake_lms():
+    lms = FakeLMS()
+    app = web.Application()
+    app.router.add_get("/courses/{course_id}/members", lms.roster)
+    server = TestServer(app)
+    await server.start_server()
+    lms.base_urls = {
+        "127.0.0.1": f"http://127.0.0.1:{server.port}",
+        "localhost": f"http://localhost:{server.port}",
+    }
+    try:
+        yield lms
+    finally:
+        await server.close()
+
+
+async def _fetch_roster(
+    lms: FakeLMS, rate_limiter: HostRateLimiter, host: str, course_id: int
+) -> list[dict]:
+    members: list[dict] = []
+    async with aiohttp.ClientSession(
+        trace_configs=[rate_limiter.trace_config()]
+    ) as session:
+        url = f"{lms.base_urls[host]}/courses/{course_id}/members"
+        while url:
+            async with session.get(
+                url, headers={"X-Test-Host": host}, raise_for_status=True
+            ) as response:
+                members.extend((await response.json())["members"])
+                link = response.headers.get("Link")
+                url = (
+                    f"{lms.base_urls[host]}/courses/{course_id}/members"
+                    + link[1 : link.index(">")]
+                    if link
+                    else ""
+                )
+    return members
+
+
+@pytest.mark.asyncio
+async def test_host_rate_limiter_spaces_requests_after_burst():
+    now = 0.0
+    sleeps: list[float] = []
+
+    async def _sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+
+    limiter = HostRateLimiter(
+        requests_per_second=10, burst=2, clock=lambda: now, sleep=_sleep
+    )
+
+    for _ in range(4):
+        await limiter.acquire("canvas.example.edu")
+    await limiter.acquire("lms.example.com")
+
+    assert sleeps == pytest.approx([0.1, 0.2])
+
+    now = 1.0
+    await limiter.acquire("canvas.example.edu")
+    assert len(sleeps) == 2
+
+
+@pytest.mark.asyncio
+async def test_host_rate_limiter_limits_real_requests_per_host(fake_lms):
+    rate_limiter = HostRateLimiter(requests_per_second=20, burst=1)
+    fake_lms.pages = 4
+
+    await asyncio.gather(
+        _fetch_roster(fake_lms, rate_limiter, "127.0.0.1", 1),
+        _fetch_roster(fake_lms, rate_limiter, "127.0.0.1", 2),
+        _fetch_roster(fake_lms, rate_limiter, "localhost", 3),
+    )
+
+    limited = sorted(fake_lms.arrivals["127.0.0.1"])
+    assert len(limited) == 8
+    # 8 requests at 20/s with no burst take at least 7 intervals.
+    assert limited[-1] - limited[0] >= 7 / 20 * 0.9
+    # The other host has its own budget.
+    other = sorted(fake_lms.arrivals["localhost"])
+    assert other[0] - limited[0] < 0.1
+
+
+@pytest.mark.asyncio
+async def test_run_roster_syncs_against_fake_lms(fake_lms):
+    rate_limiter = HostRateLimiter(requests_per_second=1000, burst=1000)
+    fake_lms.slow_courses = {3}
+    fake_lms.broken_courses = {4}
+    failures: list[tuple[int, BaseException]] = []
+    rosters: dict[int, int] = {}
+
+    async def _sync_class(course_id: int) -> str | None:
+        host = "localhost" if course_id % 2 else "127.0.0.1"
+        members = await _fetch_roster(fake_lms, rate_limiter, host, course_id)
+        rosters[course_id] = len(members)
+        if course_id == 5:
+            return "2 members are missing an email address"
+        return None
+
+    async def _on_failure(course_id: int, e: BaseException) -> None:
+        failures.append((course_id, e))
+
+    summary = await run_roster_syncs(
+        list(range(1, 9)),
+        _sync_class,
+        concurrency=4,
+        class_timeout=0.5,
+        on_failure=_on_failure,
+    )
+
+    assert fake_lms.max_in_flight == 4
+    assert sorted(result.class_id for result in summary.succeeded) == [1, 2, 6, 7, 8]
+    assert [result.class_id for result in summary.warnings] == [5]
+    assert summary.warnings[0].detail == "2 members are missing an email address"
+    failed = {result.class_id: result.detail for result in summary.failed}
+    assert failed[3] == "Timed out after 0.5s"
+    assert "503" in failed[4]
+    assert sorted(course_id for course_id, _ in failures) == [3, 4]
+    assert rosters[1] == 30
+    # The slow class did not hold up the rest.
+    assert summary.elapsed < 2
+
+
+@pytest.mark.asyncio
+async def test_run_roster_syncs_retries_conflicts_once():
+    class ConflictError(Exception):
+        pass
+
+    attempts: dict[int, int] = {}
+
+    async def _sync_class(class_id: int) -> None:
+        attempts[class_id] = attempts.get(class_id, 0) + 1
+        if class_id == 1 and attempts[class_id] == 1:
+            raise ConflictError("duplicate key value")
+        if class_id == 2:
+            raise ConflictError("duplicate key value")
+
+    summary = await run_roster_syncs(
+        [1, 2], _sync_class, retry_exceptions=(ConflictError,), max_attempts=2
+    )
+
+    assert attempts == {1: 2, 2: 2}
+    assert [result.class_id for result in summary.succeeded] == [1]
+    assert [(result.class_id, result.attempts) for result in summary.failed] == [(2, 2)]
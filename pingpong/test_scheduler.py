@@ -0,0 +1,173 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from pingpong import models
+from pingpong.scheduler import TaskScheduler
+from pingpong.schemas import MisfirePolicy, PeriodicTaskRunStatus
+
+pytestmark = pytest.mark.asyncio
+
+START = datetime(2024, 1, 1, 0, 0, 30, tzinfo=timezone.utc)
+
+
+class Clock:
+    def __init__(self, now: datetime = START):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def advance(self, **kwargs) -> None:
+        self.now += timedelta(**kwargs)
+
+
+def _schedulers(clock: Clock, count: int, policy=MisfirePolicy.SKIP):
+    executions = Counter[datetime]()
+
+    def _scheduler(i: int) -> TaskScheduler:
+        async def _run() -> None:
+            # Yield so the other schedulers tick while this one runs.
+            await asyncio.sleep(0)
+            executions[clock.now.replace(second=0)] += 1
+
+        return TaskScheduler(
+            "every_minute",
+            "* * * * *",
+            _run,
+            policy,
+            scheduler_id=f"scheduler-{i}",
+            nowfn=clock,
+            lease_seconds=90,
+            misfire_grace_seconds=30,
+        )
+
+    return [_scheduler(i) for i in range(count)], executions
+
+
+async def _runs(db) -> list[models.PeriodicTaskRun]:
+    async with db.async_session() as session:
+        task = await models.PeriodicTask.get_by_task_name(session, "every_minute")
+        return await models.PeriodicTaskRun.list_by_task_id(session, task.id)
+
+
+async def test_one_scheduler_runs_each_occurrence(db):
+    clock = Clock()
+    schedulers, executions = _schedulers(clock, 3)
+
+    for _ in range(5):
+        await asyncio.gather(*(s.tick() for s in schedulers))
+        clock.advance(minutes=1)
+    await asyncio.gather(*(s.tick() for s in schedulers))
+
+    assert [s.is_leader for s in schedulers].count(True) == 1
+    assert set(executions.values()) == {1}
+    assert len(executions) == 5
+    runs = await _runs(db)
+    assert [r.status for r in runs] == [PeriodicTaskRunStatus.COMPLETED] * 5
+    assert len({r.executor for r in runs}) == 1
+
+
+async def test_standby_takes_over_with_a_new_fencing_token(db):
+    clock = Clock()
+    schedulers, executions = _schedulers(clock, 2)
+    leader_a, standby = schedulers
+
+    await leader_a.tick()
+    await standby.tick()
+    assert leader_a.is_leader and not standby.is_leader
+    old_token = leader_a.fencing_token
+
+    # The leader stalls past its lease; the standby takes over.
+    clock.advance(minutes=2)
+    await standby.tick()
+    assert standby.is_leader
+    assert standby.fencing_token > old_token
+
+    # The stale leader can't renew or claim once it wakes up.
+    await leader_a.tick()
+    assert not leader_a.is_leader
+    await standby.tick()
+
+    assert set(executions.values()) == {1}
+    assert {r.executor for r in await _runs(db)} == {"scheduler-1"}
+
+
+async def test_released_lease_is_taken_without_waiting(db):
+    clock = Clock()
+    (first, second), _ = _schedulers(clock, 2)
+
+    await first.tick()
+    await first.release()
+    await second.tick()
+
+    assert second.is_leader
+
+
+@pytest.mark.parametrize(
+    "policy,run_minutes,skipped",
+    [
+        (MisfirePolicy.SKIP, [], 3),
+        (MisfirePolicy.RUN_ONCE, [3], 2),
+        (MisfirePolicy.CATCH_UP, [1, 2, 3], 0),
+    ],
+)
+async def test_missed_runs_follow_misfire_policy(db, policy, run_minutes, skipped):
+    clock = Clock()
+    (first, second), _ = _schedulers(clock, 2, policy)
+    await first.tick()
+
+    # Nobody ticks for three occurrences, then a new scheduler comes up.
+    clock.advance(minutes=3, seconds=15)
+    while True:
+        wake_at = await second.tick()
+        if wake_at > clock.now:
+            break
+
+    runs = await _runs(db)
+    ran = [
+        r.scheduled_for.minute
+        for r in runs
+        if r.status == PeriodicTaskRunStatus.COMPLETED
+    ]
+    assert ran == run_minutes
+    assert [r.status for r in runs].count(PeriodicTaskRunStatus.SKIPPED) == skipped
+    assert len(runs) == 3
+
+
+async def test_failed_run_is_recorded(db):
+    clock = Clock()
+
+    async def _fail() -> None:
+        raise RuntimeError("boom")
+
+    scheduler = TaskScheduler(
+        "every_minute", "* * * * *", _fail, scheduler_id="scheduler-0", nowfn=clock
+    )
+    await scheduler.tick()
+    clock.advance(minutes=1)
+    await scheduler.tick()
+
+    [run] = await _runs(db)
+    assert run.status == PeriodicTaskRunStatus.FAILED
+    assert run.error == "boom"
+
+
+async def test_run_is_recorded_when_heartbeat_fails(db):
+    clock = Clock()
+    [scheduler], executions = _schedulers(clock, 1)
+
+    async def _broken_heartbeat(task_id: int) -> None:
+        raise RuntimeError("database went away")
+
+    scheduler._heartbeat = _broken_heartbeat
+    await scheduler.tick()
+    clock.advance(minutes=1)
+    await scheduler.tick()
+
+    assert len(executions) == 1
+    [run] = await _runs(db)
+    assert run.status == PeriodicTaskRunStatus.COMPLETED
+    assert run.completed_at is not None
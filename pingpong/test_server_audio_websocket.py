@@ -1,16 +1,26 @@
 import asyncio
+import base64
 import importlib
+import json
 import logging
+import struct
 from types import SimpleNamespace
 from unittest.mock import AsyncMock
 
 import pytest
+from fastapi import WebSocketDisconnect
 from pydantic import ValidationError
 from starlette.datastructures import State
 
 from pingpong import ai_models
 from pingpong import models
 from pingpong import realtime as realtime_module
+from pingpong.realtime_audio_frames import (
+    AudioFrameType,
+    RealtimeAudioTransport,
+    decode_audio_frame,
+    encode_audio_frame,
+)
 from pingpong import schemas
 from pingpong import websocket as websocket_module
 
@@ -22,11 +32,19 @@ class DummyWebSocket:
         self.state = State()
         self.cookies: dict[str, str] = cookies or {}
         self.sent_json: list[dict] = []
+        self.sent_text: list[str] = []
+        self.sent_bytes: list[bytes] = []
         self.closed = False
 
     async def send_json(self, data: dict) -> None:
         self.sent_json.append(data)
 
+    async def send_text(self, data: str) -> None:
+        self.sent_text.append(data)
+
+    async def send_bytes(self, data: bytes) -> None:
+        self.sent_bytes.append(data)
+
     async def close(self) -> None:
         self.closed = True
 
@@ -124,6 +142,37 @@ class FakeRealtimeEventStream:
             yield event
 
 
+class FakeBrowserMessages(DummyWebSocket):
+    def __init__(self, messages: list[dict]):
+        super().__init__()
+        self.messages = messages
+
+    async def receive(self) -> dict:
+        if not self.messages:
+            raise WebSocketDisconnect()
+        return self.messages.pop(0)
+
+    def _raise_on_disconnect(self, message: dict) -> None:
+        pass
+
+
+class FakeInputAudioBuffer:
+    def __init__(self):
+        self.appended: list[str] = []
+
+    async def append(self, *, audio: str) -> None:
+        self.appended.append(audio)
+
+
+def assistant_audio_delta_event(audio: bytes) -> SimpleNamespace:
+    return SimpleNamespace(
+        type="response.output_audio.delta",
+        delta=base64.b64encode(audio).decode("utf-8"),
+        item_id="item_1",
+        event_id="event_1",
+    )
+
+
 def test_realtime_session_uses_create_defaults_for_null_fields():
     session = websocket_module.build_realtime_session(
         realtime_assistant(),
@@ -498,6 +547,126 @@ async def test_openai_recoverable_error_is_logged_without_closing_websocket():
     ]
 
 
+async def test_openai_audio_delta_uses_legacy_json_without_negotiation():
+    websocket = DummyWebSocket()
+    audio = b"\x01\x02" * 480
+
+    await realtime_module.handle_openai_events(
+        websocket,
+        FakeRealtimeEventStream([assistant_audio_delta_event(audio)]),
+        openai_client=object(),
+        thread=SimpleNamespace(id=20, version=1),
+        openai_task_queue=asyncio.Queue(),
+        assistant_audio_tracker=realtime_module.RealtimeAssistantAudioTracker(),
+    )
+
+    assert websocket.sent_bytes == []
+    assert [json.loads(text) for text in websocket.sent_text] == [
+        {
+            "type": "response.audio.delta",
+            "audio": base64.b64encode(audio).decode("utf-8"),
+            "item_id": "item_1",
+            "event_id": "event_1",
+        }
+    ]
+
+
+async def test_openai_audio_delta_uses_binary_frame_when_negotiated():
+    websocket = DummyWebSocket()
+    audio_transport = RealtimeAudioTransport()
+    audio_transport.negotiate(1)
+    audio = b"\x01\x02" * 480
+
+    await realtime_module.handle_openai_events(
+        websocket,
+        FakeRealtimeEventStream([assistant_audio_delta_event(audio)]),
+        openai_client=object(),
+        thread=SimpleNamespace(id=20, version=1),
+        openai_task_queue=asyncio.Queue(),
+        assistant_audio_tracker=realtime_module.RealtimeAssistantAudioTracker(),
+        audio_transport=audio_transport,
+    )
+
+    assert websocket.sent_text == []
+    assert len(websocket.sent_bytes) == 1
+    frame = decode_audio_frame(websocket.sent_bytes[0])
+    assert frame.type == AudioFrameType.ASSISTANT_AUDIO
+    assert (frame.item_id, frame.event_id, frame.audio) == ("item_1", "event_1", audio)
+    assert audio_transport.wire_bytes[("outbound", "binary")] < len(
+        base64.b64encode(audio)
+    )
+
+
+async def test_browser_user_audio_uses_legacy_timestamp_prefix_by_default():
+    audio = b"\x03\x04" * 240
+    websocket = FakeBrowserMessages([{"bytes": struct.pack(">d", 1_000.0) + audio}])
+    input_audio_buffer = FakeInputAudioBuffer()
+    audio_transport = RealtimeAudioTransport()
+
+    await realtime_module.handle_browser_messages(
+        websocket,
+        SimpleNamespace(input_audio_buffer=input_audio_buffer),
+        realtime_module.RealtimeAssistantAudioTracker(),
+        audio_transport=audio_transport,
+    )
+
+    assert input_audio_buffer.appended == [base64.b64encode(audio).decode("utf-8")]
+    assert audio_transport.frames == {("inbound", "legacy"): 1}
+
+
+async def test_browser_user_audio_uses_binary_frames_when_negotiated():
+    audio = b"\x05\x06" * 240
+    websocket = FakeBrowserMessages(
+        [
+            {
+                "bytes": encode_audio_frame(
+                    AudioFrameType.USER_AUDIO, timestamp_ms=2_000.0, audio=audio
+                )
+            },
+            # Malformed frames are logged and skipped.
+            {"bytes": b"\x01"},
+        ]
+    )
+    input_audio_buffer = FakeInputAudioBuffer()
+    audio_transport = RealtimeAudioTransport()
+    assert audio_transport.negotiate(1) is True
+
+    await realtime_module.handle_browser_messages(
+        websocket,
+        SimpleNamespace(input_audio_buffer=input_audio_buffer),
+        realtime_module.RealtimeAssistantAudioTracker(),
+        audio_transport=audio_transport,
+    )
+
+    assert input_audio_buffer.appended == [base64.b64encode(audio).decode("utf-8")]
+    assert audio_transport.frames == {("inbound", "binary"): 1}
+
+
+async def test_audio_stream_passes_audio_frames_version(monkeypatch):
+    browser_realtime_websocket = AsyncMock()
+    monkeypatch.setattr(
+        server, "browser_realtime_websocket", browser_realtime_websocket
+    )
+    websocket = DummyWebSocket()
+
+    await server.audio_stream(
+        websocket=websocket,
+        class_id="10",
+        thread_id="20",
+        audio_frames=1,
+    )
+
+    assert websocket.state["audio_frames_version"] == 1
+
+
+def test_audio_transport_rejects_unsupported_version():
+    audio_transport = RealtimeAudioTransport()
+
+    assert audio_transport.negotiate(None) is False
+    assert audio_transport.negotiate(99) is False
+    assert audio_transport.binary_frames is False
+
+
 @pytest.mark.parametrize("has_recording,has_messages", [(True, False), (False, True)])
 async def test_single_realtime_session_rejects_finished_thread(
     monkeypatch, has_recording, has_messages
@@ -0,0 +1,316 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import pingpong.summary as summary_module
+from pingpong import models, schemas
+from pingpong.email import EmailSendResult
+from pingpong.invite import SummaryEmailRenderer
+from pingpong.summary import (
+    SummaryUsage,
+    generate_assistant_summaries,
+    send_class_summary_to_class_users,
+)
+from pingpong.template import summary_template
+
+pytestmark = pytest.mark.asyncio
+
+LAST_ACTIVITY = datetime(2024, 1, 10, tzinfo=timezone.utc)
+AFTER = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _message(thread_id: int, run_id: int, index: int, role, text: str):
+    part_type = (
+        schemas.MessagePartType.INPUT_TEXT
+        if role == schemas.MessageRole.USER
+        else schemas.MessagePartType.OUTPUT_TEXT
+    )
+    return models.Message(
+        message_status=schemas.MessageStatus.COMPLETED,
+        run_id=run_id,
+        thread_id=thread_id,
+        output_index=index,
+        role=role,
+        content=[models.MessagePart(part_index=0, type=part_type, text=text)],
+    )
+
+
+class FakeOpenAI:
+    """Serves v2 thread messages and records summarization requests."""
+
+    def __init__(self, v2_messages: dict[str, list[str]]):
+        self.v2_messages = v2_messages
+        self.summarized: list[list[int]] = []
+        self.fetching = 0
+        self.max_fetching = 0
+        self.beta = SimpleNamespace(
+            threads=SimpleNamespace(messages=SimpleNamespace(list=self._list))
+        )
+        self.responses = SimpleNamespace(parse=self._parse)
+
+    async def _list(self, thread_id, limit, order):
+        self.fetching += 1
+        self.max_fetching = max(self.max_fetching, self.fetching)
+        await asyncio.sleep(0.01)
+        self.fetching -= 1
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(
+                    role="user",
+                    content=[
+                        SimpleNamespace(
+                            type="text", text=SimpleNamespace(value=message)
+                        )
+                    ],
+                )
+                for message in self.v2_messages[thread_id][:limit]
+            ]
+        )
+
+    async def _parse(self, input, **kwargs):
+        threads = json.loads(input)["threads"]
+        self.summarized.append(sorted(t["id"] for t in threads))
+        return SimpleNamespace(
+            output_parsed=schemas.AIAssistantSummaryOutput(topics=[]),
+            usage=SimpleNamespace(input_tokens=100, output_tokens=10),
+        )
+
+
+async def _seed(db) -> None:
+    async with db.async_session() as session:
+        class_ = models.Class(id=1, name="Summary Class", api_key="sk-test")
+        session.add(class_)
+        session.add_all(
+            models.Assistant(
+                id=id_,
+                name=name,
+                class_id=1,
+                model="gpt-4o-mini",
+                instructions="",
+            )
+            for id_, name in [(10, "Tutor"), (20, "Grader"), (30, "Idle")]
+        )
+        threads = [
+            # (id, assistant, version, thread_id)
+            (100, 10, 3, "v3-a"),
+            (101, 10, 3, "v3-b"),
+            (102, 10, 2, "thread_v2_a"),
+            (200, 20, 2, "thread_v2_b"),
+            (201, 20, 2, "thread_v2_c"),
+        ]
+        for id_, assistant_id, version, thread_id in threads:
+            session.add(
+                models.Thread(
+                    id=id_,
+                    thread_id=thread_id,
+                    class_id=1,
+                    assistant_id=assistant_id,
+                    version=version,
+                    tools_available="",
+                    private=False,
+                    last_activity=LAST_ACTIVITY,
+                )
+            )
+        await session.flush()
+        session.add_all(
+            models.Run(id=id_, status=schemas.RunStatus.COMPLETED, thread_id=id_)
+            for id_ in (100, 101)
+        )
+        await session.flush()
+        session.add_all(
+            [
+                _message(100, 100, 1, schemas.MessageRole.USER, "What is a matrix?"),
+                _message(100, 100, 2, schemas.MessageRole.ASSISTANT, "A grid."),
+                _message(100, 100, 3, schemas.MessageRole.USER, "And a vector?"),
+                _message(101, 101, 1, schemas.MessageRole.USER, "Define rank."),
+            ]
+        )
+        await session.commit()
+
+
+async def test_list_first_messages_by_thread_ids_matches_list_messages(db):
+    await _seed(db)
+    async with db.async_session() as session:
+        bulk = await models.Thread.list_first_messages_by_thread_ids(
+            session, [100, 101, 102], limit=2
+        )
+        for thread_id in (100, 101):
+            single = await models.Thread.list_messages(
+                session, thread_id, limit=2, order="asc"
+            )
+            assert [m.id for m in bulk[thread_id]] == [m.id for m in single]
+            assert [part.text for m in bulk[thread_id] for part in m.content] == [
+                part.text for m in single for part in m.content
+            ]
+    assert 102 not in bulk
+
+
+async def test_generate_assistant_summaries_loads_threads_in_bulk(db):
+    await _seed(db)
+    cli = FakeOpenAI(
+        {
+            "thread_v2_a": ["Eigenvalues?"],
+            "thread_v2_b": ["Late policy?"],
+            "thread_v2_c": ["Rubric?"],
+        }
+    )
+    usage = SummaryUsage()
+
+    async with db.async_session() as session:
+        summaries = await generate_assistant_summaries(
+            cli, session, 1, AFTER, usage=usage
+        )
+
+    assert [(s.assistant_name, s.has_threads) for s in summaries] == [
+        ("Tutor", True),
+        ("Grader", True),
+        ("Idle", False),
+    ]
+    assert sorted(cli.summarized) == [[100, 101, 102], [200, 201]]
+    assert cli.max_fetching > 1
+    assert usage == SummaryUsage(requests=2, input_tokens=200, output_tokens=20)
+
+
+async def test_generate_assistant_summaries_without_threads(db):
+    await _seed(db)
+    cli = FakeOpenAI({})
+    later = datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+    async with db.async_session() as session:
+        assert await generate_assistant_summaries(cli, session, 1, later) is None
+        summaries = await generate_assistant_summaries(
+            cli, session, 1, later, summarize_even_if_no_threads=True
+        )
+
+    assert [s.has_threads for s in summaries] == [False, False, False]
+    assert cli.summarized == []
+
+
+def test_summary_renderer_matches_template():
+    summary_html = "<p>Costs $5 or ${price}, see $link</p>"
+    renderer = SummaryEmailRenderer(
+        "Linear Algebra", summary_html, "the last 7 days", "weekly summary"
+    )
+
+    for name, link in [("Ada", "https://x/1"), ("$name", "https://x/$link")]:
+        assert renderer.render(name, link) == summary_template.substitute(
+            {
+                "name": name,
+                "courseName": "Linear Algebra",
+                "summary": summary_html,
+                "link": link,
+                "title": "Your group's activity summary is here.",
+                "time": "the last 7 days",
+                "legal_text": "you are a Moderator in Linear Algebra. You can change your notification settings on the Manage Group page on PingPong",
+            }
+        )
+    assert renderer.subject == "Your weekly summary for Linear Algebra"
+
+
+class BatchSender:
+    """Records send_many batches and fails addresses in `failing`."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.batches: list[list[tuple[str, str, str]]] = []
+
+    async def send_many(self, messages, concurrency=1):
+        batch = list(messages)
+        self.batches.append(batch)
+        return [
+            EmailSendResult(to, RuntimeError("bounced") if to in self.failing else None)
+            for to, _, _ in batch
+        ]
+
+
+class CrashingSender(BatchSender):
+    """Sends the first batch, then raises for every later one."""
+
+    async def send_many(self, messages, concurrency=1):
+        if self.batches:
+            raise RuntimeError("worker killed")
+        return await super().send_many(messages, concurrency)
+
+
+async def _seed_summary_class(db) -> None:
+    async with db.async_session() as session:
+        session.add(models.Class(id=1, name="Summary Class", api_key="sk-test"))
+        for i in range(1, 6):
+            session.add(
+                models.User(
+                    id=i,
+                    email=f"user{i}@example.com",
+                    first_name=f"User{i}",
+                    state=schemas.UserState.VERIFIED,
+                )
+            )
+        await session.flush()
+        session.add_all(
+            models.UserClassRole(user_id=i, class_id=1, role=schemas.Role.ADMIN)
+            for i in range(1, 6)
+        )
+        await session.commit()
+
+
+async def _summary_sent_user_ids(db) -> list[int]:
+    async with db.async_session() as session:
+        roles = await models.UserClassRole.get_by_user_ids(session, [1, 2, 3, 4, 5], 1)
+        return sorted(ucr.user_id for ucr in roles if ucr.last_summary_sent_at)
+
+
+async def test_send_class_summary_to_class_users_in_batches(db, now, monkeypatch):
+    sender = BatchSender(failing={"user3@example.com"})
+    monkeypatch.setattr(summary_module, "SUMMARY_DIRECT_EMAIL_BATCH_SIZE", 2)
+    monkeypatch.setattr(
+        summary_module, "outbound_email_sender", lambda *args, **kwargs: sender
+    )
+
+    async def _summary(*args, **kwargs):
+        return "<p>Summary</p>"
+
+    monkeypatch.setattr(summary_module, "generate_class_summary", _summary)
+    await _seed_summary_class(db)
+
+    async with db.async_session() as session:
+        await send_class_summary_to_class_users(
+            None, session, 1, [1, 2, 3, 4, 5], AFTER, now
+        )
+
+    assert [len(batch) for batch in sender.batches] == [2, 2, 1]
+    bodies = {to: body for batch in sender.batches for to, _, body in batch}
+    assert "User1" in bodies["user1@example.com"]
+    assert "User1" not in bodies["user2@example.com"]
+
+    assert await _summary_sent_user_ids(db) == [1, 2, 4, 5]
+    async with db.async_session() as session:
+        class_ = await models.Class.get_by_id(session, 1)
+    # A failed recipient leaves the class to be retried.
+    assert class_.last_summary_sent_at is None
+
+
+async def test_send_class_summary_keeps_batches_sent_before_a_crash(
+    db, now, monkeypatch
+):
+    sender = CrashingSender()
+    monkeypatch.setattr(summary_module, "SUMMARY_DIRECT_EMAIL_BATCH_SIZE", 2)
+    monkeypatch.setattr(
+        summary_module, "outbound_email_sender", lambda *args, **kwargs: sender
+    )
+
+    async def _summary(*args, **kwargs):
+        return "<p>Summary</p>"
+
+    monkeypatch.setattr(summary_module, "generate_class_summary", _summary)
+    await _seed_summary_class(db)
+
+    async with db.async_session() as session:
+        await send_class_summary_to_class_users(
+            None, session, 1, [1, 2, 3, 4, 5], AFTER, now
+        )
+
+    # The batch that went out before the crash is committed as sent, so a
+    # retry only emails the users after it.
+    assert await _summary_sent_user_ids(db) == [1, 2]
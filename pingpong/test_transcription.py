@@ -1,7 +1,10 @@
-import os
+from types import SimpleNamespace
+
 import pytest
 import pingpong.transcription as transcription_module
 
+from pingpong.audio_chunking import AudioChunk
+
 from openai.types.audio.transcription_diarized import TranscriptionDiarized
 from openai.types.beta.threads.message import Message as OpenAIThreadMessage
 
@@ -431,298 +434,166 @@ def test_similarity_substring_match_is_strong_signal() -> None:
     assert transcription_module._similarity(a, b) == 1.0
 
 
-def test_rescale_diarized_transcription_timestamps_scales_duration_and_segments() -> (
-    None
-):
-    transcription = TranscriptionDiarized.model_validate(
+def _diarized(segments: list[tuple[str, float, float, str]]) -> TranscriptionDiarized:
+    return TranscriptionDiarized.model_validate(
         {
-            "duration": 10.0,
+            "duration": max(
+                (end for _speaker, _start, end, _text in segments), default=0
+            ),
             "task": "transcribe",
-            "text": "",
+            "text": " ".join(text for *_rest, text in segments),
             "segments": [
                 {
-                    "id": "seg_1",
-                    "type": "transcript.text.segment",
-                    "speaker": "spk_1",
-                    "start": 1.0,
-                    "end": 2.0,
-                    "text": "Hello",
-                },
-                {
-                    "id": "seg_2",
+                    "id": f"seg_{idx}",
                     "type": "transcript.text.segment",
-                    "speaker": "spk_1",
-                    "start": 2.0,
-                    "end": 4.0,
-                    "text": "world",
-                },
+                    "speaker": speaker,
+                    "start": start,
+                    "end": end,
+                    "text": text,
+                }
+                for idx, (speaker, start, end, text) in enumerate(segments)
             ],
         }
     )
 
-    transcription_module._rescale_diarized_transcription_timestamps(
-        transcription, factor=1.25
+
+def test_rebase_diarized_transcription_timestamps_shifts_segments() -> None:
+    transcription = _diarized([("A", 1.0, 2.0, "Hello"), ("A", 2.0, 4.0, "world")])
+
+    transcription_module._rebase_diarized_transcription_timestamps(
+        transcription, offset_seconds=595.0
     )
 
-    assert transcription.duration == 12.5
-    assert transcription.segments[0].start == 1.25
-    assert transcription.segments[0].end == 2.5
-    assert transcription.segments[1].start == 2.5
-    assert transcription.segments[1].end == 5.0
+    assert [(seg.start, seg.end) for seg in transcription.segments] == [
+        (596.0, 597.0),
+        (597.0, 599.0),
+    ]
 
 
-def test_rescale_diarized_transcription_timestamps_handles_missing_or_none_values() -> (
+def test_stitch_diarized_transcriptions_dedupes_overlap_and_namespaces_speakers() -> (
     None
 ):
-    class FakeSegmentWithOptionalTimestamps:
-        def __init__(self, start, end):
-            self.start = start
-            self.end = end
-
-    class FakeSegmentWithoutTimestamps:
-        pass
-
-    class FakeTranscription:
-        def __init__(self, segments):
-            self.segments = segments
-
-    seg_none_start = FakeSegmentWithOptionalTimestamps(start=None, end=2.0)
-    seg_missing_fields = FakeSegmentWithoutTimestamps()
-    transcription = FakeTranscription(segments=[seg_none_start, seg_missing_fields])
+    chunks = [
+        AudioChunk(start_ms=0, end_ms=605_000, keep_start_ms=0, keep_end_ms=600_000),
+        AudioChunk(
+            start_ms=595_000,
+            end_ms=900_000,
+            keep_start_ms=600_000,
+            keep_end_ms=900_000,
+            is_last=True,
+        ),
+    ]
+    first = _diarized(
+        [
+            ("A", 590.0, 598.0, "Before the cut."),
+            ("B", 601.0, 604.0, "Heard in the overlap."),
+        ]
+    )
+    second = _diarized(
+        [
+            ("A", 596.0, 598.5, "Cut short."),
+            ("A", 601.0, 604.0, "Heard in the overlap."),
+            ("B", 610.0, 620.0, "After the cut."),
+        ]
+    )
 
-    transcription_module._rescale_diarized_transcription_timestamps(
-        transcription, factor=1.5
+    stitched = transcription_module._stitch_diarized_transcriptions(
+        [first, second], chunks
     )
 
-    assert seg_none_start.start is None
-    assert seg_none_start.end == 3.0
+    assert [(seg.speaker, seg.start, seg.text) for seg in stitched.segments] == [
+        ("A", 590.0, "Before the cut."),
+        ("A-2", 601.0, "Heard in the overlap."),
+        ("B-2", 610.0, "After the cut."),
+    ]
+    assert len({seg.id for seg in stitched.segments}) == 3
+    assert stitched.duration == 900.0
+    assert stitched.text == "Before the cut. Heard in the overlap. After the cut."
 
 
-def test_prepare_audio_file_for_transcription_returns_original_path_when_under_target(
-    monkeypatch: pytest.MonkeyPatch,
+@pytest.mark.asyncio
+async def test_transcribe_recording_sends_short_recordings_whole(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
 ) -> None:
-    class FakeAudio:
-        def __len__(self) -> int:
-            return 99_000  # 99 seconds
-
-        def set_frame_rate(self, _rate: int):
-            return self
+    recording_path = tmp_path / "recording.webm"
+    recording_path.write_bytes(b"audio")
+    sent_paths: list[str] = []
 
-        def set_channels(self, _channels: int):
-            return self
+    class FakeTranscriptions:
+        async def create(self, *, file, **_kwargs):
+            sent_paths.append(file.name)
+            return _diarized([("A", 1.0, 2.0, "Hello")])
 
-        def set_sample_width(self, _width: int):
-            return self
+    async def fail_transcribe_audio_chunks(*_args, **_kwargs):
+        raise AssertionError("Short recordings should not be chunked.")
 
-    monkeypatch.setattr(transcription_module, "_TRANSCRIPTION_TARGET_SECONDS", 100.0)
-    monkeypatch.setattr(
-        transcription_module.AudioSegment, "from_file", lambda _p: FakeAudio()
-    )
+    monkeypatch.setattr(transcription_module.shutil, "which", lambda _name: "/ffmpeg")
     monkeypatch.setattr(
         transcription_module,
-        "speedup",
-        lambda *_args, **_kwargs: (_ for _ in ()).throw(
-            AssertionError("speedup() should not be called")
-        ),
+        "scan_audio_silences",
+        lambda _path, *, ffmpeg_path: (60_000, []),
     )
     monkeypatch.setattr(
-        transcription_module.tempfile,
-        "NamedTemporaryFile",
-        lambda *_args, **_kwargs: (_ for _ in ()).throw(
-            AssertionError("NamedTemporaryFile() should not be called")
-        ),
+        transcription_module, "transcribe_audio_chunks", fail_transcribe_audio_chunks
     )
 
-    input_path = "/tmp/in.webm"
-    path_to_send, factor, cleanup_path = (
-        transcription_module._prepare_audio_file_for_transcription(
-            input_path=input_path
-        )
+    transcription = await transcription_module._transcribe_recording(
+        SimpleNamespace(audio=SimpleNamespace(transcriptions=FakeTranscriptions())),
+        str(recording_path),
+        temp_dir=str(tmp_path),
     )
-    assert path_to_send == input_path
-    assert factor == 1.0
-    assert cleanup_path is None
 
+    assert sent_paths == [str(recording_path)]
+    assert transcription.segments[0].text == "Hello"
 
-def test_prepare_audio_file_for_transcription_speeds_up_and_returns_actual_factor(
-    monkeypatch: pytest.MonkeyPatch,
-) -> None:
-    class FakeAudio:
-        def __init__(self, duration_ms: int):
-            self.duration_ms = duration_ms
-
-        def __len__(self) -> int:
-            return self.duration_ms
-
-        def set_frame_rate(self, _rate: int):
-            return self
-
-        def set_channels(self, _channels: int):
-            return self
-
-        def set_sample_width(self, _width: int):
-            return self
-
-    class FakeSped(FakeAudio):
-        def export(
-            self, path: str, format: str, codec: str, parameters: list[str]
-        ) -> None:
-            assert format == "webm"
-            assert codec == "libopus"
-            assert "-application" in parameters and "voip" in parameters
-            assert "-ac" in parameters and "1" in parameters
-            assert "-ar" in parameters and "24000" in parameters
-            # Touch the file to emulate export output.
-            with open(path, "ab"):
-                pass
-
-    monkeypatch.setattr(transcription_module, "_TRANSCRIPTION_TARGET_SECONDS", 100.0)
-    monkeypatch.setattr(
-        transcription_module.AudioSegment, "from_file", lambda _p: FakeAudio(200_000)
-    )
-
-    def fake_speedup(audio: FakeAudio, *, playback_speed: float) -> FakeSped:
-        assert playback_speed == 2.0  # 200s / 100s target
-        return FakeSped(120_000)  # 120 seconds after speedup
-
-    monkeypatch.setattr(transcription_module, "speedup", fake_speedup)
 
-    path_to_send, factor, cleanup_path = (
-        transcription_module._prepare_audio_file_for_transcription(
-            input_path="/tmp/in.webm"
-        )
-    )
-    try:
-        assert cleanup_path == path_to_send
-        assert isinstance(path_to_send, str) and path_to_send.endswith(".webm")
-        assert os.path.exists(path_to_send)
-        assert abs(factor - (200.0 / 120.0)) < 1e-9
-    finally:
-        if cleanup_path and os.path.exists(cleanup_path):
-            os.remove(cleanup_path)
-
-
-def test_prepare_audio_file_for_transcription_export_failure_removes_tempfile(
-    monkeypatch: pytest.MonkeyPatch,
-    tmp_path,
+@pytest.mark.asyncio
+async def test_transcribe_recording_chunks_long_recordings_at_silences(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
 ) -> None:
-    class FakeAudio:
-        def __len__(self) -> int:
-            return 200_000  # 200 seconds
-
-        def set_frame_rate(self, _rate: int):
-            return self
-
-        def set_channels(self, _channels: int):
-            return self
-
-        def set_sample_width(self, _width: int):
-            return self
-
-    class FakeSped:
-        def __len__(self) -> int:
-            return 100_000  # 100 seconds
-
-        def export(
-            self, _path: str, format: str, codec: str, parameters: list[str]
-        ) -> None:
-            raise RuntimeError("export failed")
-
-    class FakeTempFile:
-        def __init__(self, name: str):
-            self.name = name
-
-        def __enter__(self):
-            return self
-
-        def __exit__(self, exc_type, exc, tb) -> None:
-            return None
-
-    out_path = tmp_path / "out.webm"
-
-    def fake_named_tempfile(*_args, **_kwargs):
-        out_path.write_bytes(b"")
-        return FakeTempFile(str(out_path))
-
-    monkeypatch.setattr(transcription_module, "_TRANSCRIPTION_TARGET_SECONDS", 100.0)
+    captured: dict[str, object] = {}
+
+    async def fake_transcribe_audio_chunks(
+        input_path, chunks, transcribe, *, concurrency, **_kwargs
+    ):
+        captured["chunks"] = chunks
+        captured["concurrency"] = concurrency
+        results = []
+        for index, chunk in enumerate(chunks):
+            chunk_path = tmp_path / f"chunk-{index}.webm"
+            chunk_path.write_bytes(b"audio")
+            results.append(await transcribe(chunk, str(chunk_path)))
+        return results
+
+    class FakeTranscriptions:
+        async def create(self, *, file, **_kwargs):
+            return _diarized([("A", 10.0, 12.0, f"Words in {file.name[-12:]}")])
+
+    monkeypatch.setattr(transcription_module.shutil, "which", lambda _name: "/ffmpeg")
     monkeypatch.setattr(
-        transcription_module.AudioSegment, "from_file", lambda _p: FakeAudio()
+        transcription_module,
+        "scan_audio_silences",
+        lambda _path, *, ffmpeg_path: (1_800_000, [(610_000, 612_000)]),
     )
-    monkeypatch.setattr(transcription_module, "speedup", lambda *_a, **_k: FakeSped())
     monkeypatch.setattr(
-        transcription_module.tempfile, "NamedTemporaryFile", fake_named_tempfile
+        transcription_module, "transcribe_audio_chunks", fake_transcribe_audio_chunks
     )
 
-    with pytest.raises(RuntimeError, match="export failed"):
-        transcription_module._prepare_audio_file_for_transcription(
-            input_path="/tmp/in.webm"
-        )
-
-    assert not out_path.exists()
-
-
-def test_prepare_audio_file_for_transcription_sped_duration_zero_uses_requested_factor(
-    monkeypatch: pytest.MonkeyPatch,
-    tmp_path,
-) -> None:
-    class FakeAudio:
-        def __len__(self) -> int:
-            return 200_000  # 200 seconds
-
-        def set_frame_rate(self, _rate: int):
-            return self
-
-        def set_channels(self, _channels: int):
-            return self
-
-        def set_sample_width(self, _width: int):
-            return self
-
-    class FakeSped:
-        def __len__(self) -> int:
-            return 0
-
-        def export(
-            self, path: str, format: str, codec: str, parameters: list[str]
-        ) -> None:
-            (tmp_path / "exported").write_text("ok")
-            with open(path, "ab"):
-                pass
-
-    class FakeTempFile:
-        def __init__(self, name: str):
-            self.name = name
-
-        def __enter__(self):
-            return self
-
-        def __exit__(self, exc_type, exc, tb) -> None:
-            return None
-
-    out_path = tmp_path / "out.webm"
-
-    def fake_named_tempfile(*_args, **_kwargs):
-        out_path.write_bytes(b"")
-        return FakeTempFile(str(out_path))
-
-    monkeypatch.setattr(transcription_module, "_TRANSCRIPTION_TARGET_SECONDS", 100.0)
-    monkeypatch.setattr(
-        transcription_module.AudioSegment, "from_file", lambda _p: FakeAudio()
-    )
-    monkeypatch.setattr(transcription_module, "speedup", lambda *_a, **_k: FakeSped())
-    monkeypatch.setattr(
-        transcription_module.tempfile, "NamedTemporaryFile", fake_named_tempfile
+    transcription = await transcription_module._transcribe_recording(
+        SimpleNamespace(audio=SimpleNamespace(transcriptions=FakeTranscriptions())),
+        str(tmp_path / "recording.webm"),
+        temp_dir=str(tmp_path),
     )
 
-    path_to_send, factor, cleanup_path = (
-        transcription_module._prepare_audio_file_for_transcription(
-            input_path="/tmp/in.webm"
-        )
+    chunks = captured["chunks"]
+    assert isinstance(chunks, list)
+    assert [(chunk.keep_start_ms, chunk.keep_end_ms) for chunk in chunks] == [
+        (0, 611_000),
+        (611_000, 1_211_000),
+        (1_211_000, 1_800_000),
+    ]
+    assert (
+        captured["concurrency"] == transcription_module._TRANSCRIPTION_CHUNK_CONCURRENCY
     )
-    try:
-        assert path_to_send == str(out_path)
-        assert cleanup_path == str(out_path)
-        assert factor == 2.0  # requested_factor, because sped_duration_seconds == 0
-    finally:
-        if cleanup_path and os.path.exists(cleanup_path):
-            os.remove(cleanup_path)
+    assert [seg.start for seg in transcription.segments] == [10.0, 616.0, 1_216.0]
+    assert transcription.duration == 1_800.0
@@ -0,0 +1,134 @@
+import pytest
+from sqlalchemy import select
+
+import pingpong.users as users_module
+from pingpong import models, schemas
+
+
+class RecordingAuthzClient:
+    def __init__(self):
+        self.grants: set[tuple[str, str, str]] = set()
+        self.revokes: set[tuple[str, str, str]] = set()
+
+    async def test(self, *args, **kwargs):
+        return True
+
+    async def write_safe(self, grant=None, revoke=None):
+        self.grants.update(grant or [])
+        self.revokes.update(revoke or [])
+
+
+def _ucr(email: str, teacher: bool = False, **kwargs):
+    return schemas.CreateUserClassRole(
+        email=email,
+        roles=schemas.ClassUserRoles(admin=False, teacher=teacher, student=not teacher),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("bulk", [True, False])
+async def test_add_new_users_bulk_matches_row_by_row(db, monkeypatch, bulk):
+    if not bulk:
+        monkeypatch.setattr(users_module, "ADD_NEW_USERS_BULK_MIN_ROWS", 10**9)
+    created_in_bulk: list[int] = []
+    create_many = models.User.create_many
+
+    async def _create_many(session, new_users):
+        created_in_bulk.append(len(new_users))
+        return await create_many(session, new_users)
+
+    monkeypatch.setattr(models.User, "create_many", _create_many)
+
+    async with db.async_session() as session:
+        class_ = models.Class(id=500, name="Bulk Class", api_key="test-key")
+        session.add(class_)
+        session.add(models.User(id=1, email="initiator@example.com"))
+        session.add(models.User(id=2, email="enrolled@example.com"))
+        session.add(models.User(id=3, email="sso-only@example.com"))
+        session.add(models.User(id=4, email="dropped@example.com"))
+        await session.flush()
+        await models.ExternalLogin.create_or_update(session, 3, "harvard-sso", "HUID3")
+        await models.UserClassRole.create(session, 2, 500)
+        await models.UserClassRole.create(
+            session, 4, 500, "harvard", schemas.LMSType.CANVAS
+        )
+        await session.commit()
+
+    roster = [
+        _ucr("initiator@example.com", teacher=True),
+        _ucr("Enrolled@example.com", teacher=True),
+        _ucr("renamed@example.com", sso_id="HUID3"),
+        _ucr("not an email"),
+        _ucr("twice@example.com"),
+        _ucr("twice@example.com", teacher=True),
+        *(_ucr(f"student{i}@example.com", sso_id=f"S{i}") for i in range(20)),
+    ]
+    authz = RecordingAuthzClient()
+    async with db.async_session() as session:
+        adder = users_module.AddNewUsersScript(
+            "500",
+            1,
+            session,
+            authz,
+            schemas.CreateUserClassRoles(
+                roles=roster,
+                silent=True,
+                lms_tenant="harvard",
+                lms_type=schemas.LMSType.CANVAS,
+                sso_tenant="harvard-sso",
+            ),
+        )
+        results = await adder.add_new_users()
+        await session.commit()
+
+    # Rows that depend on each other (the same email twice) are not batched.
+    assert created_in_bulk == ([20] if bulk else [])
+    # One result per row in roster order, except the initiating user's row.
+    assert [(r.email, r.error is not None) for r in results.results] == [
+        ("Enrolled@example.com", False),
+        ("renamed@example.com", False),
+        ("not an email", True),
+        ("twice@example.com", False),
+        ("twice@example.com", False),
+        *((f"student{i}@example.com", False) for i in range(20)),
+    ]
+
+    async with db.async_session() as session:
+        enrollments = {
+            user.email: (enrollment.lms_tenant, enrollment.subscribed_to_summaries)
+            for enrollment, user in await session.execute(
+                select(models.UserClassRole, models.User)
+                .join(models.User, models.User.id == models.UserClassRole.user_id)
+                .where(models.UserClassRole.class_id == 500)
+            )
+        }
+        logins = set(
+            await session.execute(
+                select(models.ExternalLogin.user_id, models.ExternalLogin.identifier)
+            )
+        )
+        student_ids = {
+            user.email: user.id
+            for user in await session.scalars(
+                select(models.User).where(models.User.email.like("student%"))
+            )
+        }
+
+    assert enrollments == {
+        "enrolled@example.com": ("harvard", True),
+        # New enrollments follow the users' `dna_as_join` default.
+        "sso-only@example.com": ("harvard", False),
+        "twice@example.com": ("harvard", False),
+        **{f"student{i}@example.com": ("harvard", False) for i in range(20)},
+    }
+    assert (3, "HUID3") in logins
+    assert {
+        (student_ids[f"student{i}@example.com"], f"S{i}") for i in range(20)
+    } <= logins
+    assert ("user:2", "teacher", "class:500") in authz.grants
+    assert ("user:3", "student", "class:500") in authz.grants
+    assert ("user:4", "student", "class:500") in authz.revokes
+    assert not any(grant[0] == "user:1" for grant in authz.grants)
+    assert adder.synced_user_ids["renamed@example.com"] == 3
+    assert len(adder.synced_user_ids) == 24
@@ -4,6 +4,7 @@ import json
 import logging
 import os
 import re
+import shutil
 import tempfile
 from datetime import datetime, timezone
 from collections import Counter
@@ -11,13 +12,18 @@ from collections import Counter
 import openai
 from openai.types.audio.transcription_diarized import TranscriptionDiarized
 from openai.types.beta.threads.message import Message as OpenAIThreadMessage
-from pydub import AudioSegment
-from pydub.effects import speedup
 
 import pingpong.models as models
 from pingpong.animal_hash import user_names
+from pingpong.audio_chunking import (
+    AudioChunk,
+    plan_audio_chunks,
+    scan_audio_silences,
+    transcribe_audio_chunks,
+)
 from pingpong.auth import encode_auth_token
 from pingpong.config import config
+from pingpong.email_outbox import outbound_email_sender
 from pingpong.invite import send_transcription_download, send_transcription_failed
 from pingpong.now import NowFn, utcnow
 from pingpong.schemas import DownloadTranscriptExport, MessageForSpeakerMatch
@@ -50,7 +56,10 @@ _MIN_SIMILARITY_SCORE = 0.6
 _TRANSCRIPTION_TARGET_SECONDS = (
     1_380.0  # 23 minutes (1,380s), safely under the 1,400s context limit
 )
-_AUDIO_SAMPLE_WIDTH = 2
+# Longer recordings are split near this length so chunks transcribe in parallel.
+_TRANSCRIPTION_CHUNK_TARGET_MS = 10 * 60 * 1000
+_TRANSCRIPTION_CHUNK_OVERLAP_MS = 5_000
+_TRANSCRIPTION_CHUNK_CONCURRENCY = 8
 _AUDIO_FRAME_RATE = 24000
 _AUDIO_CHANNELS = 1
 _AUDIO_APPLICATION = "voip"
@@ -442,109 +451,149 @@ def format_diarized_transcription_txt(
     return "\n".join(chunks).strip() + "\n"
 
 
-def _prepare_audio_file_for_transcription(
-    *, input_path: str, temp_dir: str | None = None
-) -> tuple[str, float, str | None]:
-    """
-    Prepare an audio file for transcription by optionally speeding it up.
-
-    Returns:
-        A tuple of:
-        - `path_to_send`: file path to pass to the transcription API
-        - `speed_factor`: how much faster than 1x we made the audio (>= 1.0)
-        - `cleanup_path`: optional temp file path to remove afterwards
-    """
-    # Match realtime recorder settings for consistency with the stored artifact:
-    # - mono, 24kHz, 16-bit PCM prior to encoding
-    audio = (
-        AudioSegment.from_file(input_path)
-        .set_frame_rate(_AUDIO_FRAME_RATE)
-        .set_channels(_AUDIO_CHANNELS)
-        .set_sample_width(_AUDIO_SAMPLE_WIDTH)
-    )
-    duration_seconds = float(len(audio)) / 1000.0
-    if duration_seconds <= _TRANSCRIPTION_TARGET_SECONDS:
-        return input_path, 1.0, None
-
-    requested_factor = duration_seconds / _TRANSCRIPTION_TARGET_SECONDS
-    sped = speedup(audio, playback_speed=requested_factor)
-    sped_duration_seconds = float(len(sped)) / 1000.0
-    # Use the actual speed-up achieved (pydub may round frames) for timestamp rescaling.
-    actual_factor = (
-        duration_seconds / sped_duration_seconds
-        if sped_duration_seconds > 0
-        else requested_factor
+def _plan_transcription_chunks(
+    *, input_path: str, ffmpeg_path: str
+) -> list[AudioChunk]:
+    duration_ms, silences = scan_audio_silences(input_path, ffmpeg_path=ffmpeg_path)
+    chunks = plan_audio_chunks(
+        duration_ms,
+        silences,
+        target_ms=_TRANSCRIPTION_CHUNK_TARGET_MS,
+        # Keep every clip, overlap included, under the model's audio limit.
+        max_ms=int(_TRANSCRIPTION_TARGET_SECONDS * 1000)
+        - 2 * _TRANSCRIPTION_CHUNK_OVERLAP_MS,
+        overlap_ms=_TRANSCRIPTION_CHUNK_OVERLAP_MS,
     )
-    logger.info(
-        "Speeding up audio from %.1fs to %.1fs (factor: %.2fx)",
-        duration_seconds,
-        sped_duration_seconds,
-        actual_factor,
-    )
-
-    with tempfile.NamedTemporaryFile(
-        mode="wb", suffix=".webm", delete=False, dir=temp_dir
-    ) as tmp:
-        sped_path = tmp.name
-
-    # Export after closing to avoid platform-specific file-lock issues.
-    try:
-        sped.export(
-            sped_path,
-            format="webm",
-            codec="libopus",
-            parameters=[
-                "-application",
-                _AUDIO_APPLICATION,
-                "-ac",
-                str(_AUDIO_CHANNELS),
-                "-ar",
-                str(_AUDIO_FRAME_RATE),
-            ],
+    if len(chunks) > 1:
+        logger.info(
+            "Splitting %.1fs recording into %s transcription chunks",
+            duration_ms / 1000,
+            len(chunks),
         )
-    except Exception:
-        try:
-            os.remove(sped_path)
-        except OSError:
-            logger.warning(
-                "Failed to remove temporary sped audio file %s during cleanup",
-                sped_path,
-                exc_info=True,
-            )
-        raise
-    return sped_path, actual_factor, sped_path
-
-
-async def _prepare_audio_file_for_transcription_async(
-    *, input_path: str, temp_dir: str | None = None
-) -> tuple[str, float, str | None]:
-    return await asyncio.to_thread(
-        _prepare_audio_file_for_transcription, input_path=input_path, temp_dir=temp_dir
-    )
+    return chunks
 
 
-def _rescale_diarized_transcription_timestamps(
-    transcription: TranscriptionDiarized, *, factor: float
+def _rebase_diarized_transcription_timestamps(
+    transcription: TranscriptionDiarized, *, offset_seconds: float
 ) -> None:
     """
-    The diarized timestamps come from the audio we send to the API. If we speed up
-    audio by `factor`, the returned timestamps are on the sped-up timeline and must
-    be scaled back to the original (1x) timeline.
+    The diarized timestamps of a chunk are relative to the start of the clip we
+    sent. Shift them onto the timeline of the full recording.
 
     Args:
-        transcription: A diarized transcription object whose `duration` and segment
+        transcription: A diarized transcription object whose segment
             `start`/`end` timestamps will be updated in-place.
-        factor: The speed-up factor applied to the audio prior to transcription. All
-            diarized timestamps are multiplied by this value to map back to the
-            original (1x) timeline.
+        offset_seconds: Where the transcribed clip starts in the full recording.
     """
-    if getattr(transcription, "duration", None) is not None:
-        transcription.duration = float(transcription.duration) * factor
     for seg in transcription.segments:
         if getattr(seg, "start", None) is not None:
-            seg.start = float(seg.start) * factor
+            seg.start = float(seg.start) + offset_seconds
         if getattr(seg, "end", None) is not None:
-            seg.end = float(seg.end) * factor
+            seg.end = float(seg.end) + offset_seconds
+
+
+def _stitch_diarized_transcriptions(
+    transcriptions: list[TranscriptionDiarized], chunks: list[AudioChunk]
+) -> TranscriptionDiarized:
+    """
+    Combine rebased chunk transcriptions into one transcription of the recording.
+
+    Segments heard twice because of chunk overlap are kept only by the chunk
+    that owns their midpoint. Each chunk is diarized on its own, so speaker ids
+    from later chunks are suffixed with the chunk number to keep them from
+    being merged with an unrelated speaker that happens to share the id.
+    """
+    segments = []
+    for index, (transcription, chunk) in enumerate(zip(transcriptions, chunks)):
+        for seg in transcription.segments:
+            if not chunk.owns(seg.start * 1000, seg.end * 1000):
+                continue
+            segments.append(
+                seg.model_copy(
+                    update={
+                        "id": f"{index}-{seg.id}",
+                        "speaker": seg.speaker
+                        if index == 0
+                        else f"{seg.speaker}-{index + 1}",
+                    }
+                )
+            )
+    return TranscriptionDiarized(
+        duration=chunks[-1].end_ms / 1000 if chunks else 0.0,
+        segments=segments,
+        task="transcribe",
+        text=" ".join(seg.text.strip() for seg in segments if seg.text.strip()),
+    )
+
+
+async def _create_diarized_transcription(
+    cli: openai.AsyncClient | openai.AsyncAzureOpenAI, audio_path: str
+) -> TranscriptionDiarized:
+    with open(audio_path, "rb") as audio_file:
+        transcription = await cli.audio.transcriptions.create(
+            file=audio_file,
+            model="gpt-4o-transcribe-diarize",
+            response_format="diarized_json",
+            chunking_strategy="auto",
+            language="en",
+            timeout=60 * 20,  # 20 minutes
+        )
+    if not isinstance(transcription, TranscriptionDiarized):
+        raise TypeError(
+            f"Unexpected transcription response type: {type(transcription)}"
+        )
+    return transcription
+
+
+async def _transcribe_recording(
+    cli: openai.AsyncClient | openai.AsyncAzureOpenAI,
+    recording_path: str,
+    *,
+    temp_dir: str,
+) -> TranscriptionDiarized:
+    """
+    Transcribe a recording, splitting long ones at pauses into chunks that are
+    transcribed concurrently and stitched back together.
+    """
+    ffmpeg_path = shutil.which("ffmpeg")
+    if ffmpeg_path is None:
+        raise RuntimeError("ffmpeg is required for recording transcription.")
+    chunks = await asyncio.to_thread(
+        _plan_transcription_chunks, input_path=recording_path, ffmpeg_path=ffmpeg_path
+    )
+    if len(chunks) <= 1:
+        return await _create_diarized_transcription(cli, recording_path)
+
+    async def transcribe_chunk(
+        chunk: AudioChunk, chunk_path: str
+    ) -> TranscriptionDiarized:
+        transcription = await _create_diarized_transcription(cli, chunk_path)
+        _rebase_diarized_transcription_timestamps(
+            transcription, offset_seconds=chunk.start_ms / 1000
+        )
+        return transcription
+
+    transcriptions = await transcribe_audio_chunks(
+        recording_path,
+        chunks,
+        transcribe_chunk,
+        ffmpeg_path=ffmpeg_path,
+        temp_dir=temp_dir,
+        # Match realtime recorder settings for consistency with the stored artifact.
+        encode_args=[
+            "-ac",
+            str(_AUDIO_CHANNELS),
+            "-ar",
+            str(_AUDIO_FRAME_RATE),
+            "-c:a",
+            "libopus",
+            "-application",
+            _AUDIO_APPLICATION,
+        ],
+        suffix=".webm",
+        concurrency=_TRANSCRIPTION_CHUNK_CONCURRENCY,
+    )
+    return _stitch_diarized_transcriptions(transcriptions, chunks)
 
 
 async def transcribe_thread_recording_and_email_link(
@@ -557,7 +606,6 @@ async def transcribe_thread_recording_and_email_link(
     class_name: str | None = None
     user_email: str | None = None
     group_link = config.url(f"/group/{class_id}/thread/{thread_id}")
-    speed_factor: float = 1.0
 
     try:
         async with config.authz.driver.get_client() as authz:
@@ -611,33 +659,8 @@ async def transcribe_thread_recording_and_email_link(
                 async for chunk in config.audio_store.store.get_file(recording_key):
                     tmp.write(chunk)
 
-            (
-                path_to_send,
-                speed_factor,
-                _,  # cleanup handled by TemporaryDirectory context manager
-            ) = await _prepare_audio_file_for_transcription_async(
-                input_path=recording_path,
-                temp_dir=tmpdir,
-            )
-
-            with open(path_to_send, "rb") as audio_file:
-                transcription = await cli.audio.transcriptions.create(
-                    file=audio_file,
-                    model="gpt-4o-transcribe-diarize",
-                    response_format="diarized_json",
-                    chunking_strategy="auto",
-                    language="en",
-                    timeout=60 * 20,  # 20 minutes
-                )
-
-        if not isinstance(transcription, TranscriptionDiarized):
-            raise TypeError(
-                f"Unexpected transcription response type: {type(transcription)}"
-            )
-
-        if speed_factor > 1.0:
-            _rescale_diarized_transcription_timestamps(
-                transcription, factor=speed_factor
+            transcription = await _transcribe_recording(
+                cli, recording_path, temp_dir=tmpdir
             )
 
         speaker_display_names: dict[str, str] | None = None
@@ -695,7 +718,7 @@ async def transcribe_thread_recording_and_email_link(
             thread_users=thread_users,
         )
         await send_transcription_download(
-            config.email.sender,
+            outbound_email_sender(),
             invite,
             expires=config.artifact_store.download_link_expiration,
         )
@@ -709,7 +732,7 @@ async def transcribe_thread_recording_and_email_link(
         if class_name and user_email:
             try:
                 await send_transcription_failed(
-                    config.email.sender,
+                    outbound_email_sender(),
                     DownloadTranscriptExport(
                         class_name=class_name,
                         email=user_email,
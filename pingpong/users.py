@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 import logging
+from collections import Counter
 from typing import Optional, cast
 from pingpong.authz.openfga import OpenFgaAuthzClient
 from email_validator import validate_email, EmailSyntaxError
@@ -12,13 +13,18 @@ from pingpong.state_types import AppState, StateRequest
 from sqlalchemy.ext.asyncio import AsyncSession
 from .auth import generate_auth_link
 from .authz import Relation
-from .config import config
-from .invite import send_invite
+from .email_outbox import outbound_email_sender
+from .invite import send_invite, send_invites
 from .now import NowFn, utcnow
 from .merge import merge
+from .roster_diff import roster_entry_key
 
 logger = logging.getLogger(__name__)
 
+# Rosters at least this long resolve users, enrollments and external logins
+# up front in a few batched queries instead of one round trip per row.
+ADD_NEW_USERS_BULK_MIN_ROWS = 20
+
 
 class UserNotFoundException(Exception):
     def __init__(self, detail: str = "", user_id: str = ""):
@@ -147,13 +153,30 @@ class AddNewUsers(ABC):
         user_id: int,
         session: AsyncSession,
         client: OpenFgaAuthzClient,
+        removed_user_ids: list[int] | None = None,
     ):
         self.class_id = int(class_id)
         self.new_ucr = new_ucr
         self.user_id = user_id
         self.session = session
         self.client = client
+        # For sync imports of a roster diff: the users who left the roster. When
+        # set, `new_ucr.roles` only holds the added and changed members, so only
+        # these users are unenrolled instead of everyone missing from the list.
+        self.removed_user_ids = removed_user_ids
+        # Roster key -> user id for every synced member, for the roster snapshot.
+        self.synced_user_ids: dict[str, int] = {}
         self._external_login_provider_name_cache: dict[int, str | None] = {}
+        # Filled in by `_prefetch_users` for rosters handled in bulk.
+        self._prefetched_users: dict[int, tuple[models.User, list[int]]] = {}
+        self._prefetched_enrollments: dict[int, models.UserClassRole] = {}
+        self._linked_identities: set[tuple[int, str, str]] = set()
+        self._queued_enrollments: list[
+            tuple[models.User, schemas.CreateUserClassRole, list[str]]
+        ] = []
+        # Row index -> (provider, identifier) logins of users created in bulk.
+        self._bulk_identity_logins: dict[int, list[tuple[str, str]]] = {}
+        self._queued_external_logins: list[tuple[int, str, str]] = []
 
     @abstractmethod
     def send_invites(self):
@@ -228,6 +251,10 @@ class AddNewUsers(ABC):
                 continue
             seen.add(key)
 
+            # Already linked to this user, so the upsert would be a no-op
+            if (user_id, provider_name, identifier) in self._linked_identities:
+                continue
+
             await models.ExternalLogin.create_or_update(
                 self.session,
                 user_id,
@@ -236,15 +263,21 @@ class AddNewUsers(ABC):
                 called_by="AddNewUsers.add_new_users",
             )
 
-    async def _lookup_user_for_ucr(
+    def _get_user_lookup_items(
         self, ucr: schemas.CreateUserClassRole
-    ) -> tuple[models.User | None, list[int]]:
+    ) -> list[schemas.ExternalLoginLookupItem]:
         email_lookup = schemas.ExternalLoginLookupItem(
             provider="email",
             identifier=ucr.email.lower(),
         )
         lookup_items = self._get_identity_lookup_items(ucr)
         lookup_items.append(email_lookup)
+        return lookup_items
+
+    async def _lookup_user_for_ucr(
+        self, ucr: schemas.CreateUserClassRole
+    ) -> tuple[models.User | None, list[int]]:
+        lookup_items = self._get_user_lookup_items(ucr)
 
         try:
             return await models.User.get_by_email_external_logins_priority(
@@ -268,6 +301,29 @@ class AddNewUsers(ABC):
                 ),
             )
 
+    def _get_bulk_identity_logins(
+        self, ucr: schemas.CreateUserClassRole
+    ) -> list[tuple[str, str]] | None:
+        """Returns the identity logins to insert in bulk for a brand-new user.
+
+        Returns None if one of them needs `create_or_update`: email logins,
+        providers given only by id, or two identifiers for one provider.
+        """
+        logins: list[tuple[str, str]] = []
+        providers: set[str] = set()
+        for lookup_item in self._get_identity_lookup_items(ucr):
+            identifier = lookup_item.identifier.strip()
+            if not identifier:
+                continue
+            provider_name = lookup_item.provider.strip() if lookup_item.provider else ""
+            if not provider_name or provider_name == "email":
+                return None
+            if provider_name.lower() in providers:
+                return None
+            providers.add(provider_name.lower())
+            logins.append((provider_name, identifier))
+        return logins
+
     async def _merge_matched_user_ids(
         self,
         user: models.User,
@@ -289,6 +345,80 @@ class AddNewUsers(ABC):
             merged_old_user_ids.add(matched_user_id)
         return canonical_user
 
+    async def _prefetch_users(
+        self, rows: list[tuple[int, schemas.CreateUserClassRole]]
+    ) -> None:
+        """Resolves the users of a long roster in a few batched queries.
+
+        Rows that share an email or identifier with another row, match the
+        same user as another row, or need a merge depend on the rows processed
+        before them, so they are left to the per-row lookup. Every other row
+        gets its user (created here if it is new), current enrollment and
+        linked external logins up front.
+        """
+        if len(rows) < ADD_NEW_USERS_BULK_MIN_ROWS:
+            return
+
+        lookups = [(ucr.email, self._get_user_lookup_items(ucr)) for _, ucr in rows]
+        resolved = await models.User.get_many_by_email_external_logins_priority(
+            self.session, lookups
+        )
+
+        keys_by_row = [
+            {email.strip().lower()} | {item.identifier.strip() for item in items}
+            for email, items in lookups
+        ]
+        key_counts = Counter(key for keys in keys_by_row for key in keys)
+        user_counts = Counter(
+            user_id
+            for result in resolved
+            if result is not None
+            for user_id in {*result[1], *([result[0].id] if result[0] else [])}
+        )
+
+        independent: list[tuple[int, schemas.CreateUserClassRole, list[int]]] = []
+        users_by_row: dict[int, models.User] = {}
+        new_users: dict[int, models.User] = {}
+        for (index, ucr), keys, result in zip(rows, keys_by_row, resolved):
+            if result is None or any(key_counts[key] > 1 for key in keys):
+                continue
+            user, matched_user_ids = result
+            if any(user_counts[user_id] > 1 for user_id in matched_user_ids):
+                continue
+            if user is None:
+                if matched_user_ids:
+                    continue
+                new_users[index] = models.User(
+                    email=ucr.email,
+                    display_name=ucr.display_name,
+                    state=schemas.UserState.UNVERIFIED,
+                )
+                # Nobody has these identifiers yet, so they can be inserted
+                # together instead of upserted one by one.
+                identity_logins = self._get_bulk_identity_logins(ucr)
+                if identity_logins is not None:
+                    self._bulk_identity_logins[index] = identity_logins
+            elif set(matched_user_ids) - {user.id}:
+                continue
+            else:
+                users_by_row[index] = user
+            independent.append((index, ucr, matched_user_ids))
+
+        await models.User.create_many(self.session, list(new_users.values()))
+        users_by_row.update(new_users)
+        user_ids = [user.id for user in users_by_row.values()]
+
+        for start in range(0, len(user_ids), 500):
+            for enrollment in await models.UserClassRole.get_by_user_ids(
+                self.session, user_ids[start : start + 500], self.class_id
+            ):
+                self._prefetched_enrollments[enrollment.user_id] = enrollment
+        self._linked_identities = await models.ExternalLogin.get_linked_identities(
+            self.session, user_ids
+        )
+        for index, _, matched_user_ids in independent:
+            self._prefetched_users[index] = (users_by_row[index], matched_user_ids)
+
     def _permissions_to_revoke(self, user_ids: list[int]) -> list[Relation]:
         """Generate permissions to revoke after deleting enrollment for a list of users."""
 
@@ -364,7 +494,7 @@ class AddNewUsers(ABC):
         # External-login identity mapping is handled centrally via
         # _upsert_identity_external_logins before enrollment create/update.
         # Create the user enrollment
-        enrollment = await models.UserClassRole.create(
+        await models.UserClassRole.create(
             self.session,
             user.id,
             self.class_id,
@@ -375,11 +505,34 @@ class AddNewUsers(ABC):
             subscribed_to_summaries=not user.dna_as_join,
             lti_class_id=self.new_ucr.lti_class_id,
         )
+        self._record_new_enrollment(user, ucr, invite_roles)
 
+    async def _create_queued_enrollments(self):
+        """Creates the enrollments queued for prefetched users in one statement."""
+        if not self._queued_enrollments:
+            return
+        await models.UserClassRole.create_many(
+            self.session,
+            self.class_id,
+            {user.id: not user.dna_as_join for user, _, _ in self._queued_enrollments},
+            lms_tenant=self.new_ucr.lms_tenant,
+            lms_type=self.new_ucr.lms_type,
+            lti_class_id=self.new_ucr.lti_class_id,
+        )
+        for user, ucr, invite_roles in self._queued_enrollments:
+            self._record_new_enrollment(user, ucr, invite_roles)
+        self._queued_enrollments = []
+
+    def _record_new_enrollment(
+        self,
+        user: models.User,
+        ucr: schemas.UserClassRole,
+        invite_roles: list[str],
+    ):
         self.new_roles.append(
             schemas.UserClassRole(
-                user_id=enrollment.user_id,
-                class_id=enrollment.class_id,
+                user_id=user.id,
+                class_id=self.class_id,
                 roles=ucr.roles,
             )
         )
@@ -418,6 +571,20 @@ class AddNewUsers(ABC):
         # Finally, add permission revokes for the users that were deleted
         self.revokes.extend(self._permissions_to_revoke(users_to_delete))
 
+    async def _remove_users_off_roster(self, user_ids: list[int]):
+        # Only the users the roster diff says have left, rather than everyone
+        # synced from this source who is not in `newly_synced`. A member whose
+        # email changed shows up as both removed and added for the same user.
+        users_to_delete = await models.UserClassRole.delete_synced_users(
+            self.session,
+            self.class_id,
+            list(set(user_ids) - set(self.newly_synced)),
+            self.new_ucr.lms_type,
+            lms_tenant=self.new_ucr.lms_tenant,
+            lti_class_id=self.new_ucr.lti_class_id,
+        )
+        self.revokes.extend(self._permissions_to_revoke(users_to_delete))
+
     async def add_new_users(self) -> schemas.CreateUserResults:
         """
         Add new users to a class.
@@ -451,9 +618,35 @@ class AddNewUsers(ABC):
             self.newly_synced: list[int] = []
             merged_old_user_ids: set[int] = set()
 
-        results: list[schemas.CreateUserResult] = []
+        # Validate every row first so the valid ones can be looked up together
+        row_errors: list[str | None] = []
+        roster_keys: list[str] = []
         for ucr in self.new_ucr.roles:
+            roster_keys.append(roster_entry_key(ucr))
             error = self._check_permissions(ucr)
+            if error is None:
+                try:
+                    ucr.email = validate_email(
+                        ucr.email, check_deliverability=False
+                    ).normalized
+                except EmailSyntaxError as e:
+                    error = str(e)
+            row_errors.append(error)
+
+        await self._prefetch_users(
+            [
+                (index, ucr)
+                for index, (ucr, error) in enumerate(
+                    zip(self.new_ucr.roles, row_errors)
+                )
+                if error is None
+            ]
+        )
+
+        results: list[schemas.CreateUserResult] = []
+        for index, ucr in enumerate(self.new_ucr.roles):
+            roster_key = roster_keys[index]
+            error = row_errors[index]
             if error:
                 logger.info("add_users_to_class: AddUserException occurred")
                 results.append(
@@ -462,21 +655,11 @@ class AddNewUsers(ABC):
                     )
                 )
                 continue
-            try:
-                ucr.email = validate_email(
-                    ucr.email, check_deliverability=False
-                ).normalized
-            except EmailSyntaxError as e:
-                logger.info("add_users_to_class: AddUserException occurred")
-                results.append(
-                    schemas.CreateUserResult(
-                        email=ucr.email,
-                        display_name=ucr.display_name,
-                        error=str(e),
-                    )
-                )
-                continue
-            user, matched_user_ids = await self._lookup_user_for_ucr(ucr)
+            prefetched = self._prefetched_users.get(index)
+            if prefetched:
+                user, matched_user_ids = prefetched
+            else:
+                user, matched_user_ids = await self._lookup_user_for_ucr(ucr)
             if user is None:
                 user = models.User(
                     email=ucr.email,
@@ -502,6 +685,7 @@ class AddNewUsers(ABC):
 
             if is_sync_import:
                 self.newly_synced.append(user.id)
+                self.synced_user_ids[roster_key] = user.id
             if user.id == self.user_id and not self.new_ucr.is_lti_launch:
                 # We don't want an LMS sync to change the roles of the user who initiated it
                 if is_sync_import:
@@ -530,9 +714,12 @@ class AddNewUsers(ABC):
                     continue
 
             # Check if the user is already enrolled in the class
-            enrollment = await models.UserClassRole.get(
-                self.session, user.id, self.class_id
-            )
+            if prefetched:
+                enrollment = self._prefetched_enrollments.get(user.id)
+            else:
+                enrollment = await models.UserClassRole.get(
+                    self.session, user.id, self.class_id
+                )
 
             is_import_request = bool(
                 self.new_ucr.lms_tenant or self.new_ucr.lti_class_id
@@ -551,7 +738,13 @@ class AddNewUsers(ABC):
                 )
                 continue
 
-            await self._upsert_identity_external_logins(user.id, ucr)
+            if index in self._bulk_identity_logins:
+                self._queued_external_logins.extend(
+                    (user.id, provider, identifier)
+                    for provider, identifier in self._bulk_identity_logins[index]
+                )
+            else:
+                await self._upsert_identity_external_logins(user.id, ucr)
 
             invite_roles = []
             for role in ["admin", "teacher", "student"]:
@@ -569,17 +762,30 @@ class AddNewUsers(ABC):
                     schemas.CreateUserResult(email=ucr.email, display_name=display_name)
                 )
             else:
-                await self._create_user_enrollment(user, ucr, invite_roles)
+                if prefetched:
+                    self._queued_enrollments.append((user, ucr, invite_roles))
+                else:
+                    await self._create_user_enrollment(user, ucr, invite_roles)
                 results.append(
                     schemas.CreateUserResult(email=ucr.email, display_name=display_name)
                 )
 
+        if self._queued_external_logins:
+            await models.ExternalLogin.create_many(
+                self.session, self._queued_external_logins
+            )
+            self._queued_external_logins = []
+        await self._create_queued_enrollments()
+
         # Send emails to new users in the background
         if not self.new_ucr.silent:
             self.send_invites()
 
         if is_sync_import:
-            await self._remove_deleted_users()
+            if self.removed_user_ids is None:
+                await self._remove_deleted_users()
+            else:
+                await self._remove_users_off_roster(self.removed_user_ids)
 
         if len(grants) > len(list(set(grants))):
             logger.exception("Duplicate grants detected.")
@@ -598,6 +804,7 @@ class AddNewUsersManual(AddNewUsers):
         request: StateRequest,
         tasks: BackgroundTasks,
         user_id: Optional[int] = None,
+        removed_user_ids: list[int] | None = None,
     ):
         super().__init__(
             class_id,
@@ -605,6 +812,7 @@ class AddNewUsersManual(AddNewUsers):
             user_id or request.state["session"].user.id,
             request.state["db"],
             request.state["authz"],
+            removed_user_ids=removed_user_ids,
         )
         self.request = request
         self.tasks = tasks
@@ -616,19 +824,24 @@ class AddNewUsersManual(AddNewUsers):
 
     def send_invites(self):
         nowfn = self.get_now_fn()
-        for invite in self.invite_config.invites:
-            magic_link = generate_auth_link(
-                invite.user_id,
-                expiry=86_400 * 7,
-                nowfn=nowfn,
-                redirect=f"/group/{self.class_id}",
+        invites = [
+            (
+                invite,
+                generate_auth_link(
+                    invite.user_id,
+                    expiry=86_400 * 7,
+                    nowfn=nowfn,
+                    redirect=f"/group/{self.class_id}",
+                ),
             )
+            for invite in self.invite_config.invites
+        ]
+        if invites:
             self.tasks.add_task(
                 safe_task,
-                send_invite,
-                config.email.sender,
-                invite,
-                magic_link,
+                send_invites,
+                outbound_email_sender(),
+                invites,
                 86_400 * 7,
             )
 
@@ -641,8 +854,16 @@ class AddNewUsersScript(AddNewUsers):
         session: AsyncSession,
         client: OpenFgaAuthzClient,
         new_ucr: schemas.CreateUserClassRoles,
+        removed_user_ids: list[int] | None = None,
     ):
-        super().__init__(class_id, new_ucr, user_id, session, client)
+        super().__init__(
+            class_id,
+            new_ucr,
+            user_id,
+            session,
+            client,
+            removed_user_ids=removed_user_ids,
+        )
 
     def get_now_fn(self) -> NowFn:
         """Get the current time function for the request."""
@@ -658,7 +879,7 @@ class AddNewUsersScript(AddNewUsers):
                 redirect=f"/group/{self.class_id}",
             )
             send_invite(
-                config.email.sender,
+                outbound_email_sender(),
                 invite,
                 magic_link,
                 86_400 * 7,
@@ -7,28 +7,24 @@ from .schemas import VectorStoreDeleteResponse, VectorStoreType
 import pingpong.models as models
 
 
-async def create_vector_store(
-    session: AsyncSession,
+async def create_openai_vector_store(
     openai_client: openai.AsyncClient,
     class_id: str,
     file_search_file_ids: list[str],
-    type: VectorStoreType,
     upload_to_oai: bool = True,
-) -> tuple[str, int]:
+) -> str:
     """
-    Creates a new vector store with the give file_search file ids and class id
+    Creates a new vector store on OpenAI with the given file_search file ids, without recording it in the database.
 
     Args:
-        session (AsyncSession): SQLAlchemy session
         openai_client (openai.AsyncClient): OpenAI client
         class_id (str): class id of the vector store
         file_search_file_ids (list[str]): list of file ids to add to the vector store
-        type (VectorStoreType): type of the vector store
 
     Returns:
-        tuple[str, int]: vector store id (used for OpenAI API requests, and vector store object id (DB PK, used for database queries)
+        str: vector store id (used for OpenAI API requests)
     """
-
+    new_vector_store = None
     try:
         new_vector_store = await openai_client.vector_stores.create(
             metadata={
@@ -46,22 +42,50 @@ async def create_vector_store(
             400, get_details_from_api_error(e, "OpenAI rejected this request")
         )
 
+    return new_vector_store.id
+
+
+async def create_vector_store(
+    session: AsyncSession,
+    openai_client: openai.AsyncClient,
+    class_id: str,
+    file_search_file_ids: list[str],
+    type: VectorStoreType,
+    upload_to_oai: bool = True,
+) -> tuple[str, int]:
+    """
+    Creates a new vector store with the give file_search file ids and class id
+
+    Args:
+        session (AsyncSession): SQLAlchemy session
+        openai_client (openai.AsyncClient): OpenAI client
+        class_id (str): class id of the vector store
+        file_search_file_ids (list[str]): list of file ids to add to the vector store
+        type (VectorStoreType): type of the vector store
+
+    Returns:
+        tuple[str, int]: vector store id (used for OpenAI API requests, and vector store object id (DB PK, used for database queries)
+    """
+    vector_store_id = await create_openai_vector_store(
+        openai_client, class_id, file_search_file_ids, upload_to_oai
+    )
+
     try:
         data = {
             "type": type,
             "class_id": int(class_id),
             "version": 2,
             "expires_at": None,
-            "vector_store_id": new_vector_store.id,
+            "vector_store_id": vector_store_id,
         }
         vector_store_object_id = await models.VectorStore.create(
             session, data, file_search_file_ids
         )
     except Exception as e:
-        await openai_client.vector_stores.delete(new_vector_store.id)
+        await openai_client.vector_stores.delete(vector_store_id)
         raise e
 
-    return new_vector_store.id, vector_store_object_id
+    return vector_store_id, vector_store_object_id
 
 
 async def append_vector_store_files(
@@ -0,0 +1,173 @@
+"""Benchmark for provisioning a large synced roster with AddNewUsers.
+
+Syncs a synthetic roster into a fresh SQLite database twice: once through the
+bulk path (batched identity lookups, set-based enrollment writes, grouped and
+concurrent authz reads and writes) and once row by row, the way rosters were
+provisioned before. Authz calls go to an in-memory store that sleeps for
+`--authz-latency-ms` per request to stand in for the OpenFGA round trip.
+
+Run from the repository root with a config, e.g.:
+
+    CONFIG_PATH=test_config.toml python -m scripts.bench_add_new_users
+"""
+
+import asyncio
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import click
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import pingpong.authz.openfga as openfga
+import pingpong.users as users
+from pingpong import models, schemas
+
+_CLASS_ID = 1
+_INITIATOR_ID = 1
+
+
+class _FakeFga:
+    """In-memory stand-in for the OpenFGA SDK client used by the authz driver."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.tuples: set[tuple[str, str, str]] = set()
+        self.reads = 0
+        self.writes = 0
+
+    async def read(self, key, options=None):
+        self.reads += 1
+        await asyncio.sleep(self.latency)
+        matches = [
+            SimpleNamespace(key=SimpleNamespace(user=u, relation=r, object=o))
+            for u, r, o in self.tuples
+            if (key.user is None or key.user == u)
+            and key.relation == r
+            and key.object == o
+        ]
+        return SimpleNamespace(tuples=matches, continuation_token=None)
+
+    async def write(self, query):
+        self.writes += 1
+        await asyncio.sleep(self.latency)
+        for t in query.writes or []:
+            self.tuples.add((t.user, t.relation, t.object))
+        for t in query.deletes or []:
+            self.tuples.discard((t.user, t.relation, t.object))
+
+
+class _Authz(openfga.OpenFgaAuthzClient):
+    def __init__(self, fga: _FakeFga):
+        self._cli = fga
+
+    async def test(self, *args, **kwargs) -> bool:
+        return True
+
+
+def _roster(size: int) -> schemas.CreateUserClassRoles:
+    roles = [
+        schemas.CreateUserClassRole(
+            email=f"user{i}@example.edu",
+            sso_id=f"HUID{i}",
+            roles=schemas.ClassUserRoles(
+                admin=False, teacher=i % 100 == 0, student=i % 100 != 0
+            ),
+        )
+        for i in range(size)
+    ]
+    return schemas.CreateUserClassRoles(
+        roles=roles,
+        silent=True,
+        lms_tenant="bench",
+        lms_type=schemas.LMSType.CANVAS,
+        sso_tenant="bench-sso",
+    )
+
+
+async def _seed(session, fga: _FakeFga, existing: int) -> None:
+    session.add(models.Class(id=_CLASS_ID, name="Benchmark", api_key="bench"))
+    session.add(models.User(id=_INITIATOR_ID, email="instructor@example.edu"))
+    # A slice of the roster already has accounts and enrollments, as on a
+    # class that was synced before.
+    for i in range(existing):
+        user = models.User(email=f"user{i}@example.edu")
+        session.add(user)
+        await session.flush()
+        await models.UserClassRole.create(
+            session, user.id, _CLASS_ID, "bench", schemas.LMSType.CANVAS
+        )
+        fga.tuples.add((f"user:{user.id}", "student", f"class:{_CLASS_ID}"))
+    await session.commit()
+
+
+@contextmanager
+def _row_by_row():
+    saved = (
+        users.ADD_NEW_USERS_BULK_MIN_ROWS,
+        openfga._CONCURRENT_REQUESTS,
+        openfga._READ_ALL_MIN_TUPLES,
+    )
+    users.ADD_NEW_USERS_BULK_MIN_ROWS = 10**9
+    openfga._CONCURRENT_REQUESTS = 1
+    openfga._READ_ALL_MIN_TUPLES = 10**9
+    try:
+        yield
+    finally:
+        (
+            users.ADD_NEW_USERS_BULK_MIN_ROWS,
+            openfga._CONCURRENT_REQUESTS,
+            openfga._READ_ALL_MIN_TUPLES,
+        ) = saved
+
+
+async def _run(size: int, existing: int, latency: float, workdir: Path, label: str):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{workdir / label}.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    fga = _FakeFga(latency)
+    async with sessions() as session:
+        await _seed(session, fga, existing)
+
+    roster = _roster(size)
+    async with sessions() as session:
+        t0 = time.perf_counter()
+        results = await users.AddNewUsersScript(
+            str(_CLASS_ID), _INITIATOR_ID, session, _Authz(fga), roster
+        ).add_new_users()
+        await session.commit()
+        elapsed = time.perf_counter() - t0
+    await engine.dispose()
+
+    errors = sum(1 for result in results.results if result.error)
+    click.echo(
+        f"{label}: {elapsed:.2f} s, {len(results.results)} rows, {errors} errors, "
+        f"{fga.reads} authz reads, {fga.writes} authz writes"
+    )
+
+
+@click.command()
+@click.option("--users", "size", default=5000, help="Roster size.")
+@click.option(
+    "--existing", default=500, help="Roster members who are already enrolled."
+)
+@click.option(
+    "--authz-latency-ms", default=2.0, help="Simulated latency per authz request."
+)
+@click.option("--skip-row-by-row", is_flag=True, help="Only time the bulk path.")
+def main(size: int, existing: int, authz_latency_ms: float, skip_row_by_row: bool):
+    click.echo(f"{size} roster members, {existing} already enrolled")
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        latency = authz_latency_ms / 1000
+        asyncio.run(_run(size, existing, latency, workdir, "bulk"))
+        if not skip_row_by_row:
+            with _row_by_row():
+                asyncio.run(_run(size, existing, latency, workdir, "row-by-row"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Microbenchmark for finding the next run time of a cron schedule.
+
+Times `_get_next_run_time` (schedules compiled into per-field bitsets) against
+the previous implementation, which stepped forward one minute, hour or day at
+a time, for a mix of frequent and sparse schedules. The stepping version gives
+up after 1000 steps, so schedules it can't resolve are reported as such.
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import click
+
+from pingpong.now import _get_next_run_time
+from pingpong.test_now import _stepping_next_run_time
+
+_SCHEDULES = [
+    "*/15 * * * *",
+    "0 12 * * 0",
+    "30 2 * * 1",
+    "0 0 29 2 *",
+    "0 3 1-7 * 1",
+]
+
+
+def _time_per_call(fn, sched: str, starts: list[datetime], tz) -> float | None:
+    t0 = time.perf_counter()
+    try:
+        for ts in starts:
+            fn(sched, ts, tz)
+    except ValueError:
+        return None
+    return (time.perf_counter() - t0) / len(starts)
+
+
+@click.command()
+@click.option("--calls", default=2000, help="Start times to look up per schedule.")
+@click.option("--tz", "tz_name", default="America/New_York", help="Schedule timezone.")
+def main(calls: int, tz_name: str) -> None:
+    tz = ZoneInfo(tz_name)
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    # Spread start times over a few years so every DST transition is crossed.
+    starts = [base + timedelta(minutes=7919 * i) for i in range(calls)]
+
+    click.echo(f"{calls} lookups per schedule in {tz_name}")
+    for sched in _SCHEDULES:
+        compiled = _time_per_call(_get_next_run_time, sched, starts, tz)
+        if compiled is None:
+            raise click.ClickException(f"No next run time found for {sched!r}.")
+        stepping = _time_per_call(_stepping_next_run_time, sched, starts, tz)
+        line = f"{sched:<16} compiled: {compiled * 1e6:8.1f} us"
+        if stepping is None:
+            line += "   stepping: gives up"
+        else:
+            line += (
+                f"   stepping: {stepping * 1e6:8.1f} us   ({stepping / compiled:.0f}x)"
+            )
+        click.echo(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Benchmark for merging many duplicate accounts at once.
+
+Creates thousands of synthetic users in a fresh SQLite database, each with
+class enrollments, threads, external logins and authz tuples, and merges them
+in pairs (plus a few chains and several users folded into the same account).
+The merges run once through `merge_many` (set-based statements per table and
+concurrent batched authz writes) and once with `merge` called for each pair,
+the way bulk merges ran before. Authz calls go to an in-memory store that
+sleeps for `--authz-latency-ms` per request to stand in for OpenFGA.
+
+Run from the repository root with a config, e.g.:
+
+    CONFIG_PATH=test_config.toml python -m scripts.bench_merge_users
+"""
+
+import asyncio
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from types import SimpleNamespace
+
+import click
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import pingpong.authz.openfga as openfga
+import pingpong.merge as merge
+from pingpong import models
+
+_CLASSES = 50
+
+
+class _FakeFga:
+    """In-memory stand-in for the OpenFGA SDK client used by the authz driver.
+
+    Tuples are indexed by user and by object so the store itself stays cheap
+    next to the merge being timed.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.by_user: defaultdict[str, set[tuple[str, str, str]]] = defaultdict(set)
+        self.by_object: defaultdict[str, set[tuple[str, str, str]]] = defaultdict(set)
+        self.reads = 0
+        self.writes = 0
+
+    def add(self, t: tuple[str, str, str]) -> None:
+        self.by_user[t[0]].add(t)
+        self.by_object[t[2]].add(t)
+
+    def discard(self, t: tuple[str, str, str]) -> None:
+        self.by_user[t[0]].discard(t)
+        self.by_object[t[2]].discard(t)
+
+    async def read(self, key, options=None):
+        self.reads += 1
+        await asyncio.sleep(self.latency)
+        if key.object.endswith(":"):
+            # Every object of a type that the user has a relation on.
+            matches = [t for t in self.by_user[key.user] if t[2].startswith(key.object)]
+        else:
+            matches = [
+                t
+                for t in self.by_object[key.object]
+                if (key.user is None or key.user == t[0]) and key.relation == t[1]
+            ]
+        return SimpleNamespace(
+            tuples=[
+                SimpleNamespace(key=SimpleNamespace(user=u, relation=r, object=o))
+                for u, r, o in matches
+            ],
+            continuation_token=None,
+        )
+
+    async def write(self, query):
+        self.writes += 1
+        await asyncio.sleep(self.latency)
+        for t in query.writes or []:
+            self.add((t.user, t.relation, t.object))
+        for t in query.deletes or []:
+            self.discard((t.user, t.relation, t.object))
+
+
+class _Authz(openfga.OpenFgaAuthzClient):
+    def __init__(self, fga: _FakeFga):
+        self._cli = fga
+
+
+def _pairs(size: int) -> list[tuple[int, int]]:
+    """Merges user `2i + 2` into user `2i + 1`, with some chains and fan-in."""
+    pairs = []
+    for i in range(size):
+        new_user_id, old_user_id = 2 * i + 1, 2 * i + 2
+        pairs.append((new_user_id, old_user_id))
+        if i % 10 == 9:
+            # Then fold this pair's new user into the previous pair's.
+            pairs.append((new_user_id - 2, new_user_id))
+    return pairs
+
+
+async def _seed(session, fga: _FakeFga, size: int) -> None:
+    user_ids = range(1, 2 * size + 1)
+    await session.execute(
+        insert(models.Class),
+        [
+            {"id": i, "name": f"Class {i}", "api_key": "bench"}
+            for i in range(1, _CLASSES + 1)
+        ],
+    )
+    await session.execute(
+        insert(models.User),
+        [{"id": i, "email": f"user{i}@example.edu"} for i in user_ids],
+    )
+    await session.execute(
+        insert(models.UserClassRole),
+        [
+            {"user_id": i, "class_id": (i // 2) % _CLASSES + 1, "role": "student"}
+            for i in user_ids
+        ],
+    )
+    await session.execute(
+        insert(models.Thread),
+        [
+            {"id": i, "name": f"Thread {i}", "class_id": 1, "thread_id": f"t{i}"}
+            for i in user_ids
+        ],
+    )
+    await session.execute(
+        insert(models.user_thread_association),
+        [{"user_id": i, "thread_id": i} for i in user_ids],
+    )
+    await session.commit()
+    for i in user_ids:
+        await models.ExternalLogin.create_or_update(
+            session, i, "bench-sso", f"SSO{i // 2}"
+        )
+        fga.add((f"user:{i}", "student", f"class:{(i // 2) % _CLASSES + 1}"))
+        fga.add((f"user:{i}", "party", f"thread:{i}"))
+    await session.commit()
+
+
+async def _run(size: int, latency: float, workdir: Path, label: str):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{workdir / label}.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    fga = _FakeFga(latency)
+    async with sessions() as session:
+        await _seed(session, fga, size)
+
+    pairs = _pairs(size)
+    async with sessions() as session:
+        t0 = time.perf_counter()
+        if label == "batch":
+            await merge.merge_many(session, _Authz(fga), pairs)
+        else:
+            for new_user_id, old_user_id in pairs:
+                await merge.merge(session, _Authz(fga), new_user_id, old_user_id)
+        await session.commit()
+        elapsed = time.perf_counter() - t0
+        users_left = await session.scalar(select(func.count(models.User.id)))
+    await engine.dispose()
+
+    click.echo(
+        f"{label}: {elapsed:.2f} s, {len(pairs)} merges, {users_left} users left, "
+        f"{fga.reads} authz reads, {fga.writes} authz writes"
+    )
+
+
+@click.command()
+@click.option("--pairs", "size", default=2000, help="Number of duplicate pairs.")
+@click.option(
+    "--authz-latency-ms", default=2.0, help="Simulated latency per authz request."
+)
+@click.option("--skip-sequential", is_flag=True, help="Only time merge_many.")
+def main(size: int, authz_latency_ms: float, skip_sequential: bool):
+    click.echo(f"{size} duplicate pairs")
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        latency = authz_latency_ms / 1000
+        asyncio.run(_run(size, latency, workdir, "batch"))
+        if not skip_sequential:
+            asyncio.run(_run(size, latency, workdir, "sequential"))
+
+
+if __name__ == "__main__":
+    main()
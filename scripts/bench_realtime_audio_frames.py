@@ -0,0 +1,61 @@
+"""Microbenchmark for voice mode websocket audio encodings.
+
+Encodes and decodes a stream of assistant audio deltas both as legacy JSON
+messages with base64 audio and as binary audio frames, and reports bytes on
+the wire and CPU time per frame for each. Decoding stands in for the work the
+browser does per message.
+"""
+
+import json
+import os
+import time
+from typing import Literal
+
+import click
+import pybase64
+
+from pingpong.realtime_audio_frames import RealtimeAudioTransport, decode_audio_frame
+from pingpong.realtime_recorder import AUDIO_FRAME_RATE, AUDIO_SAMPLE_WIDTH
+
+
+@click.command()
+@click.option("--frames", default=5_000, help="Audio deltas to encode.")
+@click.option("--frame-ms", default=40, help="Audio per delta.")
+def main(frames: int, frame_ms: int) -> None:
+    audio = os.urandom(AUDIO_FRAME_RATE * frame_ms // 1000 * AUDIO_SAMPLE_WIDTH)
+    audio_b64 = pybase64.b64encode(audio).decode("utf-8")
+    item_id = "item_CDm9qR2xTn4bWvYp0aLkE"
+
+    for label, binary_frames in (("json+base64", False), ("binary", True)):
+        transport = RealtimeAudioTransport()
+        transport.binary_frames = binary_frames
+        decode_seconds = 0.0
+        for index in range(frames):
+            message = transport.encode_assistant_audio(
+                item_id=item_id,
+                event_id=f"event_{index:020d}",
+                audio=audio,
+                audio_b64=audio_b64,
+            )
+            t0 = time.perf_counter()
+            if isinstance(message, bytes):
+                decoded = decode_audio_frame(message).audio
+            else:
+                decoded = pybase64.b64decode(json.loads(message)["audio"])
+            decode_seconds += time.perf_counter() - t0
+            if decoded != audio:
+                raise click.ClickException(f"{label} frame {index} did not round trip.")
+
+        encoding: Literal["binary", "legacy"] = "binary" if binary_frames else "legacy"
+        wire_bytes = transport.wire_bytes[("outbound", encoding)]
+        encode_seconds = transport.codec_seconds[("outbound", encoding)]
+        click.echo(
+            f"{label}: {wire_bytes / frames:.0f} bytes/frame "
+            f"({wire_bytes / frames / len(audio):.2f}x PCM), "
+            f"encode {encode_seconds / frames * 1e6:.1f} us/frame, "
+            f"decode {decode_seconds / frames * 1e6:.1f} us/frame"
+        )
+
+
+if __name__ == "__main__":
+    main()
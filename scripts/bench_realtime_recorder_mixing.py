@@ -0,0 +1,107 @@
+"""Microbenchmark for realtime recorder buffer mixing.
+
+Builds synthetic voice sessions (continuous user audio plus many short
+assistant deltas, the last one cut off mid-chunk) and mixes each one with the
+previous `AudioSegment.overlay` loop and with `mix_pcm16`. The two outputs must
+be sample-identical.
+"""
+
+import os
+import random
+import time
+
+import click
+from pydub import AudioSegment
+
+from pingpong.realtime_recorder import (
+    AUDIO_CHANNELS,
+    AUDIO_FRAME_RATE,
+    AUDIO_SAMPLE_WIDTH,
+    mix_pcm16,
+)
+
+
+def _segment(duration_ms: int) -> AudioSegment:
+    frames = duration_ms * AUDIO_FRAME_RATE // 1000
+    return AudioSegment(
+        data=os.urandom(frames * AUDIO_SAMPLE_WIDTH * AUDIO_CHANNELS),
+        sample_width=AUDIO_SAMPLE_WIDTH,
+        frame_rate=AUDIO_FRAME_RATE,
+        channels=AUDIO_CHANNELS,
+    )
+
+
+def _synthetic_session(
+    rng: random.Random, duration_ms: int, user_chunk_ms: int, delta_ms: int
+) -> list[tuple[int, AudioSegment]]:
+    placements = [
+        (position_ms, _segment(user_chunk_ms))
+        for position_ms in range(0, duration_ms, user_chunk_ms)
+    ]
+    position_ms = rng.randrange(0, 2_000)
+    while position_ms < duration_ms:
+        response_ms = rng.randrange(2_000, 20_000)
+        response_end_ms = min(duration_ms, position_ms + response_ms)
+        while position_ms < response_end_ms:
+            chunk = _segment(delta_ms)
+            if position_ms + delta_ms > response_end_ms:
+                # Playback was interrupted during this chunk.
+                chunk = chunk[: response_end_ms - position_ms]
+            placements.append((position_ms, chunk))
+            position_ms += delta_ms
+        position_ms += rng.randrange(500, 5_000)
+    return placements
+
+
+def _overlay_mix(duration_ms: int, placements: list[tuple[int, AudioSegment]]) -> bytes:
+    mixed = AudioSegment.silent(duration=duration_ms, frame_rate=AUDIO_FRAME_RATE)
+    for position_ms, audio in placements:
+        mixed = mixed.overlay(audio, position=position_ms)
+    return mixed.raw_data
+
+
+@click.command()
+@click.option("--sessions", default=5, help="Synthetic sessions to mix.")
+@click.option("--seconds", default=60, help="Length of each mixed buffer.")
+@click.option("--user-chunk-ms", default=100, help="User audio chunk length.")
+@click.option("--delta-ms", default=100, help="Assistant audio delta length.")
+@click.option("--seed", default=0, help="Random seed.")
+def main(
+    sessions: int, seconds: int, user_chunk_ms: int, delta_ms: int, seed: int
+) -> None:
+    rng = random.Random(seed)
+    duration_ms = seconds * 1000
+    overlay_total = 0.0
+    engine_total = 0.0
+    for session in range(1, sessions + 1):
+        placements = _synthetic_session(rng, duration_ms, user_chunk_ms, delta_ms)
+
+        t0 = time.perf_counter()
+        expected = _overlay_mix(duration_ms, placements)
+        overlay_elapsed = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        actual = mix_pcm16(
+            duration_ms,
+            [(position_ms, audio.raw_data) for position_ms, audio in placements],
+        )
+        engine_elapsed = time.perf_counter() - t0
+
+        if actual != expected:
+            raise click.ClickException(f"Session {session} output differs.")
+        overlay_total += overlay_elapsed
+        engine_total += engine_elapsed
+        click.echo(
+            f"session {session}: {len(placements)} chunks, "
+            f"overlay {overlay_elapsed * 1000:.1f} ms, "
+            f"mix_pcm16 {engine_elapsed * 1000:.1f} ms"
+        )
+    click.echo(
+        f"total: overlay {overlay_total * 1000:.1f} ms, "
+        f"mix_pcm16 {engine_total * 1000:.1f} ms "
+        f"({overlay_total / engine_total:.0f}x), outputs identical"
+    )
+
+
+if __name__ == "__main__":
+    main()
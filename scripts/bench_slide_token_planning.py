@@ -0,0 +1,82 @@
+"""Microbenchmark for lecture slide manifest chunk planning.
+
+Plans manifest chunks for a synthetic transcript several times in a row. The
+first (cold) pass tokenizes the transcript; later (warm) passes should reuse
+cached token counts and take a negligible amount of time.
+"""
+
+import time
+from collections import OrderedDict
+
+import click
+
+from pingpong import lecture_slide_processing, schemas
+
+
+def _synthetic_deck(
+    slide_count: int, words_per_slide: int
+) -> tuple[list, list[schemas.LectureVideoManifestWordV3], int]:
+    page_ranges = []
+    transcript: list[schemas.LectureVideoManifestWordV3] = []
+    offset_ms = 0
+    for position in range(slide_count):
+        start_offset_ms = offset_ms
+        for index in range(words_per_slide):
+            transcript.append(
+                schemas.LectureVideoManifestWordV3(
+                    id=f"slide-{position}-word-{index}",
+                    word=f"concept{(position * 31 + index) % 997}",
+                    start_offset_ms=offset_ms,
+                    end_offset_ms=offset_ms + 300,
+                )
+            )
+            offset_ms += 350
+        page_ranges.append(
+            {
+                "slide_position": position,
+                "start_offset_ms": start_offset_ms,
+                "end_offset_ms": offset_ms,
+            }
+        )
+    return page_ranges, transcript, offset_ms
+
+
+@click.command()
+@click.option("--slides", default=120, help="Number of synthetic slides.")
+@click.option("--words-per-slide", default=400, help="Transcript words per slide.")
+@click.option("--passes", default=3, help="Planning passes to time.")
+@click.option(
+    "--input-token-budget",
+    default=200_000,
+    help="Override SLIDE_MANIFEST_INPUT_TOKEN_BUDGET so the deck is chunked.",
+)
+def main(
+    slides: int, words_per_slide: int, passes: int, input_token_budget: int
+) -> None:
+    page_ranges, transcript, total_duration_ms = _synthetic_deck(
+        slides, words_per_slide
+    )
+    lecture_slide_processing.SLIDE_MANIFEST_INPUT_TOKEN_BUDGET = input_token_budget
+    lecture_slide_processing._text_token_counts = OrderedDict()
+    lecture_slide_processing._word_token_counts = OrderedDict()
+    # Load the encoding up front so the first pass measures tokenization only.
+    lecture_slide_processing._slide_manifest_tokenizer()
+
+    click.echo(f"{slides} slides, {len(transcript)} transcript words")
+    for attempt in range(1, passes + 1):
+        t0 = time.perf_counter()
+        chunks = lecture_slide_processing._plan_slide_manifest_generation_chunks(
+            total_duration_ms,
+            generation_prompt="Benchmark prompt",
+            page_ranges=page_ranges,
+            transcript=transcript,
+        )
+        elapsed = time.perf_counter() - t0
+        label = "cold" if attempt == 1 else "warm"
+        click.echo(
+            f"pass {attempt} ({label}): {elapsed * 1000:.1f} ms, {len(chunks)} chunks"
+        )
+
+
+if __name__ == "__main__":
+    main()
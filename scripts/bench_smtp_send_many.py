@@ -0,0 +1,118 @@
+"""Benchmark for bulk email delivery over pooled SMTP sessions.
+
+Starts a local aiosmtpd sink and sends the same batch of messages twice:
+once with `SmtpEmailSender.send_many`, which reuses a small pool of open
+sessions, and once with a fresh `aiosmtplib.send` session per message, the way
+emails were sent before. The sink sleeps for `--handshake-ms` on EHLO to stand
+in for the TCP, TLS and AUTH round trips of a real mail server.
+
+Run from the repository root, e.g.:
+
+    python -m scripts.bench_smtp_send_many
+"""
+
+import asyncio
+import logging
+import socket
+import time
+
+import aiosmtplib
+import click
+from aiosmtpd.controller import Controller
+
+from pingpong.email import SmtpEmailSender
+
+
+class _Sink:
+    def __init__(self, handshake: float):
+        self.handshake = handshake
+        self.messages = 0
+        self.sessions = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        await asyncio.sleep(self.handshake)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        return "250 Message accepted for delivery"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _messages(count: int) -> list[tuple[str, str, str]]:
+    return [
+        (f"user{i}@example.edu", "Your weekly summary", f"<p>Summary {i}</p>" * 50)
+        for i in range(count)
+    ]
+
+
+async def _pooled(port: int, count: int, pool_size: int) -> None:
+    sender = SmtpEmailSender(
+        "noreply@example.edu", host="127.0.0.1", port=port, pool_size=pool_size
+    )
+    results = await sender.send_many(_messages(count), concurrency=pool_size)
+    await sender.close()
+    errors = sum(1 for result in results if result.error)
+    if errors:
+        click.echo(f"{errors} messages failed")
+
+
+async def _per_message(port: int, count: int, concurrency: int) -> None:
+    sender = SmtpEmailSender("noreply@example.edu", host="127.0.0.1", port=port)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _send(to: str, subject: str, message: str) -> None:
+        async with semaphore:
+            await aiosmtplib.send(
+                sender._build_message(to, subject, message),
+                hostname="127.0.0.1",
+                port=port,
+                start_tls=False,
+            )
+
+    await asyncio.gather(*(_send(*m) for m in _messages(count)))
+
+
+def _run(label: str, sink: _Sink, port: int, coro) -> None:
+    sink.messages = sink.sessions = 0
+    t0 = time.perf_counter()
+    asyncio.run(coro)
+    elapsed = time.perf_counter() - t0
+    click.echo(
+        f"{label}: {elapsed:.2f} s, {sink.messages} messages, "
+        f"{sink.sessions} SMTP sessions, {sink.messages / elapsed:.0f} msg/s"
+    )
+
+
+@click.command()
+@click.option("--messages", "count", default=1000, help="Messages to send.")
+@click.option("--pool-size", default=4, help="Pooled sessions and concurrency.")
+@click.option("--handshake-ms", default=20.0, help="Simulated handshake latency.")
+def main(count: int, pool_size: int, handshake_ms: float):
+    logging.getLogger("mail.log").setLevel(logging.WARNING)
+    sink = _Sink(handshake_ms / 1000)
+    controller = Controller(sink, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    try:
+        _run(
+            "pooled", sink, controller.port, _pooled(controller.port, count, pool_size)
+        )
+        _run(
+            "per-message",
+            sink,
+            controller.port,
+            _per_message(controller.port, count, pool_size),
+        )
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
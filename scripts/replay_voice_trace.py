@@ -0,0 +1,37 @@
+"""Replay a recorded voice mode event trace and report its latency telemetry.
+
+The trace is JSON lines in the format read by
+`pingpong.realtime_telemetry.replay_voice_trace`: OpenAI realtime events and
+browser control events, each with a time `t` in seconds from session start.
+"""
+
+import asyncio
+import statistics
+
+import click
+
+from pingpong.realtime_telemetry import replay_voice_trace
+
+
+def _describe(values: list[float]) -> str:
+    if not values:
+        return "no samples"
+    values_ms = sorted(value * 1000 for value in values)
+    p95 = values_ms[min(len(values_ms) - 1, round(0.95 * (len(values_ms) - 1)))]
+    return (
+        f"n={len(values_ms)} median={statistics.median(values_ms):.0f} ms "
+        f"p95={p95:.0f} ms max={values_ms[-1]:.0f} ms"
+    )
+
+
+@click.command()
+@click.argument("trace", type=click.File("r"))
+def main(trace) -> None:
+    telemetry = asyncio.run(replay_voice_trace(trace))
+    for sample, values in telemetry.samples.items():
+        click.echo(f"{sample}: {_describe(values)}")
+    click.echo(f"delta issues: {dict(telemetry.delta_issues) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import { browser } from '$app/environment';
 import { TextLineStream, JSONStream } from '$lib/streams';
+import { AUDIO_FRAME_PROTOCOL_VERSION } from '$lib/realtimeAudioFrames';
 import { getAnonymousSessionToken, getAnonymousShareToken } from '$lib/stores/anonymous';
 
 /**
@@ -5684,6 +5685,7 @@ export const createAudioWebsocket = (classId: number, threadId: number): WebSock
 	if (ltiToken) {
 		params.set('lti_session', ltiToken);
 	}
+	params.set('audio_frames', String(AUDIO_FRAME_PROTOCOL_VERSION));
 	const url = `${protocol}://${host}/api/v1/class/${classId}/thread/${threadId}/audio?${params}`;
 	return new WebSocket(url);
 };
@@ -0,0 +1,34 @@
+import { describe, expect, it } from 'vitest';
+
+import { AudioFrameType, decodeAudioFrame, encodeAudioFrame } from './realtimeAudioFrames';
+
+describe('realtime audio frames', () => {
+	it('round trips a frame', () => {
+		const audio = new Uint8Array([1, 2, 3, 4]).buffer;
+
+		const frame = decodeAudioFrame(
+			encodeAudioFrame(AudioFrameType.AssistantAudio, 1234.5, audio, 'item_1', 'event_é')
+		);
+
+		expect(frame.type).toBe(AudioFrameType.AssistantAudio);
+		expect(frame.timestampMs).toBe(1234.5);
+		expect(frame.itemId).toBe('item_1');
+		expect(frame.eventId).toBe('event_é');
+		expect(Array.from(new Uint8Array(frame.audio))).toEqual([1, 2, 3, 4]);
+	});
+
+	it('matches the server header layout', () => {
+		const buffer = encodeAudioFrame(AudioFrameType.UserAudio, 2, new ArrayBuffer(2));
+		const view = new DataView(buffer);
+
+		expect(buffer.byteLength).toBe(13);
+		expect(view.getUint8(0)).toBe(1);
+		expect(view.getFloat64(1)).toBe(2);
+		expect(view.getUint8(9)).toBe(0);
+		expect(view.getUint8(10)).toBe(0);
+	});
+
+	it('rejects truncated frames', () => {
+		expect(() => decodeAudioFrame(new ArrayBuffer(4))).toThrow();
+	});
+});
@@ -0,0 +1,68 @@
+// Binary audio frames for the voice mode websocket. Mirrors
+// pingpong/realtime_audio_frames.py:
+//   type (u8) | timestamp_ms (f64) | len(item_id) (u8) | len(event_id) (u8)
+//   | item_id (utf-8) | event_id (utf-8) | PCM16 audio
+// All integers are big-endian.
+
+export const AUDIO_FRAME_PROTOCOL_VERSION = 1;
+
+export const AudioFrameType = {
+	UserAudio: 1,
+	AssistantAudio: 2
+} as const;
+
+const HEADER_SIZE = 11;
+const encoder = new TextEncoder();
+const decoder = new TextDecoder();
+
+export type AudioFrame = {
+	type: number;
+	timestampMs: number;
+	itemId: string;
+	eventId: string;
+	audio: ArrayBuffer;
+};
+
+export const encodeAudioFrame = (
+	type: number,
+	timestampMs: number,
+	audio: ArrayBuffer,
+	itemId = '',
+	eventId = ''
+): ArrayBuffer => {
+	const itemIdBytes = encoder.encode(itemId);
+	const eventIdBytes = encoder.encode(eventId);
+	const buffer = new ArrayBuffer(
+		HEADER_SIZE + itemIdBytes.length + eventIdBytes.length + audio.byteLength
+	);
+	const view = new DataView(buffer);
+	view.setUint8(0, type);
+	view.setFloat64(1, timestampMs);
+	view.setUint8(9, itemIdBytes.length);
+	view.setUint8(10, eventIdBytes.length);
+	const bytes = new Uint8Array(buffer);
+	bytes.set(itemIdBytes, HEADER_SIZE);
+	bytes.set(eventIdBytes, HEADER_SIZE + itemIdBytes.length);
+	bytes.set(new Uint8Array(audio), HEADER_SIZE + itemIdBytes.length + eventIdBytes.length);
+	return buffer;
+};
+
+export const decodeAudioFrame = (buffer: ArrayBuffer): AudioFrame => {
+	if (buffer.byteLength < HEADER_SIZE) {
+		throw new Error('Audio frame is shorter than its header.');
+	}
+	const view = new DataView(buffer);
+	const itemIdLength = view.getUint8(9);
+	const eventIdLength = view.getUint8(10);
+	const idsEnd = HEADER_SIZE + itemIdLength + eventIdLength;
+	if (buffer.byteLength < idsEnd) {
+		throw new Error('Audio frame is shorter than its ids.');
+	}
+	return {
+		type: view.getUint8(0),
+		timestampMs: view.getFloat64(1),
+		itemId: decoder.decode(new Uint8Array(buffer, HEADER_SIZE, itemIdLength)),
+		eventId: decoder.decode(new Uint8Array(buffer, HEADER_SIZE + itemIdLength, eventIdLength)),
+		audio: buffer.slice(idsEnd)
+	};
+};